@@ -1,9 +1,11 @@
 """チャット機能のAPIエンドポイント"""
+import asyncio
+import time
 import uuid
 from datetime import datetime
 from typing import List, Optional, Dict
 
-from fastapi import APIRouter, Depends, HTTPException, Path, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Path, Request
 from fastapi.responses import JSONResponse
 
 from app.models.chat import (
@@ -20,6 +22,16 @@ from app.models.chat import (
     MessageType,
     MessageIntent
 )
+from app.services.answer_cache import answer_cache
+from app.services.compute_pool import compute_pool
+from app.services.history_summarizer import history_summarizer
+from app.services.prompt_cache import session_prompt_cache
+from app.services.token_counter import (
+    ensure_session_tokens,
+    token_counter,
+    update_session_minutes,
+)
+from app.services.transcript_retriever import transcript_retriever_cache
 from app.store.chat_store import chat_store
 from app.store.session_store import session_task_store
 from app.utils.logger import get_logger
@@ -77,9 +89,15 @@ async def create_chat_session(
         session = ChatSession(
             task_id=task_id,
             transcription=transcription,
-            minutes=minutes,
-            context_tokens=_estimate_tokens(transcription + minutes)
+            minutes=minutes
         )
+        # 文字起こし・議事録のトークン数はセッション作成時に一度だけ計測
+        ensure_session_tokens(session)
+        if settings.chat_context_mode == "retrieval":
+            # 検索用のチャンク・インデックスを事前に作成
+            transcript_retriever_cache.get(
+                session.session_id, transcription, settings.chat_retrieval_chunk_chars
+            )
         
         # セッションを保存
         chat_store.create_session(session)
@@ -173,6 +191,9 @@ async def delete_chat_session(
         success = chat_store.delete_session(session_id)
         if not success:
             raise HTTPException(status_code=500, detail="セッションの削除に失敗しました")
+        transcript_retriever_cache.discard(session_id)
+        session_prompt_cache.discard(session_id)
+        history_summarizer.discard(session_id)
         
         logger.info(f"チャットセッションを削除しました: {session_id[:8]}...")
         
@@ -251,6 +272,7 @@ async def list_chat_sessions(
 @router.post("/sessions/{session_id}/messages", response_model=SendMessageResponse)
 async def send_chat_message(
     request: Request,
+    background_tasks: BackgroundTasks,
     task_id: str = Path(..., description="タスクID"),
     session_id: str = Path(..., description="セッションID"),
     message_request: SendMessageRequest = None
@@ -282,22 +304,62 @@ async def send_chat_message(
         # 既存のメッセージ履歴を取得
         existing_messages = chat_store.get_messages(session_id)
         
-        ai_response = await openai_service.process_chat_message(
-            session=session,
-            message=message_request.message,
-            intent=message_request.intent,
-            chat_history=existing_messages
+        # 会話履歴に依存しない（最初の）質問は同じタスク・同じ議事録に対する
+        # 回答キャッシュを参照（続きの質問は「それ」などが前の会話を指すため使わない）
+        use_answer_cache = (
+            settings.chat_answer_cache_enabled
+            and message_request.intent == MessageIntent.QUESTION
+            and not existing_messages
         )
-        
-        # 引用を抽出・強化
-        enhanced_citations = citation_service.extract_citations_from_response(
-            ai_response["response"],
-            session.transcription,
-            session
+        cached_answer = (
+            answer_cache.get(task_id, session.minutes, message_request.message)
+            if use_answer_cache
+            else None
         )
         
-        # AI回答の引用とマージ
-        all_citations = ai_response["citations"] + enhanced_citations
+        if cached_answer is not None:
+            start_time = time.time()
+            all_citations = [
+                citation.model_copy(deep=True) for citation in cached_answer.citations
+            ]
+            ai_response = {
+                "response": cached_answer.response,
+                "citations": all_citations,
+                "edit_actions": [],
+                "tokens_used": 0,
+                "usage": None,
+                "processing_time": time.time() - start_time,
+            }
+            logger.info(f"回答キャッシュを使用: {session_id[:8]}...")
+        else:
+            ai_response = await openai_service.process_chat_message(
+                session=session,
+                message=message_request.message,
+                intent=message_request.intent,
+                chat_history=existing_messages
+            )
+            
+            # 引用を抽出・強化
+            # 引用照合はプロセス内の索引を使うため計算用プールのスレッドで実行
+            enhanced_citations = await compute_pool.run_in_thread(
+                citation_service.extract_citations_from_response,
+                ai_response["response"],
+                session.transcription,
+                session,
+            )
+            
+            # AI回答の引用とマージ
+            all_citations = ai_response["citations"] + enhanced_citations
+            
+            # 最初の質問への正常な回答のみキャッシュ
+            if use_answer_cache and _is_cacheable_answer(ai_response):
+                answer_cache.put(
+                    task_id,
+                    session.minutes,
+                    message_request.message,
+                    ai_response["response"],
+                    all_citations,
+                )
         
         # メッセージを作成
         chat_message = ChatMessage(
@@ -309,12 +371,16 @@ async def send_chat_message(
             citations=all_citations,
             edit_actions=ai_response["edit_actions"],
             tokens_used=ai_response["tokens_used"],
+            usage=ai_response.get("usage"),
             processing_time=ai_response["processing_time"]
         )
         
         # メッセージを保存
         chat_store.add_message(chat_message)
         
+        # 予算からあふれた古い会話は応答後にバックグラウンドで要約に取り込む
+        background_tasks.add_task(_update_history_summary, session_id)
+        
         logger.info(f"チャットメッセージを処理: {session_id[:8]}... -> {chat_message.message_id[:8]}...")
         
         return SendMessageResponse(
@@ -336,6 +402,26 @@ async def send_chat_message(
 
 
 
+async def _update_history_summary(session_id: str) -> None:
+    """会話履歴の要約を更新して保存"""
+    session = chat_store.get_session(session_id)
+    if not session:
+        return
+    try:
+        messages = list(chat_store.get_messages(session_id))
+        if await history_summarizer.update(session, messages):
+            chat_store.update_session(session)
+    except Exception as e:
+        logger.error(f"会話履歴の要約更新エラー: {e}", exc_info=True)
+
+
+def _is_cacheable_answer(ai_response: Dict) -> bool:
+    """エラー応答以外の回答かどうか"""
+    return not ai_response.get("error") and not ai_response["response"].startswith(
+        "申し訳ございません"
+    )
+
+
 @router.get("/sessions/{session_id}/citations")
 async def get_session_citations(
     request: Request,
@@ -526,8 +612,8 @@ async def analyze_edit_intent(
             raise HTTPException(status_code=403, detail="セッションへのアクセス権限がありません")
         
         # 編集インテント解析を実行
-        edit_actions, explanation = edit_intent_analyzer.analyze_edit_intent(
-            edit_instruction, session.minutes
+        edit_actions, explanation = await compute_pool.run_in_process(
+            edit_intent_analyzer.analyze_edit_intent, edit_instruction, session.minutes
         )
         
         # 結果を整理
@@ -573,16 +659,8 @@ def _estimate_tokens(text: str) -> int:
     Returns:
         int: 推定トークン数
     """
-    # 日本語の場合、約1.5文字で1トークンの概算
-    # 英語の場合、約4文字で1トークンの概算
-    # ここでは日本語メインと仮定
-    japanese_chars = sum(1 for char in text if ord(char) > 127)
-    english_chars = len(text) - japanese_chars
-    
-    estimated_tokens = int(japanese_chars / 1.5) + int(english_chars / 4)
-    
     # 最低100トークンは確保
-    return max(estimated_tokens, 100)
+    return max(token_counter.count(text), 100)
 
 
 @router.get("/sessions/{session_id}/edit-history")
@@ -631,10 +709,10 @@ async def get_edit_history(
         # 編集履歴サービスでデータを整理
         from app.services.edit_history_service import edit_history_service
         
-        # 編集エントリを作成
-        edit_entries = []
-        for history in edit_histories:
-            entry = edit_history_service.create_edit_entry(
+        # 編集エントリを作成（差分HTMLの生成は計算用プールで並行実行）
+        edit_entries = list(await asyncio.gather(*(
+            compute_pool.run_in_process(
+                edit_history_service.create_edit_entry,
                 task_id=history.task_id,
                 session_id=history.session_id,
                 message_id=history.message_id,
@@ -642,13 +720,17 @@ async def get_edit_history(
                 original_minutes=history.original_minutes,
                 updated_minutes=history.updated_minutes
             )
+            for history in edit_histories
+        )))
+        for history, entry in zip(edit_histories, edit_entries):
             entry["edit_id"] = history.edit_id
             entry["timestamp"] = history.timestamp.isoformat()
             entry["reverted"] = history.reverted
-            edit_entries.append(entry)
         
         # 比較データを作成
-        comparison_data = edit_history_service.create_comparison_data(edit_entries)
+        comparison_data = await compute_pool.run_in_process(
+            edit_history_service.create_comparison_data, edit_entries
+        )
         
         # レスポンスデータを整理
         response_data = {
@@ -728,7 +810,8 @@ async def undo_edit(
         current_minutes = task.minutes or ""
         
         # 編集エントリを作成
-        edit_entry = edit_history_service.create_edit_entry(
+        edit_entry = await compute_pool.run_in_process(
+            edit_history_service.create_edit_entry,
             task_id=edit_history.task_id,
             session_id=edit_history.session_id,
             message_id=edit_history.message_id,
@@ -770,8 +853,9 @@ async def undo_edit(
             tasks_store[task_id] = task
         
         # セッションの議事録も更新
-        session.minutes = restored_minutes
+        update_session_minutes(session, restored_minutes)
         chat_store.update_session(session)
+        answer_cache.invalidate(task_id)
         
         # 元の編集を取り消し済みとしてマーク
         edit_history.reverted = True
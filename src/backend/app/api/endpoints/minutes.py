@@ -1,12 +1,13 @@
 import json
 import os
-from datetime import datetime
-from typing import Dict, List
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
 
 from fastapi import (
     APIRouter,
     Depends,
     File,
+    Form,
     HTTPException,
     Request,
     UploadFile,
@@ -26,8 +27,15 @@ from app.models import (
     UploadResponse,
 )
 from app.models.chat import EditMinutesRequest, EditMinutesResponse, EditHistory
+from app.services.answer_cache import answer_cache
+from app.services.scheduler import TaskPriority
 from app.services.minutes_generator import MinutesGeneratorService
+from app.services.segment_index import SegmentIndex, segment_index_store
+from app.services.sentence_vectors import sentence_vector_store
+from app.services.token_counter import update_session_minutes
 from app.services.transcription import TranscriptionService
+from app.services.transcription_backends import PRIORITY_LOW, PRIORITY_NORMAL
+from app.services.vad import OffsetMap
 from app.services.video_processor import VideoProcessor
 from app.utils.file_handler import FileHandler
 from app.store import tasks_store
@@ -50,12 +58,14 @@ websocket_connections: Dict[str, List[WebSocket]] = {}
 async def upload_media(
     request: Request, 
     file: UploadFile = File(...),
+    priority: Optional[str] = Form(None),
     api_key: str = Depends(get_api_key) if settings.auth_enabled else None
 ) -> UploadResponse:
     """動画・音声ファイルをアップロードして処理を開始"""
 
     # セッションIDを取得
     session_id = SessionManager.get_session_id(request)
+    task_priority = _task_priority(priority)
 
     logger.info(
         f"ファイルアップロード開始: {file.filename} (サイズ: {file.size} bytes) (セッション: {session_id[:8]}...)"
@@ -76,12 +86,14 @@ async def upload_media(
         file_path, file_size = await FileHandler.save_uploaded_file(file, task_id)
         logger.info(f"ファイル保存完了: {file_path} ({file_size} bytes)")
 
-        # タスクを作成
+        # タスクを作成（メディアの長さはスケジューリングの予想処理時間に使用）
         task = MinutesTask(
             task_id=task_id,
             video_filename=file.filename,
             video_size=file_size,
             upload_timestamp=TimezoneUtils.now(),
+            media_duration=await VideoProcessor().probe_duration(file_path),
+            priority=task_priority.name.lower(),
         )
 
         # アップロード完了をマーク
@@ -102,17 +114,23 @@ async def upload_media(
 
         logger.info(f"タスク作成完了: {task_id} - {file.filename} (セッション: {session_id[:8]}...)")
 
-        # タスクキューに追加（ファイルタイプに応じた処理）
-        from app.services.task_queue import get_task_queue
+        # パイプラインの最初のステージ（音声抽出）のキューに追加
+        from app.services.task_queue import QueueDrainingError, get_task_pipeline
 
-        queue = get_task_queue()
-        if file_type == "video":
-            queue_id = await queue.add_task(task_id, process_video_task, task_id)
-        else:  # audio
-            queue_id = await queue.add_task(task_id, process_audio_task, task_id)
+        try:
+            queue_id = await get_task_pipeline().submit(
+                task_id,
+                {"media_type": file_type},
+                priority=task_priority,
+                owner=_queue_owner(session_id, api_key),
+                expected_seconds=task.media_duration,
+            )
+        except QueueDrainingError:
+            raise _draining_error(session_id, task)
 
         logger.info(
-            f"タスクをキューに追加: {task_id} (キューID: {queue_id}, タイプ: {file_type})"
+            f"タスクをキューに追加: {task_id} (キューID: {queue_id}, タイプ: {file_type}, "
+            f"優先度: {task.priority})"
         )
 
         return UploadResponse(task_id=task_id, status=TaskStatus.QUEUED)
@@ -129,6 +147,42 @@ async def upload_media(
         )
 
 
+DRAINING_MESSAGE = "サーバーが停止処理中です。しばらくしてから再度お試しください。"
+
+
+def _draining_error(session_id: str, task: MinutesTask) -> HTTPException:
+    """停止処理中で受け付けられなかったタスクを失敗にし、503 を返す"""
+    _set_task_failed(task, DRAINING_MESSAGE)
+    session_task_store.update_task(session_id, task)
+    tasks_store[task.task_id] = task
+    return HTTPException(
+        status_code=503, detail=DRAINING_MESSAGE, headers={"Retry-After": "30"}
+    )
+
+
+def _queue_owner(session_id: str, api_key: Optional[str]) -> str:
+    """公平分配の単位（APIキー認証時はキー、それ以外はセッション）"""
+    return api_key if isinstance(api_key, str) and api_key else session_id
+
+
+def _task_priority(value: Optional[str]) -> TaskPriority:
+    """
+    指定された優先度（low / normal / high、省略時は normal）
+
+    Raises:
+        HTTPException: 不正な値（400）
+    """
+    if value is None or not value.strip():
+        return TaskPriority.NORMAL
+    try:
+        return TaskPriority[value.strip().upper()]
+    except KeyError:
+        raise HTTPException(
+            status_code=400,
+            detail="priority には low・normal・high のいずれかを指定してください",
+        )
+
+
 @router.options("/tasks")
 async def options_tasks():
     """CORS preflight request handler for tasks endpoint"""
@@ -152,11 +206,10 @@ async def get_all_tasks(
 
 @router.get("/queue/status")
 async def get_queue_status():
-    """タスクキューの状態を取得"""
-    from app.services.task_queue import get_task_queue
+    """パイプラインのキューの状態（全体とステージごと）を取得"""
+    from app.services.task_queue import get_task_pipeline
 
-    queue = get_task_queue()
-    return queue.get_queue_status()
+    return get_task_pipeline().get_queue_status()
 
 
 @router.get("/{task_id}/status", response_model=TaskStatusResponse)
@@ -205,9 +258,41 @@ async def get_task_status(
         video_filename=task.video_filename,
         upload_timestamp=task.upload_timestamp,
         error_message=task.error_message,
+        vad_removed_percent=task.vad_removed_percent,
+        **(await _task_eta(task)),
     )
 
 
+async def _task_eta(task: MinutesTask) -> Dict[str, Any]:
+    """パイプライン上の順番と、開始・完了の予定時刻（予測できない項目はNone）"""
+    eta = {
+        "queue_position": None,
+        "estimated_start": None,
+        "estimated_completion": None,
+    }
+    if task.status not in (TaskStatus.QUEUED, TaskStatus.PROCESSING):
+        return eta
+    try:
+        from app.services.task_queue import get_task_pipeline
+
+        estimate = await get_task_pipeline().estimate_task(task.task_id)
+    except Exception as e:
+        logger.warning(f"完了予定の予測に失敗: {task.task_id} - {e}")
+        return eta
+    if estimate is None:
+        return eta
+
+    now = TimezoneUtils.now()
+    eta["queue_position"] = estimate.queue_position
+    if estimate.start_in_seconds is not None:
+        eta["estimated_start"] = now + timedelta(seconds=estimate.start_in_seconds)
+    if estimate.completion_in_seconds is not None:
+        eta["estimated_completion"] = now + timedelta(
+            seconds=estimate.completion_in_seconds
+        )
+    return eta
+
+
 @router.get("/{task_id}/result", response_model=TaskResultResponse)
 async def get_task_result(
     request: Request, 
@@ -293,6 +378,9 @@ async def delete_task(
     try:
         # ファイルクリーンアップ
         FileHandler.cleanup_files(task_id)
+        segment_index_store.delete(task_id)
+        sentence_vector_store.delete(task_id)
+        answer_cache.invalidate(task_id)
         logger.info(f"ファイルクリーンアップ完了: {task_id}")
 
         # セッションベースタスクストアから削除
@@ -319,8 +407,12 @@ async def delete_task(
 
 
 @router.post("/{task_id}/retry")
-async def retry_task(request: Request, task_id: str) -> JSONResponse:
-    """失敗したタスクを再実行"""
+async def retry_task(
+    request: Request,
+    task_id: str,
+    api_key: str = Depends(get_api_key) if settings.auth_enabled else None,
+) -> JSONResponse:
+    """失敗したタスクを再実行（アップロード時と同じ優先度・公平分配の単位で登録）"""
     session_id = SessionManager.get_session_id(request)
     logger.info(f"タスク再実行要求: {task_id} (セッション: {session_id[:8]}...)")
 
@@ -345,6 +437,8 @@ async def retry_task(request: Request, task_id: str) -> JSONResponse:
         logger.warning(f"失敗していないタスクは再実行できません: {task_id} (現在のステータス: {task.status})")
         raise HTTPException(status_code=400, detail="失敗したタスクのみ再実行できます")
 
+    from app.services.task_queue import QueueDrainingError, get_task_pipeline
+
     try:
         # タスクを初期状態にリセット
         task.status = TaskStatus.QUEUED
@@ -353,9 +447,10 @@ async def retry_task(request: Request, task_id: str) -> JSONResponse:
         task.overall_progress = 0
         task.transcription = None
         task.minutes = None
+        answer_cache.invalidate(task_id)
         
-        # すべてのステップをリセット
-        task.steps = []
+        # すべてのステップを初期状態に戻す（空にすると進捗を計算できない）
+        task.steps = MinutesTask.model_fields["steps"].default_factory()
         
         # アップロード完了をマーク（ファイルは既に存在するため）
         task.update_step_status(
@@ -369,10 +464,15 @@ async def retry_task(request: Request, task_id: str) -> JSONResponse:
 
         logger.info(f"タスクリセット完了: {task_id} (セッション: {session_id[:8]}...)")
 
-        # タスクキューに再追加
-        from app.services.task_queue import get_task_queue
-
-        queue = get_task_queue()
+        # パイプラインに再追加
+        def resubmit(media_type: str):
+            return get_task_pipeline().submit(
+                task_id,
+                {"media_type": media_type},
+                priority=_task_priority(task.priority),
+                owner=_queue_owner(session_id, api_key),
+                expected_seconds=task.media_duration,
+            )
         
         # ファイルの種類を判定（ファイル名から）
         if task.video_filename:
@@ -380,14 +480,14 @@ async def retry_task(request: Request, task_id: str) -> JSONResponse:
             is_video = any(task.video_filename.lower().endswith(ext) for ext in video_extensions)
             
             if is_video:
-                queue_id = await queue.add_task(task_id, process_video_task, task_id)
+                queue_id = await resubmit("video")
                 logger.info(f"動画タスクとしてキューに再追加: {task_id} (キューID: {queue_id})")
             else:
-                queue_id = await queue.add_task(task_id, process_audio_task, task_id)
+                queue_id = await resubmit("audio")
                 logger.info(f"音声タスクとしてキューに再追加: {task_id} (キューID: {queue_id})")
         else:
             # ファイル名が不明な場合はデフォルトで動画処理
-            queue_id = await queue.add_task(task_id, process_video_task, task_id)
+            queue_id = await resubmit("video")
             logger.info(f"デフォルト（動画）タスクとしてキューに再追加: {task_id} (キューID: {queue_id})")
 
         return JSONResponse(
@@ -399,6 +499,8 @@ async def retry_task(request: Request, task_id: str) -> JSONResponse:
             }
         )
 
+    except QueueDrainingError:
+        raise _draining_error(session_id, task)
     except Exception as e:
         logger.error(f"タスク再実行エラー: {task_id} - {str(e)}", exc_info=True)
         raise HTTPException(
@@ -406,6 +508,47 @@ async def retry_task(request: Request, task_id: str) -> JSONResponse:
         )
 
 
+@router.post("/{task_id}/cancel")
+async def cancel_task(request: Request, task_id: str) -> JSONResponse:
+    """待機中・処理中のタスクをキャンセル（実行中の処理はすぐに中断）"""
+    session_id = SessionManager.get_session_id(request)
+    logger.info(f"タスクキャンセル要求: {task_id} (セッション: {session_id[:8]}...)")
+
+    task = session_task_store.get_task(session_id, task_id) or tasks_store.get(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="指定されたタスクが見つかりません")
+
+    if task.status not in (TaskStatus.QUEUED, TaskStatus.PROCESSING):
+        raise HTTPException(
+            status_code=400, detail="待機中または処理中のタスクのみキャンセルできます"
+        )
+
+    from app.services.task_queue import get_task_pipeline
+
+    found = await get_task_pipeline().cancel(task_id)
+    if not found:
+        logger.warning(f"キューにないタスクをキャンセル: {task_id}")
+
+    # 中断後の処理はワーカー側でも行われるが、応答に反映するためここで失敗にする
+    if task.status != TaskStatus.FAILED:
+        _set_task_failed(task, CANCELLED_MESSAGE)
+        _save_processing_task(task_id, task)
+        await broadcast_task_failed(task_id, task, CANCELLED_MESSAGE)
+    if not found:
+        # キューにあったタスクのファイルは、ステージの中断（ffmpegの停止など）を
+        # 待ってから abort_media_task が削除する。キューにない場合のみここで削除
+        FileHandler.cleanup_files(task_id)
+
+    return JSONResponse(
+        status_code=200,
+        content={
+            "message": f"タスク {task_id} をキャンセルしました",
+            "task_id": task_id,
+            "status": task.status.value,
+        },
+    )
+
+
 @router.post("/{task_id}/regenerate")
 async def regenerate_minutes(request: Request, task_id: str) -> JSONResponse:
     """文字起こしから議事録を再生成"""
@@ -456,6 +599,7 @@ async def regenerate_minutes(request: Request, task_id: str) -> JSONResponse:
         
         # 永続ストアも更新
         persistent_store.update_task(session_id, task)
+        answer_cache.invalidate(task_id)
 
         logger.info(f"議事録再生成完了: {task_id} (セッション: {session_id[:8]}...)")
 
@@ -518,265 +662,330 @@ async def websocket_endpoint(websocket: WebSocket, task_id: str):
                 del websocket_connections[task_id]
 
 
-async def process_video_task(task_id: str) -> None:
-    """動画処理のメインタスク"""
-    # タスクを取得（従来のタスクストアから）
-    if task_id not in tasks_store:
-        logger.error(f"処理対象のタスクが見つかりません: {task_id}")
+def record_vad_result(task: MinutesTask, video_processor: VideoProcessor) -> None:
+    """VADの除去率とオフセットマップをタスクに記録"""
+    if video_processor.offset_map is None:
         return
+    task.vad_removed_percent = video_processor.vad_removed_percent
+    task.audio_offset_map = video_processor.offset_map.to_list()
+    logger.info(f"VAD除去率: {task.task_id} - {task.vad_removed_percent}%")
 
-    task = tasks_store[task_id]
 
-    # セッションIDを見つけてタスクを更新する関数
-    def update_session_task():
-        updated = False
-        for session_id, session_tasks in session_task_store._sessions.items():
-            if task_id in session_tasks:
-                session_task_store.update_task(session_id, task)
-                updated = True
-        
-        # セッションストアにない場合でも従来のタスクストアは更新
-        tasks_store[task_id] = task
-        
-        # 永続化ストアも更新
-        try:
-            # どのセッションにタスクが属するかを特定
-            for session_id in persistent_store._sessions_cache:
-                if task_id in persistent_store._sessions_cache[session_id]:
-                    persistent_store.update_task(session_id, task)
-                    break
-        except Exception as e:
-            logger.warning(f"プロセス中の永続化更新に失敗: {e}")
-        
-        return updated
+def save_segment_index(
+    task: MinutesTask, transcription_service: TranscriptionService
+) -> None:
+    """文字起こしセグメントの索引を保存（引用タイムスタンプ用）"""
+    try:
+        offset_map = (
+            OffsetMap.from_list(task.audio_offset_map)
+            if task.audio_offset_map
+            else None
+        )
+        index = SegmentIndex.from_segments(
+            task.transcription or "", transcription_service.segments, offset_map
+        )
+        if len(index) == 0:
+            return
+        segment_index_store.save(task.task_id, index)
+    except Exception as e:
+        logger.warning(f"セグメント索引の保存に失敗: {task.task_id} - {e}")
+
+
+def _save_processing_task(task_id: str, task: MinutesTask) -> None:
+    """処理中のタスクをセッション・従来・永続化の各ストアに反映"""
+    for session_id, session_tasks in session_task_store._sessions.items():
+        if task_id in session_tasks:
+            session_task_store.update_task(session_id, task)
 
+    # セッションストアにない場合でも従来のタスクストアは更新
+    tasks_store[task_id] = task
+
+    # 永続化ストアも更新
     try:
-        # ステータスを処理中に変更
-        task.status = TaskStatus.PROCESSING
-        update_session_task()
-        await broadcast_progress_update(task_id, task)
+        # どのセッションにタスクが属するかを特定
+        for session_id in persistent_store._sessions_cache:
+            if task_id in persistent_store._sessions_cache[session_id]:
+                persistent_store.update_task(session_id, task)
+                break
+    except Exception as e:
+        logger.warning(f"プロセス中の永続化更新に失敗: {e}")
 
-        # 1. 音声抽出
-        task.update_step_status(
-            ProcessingStepName.AUDIO_EXTRACTION, ProcessingStepStatus.PROCESSING
-        )
-        update_session_task()
-        await broadcast_progress_update(task_id, task)
 
-        video_processor = VideoProcessor()
-        audio_path = await video_processor.extract_audio(task_id)
+def _load_processing_task(task_id: str) -> Optional[MinutesTask]:
+    """処理対象のタスクを取得（再起動後は永続化から復元したセッションストアを参照）"""
+    task = tasks_store.get(task_id)
+    if task is None:
+        for session_tasks in session_task_store._sessions.values():
+            if task_id in session_tasks:
+                task = tasks_store[task_id] = session_tasks[task_id]
+                break
+    if task is None:
+        # 他のレプリカで登録されたタスクは共有ストレージから読み込む
+        loaded = persistent_store.load_task_from_disk(task_id)
+        if loaded is not None:
+            session_id, task = loaded
+            session_task_store._sessions.setdefault(session_id, {})[task_id] = task
+            tasks_store[task_id] = task
+    if task is None:
+        logger.error(f"処理対象のタスクが見つかりません: {task_id}")
+    return task
 
-        task.update_step_status(
-            ProcessingStepName.AUDIO_EXTRACTION, ProcessingStepStatus.COMPLETED, 100
-        )
-        update_session_task()
-        await broadcast_progress_update(task_id, task)
 
-        # 2. 文字起こし
-        task.update_step_status(
-            ProcessingStepName.TRANSCRIPTION, ProcessingStepStatus.PROCESSING
-        )
-        update_session_task()
-        await broadcast_progress_update(task_id, task)
+def fail_interrupted_tasks(active_task_ids: List[str]) -> int:
+    """
+    再起動で処理が途切れたタスクを失敗にする（再実行できるようにする）
 
-        transcription_service = TranscriptionService()
-        transcription = await transcription_service.transcribe_audio(audio_path)
-        task.transcription = transcription
+    Args:
+        active_task_ids: ジャーナルから再投入したタスクID
 
+    Returns:
+        int: 失敗にしたタスク数
+    """
+    active = set(active_task_ids)
+    interrupted = {}
+    for session_tasks in session_task_store._sessions.values():
+        for task_id, task in session_tasks.items():
+            if task_id not in active and task.status in (
+                TaskStatus.QUEUED,
+                TaskStatus.PROCESSING,
+            ):
+                interrupted[task_id] = task
+
+    error_message = INTERRUPTED_MESSAGE
+    for task_id, task in interrupted.items():
+        _set_task_failed(task, error_message)
+        _save_processing_task(task_id, task)
+    if interrupted:
+        logger.warning(f"中断されたタスクを失敗に変更: {len(interrupted)}件")
+    return len(interrupted)
+
+
+def _set_task_failed(task: MinutesTask, error_message: str) -> None:
+    """タスクと現在のステップを失敗にする"""
+    task.status = TaskStatus.FAILED
+    task.error_message = error_message
+    if task.current_step:
         task.update_step_status(
-            ProcessingStepName.TRANSCRIPTION, ProcessingStepStatus.COMPLETED, 100
+            task.current_step,
+            ProcessingStepStatus.FAILED,
+            error_message=error_message,
         )
-        update_session_task()
-        await broadcast_progress_update(task_id, task)
 
-        # 3. 議事録生成
-        task.update_step_status(
-            ProcessingStepName.MINUTES_GENERATION, ProcessingStepStatus.PROCESSING
-        )
-        update_session_task()
-        await broadcast_progress_update(task_id, task)
 
-        minutes_service = MinutesGeneratorService()
-        minutes = await minutes_service.generate_minutes(transcription)
-        task.minutes = minutes
+CANCELLED_MESSAGE = "処理がキャンセルされました。"
+INTERRUPTED_MESSAGE = "サーバーの再起動により処理が中断されました。再実行してください。"
 
-        task.update_step_status(
-            ProcessingStepName.MINUTES_GENERATION, ProcessingStepStatus.COMPLETED, 100
+
+async def abort_media_task(task_id: str, context: Dict, reason: str) -> None:
+    """キャンセル・タイムアウト・停止で中断したタスクを失敗にしてファイルを削除"""
+    from app.services.task_queue import ABORT_SHUTDOWN, ABORT_TIMEOUT
+
+    if reason == ABORT_TIMEOUT:
+        error_message = (
+            f"処理時間の上限（{settings.task_timeout}秒）を超えたため中断しました。"
         )
-        update_session_task()
+    elif reason == ABORT_SHUTDOWN:
+        error_message = INTERRUPTED_MESSAGE
+    else:
+        error_message = CANCELLED_MESSAGE
 
-        # 最終的な進捗更新を送信
-        await broadcast_progress_update(task_id, task)
+    task = _load_processing_task(task_id)
+    # キャンセルAPIで失敗にしたタスクは再配信しない
+    if task is not None and task.status != TaskStatus.FAILED:
+        _set_task_failed(task, error_message)
+        _save_processing_task(task_id, task)
+        await broadcast_task_failed(task_id, task, error_message)
+    FileHandler.cleanup_files(task_id)
+    logger.warning(f"タスクを中断しました: {task_id} ({reason})")
 
-        # 完了通知
-        await broadcast_task_completed(task_id, task)
 
-    except Exception as e:
-        # エラー処理
-        error_message = f"処理中にエラーが発生しました: {str(e)}"
-        task.status = TaskStatus.FAILED
-        task.error_message = error_message
-
-        # 現在のステップをエラーに設定
-        if task.current_step:
-            task.update_step_status(
-                task.current_step,
-                ProcessingStepStatus.FAILED,
-                error_message=error_message,
-            )
+async def _start_step(
+    task_id: str, task: MinutesTask, step: ProcessingStepName
+) -> None:
+    """ステップを処理中にして進捗を配信"""
+    task.update_step_status(step, ProcessingStepStatus.PROCESSING)
+    _save_processing_task(task_id, task)
+    await broadcast_progress_update(task_id, task)
 
-        update_session_task()
-        await broadcast_task_failed(task_id, task, error_message)
 
-    finally:
-        # ファイルクリーンアップ
-        FileHandler.cleanup_files(task_id)
+async def _complete_step(
+    task_id: str, task: MinutesTask, step: ProcessingStepName
+) -> None:
+    task.update_step_status(step, ProcessingStepStatus.COMPLETED, 100)
+    _save_processing_task(task_id, task)
+    await broadcast_progress_update(task_id, task)
 
 
-async def process_audio_task(task_id: str) -> None:
-    """音声処理のメインタスク"""
-    # タスクを取得（従来のタスクストアから）
-    if task_id not in tasks_store:
-        logger.error(f"処理対象のタスクが見つかりません: {task_id}")
-        return
+async def _fail_task(
+    task_id: str, task: MinutesTask, context: Dict, error: Exception
+) -> None:
+    """タスクを失敗にしてファイルを削除"""
+    if context.get("media_type") == "audio":
+        error_message = f"音声処理中にエラーが発生しました: {str(error)}"
+    else:
+        error_message = f"処理中にエラーが発生しました: {str(error)}"
+    _set_task_failed(task, error_message)
+    _save_processing_task(task_id, task)
+    await broadcast_task_failed(task_id, task, error_message)
+    FileHandler.cleanup_files(task_id)
 
-    task = tasks_store[task_id]
 
-    # セッションIDを見つけてタスクを更新する関数
-    def update_session_task():
-        updated = False
-        for session_id, session_tasks in session_task_store._sessions.items():
-            if task_id in session_tasks:
-                session_task_store.update_task(session_id, task)
-                updated = True
-        
-        # セッションストアにない場合でも従来のタスクストアは更新
-        tasks_store[task_id] = task
-        
-        # 永続化ストアも更新
-        try:
-            # どのセッションにタスクが属するかを特定
-            for session_id in persistent_store._sessions_cache:
-                if task_id in persistent_store._sessions_cache[session_id]:
-                    persistent_store.update_task(session_id, task)
-                    break
-        except Exception as e:
-            logger.warning(f"プロセス中の永続化更新に失敗: {e}")
-        
-        return updated
+async def extract_audio_stage(task_id: str, context: Dict) -> bool:
+    """ステージ1: 音声抽出（動画・M4Aは変換、その他の音声はそのまま使用）"""
+    task = _load_processing_task(task_id)
+    if task is None:
+        return False
 
     try:
         # ステータスを処理中に変更
         task.status = TaskStatus.PROCESSING
-        update_session_task()
+        _save_processing_task(task_id, task)
         await broadcast_progress_update(task_id, task)
 
-        # 音声ファイル処理開始
-        logger.info(f"音声ファイル処理開始: {task_id}")
+        if context.get("media_type") == "audio":
+            # 音声ファイル処理開始
+            logger.info(f"音声ファイル処理開始: {task_id}")
+
+            # 音声ファイルのパスを取得
+            input_audio_path = FileHandler.get_file_path(task_id)
+            if not input_audio_path:
+                raise Exception("音声ファイルが見つかりません")
+
+            # ファイル拡張子を確認
+            file_ext = os.path.splitext(input_audio_path)[1].lower()
+
+            # M4Aファイルの場合は専用処理、その他は音声抽出をスキップ
+            if file_ext == ".m4a":
+                logger.info(f"M4Aファイル専用処理開始: {task_id}")
+                task.update_step_status(
+                    ProcessingStepName.AUDIO_EXTRACTION,
+                    ProcessingStepStatus.PROCESSING,
+                    50,
+                )
+                _save_processing_task(task_id, task)
+                await broadcast_progress_update(task_id, task)
+
+                # VideoProcessorを使用してM4A処理
+                video_processor = VideoProcessor()
+                audio_path = await video_processor.process_audio_file(task_id)
+                record_vad_result(task, video_processor)
+            else:
+                logger.info(f"通常音声ファイル処理: {task_id} (拡張子: {file_ext})")
+                audio_path = input_audio_path
+        else:
+            await _start_step(task_id, task, ProcessingStepName.AUDIO_EXTRACTION)
 
-        # 音声ファイルのパスを取得
-        input_audio_path = FileHandler.get_file_path(task_id)
-        if not input_audio_path:
-            raise Exception("音声ファイルが見つかりません")
+            video_processor = VideoProcessor()
+            audio_path = await video_processor.extract_audio(task_id)
+            record_vad_result(task, video_processor)
 
-        # ファイル拡張子を確認
-        file_ext = os.path.splitext(input_audio_path)[1].lower()
-        
-        # M4Aファイルの場合は専用処理、その他は既存の処理
-        if file_ext == ".m4a":
-            # M4A処理ステップ
-            logger.info(f"M4Aファイル専用処理開始: {task_id}")
-            task.update_step_status(
-                ProcessingStepName.AUDIO_EXTRACTION, ProcessingStepStatus.PROCESSING, 50
-            )
-            update_session_task()
-            await broadcast_progress_update(task_id, task)
+        context["audio_path"] = audio_path
+        await _complete_step(task_id, task, ProcessingStepName.AUDIO_EXTRACTION)
+        return True
 
-            # VideoProcessorを使用してM4A処理
-            video_processor = VideoProcessor()
-            audio_path = await video_processor.process_audio_file(task_id)
-            
-            task.update_step_status(
-                ProcessingStepName.AUDIO_EXTRACTION, ProcessingStepStatus.COMPLETED, 100
-            )
-            update_session_task()
-            await broadcast_progress_update(task_id, task)
-        else:
-            # その他の音声ファイルは音声抽出をスキップ
-            logger.info(f"通常音声ファイル処理: {task_id} (拡張子: {file_ext})")
-            audio_path = input_audio_path
-            
-            # 音声抽出ステップをスキップしてCOMPLETEDに設定
-            task.update_step_status(
-                ProcessingStepName.AUDIO_EXTRACTION, ProcessingStepStatus.COMPLETED, 100
-            )
-            update_session_task()
-            await broadcast_progress_update(task_id, task)
+    except Exception as e:
+        await _fail_task(task_id, task, context, e)
+        return False
 
-        # 文字起こし
-        task.update_step_status(
-            ProcessingStepName.TRANSCRIPTION, ProcessingStepStatus.PROCESSING
-        )
-        update_session_task()
-        await broadcast_progress_update(task_id, task)
 
-        transcription_service = TranscriptionService()
-        transcription = await transcription_service.transcribe_audio(audio_path)
-        task.transcription = transcription
+def _transcription_priority(context: Dict) -> str:
+    """タスクの優先度を文字起こしの優先度に変換（低優先度はハイブリッド時にローカル）"""
+    if context.get("priority", TaskPriority.NORMAL) <= TaskPriority.LOW:
+        return PRIORITY_LOW
+    return PRIORITY_NORMAL
 
-        task.update_step_status(
-            ProcessingStepName.TRANSCRIPTION, ProcessingStepStatus.COMPLETED, 100
-        )
-        update_session_task()
-        await broadcast_progress_update(task_id, task)
 
-        # 議事録生成
-        task.update_step_status(
-            ProcessingStepName.MINUTES_GENERATION, ProcessingStepStatus.PROCESSING
+async def transcribe_stage(task_id: str, context: Dict) -> bool:
+    """ステージ2: 文字起こし（完了後は元ファイルと音声ファイルを削除）"""
+    task = _load_processing_task(task_id)
+    if task is None:
+        return False
+
+    try:
+        await _start_step(task_id, task, ProcessingStepName.TRANSCRIPTION)
+
+        transcription_service = TranscriptionService(
+            priority=_transcription_priority(context)
         )
-        update_session_task()
-        await broadcast_progress_update(task_id, task)
+        transcription = await transcription_service.transcribe_audio(
+            context["audio_path"]
+        )
+        task.transcription = transcription
+        save_segment_index(task, transcription_service)
+
+        await _complete_step(task_id, task, ProcessingStepName.TRANSCRIPTION)
+    except Exception as e:
+        await _fail_task(task_id, task, context, e)
+        return False
+
+    # 以降のステージは文字起こしのみを使うため、議事録生成を待たずにファイルを削除
+    FileHandler.cleanup_files(task_id)
+    return True
+
+
+async def generate_minutes_stage(task_id: str, context: Dict) -> bool:
+    """ステージ3: 議事録生成"""
+    task = _load_processing_task(task_id)
+    if task is None:
+        return False
+
+    try:
+        await _start_step(task_id, task, ProcessingStepName.MINUTES_GENERATION)
 
         minutes_service = MinutesGeneratorService()
-        minutes = await minutes_service.generate_minutes(transcription)
+        minutes = await minutes_service.generate_minutes(task.transcription)
         task.minutes = minutes
 
         task.update_step_status(
             ProcessingStepName.MINUTES_GENERATION, ProcessingStepStatus.COMPLETED, 100
         )
-        update_session_task()
+        _save_processing_task(task_id, task)
 
         # 最終的な進捗更新を送信
         await broadcast_progress_update(task_id, task)
 
         # 完了通知
         await broadcast_task_completed(task_id, task)
+        return True
 
     except Exception as e:
-        # エラー処理
-        error_message = f"音声処理中にエラーが発生しました: {str(e)}"
-        task.status = TaskStatus.FAILED
-        task.error_message = error_message
-
-        # 現在のステップをエラーに設定
-        if task.current_step:
-            task.update_step_status(
-                task.current_step,
-                ProcessingStepStatus.FAILED,
-                error_message=error_message,
-            )
+        await _fail_task(task_id, task, context, e)
+        return False
 
-        update_session_task()
-        await broadcast_task_failed(task_id, task, error_message)
 
-    finally:
-        # ファイルクリーンアップ
-        FileHandler.cleanup_files(task_id)
+# パイプラインのステージ（名前, 関数）。ステージごとにキューと同時実行数を持つ
+MEDIA_PIPELINE_STAGES = (
+    ("extract", extract_audio_stage),
+    ("transcribe", transcribe_stage),
+    ("minutes", generate_minutes_stage),
+)
+
+
+async def run_media_pipeline(task_id: str, media_type: str) -> None:
+    """キューを介さずに全ステージを順に実行"""
+    context = {"media_type": media_type}
+    for _, stage in MEDIA_PIPELINE_STAGES:
+        if not await stage(task_id, context):
+            break
+
+
+async def process_video_task(task_id: str) -> None:
+    """動画処理のメインタスク"""
+    await run_media_pipeline(task_id, "video")
+
+
+async def process_audio_task(task_id: str) -> None:
+    """音声処理のメインタスク"""
+    await run_media_pipeline(task_id, "audio")
 
 
 async def broadcast_progress_update(task_id: str, task: MinutesTask):
     """進捗更新をWebSocket接続に配信"""
     if task_id in websocket_connections:
+        eta = {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in (await _task_eta(task)).items()
+        }
         message = {
             "type": "progress_update",
             "task_id": task_id,
@@ -792,6 +1001,7 @@ async def broadcast_progress_update(task_id: str, task: MinutesTask):
                 }
                 for step in task.steps
             ],
+            **eta,
         }
 
         # 切断された接続を追跡
@@ -813,6 +1023,21 @@ async def broadcast_progress_update(task_id: str, task: MinutesTask):
             del websocket_connections[task_id]
 
 
+async def broadcast_queue_updates() -> None:
+    """
+    接続中の待機・処理中のタスクに、順番と予定時刻の変化を配信
+
+    他のタスクのステージが終わるたびにパイプラインから呼ばれる。
+    """
+    for task_id in list(websocket_connections):
+        task = tasks_store.get(task_id)
+        if task is not None and task.status in (
+            TaskStatus.QUEUED,
+            TaskStatus.PROCESSING,
+        ):
+            await broadcast_progress_update(task_id, task)
+
+
 async def broadcast_task_completed(task_id: str, task: MinutesTask):
     """タスク完了をWebSocket接続に配信"""
     if task_id in websocket_connections:
@@ -958,8 +1183,9 @@ async def edit_minutes(
             tasks_store[task_id] = task
         
         # セッションの議事録も更新
-        session.minutes = updated_minutes
+        update_session_minutes(session, updated_minutes)
         chat_store.update_session(session)
+        answer_cache.invalidate(task_id)
         
         logger.info(f"議事録を編集しました: {edit_history.edit_id[:8]}... ({len(changes_summary)}件の変更)")
         
@@ -82,7 +82,34 @@ class Settings(BaseSettings):
 
     # 処理設定
     max_concurrent_tasks: int = 3  # 同時実行タスク数（Whisper API制限考慮）
-    task_timeout: int = 7200  # 2時間（大きなファイル対応）
+    task_timeout: int = 7200  # 全ステージの実行時間の上限（秒、超えると中断して失敗）
+    pipeline_extract_concurrency: int = 2  # 音声抽出（ffmpeg）の同時実行数
+    pipeline_transcribe_concurrency: int = 3  # 文字起こしの同時実行数
+    pipeline_minutes_concurrency: int = 3  # 議事録生成（LLM）の同時実行数
+    task_scheduling_policy: str = "fair"  # fifo, fair（所有者ごとの公平分配）, sjf（短い順）
+    task_fair_quantum_seconds: float = 600.0  # fair: 1巡で各所有者に配るメディア秒数
+    task_default_expected_seconds: float = 600.0  # 長さが不明なメディアの想定秒数
+    task_journal_enabled: bool = True  # 処理中のタスクを記録し再起動後に再投入
+    task_lease_seconds: float = 60.0  # リースの期限（1/3ごとに延長、停止したレプリカから回収）
+    task_max_attempts: int = 3  # 同じステージを再投入する上限（停止を繰り返すタスク対策）
+    task_claim_interval_seconds: float = 2.0  # 共有ジャーナルから待機タスクを取得する間隔
+    task_drain_grace_seconds: float = 25.0  # 停止時に実行中のステージの完了を待つ上限
+    task_autoscale_enabled: bool = False  # 待機数・待ち時間から各ステージのワーカー数を増減
+    task_autoscale_min_workers: int = 1  # 各ステージのワーカー数の下限
+    task_autoscale_max_multiplier: float = 2.0  # 上限（各ステージの同時実行数の設定値 × 倍率）
+    task_autoscale_interval_seconds: float = 5.0  # 判定の間隔
+    task_autoscale_target_wait_seconds: float = 30.0  # これより長く待たされていれば増やす
+    task_autoscale_up_cooldown_seconds: float = 15.0  # 変更後、次に増やすまでの間隔
+    task_autoscale_down_cooldown_seconds: float = 120.0  # 変更後、次にアイドルで減らすまでの間隔
+    task_autoscale_idle_seconds: float = 120.0  # 待機なしがこれだけ続いたら減らす
+    compute_process_workers: int = 2  # CPU負荷の高い処理のプロセス数（0でスレッドのみ）
+    compute_thread_workers: int = 4  # 索引を参照する処理・ファイル書き出しのスレッド数
+    admission_enabled: bool = True  # アップロード時にキュー・ディスクの空きを確認
+    admission_max_queued_tasks: int = 50  # 待機・処理中のタスクがこれ以上なら429
+    admission_max_backlog_seconds: float = 7200.0  # 推定待ち時間がこれを超えたら429
+    admission_min_free_disk_mb: int = 1024  # 受け入れ後に残すディスクの空き容量
+    admission_temp_space_factor: float = 1.5  # 一時ファイルに必要な容量（申告サイズの倍率）
+    admission_retry_after_seconds: int = 60  # 推定できない場合の Retry-After（秒）
 
     # 音声処理設定
     audio_max_file_size_mb: int = 20  # Whisper API制限の安全マージン
@@ -98,10 +125,25 @@ class Settings(BaseSettings):
     m4a_max_input_size_mb: int = 500  # M4A入力ファイルの最大サイズ (MB)
     m4a_compression_enabled: bool = True  # M4A自動圧縮の有効/無効
 
+    # VAD（無音除去）設定
+    vad_enabled: bool = False  # 文字起こし前に長い無音区間を除去
+    vad_threshold_db: float = -40.0  # 音声とみなすフレームエネルギーの下限 (dBFS)
+    vad_frame_ms: int = 30
+    vad_min_silence_ms: int = 1000  # これより長い無音のみ除去
+    vad_padding_ms: int = 200  # 音声区間の前後に残す余白
+
     # Whisper設定
     whisper_model: str = "whisper-1"
     whisper_language: str = "ja"
 
+    # 文字起こしバックエンド設定
+    transcription_backend: str = "openai"  # openai, local, hybrid
+    local_whisper_engine: str = "faster_whisper"  # faster_whisper, stub
+    local_whisper_model: str = "small"  # モデル名またはCTranslate2モデルのパス
+    local_whisper_workers: int = 2  # ローカル推論のプロセス数
+    local_whisper_compute_type: str = "int8"
+    hybrid_local_max_seconds: int = 120  # ハイブリッド時にローカルで処理するチャンク長の上限
+
     # GPT設定
     gpt_model: str = "o3"
     gpt_max_tokens: int = 4000
@@ -113,13 +155,42 @@ class Settings(BaseSettings):
     chat_max_messages_per_session: int = 100
     chat_max_tokens_per_request: int = 8000
     chat_rate_limit_per_minute: int = 10
+    chat_context_mode: str = "full"  # full: 文字起こし全文, retrieval: 関連部分のみ
+    chat_retrieval_chunk_chars: int = 400  # 検索用チャンクの目安文字数
+    chat_retrieval_top_k: int = 8  # 質問ごとに候補とするチャンク数
+    chat_retrieval_token_budget: int = 4000  # プロンプトに含める抜粋の合計トークン上限
+    chat_answer_cache_enabled: bool = True  # 同じタスクの同じ質問への回答を再利用
+    chat_answer_cache_max_entries: int = 512
+    chat_answer_cache_ttl_seconds: int = 3600
+    chat_history_max_messages: int = 5  # そのままプロンプトに含める直近の会話数
+    chat_history_token_budget: int = 1500  # 直近の会話のトークン上限（超えた分は要約）
+    chat_history_summary_max_tokens: int = 400  # 会話履歴の要約のトークン上限
+    citation_semantic_top_k: int = 1  # 回答中の語句ごとに採用する類似文の数
+    citation_semantic_threshold: float = 0.3  # 語句の重みのうち文に含まれる割合の下限
+    citation_vector_dim: int = 2048  # 文ベクトル（ハッシュTF-IDF）の次元数
     
     # OpenAI Chat設定  
     openai_chat_model: str = "gpt-4.1"  # gpt-4.1, o3-mini, gpt-4o (課金後利用可能)
     openai_chat_max_tokens: int = 4000
     openai_chat_temperature: float = 0.3
     openai_timeout_seconds: int = 60
-    
+    openai_base_url: Optional[str] = None  # 互換サーバー（負荷試験用スタブ等）の接続先
+
+    # OpenAI同時実行制御（AIMD）設定
+    openai_adaptive_concurrency_enabled: bool = True  # 無効時は初期値で固定
+    openai_concurrency_initial: int = 4  # エンドポイントごとの初期同時実行数
+    openai_concurrency_min: int = 1
+    openai_concurrency_max: int = 16
+    openai_concurrency_decrease_factor: float = 0.5  # 429/タイムアウト時の削減率
+
+    # OpenAIリトライ・ヘッジング設定
+    openai_retry_max_attempts: int = 3  # 429/5xx/タイムアウト時の最大試行回数
+    openai_retry_base_delay: float = 0.5  # 指数バックオフの基準待機時間 (秒)
+    openai_retry_max_delay: float = 30.0
+    openai_hedging_enabled: bool = False  # 短いチャット呼び出しのヘッジリクエスト
+    openai_hedge_min_samples: int = 20  # p95を閾値に使うまでの最小サンプル数
+    openai_hedge_max_prompt_chars: int = 20000  # これより長いプロンプトはヘッジしない
+
     # ロギング設定
     log_level: str = "INFO"
     log_dir: str = "logs"
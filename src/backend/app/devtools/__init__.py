@@ -0,0 +1 @@
+"""開発・負荷試験用ツール"""
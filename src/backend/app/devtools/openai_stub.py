@@ -0,0 +1,399 @@
+"""
+OpenAI互換スタブサーバー
+
+/v1/audio/transcriptions と /v1/chat/completions（ストリーミング含む）を実装し、
+レイテンシ分布・エラー/429注入を設定できる。出力は入力内容から決定的に生成される
+ため、課金なしでパイプライン全体の負荷試験・レイテンシ計測に利用できる。
+
+使い方:
+    python scripts/run_openai_stub.py --port 8100 --latency-mean 0.5
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1 uvicorn app.main:app
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+import uuid
+from dataclasses import asdict, dataclass, fields
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+# 決定的な出力の素材となる文
+STUB_SENTENCES = [
+    "本日の会議を始めます。",
+    "前回の議事録を確認しました。",
+    "今期の売上は前年比で増加しています。",
+    "新機能のリリース日程について議論しました。",
+    "課題の担当者を来週までに決定します。",
+    "予算の見直しが必要との意見がありました。",
+    "顧客からのフィードバックを共有します。",
+    "テスト環境の構築は完了しています。",
+    "次回の会議は来週の月曜日に行います。",
+    "以上で本日の議題は終了です。",
+]
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+
+@dataclass
+class StubConfig:
+    """スタブサーバーの挙動設定"""
+
+    latency_distribution: str = "lognormal"  # fixed, uniform, exponential, lognormal
+    latency_mean: float = 0.2  # 平均レイテンシ（秒）
+    latency_jitter: float = 0.5  # uniformは±割合、lognormalはσ
+    transcription_realtime_factor: float = 0.0  # 音声1秒あたりの追加処理時間（秒）
+    audio_bytes_per_second: int = 12000  # 音声長の推定に使うビットレート（96kbps）
+    error_rate: float = 0.0  # 500を返す確率
+    throttle_rate: float = 0.0  # 429を返す確率
+    retry_after: float = 1.0  # 429時のRetry-After（秒）
+    chat_response_sentences: int = 4  # チャット応答の文数
+    chat_prefill_per_1k_tokens: float = 0.0  # 入力1,000トークンあたりの追加処理時間（秒）
+    stream_chunk_chars: int = 8  # ストリーミング時の1チャンクの文字数
+    stream_chunk_delay: float = 0.01  # ストリーミング時のチャンク間隔（秒）
+    seed: Optional[int] = 0  # レイテンシ・エラー注入の乱数シード
+
+    def update(self, values: Dict[str, Any]) -> None:
+        """
+        既知のフィールドのみ更新
+
+        すべての値を検証してから反映する（不正な値があれば何も変更しない）。
+
+        Raises:
+            ValueError: 型の合わない値・未対応のレイテンシ分布
+        """
+        if not isinstance(values, dict):
+            raise ValueError("設定はオブジェクトで指定してください")
+        types = {f.name: f.type for f in fields(self)}
+        updates = {key: value for key, value in values.items() if key in types}
+        for key, value in updates.items():
+            if not _matches_type(value, types[key]):
+                raise ValueError(f"{key} の値が不正です: {value!r}")
+        distribution = updates.get("latency_distribution", self.latency_distribution)
+        if distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"未対応のレイテンシ分布です: {distribution}")
+        for key, value in updates.items():
+            setattr(self, key, value)
+
+
+def _matches_type(value: Any, field_type: Any) -> bool:
+    """設定値がフィールドの型に合うか（int は float として受け付ける）"""
+    if value is None:
+        return field_type == Optional[int]
+    if isinstance(value, bool):
+        return False
+    if field_type is float:
+        return isinstance(value, (int, float))
+    if field_type in (int, Optional[int]):
+        return isinstance(value, int)
+    return isinstance(value, field_type)
+
+
+class StubState:
+    """乱数生成器とエンドポイント別統計"""
+
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def endpoint_stats(self, endpoint: str) -> Dict[str, int]:
+        stats = self.stats.get(endpoint)
+        if stats is None:
+            stats = {
+                "requests": 0,
+                "errors": 0,
+                "throttled": 0,
+                "in_flight": 0,
+                "max_in_flight": 0,
+            }
+            self.stats[endpoint] = stats
+        return stats
+
+    def sample_latency(self) -> float:
+        """設定された分布からレイテンシを生成"""
+        config = self.config
+        mean = max(config.latency_mean, 0.0)
+        if mean == 0.0 or config.latency_distribution == "fixed":
+            return mean
+        if config.latency_distribution == "uniform":
+            spread = mean * config.latency_jitter
+            return max(0.0, self.rng.uniform(mean - spread, mean + spread))
+        if config.latency_distribution == "exponential":
+            return self.rng.expovariate(1.0 / mean)
+        # lognormal: 平均がlatency_meanになるようにμを調整
+        sigma = max(config.latency_jitter, 0.0)
+        mu = math.log(mean) - sigma**2 / 2
+        return self.rng.lognormvariate(mu, sigma)
+
+    def injected_error(self) -> Optional[JSONResponse]:
+        """設定された確率で429/500のレスポンスを返す"""
+        roll = self.rng.random()
+        config = self.config
+        if roll < config.throttle_rate:
+            return JSONResponse(
+                status_code=429,
+                content=_error_body(
+                    "Rate limit reached (stub)", "requests", "rate_limit_exceeded"
+                ),
+                headers={
+                    "retry-after": str(config.retry_after),
+                    "retry-after-ms": str(int(config.retry_after * 1000)),
+                },
+            )
+        if roll < config.throttle_rate + config.error_rate:
+            return JSONResponse(
+                status_code=500,
+                content=_error_body("Internal server error (stub)", "server_error"),
+            )
+        return None
+
+
+def _error_body(message: str, error_type: str, code: Optional[str] = None) -> Dict:
+    return {
+        "error": {"message": message, "type": error_type, "param": None, "code": code}
+    }
+
+
+def _digest(data: bytes) -> bytes:
+    return hashlib.sha256(data).digest()
+
+
+def deterministic_sentences(data: bytes, count: int) -> List[str]:
+    """入力のハッシュから決定的に文を選択"""
+    digest = _digest(data)
+    return [
+        STUB_SENTENCES[digest[i % len(digest)] % len(STUB_SENTENCES)]
+        for i in range(max(count, 1))
+    ]
+
+
+def estimate_tokens(text: str) -> int:
+    """スタブ用の簡易トークン数推定（日本語はおよそ2文字で1トークン）"""
+    return max(1, math.ceil(len(text) / 2))
+
+
+def build_transcription(audio: bytes, duration: float) -> Dict[str, Any]:
+    """音声データから決定的な verbose_json 形式の結果を生成"""
+    sentence_count = max(1, min(len(STUB_SENTENCES) * 4, int(duration // 5) or 1))
+    sentences = deterministic_sentences(audio, sentence_count)
+    step = duration / len(sentences) if duration > 0 else 0.0
+
+    segments = []
+    words = []
+    for index, sentence in enumerate(sentences):
+        start = round(index * step, 2)
+        end = round((index + 1) * step, 2)
+        segments.append(
+            {
+                "id": index,
+                "seek": 0,
+                "start": start,
+                "end": end,
+                "text": sentence,
+                "tokens": [],
+                "temperature": 0.0,
+                "avg_logprob": -0.1,
+                "compression_ratio": 1.0,
+                "no_speech_prob": 0.0,
+            }
+        )
+        # 単語単位のタイムスタンプは文字を均等割り
+        char_step = (end - start) / len(sentence)
+        for offset, char in enumerate(sentence):
+            words.append(
+                {
+                    "word": char,
+                    "start": round(start + offset * char_step, 3),
+                    "end": round(start + (offset + 1) * char_step, 3),
+                }
+            )
+
+    return {
+        "task": "transcribe",
+        "language": "japanese",
+        "duration": round(duration, 2),
+        "text": "".join(sentences),
+        "segments": segments,
+        "words": words,
+    }
+
+
+def create_stub_app(config: Optional[StubConfig] = None) -> FastAPI:
+    """
+    スタブサーバーのアプリケーションを作成
+
+    Args:
+        config: 挙動設定（省略時はデフォルト）
+
+    Returns:
+        FastAPI: OpenAI互換のASGIアプリケーション
+    """
+    state = StubState(config or StubConfig())
+    app = FastAPI(title="OpenAI Stub Server")
+    app.state.stub = state
+
+    async def begin(endpoint: str) -> Optional[JSONResponse]:
+        stats = state.endpoint_stats(endpoint)
+        stats["requests"] += 1
+        error_response = state.injected_error()
+        if error_response is not None:
+            key = "throttled" if error_response.status_code == 429 else "errors"
+            stats[key] += 1
+            return error_response
+        stats["in_flight"] += 1
+        stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+        return None
+
+    def finish(endpoint: str) -> None:
+        state.endpoint_stats(endpoint)["in_flight"] -= 1
+
+    @app.get("/v1/models")
+    async def list_models():
+        models = ["whisper-1", "gpt-4.1", "gpt-4.1-mini", "o3"]
+        return {
+            "object": "list",
+            "data": [
+                {"id": model, "object": "model", "created": 0, "owned_by": "stub"}
+                for model in models
+            ],
+        }
+
+    @app.post("/v1/audio/transcriptions")
+    async def create_transcription(request: Request):
+        endpoint = "audio.transcriptions"
+        form = await request.form()
+        upload = form.get("file")
+        audio = await upload.read() if upload is not None else b""
+        response_format = form.get("response_format") or "json"
+
+        error_response = await begin(endpoint)
+        if error_response is not None:
+            return error_response
+
+        try:
+            duration = len(audio) / max(state.config.audio_bytes_per_second, 1)
+            latency = (
+                state.sample_latency()
+                + duration * state.config.transcription_realtime_factor
+            )
+            await asyncio.sleep(latency)
+            result = build_transcription(audio, duration)
+        finally:
+            finish(endpoint)
+
+        if response_format == "text":
+            return PlainTextResponse(result["text"])
+        if response_format == "verbose_json":
+            granularities = form.getlist("timestamp_granularities[]")
+            if "word" not in granularities:
+                result.pop("words")
+            return result
+        return {"text": result["text"]}
+
+    @app.post("/v1/chat/completions")
+    async def create_chat_completion(request: Request):
+        endpoint = "chat.completions"
+        body = await request.json()
+        model = body.get("model", "gpt-4.1")
+        messages = body.get("messages", [])
+        prompt_text = "".join(str(m.get("content", "")) for m in messages)
+
+        error_response = await begin(endpoint)
+        if error_response is not None:
+            return error_response
+
+        content = "".join(
+            deterministic_sentences(
+                json.dumps(messages, ensure_ascii=False).encode("utf-8"),
+                state.config.chat_response_sentences,
+            )
+        )
+        completion_id = f"chatcmpl-stub-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        usage = {
+            "prompt_tokens": estimate_tokens(prompt_text),
+            "completion_tokens": estimate_tokens(content),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        # 入力が長いほど最初のトークンまでの時間が伸びる（プレフィル）
+        prefill_rate = state.config.chat_prefill_per_1k_tokens
+        prefill = usage["prompt_tokens"] / 1000 * prefill_rate
+
+        if not body.get("stream"):
+            try:
+                await asyncio.sleep(state.sample_latency() + prefill)
+            finally:
+                finish(endpoint)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": usage,
+            }
+
+        async def event_stream():
+            def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None):
+                payload = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                    ],
+                }
+                return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+            try:
+                # 最初のチャンクまでの時間（TTFT）としてレイテンシを適用
+                await asyncio.sleep(state.sample_latency() + prefill)
+                yield chunk({"role": "assistant", "content": ""})
+                size = max(state.config.stream_chunk_chars, 1)
+                for start in range(0, len(content), size):
+                    await asyncio.sleep(state.config.stream_chunk_delay)
+                    yield chunk({"content": content[start : start + size]})
+                yield chunk({}, finish_reason="stop")
+                yield "data: [DONE]\n\n"
+            finally:
+                finish(endpoint)
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+    @app.get("/stub/config")
+    async def get_config():
+        return asdict(state.config)
+
+    @app.put("/stub/config")
+    async def update_config(request: Request):
+        values = await request.json()
+        try:
+            state.config.update(values)
+        except ValueError as e:
+            return JSONResponse(status_code=400, content={"detail": str(e)})
+        if "seed" in values:
+            state.rng.seed(state.config.seed)
+        return asdict(state.config)
+
+    @app.get("/stub/stats")
+    async def get_stats():
+        return state.stats
+
+    @app.post("/stub/stats/reset")
+    async def reset_stats():
+        state.stats.clear()
+        return {"status": "reset"}
+
+    return app
@@ -8,7 +8,7 @@ from starlette.middleware.sessions import SessionMiddleware
 
 from app.api.endpoints import minutes, chat
 from app.config import settings
-from app.services.task_queue import initialize_task_queue, shutdown_task_queue
+from app.services.task_queue import initialize_task_pipeline, shutdown_task_pipeline
 from app.store import tasks_store
 from app.store.session_store import session_task_store
 from app.store.persistent_store import persistent_store
@@ -39,6 +39,42 @@ def create_app() -> FastAPI:
         https_only=True,  # same_site="none" の場合は必須
     )
 
+    # アップロードの受け付け制御（本文を受信する前に判定する）
+    # CORSより内側に置き、429/503 のレスポンスにもCORSヘッダーを付ける
+    @app.middleware("http")
+    async def upload_admission(request: Request, call_next):
+        if not (
+            settings.admission_enabled
+            and request.method == "POST"
+            and request.url.path == "/api/v1/minutes/upload"
+        ):
+            return await call_next(request)
+
+        from app.services.admission import AdmissionRejected, admission_controller
+
+        try:
+            declared = int(request.headers.get("content-length") or 0)
+        except ValueError:
+            declared = 0
+        try:
+            reservation = admission_controller.admit(
+                min(declared, settings.max_file_size)
+            )
+        except AdmissionRejected as e:
+            return JSONResponse(
+                status_code=e.status_code,
+                content={
+                    "detail": e.detail,
+                    "estimated_wait_seconds": e.estimated_wait_seconds,
+                },
+                headers={"Retry-After": str(e.retry_after)},
+            )
+        try:
+            return await call_next(request)
+        finally:
+            # 保存済みのファイルは実際にディスクを使っているため予約は不要
+            reservation.release()
+
     # CORS設定
     app.add_middleware(
         CORSMiddleware,
@@ -120,8 +156,17 @@ def create_app() -> FastAPI:
     @app.on_event("startup")
     async def startup_event():
         logger.info("アプリケーション起動: タスクキュー初期化開始")
-        await initialize_task_queue()
-        logger.info("タスクキュー初期化完了")
+        recovered = await initialize_task_pipeline()
+        logger.info(f"タスクキュー初期化完了 (再投入: {len(recovered)}件)")
+
+        # ジャーナルに記録のない処理中タスクは再起動で失われたため失敗にする
+        try:
+            from app.services.task_queue import get_task_pipeline
+
+            journal = get_task_pipeline().journal
+            minutes.fail_interrupted_tasks(journal.task_ids() if journal else [])
+        except Exception as e:
+            logger.warning(f"中断タスクの確認に失敗: {e}")
         
         # 古いタスクのクリーンアップ
         try:
@@ -134,9 +179,19 @@ def create_app() -> FastAPI:
     @app.on_event("shutdown")
     async def shutdown_event():
         logger.info("アプリケーション停止: タスクキュー停止開始")
-        await shutdown_task_queue()
+        # 実行中のステージは猶予時間まで完了を待ち、残りは次回起動時に再開する
+        await shutdown_task_pipeline(settings.task_drain_grace_seconds)
         logger.info("タスクキュー停止完了")
 
+        from app.services.transcription_backends import shutdown_transcription_backends
+
+        await shutdown_transcription_backends()
+
+        from app.services.compute_pool import compute_pool
+
+        # ストアの保留中の書き込みを終えてから停止
+        await compute_pool.shutdown()
+
     @app.get("/")
     async def root():
         return {
@@ -148,11 +203,15 @@ def create_app() -> FastAPI:
 
     @app.get("/health")
     async def health_check():
-        from app.services.task_queue import get_task_queue
+        from app.services.adaptive_concurrency import get_concurrency_stats
+        from app.services.admission import admission_controller
+        from app.services.answer_cache import answer_cache
+        from app.services.compute_pool import compute_pool
+        from app.services.retry_policy import latency_tracker
+        from app.services.task_queue import get_task_pipeline
         from app.store.chat_store import chat_store
 
-        queue = get_task_queue()
-        queue_status = queue.get_queue_status()
+        queue_status = get_task_pipeline().get_queue_status()
         chat_stats = chat_store.get_stats()
 
         return {
@@ -166,6 +225,11 @@ def create_app() -> FastAPI:
                 "total_tokens_used": chat_stats.total_tokens_used
             },
             "queue": queue_status,
+            "openai_concurrency": get_concurrency_stats(),
+            "openai_latency": latency_tracker.get_stats(),
+            "answer_cache": answer_cache.get_stats(),
+            "compute_pool": compute_pool.get_stats(),
+            "admission": admission_controller.get_stats(),
         }
 
     if settings.auth_enabled:
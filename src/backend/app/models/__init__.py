@@ -87,6 +87,13 @@ class MinutesTask(BaseModel):
     transcription: Optional[str] = None
     minutes: Optional[str] = None
     error_message: Optional[str] = None
+    # アップロード時に取得したメディアの長さ（秒、取得できない場合はNone）
+    media_duration: Optional[float] = None
+    # キューの優先度（low / normal / high、再実行時も同じ優先度で登録する）
+    priority: str = "normal"
+    # VADで除去した音声の割合（%）と、除去後→元メディア時刻のオフセットマップ
+    vad_removed_percent: Optional[float] = None
+    audio_offset_map: Optional[List[List[float]]] = None
 
     def get_current_step(self) -> Optional[ProcessingStep]:
         """現在実行中のステップを取得"""
@@ -162,6 +169,11 @@ class TaskStatusResponse(BaseModel):
     video_filename: str
     upload_timestamp: datetime
     error_message: Optional[str] = None
+    vad_removed_percent: Optional[float] = None
+    # 待機・処理中のみ（0: ステージを実行中、1以上: ステージの待機列での順番）
+    queue_position: Optional[int] = None
+    estimated_start: Optional[datetime] = None  # 待機中のステージの開始予定
+    estimated_completion: Optional[datetime] = None  # 議事録の完成予定
 
 
 class TaskResultResponse(BaseModel):
@@ -174,6 +186,23 @@ class TaskResultResponse(BaseModel):
     upload_timestamp: datetime
 
 
+class TranscriptionSegment(BaseModel):
+    """文字起こしセグメント（秒単位のタイムスタンプ付き）"""
+
+    start: float
+    end: float
+    text: str
+
+
+class TranscriptionResult(BaseModel):
+    """文字起こしバックエンドの処理結果"""
+
+    text: str
+    segments: List[TranscriptionSegment] = Field(default_factory=list)
+    duration: Optional[float] = None
+    backend: str = ""
+
+
 class WebSocketMessage(BaseModel):
     """WebSocketメッセージ"""
 
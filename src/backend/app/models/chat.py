@@ -4,7 +4,7 @@ from datetime import datetime
 from typing import Dict, List, Optional
 from enum import Enum
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, computed_field
 
 
 class MessageType(str, Enum):
@@ -67,10 +67,31 @@ class ChatSession(BaseModel):
     created_at: datetime = Field(default_factory=datetime.now, description="作成日時")
     last_activity: datetime = Field(default_factory=datetime.now, description="最終アクティビティ日時")
     context_tokens: int = Field(0, description="コンテキストトークン数")
+    transcription_tokens: int = Field(0, description="文字起こしのトークン数（キャッシュ）")
+    minutes_tokens: int = Field(0, description="議事録のトークン数（キャッシュ）")
     total_messages: int = Field(0, description="総メッセージ数")
+    history_summary: str = Field("", description="要約済みの古い会話履歴")
+    summarized_message_count: int = Field(0, description="要約に含めた先頭からのメッセージ数")
     is_active: bool = Field(True, description="アクティブ状態")
 
 
+class TokenUsage(BaseModel):
+    """トークン使用量情報"""
+    prompt_tokens: int = Field(0, description="プロンプトトークン数")
+    completion_tokens: int = Field(0, description="完了トークン数")
+    total_tokens: int = Field(0, description="総トークン数")
+    cached_tokens: int = Field(0, description="プロンプトキャッシュに一致したトークン数")
+    estimated_cost: float = Field(0.0, description="推定コスト（USD）")
+
+    @computed_field
+    @property
+    def cached_ratio(self) -> float:
+        """プロンプトトークンのうちキャッシュに一致した割合"""
+        if not self.prompt_tokens:
+            return 0.0
+        return round(self.cached_tokens / self.prompt_tokens, 3)
+
+
 class ChatMessage(BaseModel):
     """チャットメッセージ"""
     message_id: str = Field(default_factory=lambda: str(uuid.uuid4()), description="メッセージID")
@@ -83,6 +104,7 @@ class ChatMessage(BaseModel):
     citations: List[Citation] = Field(default_factory=list, description="引用リスト")
     edit_actions: List[EditAction] = Field(default_factory=list, description="編集アクション（編集リクエストの場合）")
     tokens_used: int = Field(0, description="使用トークン数")
+    usage: Optional[TokenUsage] = Field(None, description="APIが返したトークン使用量")
     processing_time: float = Field(0.0, description="処理時間（秒）")
     error_message: Optional[str] = Field(None, description="エラーメッセージ")
 
@@ -153,14 +175,6 @@ class ChatHistoryResponse(BaseModel):
     session_info: ChatSession = Field(..., description="セッション情報")
 
 
-class TokenUsage(BaseModel):
-    """トークン使用量情報"""
-    prompt_tokens: int = Field(0, description="プロンプトトークン数")
-    completion_tokens: int = Field(0, description="完了トークン数")
-    total_tokens: int = Field(0, description="総トークン数")
-    estimated_cost: float = Field(0.0, description="推定コスト（USD）")
-
-
 # 統計・監視用モデル
 
 class ChatStats(BaseModel):
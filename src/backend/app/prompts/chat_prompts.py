@@ -1,17 +1,14 @@
 """チャット機能用プロンプトテンプレート"""
 
+# セッション中に変わらない指示を先頭に、文字起こし（不変）・議事録（編集で変化）の順に
+# 配置する。会話履歴と質問はユーザーメッセージに置き、システムプロンプトを
+# ターンをまたいでバイト単位で同一に保つ（プロバイダー側のプロンプトキャッシュ対策）。
 CHAT_SYSTEM_PROMPT = """
 あなたは会議の議事録と文字起こしの内容に詳しいアシスタントです。
 質問への回答と議事録の編集依頼の両方に対応できます。
 
 以下の会議内容に基づいて、ユーザーの質問に正確かつ有用な回答を提供してください。
 
-【文字起こし内容】
-{transcription}
-
-【議事録内容】
-{minutes}
-
 【回答時の注意点】
 1. 文字起こしや議事録の内容に基づいて回答する
 2. 内容にない情報は推測しない
@@ -34,8 +31,17 @@ CHAT_SYSTEM_PROMPT = """
 3. 予算見積もりの再計算（担当：山田さん、期限：明日まで）
 
 引用: "田中さんには来週金曜日までに詳細設計書をお願いします。佐藤さんは今月末までに顧客ヒアリングを、山田さんは明日までに予算の再計算をお願いします。"
+
+【文字起こし内容】
+{transcription}
+
+【議事録内容】
+{minutes}
 """
 
+# 検索モードでシステムプロンプトの文字起こし欄に置く説明（抜粋は質問ごとに添付）
+RETRIEVED_TRANSCRIPTION_NOTE = "（文字起こしは質問ごとに関連する部分のみを【関連する文字起こし】として添付します）"
+
 EDIT_ANALYSIS_PROMPT = """
 ユーザーからの編集指示を解析し、議事録に対する具体的な編集アクションを生成してください。
 
@@ -120,6 +126,23 @@ CITATION_EXTRACTION_PROMPT = """
 文脈: 簡潔な説明
 """
 
+HISTORY_SUMMARY_PROMPT = """
+会議内容についてのチャットの会話履歴を、後続の質問に答えるための記憶として要約してください。
+
+【これまでの要約】
+{previous_summary}
+
+【新たに要約に含める会話】
+{conversation}
+
+【要約ルール】
+1. これまでの要約と新たな会話を1つの要約に統合する
+2. 質問された話題、回答で示した事実・数値・担当者・期限を残す
+3. 議事録への編集依頼とその結果があれば残す
+4. 挨拶や言い換えなど後続の回答に不要な内容は省く
+5. 箇条書きで{max_tokens}トークン以内にまとめる
+"""
+
 def get_chat_system_prompt(transcription: str, minutes: str) -> str:
     """チャット用システムプロンプトを取得"""
     return CHAT_SYSTEM_PROMPT.format(
@@ -127,6 +150,16 @@ def get_chat_system_prompt(transcription: str, minutes: str) -> str:
         minutes=minutes
     )
 
+def build_retrieved_transcription(passages: list) -> str:
+    """検索で選んだ文字起こしの抜粋をプロンプト用テキストに変換"""
+    if not passages:
+        return "（質問に関連する文字起こしの部分は見つかりませんでした）"
+
+    parts = ["（質問に関連する部分のみを時系列で抜粋）"]
+    for timestamp, text in passages:
+        parts.append(f"[{timestamp}] {text}")
+    return "\n\n".join(parts)
+
 def get_edit_analysis_prompt(current_minutes: str, edit_instruction: str) -> str:
     """編集解析用プロンプトを取得"""
     return EDIT_ANALYSIS_PROMPT.format(
@@ -142,13 +175,34 @@ def get_citation_extraction_prompt(transcription: str, question: str, ai_respons
         ai_response=ai_response
     )
 
-def build_chat_history_context(messages: list, max_messages: int = 5) -> str:
-    """チャット履歴をコンテキスト用テキストに変換"""
-    if not messages:
+def get_history_summary_prompt(
+    previous_summary: str, messages: list, max_tokens: int
+) -> str:
+    """会話履歴の要約用プロンプトを取得"""
+    conversation = "\n".join(
+        f"Q: {msg.message}\nA: {msg.response}" for msg in messages
+    )
+    return HISTORY_SUMMARY_PROMPT.format(
+        previous_summary=previous_summary or "（なし）",
+        conversation=conversation,
+        max_tokens=max_tokens,
+    )
+
+def build_chat_history_context(
+    messages: list, max_messages: int = 5, summary: str = ""
+) -> str:
+    """チャット履歴をコンテキスト用テキストに変換（古い会話は要約として先頭に含める）"""
+    if not messages and not summary:
         return ""
     
-    recent_messages = messages[-max_messages:]
-    context_parts = ["【これまでの会話履歴】"]
+    recent_messages = messages[-max_messages:] if messages else []
+    context_parts = []
+    if summary:
+        context_parts.append("【これまでの会話の要約】")
+        context_parts.append(summary)
+        context_parts.append("")
+    if recent_messages:
+        context_parts.append("【これまでの会話履歴】")
     
     for msg in recent_messages:
         context_parts.append(f"Q: {msg.message}")
@@ -157,13 +211,20 @@ def build_chat_history_context(messages: list, max_messages: int = 5) -> str:
     
     return "\n".join(context_parts)
 
-def build_user_prompt(message: str, chat_history_context: str = "") -> str:
-    """ユーザープロンプトを構築"""
+def build_user_prompt(
+    message: str, chat_history_context: str = "", transcription_excerpt: str = ""
+) -> str:
+    """ユーザープロンプトを構築（検索モードでは文字起こしの抜粋を質問の直前に含める）"""
     parts = []
     
     if chat_history_context:
         parts.append(chat_history_context)
     
+    if transcription_excerpt:
+        parts.append("【関連する文字起こし】")
+        parts.append(transcription_excerpt)
+        parts.append("")
+    
     parts.append("【新しい質問】")
     parts.append(message)
     
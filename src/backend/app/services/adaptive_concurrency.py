@@ -0,0 +1,283 @@
+"""OpenAI API呼び出しの適応的同時実行制御（AIMD）"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.utils.logger import LoggerMixin
+
+# エンドポイント名
+TRANSCRIPTION_ENDPOINT = "audio.transcriptions"
+CHAT_ENDPOINT = "chat.completions"
+
+
+def classify_api_error(error: BaseException) -> str:
+    """
+    API例外を分類
+
+    Args:
+        error: 発生した例外
+
+    Returns:
+        str: "throttle"（429）, "timeout", "server_error"（5xx）, "error" のいずれか
+    """
+    status_code = getattr(error, "status_code", None)
+    if status_code == 429:
+        return "throttle"
+    if isinstance(error, asyncio.TimeoutError) or "Timeout" in type(error).__name__:
+        return "timeout"
+    if isinstance(status_code, int) and status_code >= 500:
+        return "server_error"
+    return "error"
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """
+    例外のレスポンスヘッダーから Retry-After（秒）を取得
+
+    Args:
+        error: 発生した例外
+
+    Returns:
+        Optional[float]: 待機秒数（ヘッダーがない場合はNone）
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    # OpenAIはミリ秒単位のヘッダーも返す
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return max(float(retry_after_ms) / 1000.0, 0.0)
+        except (TypeError, ValueError):
+            pass
+
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return max(float(retry_after), 0.0)
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+class AdaptiveConcurrencyLimiter(LoggerMixin):
+    """
+    AIMD方式の同時実行リミッター
+
+    正常応答ごとに許容同時実行数を加算的に増やし、429やタイムアウトを
+    受けた場合は乗算的に減らす。同じ輻輳で同時に失敗した呼び出しごとに
+    減らさないよう、減少は1つの輻輳ウィンドウにつき1回（前回の減少より後に
+    開始した呼び出しの失敗のみ）とする。Retry-Afterが返された場合は指定時間まで
+    新しい呼び出しを開始しない。
+    """
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        decrease_factor: float = 0.5,
+        latency_tolerance: float = 3.0,
+        adaptive: bool = True,
+    ):
+        self.name = name
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.adaptive = adaptive
+
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.last_decrease = float("-inf")
+        self._condition: Optional[asyncio.Condition] = None
+
+        # 統計
+        self.total_calls = 0
+        self.successes = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.latency_ewma: Optional[float] = None
+        self.min_latency: Optional[float] = None
+
+    @property
+    def current_limit(self) -> int:
+        """現在の許容同時実行数（整数）"""
+        return max(self.min_limit, int(self.limit))
+
+    def _get_condition(self) -> asyncio.Condition:
+        # イベントループ上で遅延生成する（インポート時に生成しない）
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    async def acquire(self) -> None:
+        """実行枠を取得（空きがない場合・Retry-After待機中は待機）"""
+        condition = self._get_condition()
+        async with condition:
+            while True:
+                wait_seconds = self.blocked_until - time.monotonic()
+                if wait_seconds > 0:
+                    try:
+                        await asyncio.wait_for(condition.wait(), timeout=wait_seconds)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if self.in_flight < self.current_limit:
+                    break
+                await condition.wait()
+            self.in_flight += 1
+            self.total_calls += 1
+
+    async def release(self) -> None:
+        """実行枠を解放"""
+        condition = self._get_condition()
+        async with condition:
+            self.in_flight = max(0, self.in_flight - 1)
+            condition.notify_all()
+
+    @asynccontextmanager
+    async def slot(self):
+        """実行枠を確保して処理結果をAIMD制御に反映するコンテキスト"""
+        await self.acquire()
+        start_time = time.monotonic()
+        try:
+            yield
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.record_failure(e, start_time)
+            raise
+        else:
+            self.record_success(time.monotonic() - start_time)
+        finally:
+            await self.release()
+
+    def record_success(self, latency: float) -> None:
+        """正常応答を記録（健全であれば加算的に増加）"""
+        self.successes += 1
+
+        if self.min_latency is None or latency < self.min_latency:
+            self.min_latency = latency
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma = 0.8 * self.latency_ewma + 0.2 * latency
+
+        if not self.adaptive:
+            return
+
+        # レイテンシが基準値から大きく悪化している場合は増やさない
+        if self.min_latency and latency > self.min_latency * self.latency_tolerance:
+            return
+
+        # 1ラウンド（現在の上限数の成功）で+1となる加算的増加
+        self.limit = min(float(self.max_limit), self.limit + 1.0 / max(self.limit, 1.0))
+
+    def record_failure(
+        self, error: BaseException, started: Optional[float] = None
+    ) -> None:
+        """
+        失敗を記録（スロットリング・タイムアウトなら乗算的に減少）
+
+        Args:
+            error: 発生した例外
+            started: 呼び出しの開始時刻（time.monotonic()、不明ならNone）
+        """
+        kind = classify_api_error(error)
+
+        if kind == "throttle":
+            self.throttled += 1
+            retry_after = get_retry_after(error)
+            if retry_after:
+                self.blocked_until = max(
+                    self.blocked_until, time.monotonic() + retry_after
+                )
+            self._decrease(f"429 (Retry-After: {retry_after})", started)
+        elif kind == "timeout":
+            self.timeouts += 1
+            self._decrease("タイムアウト", started)
+        else:
+            self.errors += 1
+
+    def _decrease(self, reason: str, started: Optional[float] = None) -> None:
+        if not self.adaptive:
+            return
+        now = time.monotonic()
+        # 前回の減少より前に開始した呼び出しは、減少前の上限で送られたもの。
+        # 開始時刻が不明な場合は、前回の減少から1RTT（平均レイテンシ）は減らさない
+        if started is not None:
+            if started < self.last_decrease:
+                return
+        elif now - self.last_decrease < (self.latency_ewma or 0.0):
+            return
+        self.last_decrease = now
+        previous = self.current_limit
+        self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+        self.logger.warning(
+            f"同時実行数を削減: {self.name} {previous} -> {self.current_limit} ({reason})"
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """リミッターの統計情報を取得"""
+        return {
+            "limit": self.current_limit,
+            "in_flight": self.in_flight,
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "adaptive": self.adaptive,
+            "total_calls": self.total_calls,
+            "successes": self.successes,
+            "throttled": self.throttled,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "latency_ewma": (
+                round(self.latency_ewma, 3) if self.latency_ewma is not None else None
+            ),
+            "retry_after_remaining": round(
+                max(0.0, self.blocked_until - time.monotonic()), 3
+            ),
+        }
+
+
+# エンドポイントごとのリミッター
+_limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+
+
+def get_concurrency_limiter(endpoint: str) -> AdaptiveConcurrencyLimiter:
+    """エンドポイントのリミッターを取得（未作成の場合は設定値から作成）"""
+    limiter = _limiters.get(endpoint)
+    if limiter is None:
+        limiter = AdaptiveConcurrencyLimiter(
+            name=endpoint,
+            initial_limit=settings.openai_concurrency_initial,
+            min_limit=settings.openai_concurrency_min,
+            max_limit=settings.openai_concurrency_max,
+            decrease_factor=settings.openai_concurrency_decrease_factor,
+            adaptive=settings.openai_adaptive_concurrency_enabled,
+        )
+        _limiters[endpoint] = limiter
+    return limiter
+
+
+def get_concurrency_stats() -> Dict[str, Dict[str, Any]]:
+    """全エンドポイントのリミッター統計を取得"""
+    return {name: limiter.get_stats() for name, limiter in _limiters.items()}
+
+
+def get_throttle_count(endpoint: str) -> int:
+    """エンドポイントで観測したスロットリング（429・タイムアウト）の累計"""
+    limiter = _limiters.get(endpoint)
+    return limiter.throttled + limiter.timeouts if limiter is not None else 0
+
+
+def reset_concurrency_limiters() -> None:
+    """リミッターを破棄（テスト・設定変更用）"""
+    _limiters.clear()
@@ -0,0 +1,231 @@
+"""
+アップロードの受け付け制御（バックプレッシャー）
+
+アップロードは受け付けた時点でディスクを消費し、処理はキューで待たされる。
+混雑時やディスク不足のときに受け付け続けると、長く待たされた末に失敗するか
+ディスクが溢れて処理中のタスクまで失敗する。本文を受信する前に次を確認し、
+超えていれば Retry-After と推定待ち時間を付けて断る。
+
+- 待機・処理中のタスク数（429）
+- 新しいタスクの推定待ち時間（429、Retry-After は上限を超えた分）
+- upload_dir・temp_dir の空き容量（503）: 受付中のアップロードの申告サイズを
+  予約として差し引き、同時に届いたアップロードが同じ空きを当てにしないようにする
+"""
+import math
+import os
+import shutil
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.utils.logger import LoggerMixin
+
+# () -> {"tasks": 待機・処理中の件数, "estimated_wait_seconds": 推定待ち時間}
+BacklogProvider = Callable[[], Dict[str, Any]]
+
+REJECT_QUEUE_FULL = "queue_full"
+REJECT_BACKLOG = "backlog"
+REJECT_DISK = "disk"
+
+
+class AdmissionRejected(Exception):
+    """受け付けられない（混雑・ディスク不足）"""
+
+    def __init__(
+        self,
+        reason: str,
+        status_code: int,
+        detail: str,
+        retry_after: int,
+        estimated_wait_seconds: Optional[float] = None,
+    ):
+        super().__init__(detail)
+        self.reason = reason
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+        self.estimated_wait_seconds = estimated_wait_seconds
+
+
+class DiskReservation:
+    """受付中のアップロードのディスク予約（保存後に release() する）"""
+
+    def __init__(self, controller: "AdmissionController", devices: Dict[int, int]):
+        self.controller = controller
+        self.devices = devices
+        self.released = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.controller._release(self.devices)
+
+
+class AdmissionController(LoggerMixin):
+    """アップロードの受け付け可否を判定し、ディスクを予約する"""
+
+    def __init__(
+        self,
+        upload_dir: str,
+        temp_dir: str,
+        max_queued_tasks: int = 50,
+        max_backlog_seconds: float = 7200.0,
+        min_free_bytes: int = 1024 * 1024 * 1024,
+        temp_space_factor: float = 1.5,
+        retry_after_seconds: int = 60,
+        backlog_provider: Optional[BacklogProvider] = None,
+    ):
+        """
+        Args:
+            upload_dir: アップロードの保存先
+            temp_dir: 音声抽出・チャンク分割の一時ファイルの保存先
+            max_queued_tasks: 待機・処理中のタスクがこれ以上なら断る
+            max_backlog_seconds: 推定待ち時間がこれを超えたら断る
+            min_free_bytes: 受け付け後に残すディスクの空き容量
+            temp_space_factor: temp_dir に必要な容量（申告サイズに対する倍率）
+            retry_after_seconds: 待ち時間を推定できない場合の Retry-After
+            backlog_provider: パイプラインの待機状況を返す関数
+        """
+        self.upload_dir = upload_dir
+        self.temp_dir = temp_dir
+        self.max_queued_tasks = max_queued_tasks
+        self.max_backlog_seconds = max_backlog_seconds
+        self.min_free_bytes = min_free_bytes
+        self.temp_space_factor = temp_space_factor
+        self.retry_after_seconds = retry_after_seconds
+        self.backlog_provider = backlog_provider
+        self._lock = threading.Lock()
+        # ファイルシステム（st_dev）→ 予約済みのバイト数
+        self._reserved: Dict[int, int] = {}
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {}
+
+    def admit(self, declared_bytes: Optional[int] = None) -> DiskReservation:
+        """
+        アップロードを受け付けられるか確認し、申告サイズ分のディスクを予約
+
+        Args:
+            declared_bytes: 申告サイズ（Content-Length、不明ならNone）
+
+        Returns:
+            DiskReservation: ディスク予約（ファイルの保存後に解放する）
+
+        Raises:
+            AdmissionRejected: 混雑・ディスク不足で受け付けられない
+        """
+        try:
+            self._check_backlog()
+            reservation = self._reserve(max(declared_bytes or 0, 0))
+        except AdmissionRejected as e:
+            self.rejected[e.reason] = self.rejected.get(e.reason, 0) + 1
+            self.logger.warning(
+                f"アップロードを受け付けません: {e.detail} "
+                f"(Retry-After: {e.retry_after}秒)"
+            )
+            raise
+        self.admitted += 1
+        return reservation
+
+    def _check_backlog(self) -> None:
+        if self.backlog_provider is None:
+            return
+        try:
+            backlog = self.backlog_provider()
+        except Exception as e:
+            self.logger.warning(f"キューの状況を取得できません: {e}")
+            return
+        tasks = backlog.get("tasks", 0)
+        wait = backlog.get("estimated_wait_seconds")
+        if tasks >= self.max_queued_tasks:
+            raise AdmissionRejected(
+                REJECT_QUEUE_FULL,
+                429,
+                f"処理待ちのタスクが上限に達しています（{tasks}件）。"
+                "しばらくしてから再度お試しください。",
+                self._retry_after(wait),
+                wait,
+            )
+        if wait is not None and wait > self.max_backlog_seconds:
+            raise AdmissionRejected(
+                REJECT_BACKLOG,
+                429,
+                f"混雑しています（推定待ち時間: 約{math.ceil(wait / 60)}分）。"
+                "しばらくしてから再度お試しください。",
+                self._retry_after(wait - self.max_backlog_seconds),
+                wait,
+            )
+
+    def _retry_after(self, seconds: Optional[float]) -> int:
+        if seconds is None:
+            return self.retry_after_seconds
+        return max(math.ceil(seconds), self.retry_after_seconds)
+
+    def _requirements(self, declared_bytes: int) -> List[Tuple[str, int, int]]:
+        """(ディレクトリ, ファイルシステム, 必要なバイト数)"""
+        requirements = []
+        for directory, needed in (
+            (self.upload_dir, declared_bytes),
+            (self.temp_dir, math.ceil(declared_bytes * self.temp_space_factor)),
+        ):
+            os.makedirs(directory, exist_ok=True)
+            requirements.append((directory, os.stat(directory).st_dev, needed))
+        return requirements
+
+    def _reserve(self, declared_bytes: int) -> DiskReservation:
+        requirements = self._requirements(declared_bytes)
+        with self._lock:
+            # 同じファイルシステム上のディレクトリは必要量を合算する
+            needed: Dict[int, int] = {}
+            for _, device, size in requirements:
+                needed[device] = needed.get(device, 0) + size
+            for directory, device, _ in requirements:
+                free = shutil.disk_usage(directory).free - self._reserved.get(device, 0)
+                if free - needed[device] < self.min_free_bytes:
+                    raise AdmissionRejected(
+                        REJECT_DISK,
+                        503,
+                        "サーバーのディスク容量が不足しています。"
+                        "しばらくしてから再度お試しください。",
+                        self.retry_after_seconds,
+                    )
+            # 一時ファイルは処理の開始時に作られるため、予約するのはアップロード分のみ
+            upload_device = requirements[0][1]
+            devices = {upload_device: declared_bytes} if declared_bytes else {}
+            for device, size in devices.items():
+                self._reserved[device] = self._reserved.get(device, 0) + size
+        return DiskReservation(self, devices)
+
+    def _release(self, devices: Dict[int, int]) -> None:
+        with self._lock:
+            for device, size in devices.items():
+                remaining = self._reserved.get(device, 0) - size
+                if remaining > 0:
+                    self._reserved[device] = remaining
+                else:
+                    self._reserved.pop(device, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "reserved_bytes": sum(self._reserved.values()),
+        }
+
+
+def _pipeline_backlog() -> Dict[str, Any]:
+    from app.services.task_queue import get_task_pipeline
+
+    return get_task_pipeline().get_backlog()
+
+
+# グローバルな受け付け制御
+admission_controller = AdmissionController(
+    settings.upload_dir,
+    settings.temp_dir,
+    max_queued_tasks=settings.admission_max_queued_tasks,
+    max_backlog_seconds=settings.admission_max_backlog_seconds,
+    min_free_bytes=settings.admission_min_free_disk_mb * 1024 * 1024,
+    temp_space_factor=settings.admission_temp_space_factor,
+    retry_after_seconds=settings.admission_retry_after_seconds,
+    backlog_provider=_pipeline_backlog,
+)
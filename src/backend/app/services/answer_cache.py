@@ -0,0 +1,186 @@
+"""
+チャットの回答キャッシュ
+
+同じタスクでは「アクションアイテムは？」「決定事項は？」のようなほぼ同じ質問が
+繰り返されるため、正規化した質問文と議事録のバージョン（内容のハッシュ）をキーに
+回答と引用をタスクごとにキャッシュする。議事録が編集・取り消し・再生成された場合は
+キーが変わるため古い回答は使われず、該当タスクのエントリも明示的に破棄する。
+"""
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.utils.logger import get_logger
+
+if TYPE_CHECKING:
+    from app.models.chat import Citation
+
+logger = get_logger(__name__)
+
+# 質問文から除外する空白・記号
+_IGNORED_CHARS = re.compile(r"[\s、。，．,.！？!?「」『』（）()・:：;；\"'“”]+")
+# 意味を変えない文末表現（長いものから順に除去）
+_TRAILING_PHRASES = (
+    "を教えてください",
+    "について教えて",
+    "教えてください",
+    "は何でしたか",
+    "は何ですか",
+    "はなんですか",
+    "でしょうか",
+    "を教えて",
+    "ですか",
+    "教えて",
+    "は何",
+    "は",
+)
+
+
+def normalize_question(question: str) -> str:
+    """
+    質問文を正規化（全角半角・大文字小文字・記号・定型の文末表現を統一）
+
+    Args:
+        question: 質問文
+
+    Returns:
+        str: 正規化した質問文
+    """
+    text = _IGNORED_CHARS.sub("", unicodedata.normalize("NFKC", question).lower())
+    stripped = True
+    while stripped:
+        stripped = False
+        for phrase in _TRAILING_PHRASES:
+            if text.endswith(phrase) and len(text) > len(phrase):
+                text = text[: -len(phrase)]
+                stripped = True
+                break
+    return text
+
+
+def minutes_version(minutes: str) -> str:
+    """議事録の内容からバージョン（ハッシュ）を算出"""
+    return hashlib.sha1((minutes or "").encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedAnswer:
+    """キャッシュした回答"""
+
+    response: str
+    citations: List["Citation"] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    hits: int = 0
+
+
+class AnswerCache:
+    """タスク・議事録バージョン・正規化した質問をキーにした回答キャッシュ"""
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple[str, str, str], CachedAnswer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _key(task_id: str, minutes: str, question: str) -> Tuple[str, str, str]:
+        return task_id, minutes_version(minutes), normalize_question(question)
+
+    def get(self, task_id: str, minutes: str, question: str) -> Optional[CachedAnswer]:
+        """
+        キャッシュした回答を取得
+
+        Args:
+            task_id: タスクID
+            minutes: 現在の議事録
+            question: 質問文
+
+        Returns:
+            Optional[CachedAnswer]: 回答（未登録・期限切れの場合はNone）
+        """
+        key = self._key(task_id, minutes, question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry.created_at > self.ttl_seconds:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            entry.hits += 1
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(
+        self,
+        task_id: str,
+        minutes: str,
+        question: str,
+        response: str,
+        citations: List["Citation"],
+    ) -> None:
+        """
+        回答をキャッシュ
+
+        Args:
+            task_id: タスクID
+            minutes: 回答時の議事録
+            question: 質問文
+            response: 回答テキスト
+            citations: 引用リスト
+        """
+        key = self._key(task_id, minutes, question)
+        if not key[2]:
+            return
+        with self._lock:
+            self._entries[key] = CachedAnswer(response, list(citations), time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, task_id: str) -> int:
+        """
+        タスクのキャッシュを破棄（議事録の編集・取り消し・再生成時）
+
+        Args:
+            task_id: タスクID
+
+        Returns:
+            int: 破棄したエントリ数
+        """
+        with self._lock:
+            keys = [key for key in self._entries if key[0] == task_id]
+            for key in keys:
+                del self._entries[key]
+            self.invalidations += 1
+        if keys:
+            logger.info(f"回答キャッシュを破棄: {task_id} ({len(keys)}件)")
+        return len(keys)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """ヒット率などの統計情報を取得"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+# グローバルな回答キャッシュ
+answer_cache = AnswerCache(
+    settings.chat_answer_cache_max_entries, settings.chat_answer_cache_ttl_seconds
+)
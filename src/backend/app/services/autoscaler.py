@@ -0,0 +1,164 @@
+"""
+ワーカー数の自動調整
+
+キューの待機数・待ち時間・上流（OpenAI API）のスロットリングから、
+ワーカー数を min_workers〜max_workers の範囲で増減する。
+
+- 増加: 待機タスクがあり、ワーカーあたりの待機数か待ち時間が目標を超えたとき。
+  実行中と待機中を合わせた数まで一度に増やす（アップロードが集中しても早く捌く）
+- 減少: 待機タスクがない状態が scale_down_idle_seconds 続いたとき、
+  実行中の数まで減らす（アイドル時にリソースを持ち続けない）
+- スロットリング: 前回の判定以降に429・タイムアウトが増えていれば増やさずに
+  1つ減らす（ワーカーを増やしても上流の制限で待たされるだけのため）
+
+増加・減少のそれぞれにクールダウンを設け、判定が振動しないようにする。
+"""
+import math
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Deque, Dict, Optional
+
+from app.utils.logger import LoggerMixin
+
+
+@dataclass
+class ScalingDecision:
+    """ワーカー数の変更記録"""
+
+    at: float  # time.time()
+    previous: int
+    target: int
+    reason: str
+    depth: int
+    wait_seconds: float
+
+
+class WorkerAutoscaler(LoggerMixin):
+    """キューの状態からワーカー数を決める"""
+
+    def __init__(
+        self,
+        min_workers: int = 1,
+        max_workers: int = 4,
+        interval_seconds: float = 5.0,
+        target_wait_seconds: float = 30.0,
+        tasks_per_worker: float = 1.0,
+        up_cooldown_seconds: float = 15.0,
+        down_cooldown_seconds: float = 60.0,
+        scale_down_idle_seconds: float = 60.0,
+        throttle_signal: Optional[Callable[[], int]] = None,
+    ):
+        """
+        Args:
+            min_workers: ワーカー数の下限
+            max_workers: ワーカー数の上限
+            interval_seconds: 判定の間隔
+            target_wait_seconds: これより長く待たされていれば増やす
+            tasks_per_worker: ワーカーあたりの待機数がこれ以上なら増やす
+            up_cooldown_seconds: 変更後、次に増やす（スロットリングで減らす）までの間隔
+            down_cooldown_seconds: 変更後、アイドルで減らすまでの間隔
+            scale_down_idle_seconds: 待機タスクのない状態がこれだけ続いたら減らす
+            throttle_signal: 上流のスロットリング回数（累計）を返す関数
+        """
+        self.min_workers = max(1, min_workers)
+        self.max_workers = max(self.min_workers, max_workers)
+        self.interval_seconds = interval_seconds
+        self.target_wait_seconds = target_wait_seconds
+        self.tasks_per_worker = max(tasks_per_worker, 0.1)
+        self.up_cooldown_seconds = up_cooldown_seconds
+        self.down_cooldown_seconds = down_cooldown_seconds
+        self.scale_down_idle_seconds = scale_down_idle_seconds
+        self.throttle_signal = throttle_signal
+
+        self._last_change = -math.inf
+        self._last_backlog = time.monotonic()
+        self._last_throttled: Optional[int] = None
+        self.decisions: Deque[ScalingDecision] = deque(maxlen=20)
+
+    def clamp(self, workers: int) -> int:
+        """ワーカー数を上下限に収める"""
+        return min(max(workers, self.min_workers), self.max_workers)
+
+    def _throttled_since_last(self) -> int:
+        if self.throttle_signal is None:
+            return 0
+        try:
+            total = self.throttle_signal()
+        except Exception as e:
+            self.logger.warning(f"スロットリング回数を取得できません: {e}")
+            return 0
+        previous, self._last_throttled = self._last_throttled, total
+        return max(total - previous, 0) if previous is not None else 0
+
+    def evaluate(
+        self,
+        workers: int,
+        running: int,
+        depth: int,
+        wait_seconds: float,
+        now: Optional[float] = None,
+    ) -> int:
+        """
+        次のワーカー数を決める
+
+        Args:
+            workers: 現在のワーカー数
+            running: 実行中のタスク数
+            depth: 待機中のタスク数
+            wait_seconds: 待機中・直近に開始したタスクの最長の待ち時間
+            now: 現在時刻（time.monotonic()、テスト用）
+
+        Returns:
+            int: ワーカー数（変更しない場合は workers）
+        """
+        now = time.monotonic() if now is None else now
+        throttled = self._throttled_since_last()
+        if depth > 0:
+            self._last_backlog = now
+        since_change = now - self._last_change
+
+        target, reason = workers, ""
+        if throttled:
+            if workers > self.min_workers and since_change >= self.up_cooldown_seconds:
+                target = workers - 1
+                reason = f"上流のスロットリング（{throttled}件）"
+        elif depth > 0 and workers < self.max_workers:
+            backlogged = depth >= workers * self.tasks_per_worker
+            if (
+                backlogged or wait_seconds >= self.target_wait_seconds
+            ) and since_change >= self.up_cooldown_seconds:
+                needed = running + math.ceil(depth / self.tasks_per_worker)
+                target = self.clamp(max(workers + 1, needed))
+                reason = f"待機{depth}件・待ち時間{wait_seconds:.0f}秒"
+        elif (
+            depth == 0
+            and workers > max(self.min_workers, running)
+            and now - self._last_backlog >= self.scale_down_idle_seconds
+            and since_change >= self.down_cooldown_seconds
+        ):
+            target = max(self.min_workers, running)
+            reason = f"待機タスクなし（{now - self._last_backlog:.0f}秒）"
+
+        if target != workers:
+            self._last_change = now
+            self.decisions.append(
+                ScalingDecision(
+                    at=time.time(),
+                    previous=workers,
+                    target=target,
+                    reason=reason,
+                    depth=depth,
+                    wait_seconds=round(wait_seconds, 1),
+                )
+            )
+            self.logger.info(f"ワーカー数を変更: {workers} -> {target} ({reason})")
+        return target
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "min_workers": self.min_workers,
+            "max_workers": self.max_workers,
+            "target_wait_seconds": self.target_wait_seconds,
+            "decisions": [asdict(decision) for decision in self.decisions][-5:],
+        }
@@ -8,6 +8,11 @@ from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from app.models.chat import Citation, ChatMessage, ChatSession
+from app.config import settings
+from app.services.ngram_index import ngram_index_cache
+from app.services.normalized_text import normalize_text, normalized_text_cache
+from app.services.segment_index import estimate_timestamp, segment_index_store
+from app.services.sentence_vectors import sentence_vector_store
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -102,8 +107,12 @@ class CitationService:
         citation_text = match.group(1) if match.groups() else match.group(0)
         
         # 文字起こし内で該当テキストを検索
-        position = self._find_text_position(citation_text, transcription)
-        if position is None:
+        span = self._find_text_span(citation_text, transcription)
+        if span is not None:
+            # 正規化して一致した場合も元テキスト上の範囲をそのまま引用する
+            position = span[0]
+            citation_text = transcription[span[0]:span[1]]
+        else:
             # 類似テキストを検索
             position, actual_text = self._find_similar_text(citation_text, transcription)
             if position is None:
@@ -142,37 +151,41 @@ class CitationService:
         Returns:
             List: セマンティック引用リスト
         """
-        # 簡易実装：キーワードベース検索
-        # 実際の実装では、埋め込みベクトルやBM25を使用
-        
         # Import Citation at runtime to avoid circular imports
         from app.models.chat import Citation
         
-        citations = []
+        # AI回答から重要な名詞句を抽出（短すぎる語句は除外）
+        phrases = [
+            phrase
+            for phrase in self._extract_important_phrases(ai_response)
+            if len(phrase) >= 5
+        ]
+        if not phrases or not transcription:
+            return []
         
-        # AI回答から重要な名詞句を抽出
-        important_phrases = self._extract_important_phrases(ai_response)
-        
-        for phrase in important_phrases:
-            if len(phrase) < 5:  # 短すぎる語句は除外
-                continue
-                
-            position = self._find_text_position(phrase, transcription)
-            if position is not None:
-                timestamp = self._estimate_timestamp(position, transcription, session)
-                confidence = self._calculate_confidence(phrase, transcription, position)
-                
-                # 信頼度が一定以上の場合のみ追加
-                if confidence >= 0.7:
-                    citation = Citation(
-                        text=phrase,
-                        start_time=timestamp,
-                        confidence=confidence,
-                        context=self._extract_context(position, transcription),
-                        highlight_start=position,
-                        highlight_end=position + len(phrase)
+        # 文ベクトル行列（タスクごとにディスクへキャッシュ）との積で類似文を順位付け
+        index = sentence_vector_store.get(
+            transcription, task_id=getattr(session, "task_id", None)
+        )
+        results = index.search(
+            phrases,
+            top_k=settings.citation_semantic_top_k,
+            threshold=settings.citation_semantic_threshold,
+        )
+        
+        citations = []
+        for matches in results:
+            for start, end, score in matches:
+                citations.append(
+                    Citation(
+                        text=transcription[start:end],
+                        start_time=self._estimate_timestamp(start, transcription, session),
+                        confidence=round(min(score, 1.0), 3),
+                        context=self._extract_context(start, transcription),
+                        highlight_start=start,
+                        highlight_end=end
                     )
-                    citations.append(citation)
+                )
         
         return citations
     
@@ -225,21 +238,28 @@ class CitationService:
         Returns:
             Optional[int]: 見つかった位置（文字インデックス）
         """
-        # 完全一致検索
-        position = source_text.find(target_text)
-        if position != -1:
-            return position
+        span = self._find_text_span(target_text, source_text)
+        return span[0] if span is not None else None
+    
+    def _find_text_span(self, target_text: str, source_text: str) -> Optional[Tuple[int, int]]:
+        """
+        ソーステキスト内での対象テキストの範囲を検索
         
-        # 正規化して検索
-        normalized_target = self._normalize_text(target_text)
-        normalized_source = self._normalize_text(source_text)
+        Args:
+            target_text: 検索対象テキスト
+            source_text: 検索元テキスト
         
-        position = normalized_source.find(normalized_target)
+        Returns:
+            Optional[Tuple[int, int]]: 元テキスト上の [開始位置, 終了位置)
+        """
+        # 完全一致検索
+        position = source_text.find(target_text)
         if position != -1:
-            # 元のテキストでの位置を計算
-            return self._map_normalized_position(position, source_text, normalized_source)
+            return position, position + len(target_text)
         
-        return None
+        # 正規化して検索（文字起こしの正規化結果と位置対応表はキャッシュを利用）
+        normalized_source = normalized_text_cache.get(source_text)
+        return normalized_source.find(normalize_text(target_text))
     
     def _find_similar_text(self, target_text: str, source_text: str) -> Tuple[Optional[int], str]:
         """
@@ -252,27 +272,14 @@ class CitationService:
         Returns:
             Tuple[Optional[int], str]: (位置, 実際のテキスト)
         """
-        # 簡易実装：部分文字列マッチング
-        target_words = target_text.split()
-        best_match = None
-        best_position = None
-        best_score = 0
-        
-        # 文章を単語単位で分割してスライディングウィンドウで検索
-        source_words = source_text.split()
-        
-        for i in range(len(source_words) - len(target_words) + 1):
-            window = source_words[i:i + len(target_words)]
-            similarity = self._calculate_text_similarity(target_words, window)
-            
-            if similarity > best_score and similarity > 0.6:  # 閾値
-                best_score = similarity
-                best_match = ' '.join(window)
-                # 実際の文字位置を計算
-                words_before = source_words[:i]
-                best_position = len(' '.join(words_before)) + (1 if words_before else 0)
-        
-        return best_position, best_match or target_text
+        # 文字n-gramの転置インデックス（文字起こしごとにキャッシュ）で候補を絞り込む
+        index = ngram_index_cache.get(source_text)
+        match = index.find_similar(target_text, threshold=0.6)
+        if match is None:
+            return None, target_text
+
+        start, end, _ = match
+        return start, source_text[start:end]
     
     def _calculate_text_similarity(self, words1: List[str], words2: List[str]) -> float:
         """
@@ -307,13 +314,8 @@ class CitationService:
         Returns:
             str: 正規化後テキスト
         """
-        # 空白文字の正規化
-        text = re.sub(r'\s+', ' ', text)
-        # 句読点の正規化
-        text = re.sub(r'[、。，．]', '', text)
-        # 大文字小文字の統一
-        text = text.lower()
-        return text.strip()
+        # 空白の統一・句読点の除去・小文字化（文字起こし側の正規化と同じ規則）
+        return normalize_text(text)
     
     def _map_normalized_position(self, normalized_pos: int, original_text: str, normalized_text: str) -> int:
         """
@@ -327,7 +329,12 @@ class CitationService:
         Returns:
             int: 元のテキスト内の位置
         """
-        # 簡易実装：文字数の比例から推定
+        normalized = normalized_text_cache.get(original_text)
+        if normalized.text == normalized_text:
+            # 正規化時に記録した位置対応表で正確に変換
+            return normalized.to_original(normalized_pos)
+        
+        # 異なる規則で正規化されたテキストの場合は文字数の比例から推定
         ratio = len(original_text) / len(normalized_text) if normalized_text else 1
         return int(normalized_pos * ratio)
     
@@ -341,21 +348,11 @@ class CitationService:
             session: セッション
         
         Returns:
-            str: 推定タイムスタンプ
+            str: HH:MM:SS 形式のタイムスタンプ
         """
-        # 簡易実装：位置の比例からタイムスタンプを推定
-        text_ratio = position / len(transcription) if transcription else 0
-        
-        # 仮想的な動画時間（実際の実装では動画メタデータから取得）
-        estimated_duration_seconds = len(transcription) // 10  # 1秒あたり10文字と仮定
-        estimated_time_seconds = int(text_ratio * estimated_duration_seconds)
-        
-        # HH:MM:SS形式に変換
-        hours = estimated_time_seconds // 3600
-        minutes = (estimated_time_seconds % 3600) // 60
-        seconds = estimated_time_seconds % 60
-        
-        return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+        # セグメント索引があれば実時刻、なければ文字数から推定
+        index = segment_index_store.get(getattr(session, "task_id", None))
+        return estimate_timestamp(position, transcription, index)
     
     def _calculate_confidence(self, citation_text: str, transcription: str, position: int) -> float:
         """
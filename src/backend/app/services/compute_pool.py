@@ -0,0 +1,308 @@
+"""
+CPU負荷の高い同期処理の実行プール
+
+議事録の差分HTML・編集指示の正規表現解析・引用照合・ストアのJSON書き出しを
+イベントループ上で実行すると、その間すべてのリクエストが待たされる。
+プロセスプールと上限付きスレッドプールを共有し、次のように使い分ける。
+
+- run_in_process: GILを保持したまま長く動く純粋な関数。関数・引数・戻り値は
+  pickle で子プロセスとやり取りするため、モジュールレベルの関数か
+  シングルトンのメソッドに限る（送れない場合はスレッドプールで実行）
+- run_in_thread: プロセス内の索引・キャッシュを参照する処理や、
+  numpy・ファイル入出力のようにGILを解放する処理
+"""
+import asyncio
+import functools
+import json
+import multiprocessing
+import os
+import pickle
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.utils.logger import LoggerMixin, get_logger
+
+logger = get_logger(__name__)
+
+# (パス, データ, json.dump のキーワード引数)
+JsonFile = Tuple[str, Any, Dict[str, Any]]
+
+
+def write_json_files(files: List[JsonFile]) -> None:
+    """JSONファイルを書き出す（読み込み側が書きかけを読まないよう置き換える）"""
+    for path, data, options in files:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, **options)
+        os.replace(tmp_path, path)
+
+
+def _call_pickled(payload: bytes) -> Any:
+    """子プロセス側: pickle した呼び出しを復元して実行"""
+    func, args, kwargs = pickle.loads(payload)
+    return func(*args, **kwargs)
+
+
+def _pickle_call(func: Callable[..., Any], args: tuple, kwargs: dict) -> bytes:
+    """
+    呼び出しを投入前に pickle する
+
+    送れない関数・引数を投入時点で検出でき、引数はこの時点のスナップショットになる
+    （プール側で pickle すると、その間にイベントループ側で変更される恐れがある）。
+    """
+    try:
+        return pickle.dumps((func, args, kwargs), protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, AttributeError, TypeError) as e:
+        raise pickle.PicklingError(str(e)) from e
+
+
+class ComputePool(LoggerMixin):
+    """プロセスプールとスレッドプールの共有サービス"""
+
+    def __init__(self, process_workers: int = 2, thread_workers: int = 4):
+        # 0 ならプロセスプールを使わずスレッドプールで実行
+        self.process_workers = max(0, process_workers)
+        self.thread_workers = max(1, thread_workers)
+        self._process_executor: Optional[ProcessPoolExecutor] = None
+        self._thread_executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._writers: List["BackgroundJsonWriter"] = []
+        self._counters: Dict[str, Dict[str, int]] = {
+            kind: {"in_flight": 0, "completed": 0, "failed": 0}
+            for kind in ("process", "thread")
+        }
+        self.fallbacks = 0
+
+    def _get_process_executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.process_workers <= 0:
+            return None
+        with self._lock:
+            if self._process_executor is None:
+                # スレッドを持つイベントループからのforkを避けるためspawnを使用
+                self._process_executor = ProcessPoolExecutor(
+                    max_workers=self.process_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+                self.logger.info(f"計算用プロセスプール起動: workers={self.process_workers}")
+            return self._process_executor
+
+    def _get_thread_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._thread_executor is None:
+                self._thread_executor = ThreadPoolExecutor(
+                    max_workers=self.thread_workers, thread_name_prefix="compute"
+                )
+            return self._thread_executor
+
+    def submit_to_process(self, func: Callable[..., Any], *args: Any) -> Future:
+        """
+        同期コードからプロセスプールに投入（無効時はスレッドプール）
+
+        Raises:
+            pickle.PicklingError: 関数・引数を子プロセスへ送れない
+        """
+        executor = self._get_process_executor()
+        if executor is None:
+            return self._get_thread_executor().submit(func, *args)
+        return executor.submit(_call_pickled, _pickle_call(func, args, {}))
+
+    async def run_in_process(self, func: Callable[..., Any], *args: Any, **kwargs: Any):
+        """
+        関数を子プロセスで実行
+
+        Args:
+            func: モジュールレベルの関数またはシングルトンのメソッド
+            *args, **kwargs: 関数の引数（pickle できる値）
+
+        Returns:
+            Any: 関数の戻り値
+        """
+        executor = self._get_process_executor()
+        if executor is None:
+            return await self.run_in_thread(func, *args, **kwargs)
+        try:
+            payload = _pickle_call(func, args, kwargs)
+        except pickle.PicklingError as e:
+            # ローカル関数やテスト用のモックなど子プロセスへ送れないものはスレッドで実行
+            self.fallbacks += 1
+            self.logger.debug(f"プロセスへ送れないためスレッドで実行: {func} - {e}")
+            return await self.run_in_thread(func, *args, **kwargs)
+        try:
+            return await self._run(executor, "process", _call_pickled, (payload,), {})
+        except BrokenProcessPool:
+            # 子プロセスが異常終了したプールは次回の投入時に作り直す
+            with self._lock:
+                if self._process_executor is executor:
+                    self._process_executor = None
+            executor.shutdown(wait=False)
+            raise
+
+    async def run_in_thread(self, func: Callable[..., Any], *args: Any, **kwargs: Any):
+        """関数を上限付きスレッドプールで実行"""
+        executor = self._get_thread_executor()
+        return await self._run(executor, "thread", func, args, kwargs)
+
+    async def _run(self, executor, kind: str, func, args, kwargs) -> Any:
+        counters = self._counters[kind]
+        counters["in_flight"] += 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                executor, functools.partial(func, *args, **kwargs)
+            )
+        except Exception:
+            counters["failed"] += 1
+            raise
+        finally:
+            counters["in_flight"] -= 1
+        counters["completed"] += 1
+        return result
+
+    def json_writer(
+        self, name: str, write: Callable[[Any], None] = write_json_files
+    ) -> "BackgroundJsonWriter":
+        """
+        ストア用のJSON書き出しを作成（停止時に書き残しがないよう登録する）
+
+        Args:
+            name: ストア名（統計・ログ用）
+            write: 保存内容を書き出す関数（プロセスプールで実行するため、
+                モジュールレベルの関数に限る）
+        """
+        writer = BackgroundJsonWriter(self, name, write)
+        self._writers.append(writer)
+        return writer
+
+    def flush(self) -> None:
+        """全ストアの書き込み中・保留中の内容を書き出すまで待つ"""
+        for writer in self._writers:
+            writer.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "process_workers": self.process_workers,
+            "thread_workers": self.thread_workers,
+            "process": dict(self._counters["process"]),
+            "thread": dict(self._counters["thread"]),
+            "fallbacks": self.fallbacks,
+            "writers": {writer.name: writer.get_stats() for writer in self._writers},
+        }
+
+    async def shutdown(self) -> None:
+        """保留中の書き込みを終えてからプールを停止"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.flush)
+        with self._lock:
+            executors = [self._process_executor, self._thread_executor]
+            self._process_executor = self._thread_executor = None
+        for executor in executors:
+            if executor is not None:
+                await loop.run_in_executor(
+                    None, functools.partial(executor.shutdown, wait=True)
+                )
+
+
+class BackgroundJsonWriter:
+    """
+    ストアのJSON書き出しをプロセスプールで行う
+
+    書き込みは常に1件ずつ行い、書き込み中に届いた保存要求は最新の内容だけを
+    次に書き出す（古い内容が後から上書きすることはない）。
+    イベントループ外（起動時・同期テスト）ではその場で書き出す。
+    """
+
+    def __init__(
+        self,
+        pool: ComputePool,
+        name: str,
+        write: Callable[[Any], None] = write_json_files,
+    ):
+        self.pool = pool
+        self.name = name
+        self.write = write
+        self._lock = threading.Lock()
+        self._pending: Optional[Any] = None
+        self._writing = False
+        self._idle = threading.Event()
+        self._idle.set()
+        self.writes = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    def save(self, files: Any) -> None:
+        """
+        保存を予約する
+
+        Args:
+            files: write に渡す内容（データはこの時点のスナップショット）
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            self._write_inline(files)
+            return
+        with self._lock:
+            if self._writing:
+                if self._pending is not None:
+                    self.coalesced += 1
+                self._pending = files
+                return
+            self._writing = True
+            self._idle.clear()
+        self._submit(files)
+
+    def _submit(self, files: Any) -> None:
+        try:
+            future = self.pool.submit_to_process(self.write, files)
+        except (pickle.PicklingError, RuntimeError):
+            # 子プロセスへ送れない内容や停止後のプールはその場で書き出す
+            self._write_inline(files)
+            self._next()
+            return
+        future.add_done_callback(self._on_done)
+
+    def _on_done(self, future: Future) -> None:
+        error = None if future.cancelled() else future.exception()
+        if error is not None:
+            self.failures += 1
+            logger.error(f"{self.name} の保存エラー: {error}")
+        else:
+            self.writes += 1
+        self._next()
+
+    def _next(self) -> None:
+        with self._lock:
+            files, self._pending = self._pending, None
+            if files is None:
+                self._writing = False
+                self._idle.set()
+                return
+        self._submit(files)
+
+    def _write_inline(self, files: Any) -> None:
+        try:
+            self.write(files)
+            self.writes += 1
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"{self.name} の保存エラー: {e}", exc_info=True)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """書き込み中・保留中の内容を書き出すまで待つ"""
+        return self._idle.wait(timeout)
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "writes": self.writes,
+            "coalesced": self.coalesced,
+            "failures": self.failures,
+        }
+
+
+# グローバルな計算用プール
+compute_pool = ComputePool(
+    settings.compute_process_workers, settings.compute_thread_workers
+)
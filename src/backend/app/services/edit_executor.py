@@ -5,6 +5,7 @@ from typing import Dict, List, Tuple, Optional
 from datetime import datetime
 
 from app.models.chat import EditAction, EditActionType, EditScope
+from app.services.pattern_matcher import compile_any
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -29,6 +30,11 @@ class EditExecutor:
                 r'#+\s*(?:議論内容|討議内容)\s*'
             ]
         }
+        # セクションごとのパターンを1つの正規表現にまとめてコンパイル
+        self.section_matchers = {
+            section: compile_any(patterns, re.IGNORECASE)
+            for section, patterns in self.section_patterns.items()
+        }
     
     def execute_edit_actions(
         self,
@@ -260,10 +266,10 @@ class EditExecutor:
         """アクションアイテムセクションの開始行を探す"""
         lines = minutes.split('\n')
         
+        matcher = self.section_matchers["action_items"]
         for i, line in enumerate(lines):
-            for pattern in self.section_patterns["action_items"]:
-                if re.search(pattern, line, re.IGNORECASE):
-                    return i
+            if matcher.search(line):
+                return i
         
         return None
     
@@ -10,6 +10,7 @@ from app.models.chat import (
     EditScope,
     MessageIntent
 )
+from app.services.pattern_matcher import KeywordPatternMatcher
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -56,6 +57,9 @@ class EditIntentAnalyzer:
             ]
         }
         
+        # 全パターンを事前にコンパイルし、キーワードで候補を絞り込んで照合する
+        self.edit_matcher = KeywordPatternMatcher(self.edit_patterns)
+        
         # 日本語の時間表現パターン
         self.time_patterns = {
             r'今日': datetime.now().strftime('%Y-%m-%d'),
@@ -90,18 +94,18 @@ class EditIntentAnalyzer:
         edit_actions = []
         explanations = []
         
-        # 各編集パターンをチェック
-        for action_type, patterns in self.edit_patterns.items():
-            for pattern in patterns:
-                match = re.search(pattern, edit_instruction, re.IGNORECASE)
-                if match:
-                    action, explanation = self._create_edit_action(
-                        action_type, match, edit_instruction, current_minutes
-                    )
-                    if action:
-                        edit_actions.append(action)
-                        explanations.append(explanation)
-                        break
+        # 各編集パターンをチェック（アクションタイプごとに最初に成立したもののみ採用）
+        matched_types = set()
+        for action_type, match in self.edit_matcher.iter_matches(edit_instruction):
+            if action_type in matched_types:
+                continue
+            action, explanation = self._create_edit_action(
+                action_type, match, edit_instruction, current_minutes
+            )
+            if action:
+                edit_actions.append(action)
+                explanations.append(explanation)
+                matched_types.add(action_type)
         
         # 複合的な編集指示の処理
         if not edit_actions:
@@ -0,0 +1,152 @@
+"""
+チャット履歴のローリング要約
+
+直近の会話はトークン予算内でそのままプロンプトに含め、予算からあふれた古い会話は
+要約としてチャットセッションに保存する。要約は回答後にバックグラウンドで差分だけ
+更新する（前回の要約＋新たにあふれた会話 → 新しい要約）ため、会話が長くなっても
+1メッセージあたりのプロンプトは一定の大きさに収まる。
+"""
+import asyncio
+import re
+from typing import TYPE_CHECKING, Dict, List, Sequence
+
+from app.config import settings
+from app.services.token_counter import token_counter
+from app.utils.logger import get_logger
+
+if TYPE_CHECKING:
+    from app.models.chat import ChatMessage, ChatSession
+
+logger = get_logger(__name__)
+
+# 抽出的要約で1ターンから残す文字数
+_QUESTION_CHARS = 60
+_ANSWER_CHARS = 120
+# 文の区切り
+_SENTENCE_END = re.compile(r"(?<=[。！？!?\n])")
+
+
+def message_tokens(message: "ChatMessage") -> int:
+    """1ターン（質問＋回答）のトークン数"""
+    return token_counter.count(message.message) + token_counter.count(
+        message.response or ""
+    )
+
+
+def select_recent_messages(
+    messages: Sequence["ChatMessage"], token_budget: int, max_messages: int
+) -> List["ChatMessage"]:
+    """
+    トークン予算内に収まる直近の会話を選択
+
+    Args:
+        messages: 要約済みでない会話（古い順）
+        token_budget: 会話履歴のトークン上限
+        max_messages: そのまま含める最大ターン数
+
+    Returns:
+        List[ChatMessage]: 直近の会話（古い順、最新の1ターンは予算超過でも含める）
+    """
+    selected: List["ChatMessage"] = []
+    used_tokens = 0
+    for message in reversed(messages[-max_messages:] if max_messages > 0 else []):
+        tokens = message_tokens(message)
+        if selected and used_tokens + tokens > token_budget:
+            break
+        selected.append(message)
+        used_tokens += tokens
+    selected.reverse()
+    return selected
+
+
+def unsummarized_messages(
+    session: "ChatSession", messages: Sequence["ChatMessage"]
+) -> List["ChatMessage"]:
+    """要約に含まれていない会話を取得"""
+    return list(messages[getattr(session, "summarized_message_count", 0) :])
+
+
+def extractive_summary(
+    previous_summary: str, messages: Sequence["ChatMessage"], max_tokens: int
+) -> str:
+    """
+    APIを使わない抽出的要約（質問の冒頭と回答の最初の文を残す）
+
+    Args:
+        previous_summary: 前回までの要約
+        messages: 新たに要約に含める会話
+        max_tokens: 要約のトークン上限（超える場合は古い行から削除）
+
+    Returns:
+        str: 更新後の要約
+    """
+    lines = [line for line in previous_summary.splitlines() if line.strip()]
+    for message in messages:
+        question = " ".join(message.message.split())[:_QUESTION_CHARS]
+        answer = next(
+            (
+                sentence.strip()
+                for sentence in _SENTENCE_END.split(message.response or "")
+                if sentence.strip()
+            ),
+            "",
+        )
+        lines.append(f"- Q: {question} / A: {answer[:_ANSWER_CHARS]}")
+
+    while len(lines) > 1 and token_counter.count("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+class HistorySummarizer:
+    """チャットセッションの会話履歴を差分で要約"""
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def update(
+        self, session: "ChatSession", messages: Sequence["ChatMessage"]
+    ) -> bool:
+        """
+        予算からあふれた会話を要約に取り込む
+
+        Args:
+            session: チャットセッション（要約と要約済みターン数を更新）
+            messages: セッションの全会話（古い順）
+
+        Returns:
+            bool: 要約を更新したかどうか
+        """
+        lock = self._locks.setdefault(session.session_id, asyncio.Lock())
+        async with lock:
+            pending = unsummarized_messages(session, messages)
+            recent = select_recent_messages(
+                pending,
+                settings.chat_history_token_budget,
+                settings.chat_history_max_messages,
+            )
+            overflow = pending[: len(pending) - len(recent)]
+            if not overflow:
+                return False
+
+            from app.services.openai_service import openai_service
+
+            summary = await openai_service.summarize_chat_history(
+                session.history_summary, overflow
+            )
+            session.history_summary = summary
+            session.summarized_message_count += len(overflow)
+            logger.info(
+                f"会話履歴を要約: {session.session_id[:8]}... "
+                f"({session.summarized_message_count}ターン → "
+                f"{token_counter.count(summary)}トークン)"
+            )
+            return True
+
+    def discard(self, session_id: str) -> None:
+        """セッションのロックを破棄"""
+        self._locks.pop(session_id, None)
+
+
+# グローバルな履歴要約サービス
+history_summarizer = HistorySummarizer()
@@ -3,7 +3,10 @@ import re
 import openai
 
 from app.config import settings
+from app.services.adaptive_concurrency import CHAT_ENDPOINT, get_concurrency_limiter
+from app.services.retry_policy import MINUTES_CALL, call_with_retry
 from app.utils.logger import LoggerMixin
+from app.utils.openai_client import openai_client_kwargs
 
 
 class MinutesGeneratorService(LoggerMixin):
@@ -11,7 +14,7 @@ class MinutesGeneratorService(LoggerMixin):
 
     def __init__(self):
         """OpenAI クライアントを初期化"""
-        self.client = openai.AsyncOpenAI(api_key=settings.openai_api_key)
+        self.client = openai.AsyncOpenAI(**openai_client_kwargs())
         self.logger.info("MinutesGeneratorService初期化完了")
 
     async def generate_minutes(
@@ -105,11 +108,16 @@ class MinutesGeneratorService(LoggerMixin):
             try:
                 self.logger.debug(f"APIリクエスト: モデル={model}")
 
-                response = await self.client.chat.completions.create(
-                    model=model,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.2,
-                )
+                async def request(model: str = model):
+                    async with get_concurrency_limiter(CHAT_ENDPOINT).slot():
+                        return await self.client.chat.completions.create(
+                            model=model,
+                            messages=[{"role": "user", "content": prompt}],
+                            temperature=0.2,
+                        )
+
+                # 429/5xx/タイムアウトはバックオフ付きでリトライ
+                response = await call_with_retry(request, MINUTES_CALL)
 
                 self.logger.info(f"API呼び出し成功: モデル={model}")
                 return response.choices[0].message.content
@@ -0,0 +1,151 @@
+"""
+文字n-gramの転置インデックス
+
+文字起こし全体の n-gram ごとに出現位置のリストを保持し、あいまい検索を
+「候補生成（ポスティングの参照）→ 位置の揃った候補のスコアリング」で行う。
+分かち書きのない日本語でも単語分割なしで類似箇所を検索できる。
+"""
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class NgramIndex:
+    """文字n-gram → 出現位置の転置インデックス"""
+
+    def __init__(self, text: str, n: int = 2, max_postings: int = 5000):
+        """
+        Args:
+            text: インデックス対象テキスト
+            n: n-gramの文字数
+            max_postings: これより多く出現するn-gramは候補生成に使わない
+        """
+        self.text = text
+        self.n = max(n, 1)
+        self.max_postings = max_postings
+
+        # 大文字小文字を無視（長さが変わる文字を含む場合は元のテキストのまま）
+        lowered = text.lower()
+        self._searchable = lowered if len(lowered) == len(text) else text
+
+        postings: Dict[str, List[int]] = defaultdict(list)
+        searchable = self._searchable
+        for position in range(len(searchable) - self.n + 1):
+            postings[searchable[position : position + self.n]].append(position)
+        self._postings = dict(postings)
+
+    def __len__(self) -> int:
+        return len(self._postings)
+
+    def _query_grams(self, query: str) -> List[Tuple[int, str]]:
+        """空白を除いた検索語の (検索語内の位置, n-gram) リスト"""
+        compact = "".join(query.lower().split())
+        if len(compact) < self.n:
+            return [(0, compact)] if compact else []
+        return [
+            (offset, compact[offset : offset + self.n])
+            for offset in range(len(compact) - self.n + 1)
+        ]
+
+    def find_similar(
+        self, query: str, threshold: float = 0.6
+    ) -> Optional[Tuple[int, int, float]]:
+        """
+        検索語に最も類似する範囲を検索
+
+        検索語内の位置と出現位置の差（揃え位置）でヒットを束ね、検索語の
+        n-gramを最も多く含む範囲を選ぶ。
+
+        Args:
+            query: 検索語
+            threshold: 採用する最小スコア（検索語のn-gramのうち一致した割合）
+
+        Returns:
+            Optional[Tuple[int, int, float]]: (開始位置, 終了位置, スコア)。
+            閾値に満たない場合はNone
+        """
+        grams = self._query_grams(query)
+        if not grams:
+            return None
+
+        # 揃え位置のずれ（挿入・削除）を許容する幅
+        width = max(len(grams) // 2, 4)
+        buckets: Dict[int, List[Tuple[int, int]]] = defaultdict(list)
+        usable: Set[str] = set()
+
+        for gram_id, (offset, gram) in enumerate(grams):
+            positions = self._postings.get(gram)
+            if positions is None:
+                usable.add(gram)
+                continue
+            if len(positions) > self.max_postings:
+                # 頻出しすぎるn-gramは識別力が低いため候補生成・スコアから除外
+                continue
+            usable.add(gram)
+            for position in positions:
+                anchor = position - offset
+                buckets[anchor // width].append((gram_id, position))
+
+        if not buckets or not usable:
+            return None
+
+        total = len(usable)
+        best: Optional[Tuple[int, int, float]] = None
+        for key in buckets:
+            # 隣接するバケットと合わせて評価（境界をまたぐ一致を取りこぼさない）
+            hits = buckets[key] + buckets.get(key + 1, [])
+            matched = {grams[gram_id][1] for gram_id, _ in hits}
+            score = len(matched) / total
+            if best is not None and score <= best[2]:
+                continue
+            start = min(position for _, position in hits)
+            end = max(position for _, position in hits) + self.n
+            best = (start, end, score)
+
+        if best is None or best[2] < threshold:
+            return None
+        return best
+
+
+class NgramIndexCache:
+    """
+    テキストのハッシュをキーにしたインデックスのキャッシュ
+
+    引用照合はスレッドプールで並行して実行されるため、辞書の操作はロックで守る。
+    """
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, NgramIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str, n: int = 2) -> NgramIndex:
+        """インデックスを取得（未作成の場合は作成）"""
+        key = f"{n}:{hashlib.sha1(text.encode('utf-8')).hexdigest()}"
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+                return index
+
+        index = NgramIndex(text, n)
+        with self._lock:
+            self._entries[key] = index
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.debug(f"n-gramインデックスを作成: {len(text)}文字, {len(index)}種類")
+        return index
+
+    def clear(self) -> None:
+        """キャッシュをクリア"""
+        with self._lock:
+            self._entries.clear()
+
+
+# グローバルなn-gramインデックスキャッシュ
+ngram_index_cache = NgramIndexCache()
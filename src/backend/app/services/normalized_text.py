@@ -0,0 +1,151 @@
+"""
+正規化テキストと元テキストへの位置対応
+
+引用検索用の正規化（空白の統一・句読点の除去・小文字化）を1パスで行い、
+正規化後の各文字が元テキストのどの位置に由来するかを配列で保持する。
+文字起こしごとにキャッシュし、語句ごとの全文正規化を避ける。
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 正規化で除去する句読点
+_REMOVED_PUNCTUATION = frozenset("、。，．")
+
+
+class NormalizedText:
+    """正規化テキストと正規化位置→元位置の対応表"""
+
+    def __init__(self, original: str):
+        self.original = original
+
+        chars: List[str] = []
+        offsets: List[int] = []
+        in_whitespace = False
+        for position, char in enumerate(original):
+            if char.isspace():
+                # 連続する空白は1つの半角スペースにまとめる
+                if not in_whitespace:
+                    chars.append(" ")
+                    offsets.append(position)
+                in_whitespace = True
+                continue
+            in_whitespace = False
+            if char in _REMOVED_PUNCTUATION:
+                continue
+            # 小文字化で複数文字になる場合も全て同じ元位置に対応させる
+            for lowered in char.lower():
+                chars.append(lowered)
+                offsets.append(position)
+
+        # 前後の空白を除去
+        start, end = 0, len(chars)
+        while start < end and chars[start] == " ":
+            start += 1
+        while end > start and chars[end - 1] == " ":
+            end -= 1
+
+        self.text = "".join(chars[start:end])
+        self.offsets = offsets[start:end]
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def to_original(self, position: int) -> int:
+        """
+        正規化テキスト上の位置を元テキスト上の位置に変換
+
+        Args:
+            position: 正規化テキスト上の位置（末尾位置を含む）
+
+        Returns:
+            int: 元テキスト上の位置
+        """
+        if position < len(self.offsets):
+            return self.offsets[max(position, 0)]
+        if not self.offsets:
+            return 0
+        # 末尾は最後の文字の直後
+        return self.offsets[-1] + 1
+
+    def to_original_span(self, start: int, end: int) -> Tuple[int, int]:
+        """
+        正規化テキスト上の範囲 [start, end) を元テキスト上の範囲に変換
+
+        Args:
+            start: 開始位置
+            end: 終了位置
+
+        Returns:
+            Tuple[int, int]: 元テキスト上の [開始位置, 終了位置)
+        """
+        original_start = self.to_original(start)
+        if end <= start:
+            return original_start, original_start
+        return original_start, self.to_original(end - 1) + 1
+
+    def find(self, normalized_target: str) -> Optional[Tuple[int, int]]:
+        """
+        正規化済みの語句を検索し、元テキスト上の範囲を返す
+
+        Args:
+            normalized_target: 正規化済みの検索語句
+
+        Returns:
+            Optional[Tuple[int, int]]: 元テキスト上の [開始位置, 終了位置)
+        """
+        if not normalized_target:
+            return None
+        position = self.text.find(normalized_target)
+        if position == -1:
+            return None
+        return self.to_original_span(position, position + len(normalized_target))
+
+
+def normalize_text(text: str) -> str:
+    """テキストを正規化（NormalizedTextと同じ規則）"""
+    return NormalizedText(text).text
+
+
+class NormalizedTextCache:
+    """
+    テキストのハッシュをキーにした正規化テキストのキャッシュ
+
+    引用照合はスレッドプールで並行して実行されるため、辞書の操作はロックで守る。
+    """
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, NormalizedText]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str) -> NormalizedText:
+        """正規化テキストを取得（未作成の場合は作成）"""
+        key = hashlib.sha1(text.encode("utf-8")).hexdigest()
+        with self._lock:
+            normalized = self._entries.get(key)
+            if normalized is not None:
+                self._entries.move_to_end(key)
+                return normalized
+
+        normalized = NormalizedText(text)
+        with self._lock:
+            self._entries[key] = normalized
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        logger.debug(f"正規化テキストを作成: {len(text)}文字 → {len(normalized)}文字")
+        return normalized
+
+    def clear(self) -> None:
+        """キャッシュをクリア"""
+        with self._lock:
+            self._entries.clear()
+
+
+# グローバルな正規化テキストキャッシュ
+normalized_text_cache = NormalizedTextCache()
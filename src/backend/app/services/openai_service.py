@@ -3,6 +3,7 @@ import json
 import time
 import re
 import asyncio
+from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
 
 from app.models.chat import (
@@ -16,10 +17,36 @@ from app.models.chat import (
     TokenUsage
 )
 from app.config import settings
+from app.services.adaptive_concurrency import CHAT_ENDPOINT, get_concurrency_limiter
+from app.services.history_summarizer import (
+    extractive_summary,
+    select_recent_messages,
+    unsummarized_messages,
+)
+from app.services.prompt_cache import PROVIDER_CACHE_MIN_TOKENS, session_prompt_cache
+from app.services.retry_policy import CHAT_ANSWER_CALL, call_with_retry
+from app.services.segment_index import estimate_timestamp, segment_index_store
+from app.services.token_counter import (
+    ensure_session_tokens,
+    token_counter,
+    usage_from_response,
+)
+from app.services.transcript_retriever import transcript_retriever_cache
 from app.utils.logger import get_logger
+from app.utils.openai_client import openai_client_kwargs
 
 logger = get_logger(__name__)
 
+
+@dataclass
+class PromptContext:
+    """模擬モードに渡す構造化されたセッションデータ（プロンプトの再解析を避ける）"""
+
+    transcription: str
+    minutes: str
+    question: str
+
+
 # OpenAI クライアントの初期化（実際のAPI統合用）
 try:
     import openai
@@ -44,12 +71,16 @@ class OpenAIService:
         
         # プロンプト管理システム
         from app.prompts.chat_prompts import (
+            RETRIEVED_TRANSCRIPTION_NOTE,
+            build_retrieved_transcription,
             get_chat_system_prompt,
             get_edit_analysis_prompt,
             build_chat_history_context,
             build_user_prompt
         )
+        self.retrieved_transcription_note = RETRIEVED_TRANSCRIPTION_NOTE
         self.prompt_manager = {
+            "build_retrieved_transcription": build_retrieved_transcription,
             "get_chat_system_prompt": get_chat_system_prompt,
             "get_edit_analysis_prompt": get_edit_analysis_prompt,
             "build_chat_history_context": build_chat_history_context,
@@ -103,32 +134,127 @@ class OpenAIService:
     ) -> Dict:
         """質問を処理"""
         start_time = time.time()
-        # プロンプトを構築
-        system_prompt = self.prompt_manager["get_chat_system_prompt"](
-            transcription=session.transcription,
-            minutes=session.minutes
+        # 検索モードでは関連する抜粋のみを質問と一緒に送る
+        transcription, context_tokens = self._build_transcription_context(
+            session, message
+        )
+        retrieval = settings.chat_context_mode == "retrieval" and bool(
+            session.transcription
+        )
+        
+        # システムプロンプトはターンをまたいで同一の文字列を再利用（先頭一致キャッシュ）
+        system_prompt, prefix_cached = session_prompt_cache.get(
+            getattr(session, "session_id", None),
+            self.retrieved_transcription_note if retrieval else session.transcription,
+            session.minutes,
+            lambda transcription, minutes: self.prompt_manager[
+                "get_chat_system_prompt"
+            ](transcription=transcription, minutes=minutes),
         )
         
-        # チャット履歴をコンテキストに変換
-        chat_context = self.prompt_manager["build_chat_history_context"](chat_history)
-        user_prompt = self.prompt_manager["build_user_prompt"](message, chat_context)
+        # 会話履歴・抜粋・質問など毎回変わる部分はユーザーメッセージに置く
+        # （要約済みの古い会話は要約で、直近の会話はトークン予算内でそのまま含める）
+        recent_history = select_recent_messages(
+            unsummarized_messages(session, chat_history),
+            settings.chat_history_token_budget,
+            settings.chat_history_max_messages,
+        )
+        chat_context = self.prompt_manager["build_chat_history_context"](
+            recent_history,
+            max_messages=len(recent_history),
+            summary=getattr(session, "history_summary", ""),
+        )
+        if retrieval:
+            user_prompt = self.prompt_manager["build_user_prompt"](
+                message, chat_context, transcription_excerpt=transcription
+            )
+        else:
+            user_prompt = self.prompt_manager["build_user_prompt"](
+                message, chat_context
+            )
         
-        # 現在は模擬実装（後でOpenAI APIに置き換え）
+        usage = TokenUsage()
         response_text, citations = await self._call_openai_api(
-            system_prompt, user_prompt, intent="question"
+            system_prompt,
+            user_prompt,
+            intent="question",
+            task_id=getattr(session, "task_id", None),
+            usage=usage,
+            context=PromptContext(session.transcription, session.minutes, message),
         )
         
         processing_time = time.time() - start_time
-        tokens_used = self._estimate_tokens(system_prompt + user_prompt + response_text)
+        if not usage.total_tokens:
+            # APIの使用量がない場合（模擬モード等）はキャッシュ済みの件数から算出
+            template = self.prompt_manager["get_chat_system_prompt"](
+                transcription="", minutes=""
+            )
+            prefix_tokens = token_counter.count(template)
+            if retrieval:
+                # 抜粋はユーザーメッセージ側で数える
+                prefix_tokens += getattr(session, "minutes_tokens", 0) + (
+                    token_counter.count(self.retrieved_transcription_note)
+                )
+            else:
+                prefix_tokens += context_tokens
+            usage = self._estimate_usage(prefix_tokens, user_prompt, response_text)
+            if prefix_cached and prefix_tokens >= PROVIDER_CACHE_MIN_TOKENS:
+                # 同一のシステムプロンプトを再送した場合はプロバイダー側でキャッシュされる
+                usage.cached_tokens = prefix_tokens
         
         return {
             "response": response_text,
             "citations": citations,
             "edit_actions": [],
-            "tokens_used": tokens_used,
+            "tokens_used": usage.total_tokens,
+            "usage": usage,
             "processing_time": processing_time
         }
     
+    def _build_transcription_context(
+        self, session: ChatSession, message: str
+    ) -> Tuple[str, int]:
+        """
+        プロンプトに含める文字起こしを構築
+        
+        full モードでは全文を、retrieval モードでは質問に関連するチャンクのみを
+        トークン予算内で時系列順に含める。
+        
+        Args:
+            session: チャットセッション
+            message: ユーザーの質問
+        
+        Returns:
+            Tuple[str, int]: (文字起こしテキスト, 議事録を含むコンテキストトークン数)
+        """
+        context_tokens = ensure_session_tokens(session)
+        if settings.chat_context_mode != "retrieval" or not session.transcription:
+            return session.transcription, context_tokens
+        
+        retriever = transcript_retriever_cache.get(
+            session.session_id,
+            session.transcription,
+            settings.chat_retrieval_chunk_chars,
+        )
+        chunks = retriever.retrieve(
+            message,
+            settings.chat_retrieval_token_budget,
+            settings.chat_retrieval_top_k,
+        )
+        index = segment_index_store.get(getattr(session, "task_id", None))
+        passages = [
+            (estimate_timestamp(chunk.start, session.transcription, index), chunk.text)
+            for chunk in chunks
+        ]
+        transcription = self.prompt_manager["build_retrieved_transcription"](passages)
+        logger.info(
+            f"検索コンテキスト: {len(chunks)}/{len(retriever.chunks)}チャンク "
+            f"({sum(chunk.tokens for chunk in chunks)}/{retriever.total_tokens}トークン)"
+        )
+        return transcription, (
+            getattr(session, "minutes_tokens", 0) + token_counter.count(transcription)
+        )
+    
     async def _process_edit_request(
         self,
         session: ChatSession,
@@ -146,18 +272,29 @@ class OpenAIService:
         user_prompt = message  # 編集指示をそのまま渡す
         
         # OpenAI APIを呼び出して編集アクションを生成
+        usage = TokenUsage()
         response_text, edit_actions = await self._analyze_edit_intent(
-            system_prompt, user_prompt, session.minutes
+            system_prompt, user_prompt, session.minutes, usage=usage
         )
         
         processing_time = time.time() - start_time
-        tokens_used = self._estimate_tokens(system_prompt + user_prompt + response_text)
+        if not usage.total_tokens:
+            template = self.prompt_manager["get_edit_analysis_prompt"](
+                current_minutes="", edit_instruction=message
+            )
+            ensure_session_tokens(session)
+            usage = self._estimate_usage(
+                getattr(session, "minutes_tokens", 0),
+                template + user_prompt,
+                response_text,
+            )
         
         return {
             "response": response_text,
             "citations": [],
             "edit_actions": edit_actions,
-            "tokens_used": tokens_used,
+            "tokens_used": usage.total_tokens,
+            "usage": usage,
             "processing_time": processing_time
         }
     
@@ -165,7 +302,10 @@ class OpenAIService:
         self,
         system_prompt: str,
         user_prompt: str,
-        intent: str = "question"
+        intent: str = "question",
+        task_id: Optional[str] = None,
+        usage: Optional[TokenUsage] = None,
+        context: Optional[PromptContext] = None,
     ) -> Tuple[str, List[Citation]]:
         """
         OpenAI APIを呼び出し
@@ -174,12 +314,17 @@ class OpenAIService:
             system_prompt: システムプロンプト
             user_prompt: ユーザープロンプト
             intent: 処理の意図
+            task_id: タスクID（引用タイムスタンプのセグメント索引参照用）
+            usage: APIが返したトークン使用量の格納先
+            context: 模擬モードで使うセッションデータ
         
         Returns:
             Tuple: (回答テキスト, 引用リスト)
         """
         if self.use_mock:
-            return await self._call_mock_api(system_prompt, user_prompt, intent)
+            return await self._call_mock_api(
+                system_prompt, user_prompt, intent, task_id=task_id, context=context
+            )
         
         try:
             logger.info(f"OpenAI API呼び出し開始 - intent: {intent}, model: {self.model}")
@@ -189,18 +334,35 @@ class OpenAIService:
                 {"role": "user", "content": user_prompt}
             ]
             
-            # OpenAI API呼び出し
-            response = await asyncio.wait_for(
-                self._make_openai_request(messages),
-                timeout=self.timeout
+            # 短いプロンプトのみヘッジ対象（長文生成の重複発行は避ける）
+            hedge = (
+                settings.openai_hedging_enabled
+                and len(system_prompt) + len(user_prompt)
+                <= settings.openai_hedge_max_prompt_chars
+            )
+            
+            # OpenAI API呼び出し（429/5xx/タイムアウトはリトライ）
+            response = await call_with_retry(
+                lambda: asyncio.wait_for(
+                    self._make_openai_request(messages),
+                    timeout=self.timeout
+                ),
+                CHAT_ANSWER_CALL,
+                hedge=hedge
             )
             
             response_text = response.choices[0].message.content
+            self._record_usage(response, usage)
             
             # AIの回答から引用を抽出する代わりに、コンテンツベースの引用を生成
             citations = self._generate_smart_citations(user_prompt, response_text)
             
             logger.info(f"OpenAI API呼び出し成功 - tokens: {response.usage.total_tokens}")
+            if usage is not None and usage.prompt_tokens:
+                logger.info(
+                    f"プロンプトキャッシュ: {usage.cached_tokens}/{usage.prompt_tokens}"
+                    f"トークン ({usage.cached_ratio:.0%})"
+                )
             
             return response_text, citations
             
@@ -220,23 +382,25 @@ class OpenAIService:
             try:
                 # 新しいOpenAI v1.0+ クライアント使用
                 from openai import AsyncOpenAI
-                client = AsyncOpenAI(api_key=settings.openai_api_key)
+                client = AsyncOpenAI(**openai_client_kwargs())
                 
-                # o3系モデルは特殊なパラメーター構成
-                if self.model.startswith('o3'):
-                    # o3系モデルは基本パラメーターのみ対応
-                    response = await client.chat.completions.create(
-                        model=self.model,
-                        messages=messages
-                    )
-                else:
-                    response = await client.chat.completions.create(
-                        model=self.model,
-                        messages=messages,
-                        max_tokens=self.max_tokens,
-                        temperature=self.temperature,
-                        timeout=self.timeout
-                    )
+                # 同時実行数はAIMDリミッターで制御
+                async with get_concurrency_limiter(CHAT_ENDPOINT).slot():
+                    # o3系モデルは特殊なパラメーター構成
+                    if self.model.startswith('o3'):
+                        # o3系モデルは基本パラメーターのみ対応
+                        response = await client.chat.completions.create(
+                            model=self.model,
+                            messages=messages
+                        )
+                    else:
+                        response = await client.chat.completions.create(
+                            model=self.model,
+                            messages=messages,
+                            max_tokens=self.max_tokens,
+                            temperature=self.temperature,
+                            timeout=self.timeout
+                        )
                 return response
             except ImportError:
                 # 古いライブラリバージョンのフォールバック
@@ -255,7 +419,9 @@ class OpenAIService:
         self,
         system_prompt: str,
         user_prompt: str,
-        intent: str = "question"
+        intent: str = "question",
+        task_id: Optional[str] = None,
+        context: Optional[PromptContext] = None,
     ) -> Tuple[str, List[Citation]]:
         """模擬API呼び出し（改善版）"""
         logger.info(f"OpenAI API模擬呼び出し - intent: {intent}")
@@ -264,12 +430,18 @@ class OpenAIService:
         await asyncio.sleep(0.5)
         
         if intent == "question":
-            # システムプロンプトから文字起こしと議事録を抽出
-            transcription = self._extract_transcription_from_prompt(system_prompt)
-            minutes = self._extract_minutes_from_prompt(system_prompt)
-            
-            # ユーザーの質問を抽出
-            question = user_prompt.split('【新しい質問】')[-1].strip() if '【新しい質問】' in user_prompt else user_prompt
+            if context is not None:
+                # セッションデータをそのまま使用（プロンプトの再解析は不要）
+                transcription = context.transcription
+                minutes = context.minutes
+                question = context.question
+            else:
+                # システムプロンプトから文字起こしと議事録を抽出
+                transcription = self._extract_transcription_from_prompt(system_prompt)
+                minutes = self._extract_minutes_from_prompt(system_prompt)
+                
+                # ユーザーの質問を抽出
+                question = user_prompt.split('【新しい質問】')[-1].strip() if '【新しい質問】' in user_prompt else user_prompt
             
             # 質問に関連する内容を検索
             relevant_content = self._find_relevant_content(question, transcription, minutes)
@@ -278,7 +450,9 @@ class OpenAIService:
                 response_text = f"ご質問「{question}」についてお答えします。\n\n{relevant_content}"
                 
                 # 関連する引用を生成
-                citations = self._generate_relevant_citations(question, transcription)
+                citations = self._generate_relevant_citations(
+                    question, transcription, task_id=task_id
+                )
             else:
                 response_text = f"ご質問「{question}」について、議事録および文字起こしから検索しましたが、直接的な言及は見つかりませんでした。\n\n関連する可能性のある内容がある場合は、より具体的な質問をしていただけると詳細な回答ができます。"
                 citations = []
@@ -432,8 +606,11 @@ class OpenAIService:
         
         return context.strip()
     
-    def _generate_relevant_citations(self, question: str, transcription: str) -> List[Citation]:
+    def _generate_relevant_citations(
+        self, question: str, transcription: str, task_id: Optional[str] = None
+    ) -> List[Citation]:
         """質問に関連する引用を生成"""
+        index = segment_index_store.get(task_id)
         keywords = self._extract_keywords(question)
         citations = []
         
@@ -442,13 +619,8 @@ class OpenAIService:
             if pos != -1:
                 context = self._get_context_around_keyword(keyword, transcription, 80)
                 if context:
-                    # タイムスタンプを推定
-                    text_ratio = pos / len(transcription) if transcription else 0
-                    estimated_seconds = int(text_ratio * 600)  # 10分の動画と仮定
-                    hours = estimated_seconds // 3600
-                    minutes = (estimated_seconds % 3600) // 60
-                    seconds = estimated_seconds % 60
-                    timestamp = f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+                    # セグメント索引から実時刻を取得（なければ推定）
+                    timestamp = estimate_timestamp(pos, transcription, index)
                     
                     citation = Citation(
                         text=context[:50] + "..." if len(context) > 50 else context,
@@ -514,7 +686,8 @@ class OpenAIService:
         self,
         system_prompt: str,
         user_prompt: str,
-        current_minutes: str
+        current_minutes: str,
+        usage: Optional[TokenUsage] = None,
     ) -> Tuple[str, List[EditAction]]:
         """
         編集インテントを解析
@@ -523,11 +696,13 @@ class OpenAIService:
             system_prompt: システムプロンプト
             user_prompt: ユーザープロンプト
             current_minutes: 現在の議事録
+            usage: APIが返したトークン使用量の格納先
         
         Returns:
             Tuple: (説明テキスト, 編集アクションリスト)
         """
         # 高度な編集インテント解析エンジンを使用
+        from app.services.compute_pool import compute_pool
         from app.services.edit_intent_analyzer import edit_intent_analyzer
         
         edit_instruction = user_prompt
@@ -535,8 +710,10 @@ class OpenAIService:
         
         try:
             # まず、パターンベース解析を実行
-            edit_actions, explanation = edit_intent_analyzer.analyze_edit_intent(
-                edit_instruction, current_minutes
+            edit_actions, explanation = await compute_pool.run_in_process(
+                edit_intent_analyzer.analyze_edit_intent,
+                edit_instruction,
+                current_minutes,
             )
             
             if self.use_mock:
@@ -548,7 +725,7 @@ class OpenAIService:
             
             # OpenAI APIが利用可能な場合はAI解析も実行
             ai_response = await self._call_openai_for_edit_analysis(
-                system_prompt, user_prompt, edit_actions
+                system_prompt, user_prompt, edit_actions, usage=usage
             )
             
             # AI解析結果とパターンベース解析を統合
@@ -567,7 +744,8 @@ class OpenAIService:
         self,
         system_prompt: str,
         user_prompt: str,
-        pattern_actions: List[EditAction]
+        pattern_actions: List[EditAction],
+        usage: Optional[TokenUsage] = None,
     ) -> str:
         """
         OpenAI APIで編集解析を実行
@@ -576,6 +754,7 @@ class OpenAIService:
             system_prompt: システムプロンプト
             user_prompt: ユーザープロンプト
             pattern_actions: パターンベース解析結果
+            usage: APIが返したトークン使用量の格納先
         
         Returns:
             str: AI解析結果
@@ -600,6 +779,7 @@ class OpenAIService:
                 self._make_openai_request(messages),
                 timeout=self.timeout
             )
+            self._record_usage(response, usage)
             
             return response.choices[0].message.content
             
@@ -607,6 +787,46 @@ class OpenAIService:
             logger.error(f"OpenAI編集解析エラー: {e}")
             return "AI解析に失敗しましたが、パターンベース解析を使用します。"
     
+    async def summarize_chat_history(
+        self, previous_summary: str, messages: List[ChatMessage]
+    ) -> str:
+        """
+        古い会話を前回までの要約に統合
+        
+        Args:
+            previous_summary: 前回までの要約
+            messages: 新たに要約に含める会話（古い順）
+        
+        Returns:
+            str: 更新後の要約（模擬モード・エラー時は抽出的要約）
+        """
+        max_tokens = settings.chat_history_summary_max_tokens
+        if self.use_mock:
+            return extractive_summary(previous_summary, messages, max_tokens)
+        
+        from app.prompts.chat_prompts import get_history_summary_prompt
+        
+        try:
+            response = await asyncio.wait_for(
+                self._make_openai_request(
+                    [
+                        {
+                            "role": "user",
+                            "content": get_history_summary_prompt(
+                                previous_summary, messages, max_tokens
+                            ),
+                        }
+                    ]
+                ),
+                timeout=self.timeout,
+            )
+            summary = (response.choices[0].message.content or "").strip()
+            if summary:
+                return summary
+        except Exception as e:
+            logger.error(f"会話履歴の要約エラー: {e}")
+        return extractive_summary(previous_summary, messages, max_tokens)
+    
     def _merge_edit_analysis(
         self,
         pattern_actions: List[EditAction],
@@ -689,15 +909,42 @@ class OpenAIService:
     
     
     def _estimate_tokens(self, text: str) -> int:
-        """トークン数を概算"""
-        # 日本語と英語の混在テキストのトークン数概算
-        japanese_chars = sum(1 for char in text if ord(char) > 127)
-        english_chars = len(text) - japanese_chars
+        """トークン数を計測（トークナイザーが利用できない場合は概算）"""
+        return max(token_counter.count(text), 50)
+    
+    def _estimate_usage(
+        self, context_tokens: int, prompt_text: str, response_text: str
+    ) -> TokenUsage:
+        """
+        トークン使用量を算出
         
-        # 日本語: 約1.5文字で1トークン、英語: 約4文字で1トークン
-        estimated_tokens = int(japanese_chars / 1.5) + int(english_chars / 4)
+        Args:
+            context_tokens: セッションにキャッシュ済みのコンテキストトークン数
+            prompt_text: コンテキスト以外のプロンプト（テンプレート・質問等）
+            response_text: 回答テキスト
         
-        return max(estimated_tokens, 50)
+        Returns:
+            TokenUsage: 算出した使用量
+        """
+        prompt_tokens = context_tokens + token_counter.count(prompt_text)
+        completion_tokens = token_counter.count(response_text)
+        return TokenUsage(
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            total_tokens=prompt_tokens + completion_tokens,
+        )
+    
+    @staticmethod
+    def _record_usage(response, usage: Optional[TokenUsage]) -> None:
+        """APIレスポンスの使用量を格納先に反映"""
+        if usage is None:
+            return
+        actual = usage_from_response(response)
+        if actual is not None:
+            usage.prompt_tokens = actual.prompt_tokens
+            usage.completion_tokens = actual.completion_tokens
+            usage.total_tokens = actual.total_tokens
+            usage.cached_tokens = actual.cached_tokens
     
     def _create_error_response(self, error_message: str, processing_time: float) -> Dict:
         """エラーレスポンスを作成"""
@@ -706,7 +953,8 @@ class OpenAIService:
             "citations": [],
             "edit_actions": [],
             "tokens_used": 100,
-            "processing_time": processing_time
+            "processing_time": processing_time,
+            "error": True
         }
 
 
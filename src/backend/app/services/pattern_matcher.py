@@ -0,0 +1,143 @@
+"""
+複数の正規表現パターンの一括照合
+
+編集指示の解析では多数のパターンを順番に re.search していたため、指示1件ごとに
+全パターンの走査が発生していた。ここでは各パターンを事前にコンパイルし、
+パターンに必ず含まれるキーワード（「(変更|修正)」のようなリテラルの選択グループ）を
+抽出しておく。照合時はキーワードを1つの正規表現で1回走査して検出し、
+キーワードがそろったパターンだけを評価する。評価順と一致結果は元の逐次照合と同じ。
+"""
+import re
+from typing import Dict, FrozenSet, Iterator, List, Optional, Sequence, Set, Tuple
+
+# 量指定子の付かないグループ（ネストなし）
+_GROUP_PATTERN = re.compile(r"(?<!\\)\(([^()]*)\)(?![?*+{])")
+# 正規表現の特殊文字を含まないリテラルの選択肢
+_LITERAL_ALTERNATIVES = re.compile(r"[^\\.\[\]()?*+{}^$|]+(?:\|[^\\.\[\]()?*+{}^$|]+)*")
+
+
+def _is_flat(pattern: str) -> bool:
+    """グループが入れ子でなく、最上位に選択（|）がないか"""
+    depth = 0
+    escaped = in_class = False
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+            if depth > 1:
+                return False
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return False
+    return depth == 0
+
+
+def required_keywords(pattern: str) -> List[FrozenSet[str]]:
+    """
+    パターンが一致するために必要なキーワードの組を抽出
+
+    Args:
+        pattern: 正規表現パターン
+
+    Returns:
+        List[FrozenSet[str]]: キーワードの組のリスト（各組のいずれか1つが必要）
+    """
+    if not _is_flat(pattern):
+        # 入れ子のグループや最上位の選択を含むパターンは絞り込みの対象外
+        return []
+
+    keyword_sets = []
+    for group in _GROUP_PATTERN.finditer(pattern):
+        content = group.group(1)
+        if content.startswith("?"):
+            # (?:...) などの拡張記法は対象外
+            continue
+        if _LITERAL_ALTERNATIVES.fullmatch(content):
+            keyword_sets.append(frozenset(word.lower() for word in content.split("|")))
+    return keyword_sets
+
+
+def compile_any(patterns: Sequence[str], flags: int = 0) -> "re.Pattern[str]":
+    """
+    いずれかのパターンに一致する1つの正規表現にまとめる
+
+    Args:
+        patterns: 正規表現パターン
+        flags: コンパイルフラグ
+
+    Returns:
+        re.Pattern: まとめた正規表現
+    """
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), flags)
+
+
+class KeywordPatternMatcher:
+    """キーワードで候補を絞り込む複数パターンの照合器"""
+
+    def __init__(self, patterns: Dict[str, Sequence[str]], flags: int = re.IGNORECASE):
+        """
+        Args:
+            patterns: 種類 → パターンのリスト（評価順）
+            flags: コンパイルフラグ
+        """
+        self._entries: List[Tuple[str, "re.Pattern[str]", List[FrozenSet[str]]]] = []
+        keywords: Set[str] = set()
+        for kind, kind_patterns in patterns.items():
+            for pattern in kind_patterns:
+                keyword_sets = required_keywords(pattern)
+                self._entries.append((kind, re.compile(pattern, flags), keyword_sets))
+                for keyword_set in keyword_sets:
+                    keywords.update(keyword_set)
+
+        # 長いキーワードを優先し、先読みで重なったキーワードも検出する
+        ordered = sorted(keywords, key=len, reverse=True)
+        self._keyword_scanner: Optional["re.Pattern[str]"] = (
+            re.compile(
+                "(?=(" + "|".join(re.escape(keyword) for keyword in ordered) + "))"
+            )
+            if ordered
+            else None
+        )
+        # 検出したキーワードに含まれる短いキーワードも検出済みとみなす
+        self._contained: Dict[str, Set[str]] = {
+            keyword: {other for other in ordered if other in keyword}
+            for keyword in ordered
+        }
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keywords_in(self, text: str) -> Set[str]:
+        """テキストに含まれるキーワード（小文字）を1回の走査で検出"""
+        if self._keyword_scanner is None:
+            return set()
+        found: Set[str] = set()
+        for match in self._keyword_scanner.finditer(text.lower()):
+            found.update(self._contained[match.group(1)])
+        return found
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[str, "re.Match[str]"]]:
+        """
+        一致したパターンを評価順に列挙
+
+        Args:
+            text: 対象テキスト
+
+        Yields:
+            Tuple[str, re.Match]: (種類, 一致結果)
+        """
+        present = self.keywords_in(text)
+        for kind, compiled, keyword_sets in self._entries:
+            if any(present.isdisjoint(keyword_set) for keyword_set in keyword_sets):
+                continue
+            match = compiled.search(text)
+            if match:
+                yield kind, match
@@ -0,0 +1,86 @@
+"""
+チャットセッションごとのシステムプロンプトのキャッシュ
+
+システムプロンプト（指示・文字起こし・議事録）はセッション中ほとんど変わらないため、
+メッセージごとに全文を str.format し直さず、セッション単位で構築済みの文字列を再利用する。
+同じ文字列を送り続けることで、プロバイダー側のプロンプトキャッシュ（先頭一致）も
+ターンをまたいで効くようになる。議事録が編集された場合などは内容の比較で検出して作り直す。
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional, Tuple
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# OpenAIのプロンプトキャッシュが適用される最小プロンプト長（トークン）
+PROVIDER_CACHE_MIN_TOKENS = 1024
+
+
+@dataclass
+class PromptPrefix:
+    """構築済みのシステムプロンプト"""
+
+    transcription: str
+    minutes: str
+    system_prompt: str
+    hits: int = 0
+
+
+class SessionPromptCache:
+    """セッションID → 構築済みシステムプロンプトのキャッシュ"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, PromptPrefix]" = OrderedDict()
+
+    def get(
+        self,
+        session_id: Optional[str],
+        transcription: str,
+        minutes: str,
+        build: Callable[[str, str], str],
+    ) -> Tuple[str, bool]:
+        """
+        システムプロンプトを取得（未構築・内容変更時は構築）
+
+        Args:
+            session_id: チャットセッションID（文字列でない場合はキャッシュしない）
+            transcription: プロンプトに含める文字起こし
+            minutes: プロンプトに含める議事録
+            build: (文字起こし, 議事録) からシステムプロンプトを構築する関数
+
+        Returns:
+            Tuple[str, bool]: (システムプロンプト, キャッシュを再利用したか)
+        """
+        if not isinstance(session_id, str) or not session_id:
+            return build(transcription, minutes), False
+
+        entry = self._entries.get(session_id)
+        # 同一オブジェクトなら比較は即座に終わり、別オブジェクトでも全文の一致で判定する
+        if (
+            entry is not None
+            and entry.transcription == transcription
+            and entry.minutes == minutes
+        ):
+            entry.hits += 1
+            self._entries.move_to_end(session_id)
+            return entry.system_prompt, True
+
+        self._entries[session_id] = PromptPrefix(
+            transcription, minutes, build(transcription, minutes)
+        )
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        logger.debug(f"システムプロンプトを構築: {session_id[:8]}...")
+        return self._entries[session_id].system_prompt, False
+
+    def discard(self, session_id: str) -> None:
+        """キャッシュを破棄"""
+        self._entries.pop(session_id, None)
+
+
+# グローバルなシステムプロンプトキャッシュ
+session_prompt_cache = SessionPromptCache()
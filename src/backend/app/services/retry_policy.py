@@ -0,0 +1,263 @@
+"""OpenAI API呼び出しのリトライ・ヘッジングポリシー"""
+import asyncio
+import math
+import random
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from app.config import settings
+from app.services.adaptive_concurrency import classify_api_error, get_retry_after
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# リトライ対象のエラー分類
+RETRYABLE_ERROR_KINDS = {"throttle", "timeout", "server_error", "connection"}
+
+# レイテンシの記録・ヘッジ閾値の単位（呼び出しの種類）。同じエンドポイントでも
+# 議事録生成とチャットの回答では出力の長さが大きく異なるため分けて記録する
+CHAT_ANSWER_CALL = "chat.completions:answer"
+MINUTES_CALL = "chat.completions:minutes"
+
+
+def classify_retryable_error(error: BaseException) -> str:
+    """
+    例外をリトライ判定用に分類
+
+    Args:
+        error: 発生した例外
+
+    Returns:
+        str: classify_api_errorの分類に加え、接続エラーは "connection"
+    """
+    kind = classify_api_error(error)
+    if kind == "error" and "Connection" in type(error).__name__:
+        return "connection"
+    return kind
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """リトライすべき一時的なエラーかを判定"""
+    return classify_retryable_error(error) in RETRYABLE_ERROR_KINDS
+
+
+class LatencyTracker:
+    """エンドポイントごとの直近レイテンシを保持し、パーセンタイルを算出"""
+
+    def __init__(self, window_size: int = 500):
+        self.window_size = window_size
+        self._samples: Dict[str, Deque[float]] = {}
+
+    def record(self, endpoint: str, latency: float) -> None:
+        """レイテンシを記録"""
+        samples = self._samples.get(endpoint)
+        if samples is None:
+            samples = deque(maxlen=self.window_size)
+            self._samples[endpoint] = samples
+        samples.append(latency)
+
+    def sample_count(self, endpoint: str) -> int:
+        """記録済みサンプル数を取得"""
+        return len(self._samples.get(endpoint, ()))
+
+    def percentile(self, endpoint: str, percentile: float) -> Optional[float]:
+        """
+        パーセンタイル値を取得
+
+        Args:
+            endpoint: エンドポイント名
+            percentile: 0-100のパーセンタイル
+
+        Returns:
+            Optional[float]: レイテンシ（秒）。サンプルがない場合はNone
+        """
+        samples = self._samples.get(endpoint)
+        if not samples:
+            return None
+        # nearest-rank法
+        ordered = sorted(samples)
+        rank = math.ceil(percentile / 100 * len(ordered))
+        return ordered[min(len(ordered), max(rank, 1)) - 1]
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """全エンドポイントのp50/p95/p99を取得"""
+        stats = {}
+        for endpoint in self._samples:
+            stats[endpoint] = {
+                "samples": self.sample_count(endpoint),
+                "p50": self._rounded(self.percentile(endpoint, 50)),
+                "p95": self._rounded(self.percentile(endpoint, 95)),
+                "p99": self._rounded(self.percentile(endpoint, 99)),
+            }
+        return stats
+
+    def clear(self) -> None:
+        """記録をクリア"""
+        self._samples.clear()
+
+    @staticmethod
+    def _rounded(value: Optional[float]) -> Optional[float]:
+        return round(value, 3) if value is not None else None
+
+
+# グローバルなレイテンシトラッカー
+latency_tracker = LatencyTracker()
+
+
+class RetryPolicy:
+    """指数バックオフ（フルジッター）付きのリトライポリシー"""
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+    ):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    @classmethod
+    def from_settings(cls) -> "RetryPolicy":
+        """設定値からポリシーを作成"""
+        return cls(
+            max_attempts=settings.openai_retry_max_attempts,
+            base_delay=settings.openai_retry_base_delay,
+            max_delay=settings.openai_retry_max_delay,
+        )
+
+    def get_delay(self, attempt: int, error: Optional[BaseException] = None) -> float:
+        """
+        次の試行までの待機時間を計算
+
+        Args:
+            attempt: 失敗した試行回数（1始まり）
+            error: 失敗時の例外（Retry-After参照用）
+
+        Returns:
+            float: 待機秒数
+        """
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        delay = random.uniform(0, ceiling)
+
+        # Retry-Afterが指定されている場合はそれ以上待つ
+        if error is not None:
+            retry_after = get_retry_after(error)
+            if retry_after is not None:
+                delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+
+async def hedged_call(
+    func: Callable[[], Awaitable[Any]],
+    endpoint: str,
+    tracker: Optional[LatencyTracker] = None,
+) -> Any:
+    """
+    p95レイテンシ経過後に同一リクエストをもう1本発行し、先に成功した結果を採用
+
+    サンプル数が不足している場合はヘッジせずに1本だけ実行する。
+    トラッカーには1本目のリクエストの所要時間だけを記録する（ヘッジで短くなった
+    所要時間を記録すると閾値が下がり続けるため）。ヘッジが先に成功した場合は
+    1本目を打ち切り、打ち切るまでの経過時間を下限値として記録する。
+    呼び出し元のキャンセルを含め、どの経路で抜けても未完了のリクエストは打ち切る。
+
+    Args:
+        func: リクエストを実行するコルーチン関数
+        endpoint: 呼び出しの種類（閾値の参照先・レイテンシの記録単位）
+        tracker: レイテンシトラッカー
+
+    Returns:
+        Any: 先に成功したリクエストの結果
+    """
+    tracker = tracker or latency_tracker
+    hedge_delay = None
+    if tracker.sample_count(endpoint) >= settings.openai_hedge_min_samples:
+        hedge_delay = tracker.percentile(endpoint, 95)
+
+    started = time.monotonic()
+    primary = asyncio.ensure_future(func())
+    hedge: Optional[asyncio.Future] = None
+    try:
+        if hedge_delay is None:
+            result = await primary
+            tracker.record(endpoint, time.monotonic() - started)
+            return result
+
+        done, _ = await asyncio.wait({primary}, timeout=hedge_delay)
+        if done:
+            result = primary.result()
+            tracker.record(endpoint, time.monotonic() - started)
+            return result
+
+        logger.info(f"ヘッジリクエストを発行: {endpoint} (p95={hedge_delay:.2f}秒超過)")
+        hedge = asyncio.ensure_future(func())
+        pending = {primary, hedge}
+        last_error: Optional[BaseException] = None
+
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    # 1本目が失敗していなければ、完了または打ち切りまでの時間を記録
+                    if not primary.done() or primary.exception() is None:
+                        tracker.record(endpoint, time.monotonic() - started)
+                    return task.result()
+                last_error = task.exception()
+        raise last_error
+    finally:
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+async def call_with_retry(
+    func: Callable[[], Awaitable[Any]],
+    endpoint: str,
+    policy: Optional[RetryPolicy] = None,
+    hedge: bool = False,
+    tracker: Optional[LatencyTracker] = None,
+) -> Any:
+    """
+    分類に基づいてリトライしながらAPIを呼び出す
+
+    Args:
+        func: リクエストを実行するコルーチン関数（呼び出しごとに新しいリクエスト）
+        endpoint: 呼び出しの種類（レイテンシの記録単位。CHAT_ANSWER_CALLなど）
+        policy: リトライポリシー（省略時は設定値）
+        hedge: ヘッジリクエストを有効にするか
+        tracker: レイテンシトラッカー
+
+    Returns:
+        Any: APIレスポンス
+
+    Raises:
+        Exception: リトライ対象外のエラー、またはリトライ上限到達時の最後のエラー
+    """
+    policy = policy or RetryPolicy.from_settings()
+    tracker = tracker or latency_tracker
+
+    for attempt in range(1, policy.max_attempts + 1):
+        start_time = time.monotonic()
+        try:
+            if hedge:
+                # 所要時間は hedged_call が1本目のリクエストについて記録する
+                return await hedged_call(func, endpoint, tracker)
+            result = await func()
+            tracker.record(endpoint, time.monotonic() - start_time)
+            return result
+
+        except Exception as e:
+            kind = classify_retryable_error(e)
+            if kind not in RETRYABLE_ERROR_KINDS or attempt >= policy.max_attempts:
+                raise
+
+            delay = policy.get_delay(attempt, e)
+            logger.warning(
+                f"API呼び出し失敗（{kind}）: {endpoint} - "
+                f"{delay:.2f}秒後にリトライ ({attempt}/{policy.max_attempts})"
+            )
+            await asyncio.sleep(delay)
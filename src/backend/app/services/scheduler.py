@@ -0,0 +1,245 @@
+"""
+タスクキューのスケジューラー
+
+asyncio.Queue の取り出し順序を差し替え、優先度と公平性を考慮してタスクを選ぶ。
+優先度の高いタスクを常に先に取り出し、同じ優先度の中では次のポリシーで選択する。
+
+- fifo: 登録順
+- fair: 所有者（セッション・APIキー）ごとの Deficit Round Robin。
+  1巡ごとに各所有者へ quantum（秒）を配り、予想処理時間（メディアの長さ）が
+  貯まった分に収まるタスクを取り出す。長い録音を大量に登録した所有者がいても、
+  他の所有者の短いタスクは数巡以内に処理される。
+- sjf: 予想処理時間の短い順（Shortest Expected Job First）
+"""
+import asyncio
+import heapq
+import itertools
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from enum import Enum, IntEnum
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class TaskPriority(IntEnum):
+    """タスクの優先度（大きいほど先に処理）"""
+
+    LOW = 0
+    NORMAL = 1
+    HIGH = 2
+
+
+class SchedulingPolicy(str, Enum):
+    """同じ優先度のタスクの選択方式"""
+
+    FIFO = "fifo"
+    FAIR = "fair"
+    SJF = "sjf"
+
+
+# 所有者が不明なタスクをまとめる所有者名
+ANONYMOUS_OWNER = "_anonymous"
+
+
+@dataclass
+class QueuePosition:
+    """ステージ内でのタスクの位置（ETA の予測用）"""
+
+    stage: int
+    expected_seconds: float  # このタスクの予想処理時間（メディアの長さ）
+    elapsed_seconds: Optional[float] = None  # 実行中ならステージの経過時間
+    ahead: int = 0  # 先に取り出される待機タスクの数
+    ahead_seconds: float = 0.0  # その予想処理時間の合計
+    # 同じステージで実行中の他のタスクの (予想処理時間, 経過時間)
+    running: List[Tuple[float, float]] = field(default_factory=list)
+
+
+class _FairShare:
+    """1つの優先度内の Deficit Round Robin"""
+
+    def __init__(self, quantum: float):
+        self.quantum = max(quantum, 1.0)
+        # 所有者 → 待機中のタスク（登録順）。並び順がラウンドロビンの巡回順
+        self.owners: "OrderedDict[str, Deque[Any]]" = OrderedDict()
+        self.deficits: Dict[str, float] = {}
+        self._granted: set = set()
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self.owners.values())
+
+    def push(self, item: Any, owner: str) -> None:
+        if owner not in self.owners:
+            self.owners[owner] = deque()
+            self.deficits[owner] = 0.0
+        self.owners[owner].append(item)
+
+    def pop(self, cost_of) -> Any:
+        while True:
+            owner, items = next(iter(self.owners.items()))
+            if owner not in self._granted:
+                # 巡回してきた所有者に quantum を配る
+                self.deficits[owner] += self.quantum
+                self._granted.add(owner)
+            cost = cost_of(items[0])
+            if cost <= self.deficits[owner]:
+                self.deficits[owner] -= cost
+                item = items.popleft()
+                if not items:
+                    # 待機タスクがなくなった所有者は残高を持ち越さない
+                    del self.owners[owner]
+                    del self.deficits[owner]
+                    self._granted.discard(owner)
+                return item
+            # 残高が足りない所有者は次の巡回まで後回し
+            self.owners.move_to_end(owner)
+            self._granted.discard(owner)
+
+
+class _PriorityLevels:
+    """優先度 → 待機列（FIFO/SJF: ヒープ、FAIR: _FairShare）"""
+
+    def __init__(self):
+        self.levels: Dict[int, Any] = {}
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self):
+        return iter(sorted(self.levels, reverse=True))
+
+
+class SchedulingQueue(asyncio.Queue):
+    """
+    優先度とポリシーに従って取り出す asyncio.Queue
+
+    登録する要素は priority・owner・expected_seconds 属性を持つ（QueuedTask）。
+    asyncio.PriorityQueue と同じく _put/_get を差し替えているため、
+    get/put/qsize/task_done などのインターフェースはそのまま使える。
+    """
+
+    def __init__(
+        self,
+        policy: SchedulingPolicy = SchedulingPolicy.FIFO,
+        fair_quantum_seconds: float = 600.0,
+        default_expected_seconds: float = 600.0,
+    ):
+        self.policy = SchedulingPolicy(policy)
+        self.fair_quantum_seconds = fair_quantum_seconds
+        self.default_expected_seconds = default_expected_seconds
+        super().__init__()
+
+    def _init(self, maxsize):
+        self._counter = itertools.count()
+        # asyncio.Queue は qsize/empty で self._queue の長さを参照する
+        self._queue = _PriorityLevels()
+
+    def _cost(self, item: Any) -> float:
+        expected = getattr(item, "expected_seconds", None)
+        return expected if expected and expected > 0 else self.default_expected_seconds
+
+    def _put(self, item):
+        priority = int(getattr(item, "priority", TaskPriority.NORMAL))
+        levels = self._queue.levels
+        if self.policy == SchedulingPolicy.FAIR:
+            level = levels.setdefault(
+                priority, _FairShare(self.fair_quantum_seconds)
+            )
+            level.push(item, getattr(item, "owner", None) or ANONYMOUS_OWNER)
+        else:
+            level = levels.setdefault(priority, [])
+            order = self._cost(item) if self.policy == SchedulingPolicy.SJF else 0
+            heapq.heappush(level, ((order, next(self._counter)), item))
+        self._queue.size += 1
+
+    def _get(self):
+        levels = self._queue.levels
+        priority = max(levels)
+        level = levels[priority]
+        if self.policy == SchedulingPolicy.FAIR:
+            item = level.pop(self._cost)
+        else:
+            item = heapq.heappop(level)[1]
+        if not level:
+            del levels[priority]
+        self._queue.size -= 1
+        return item
+
+    def remove(self, predicate: Callable[[Any], bool]) -> List[Any]:
+        """
+        条件に一致する待機中の要素を取り除く（キャンセル用）
+
+        Returns:
+            List[Any]: 取り除いた要素
+        """
+        removed: List[Any] = []
+        for priority, level in list(self._queue.levels.items()):
+            if isinstance(level, _FairShare):
+                for owner, items in list(level.owners.items()):
+                    kept = deque(item for item in items if not predicate(item))
+                    removed.extend(item for item in items if predicate(item))
+                    if kept:
+                        level.owners[owner] = kept
+                    else:
+                        del level.owners[owner]
+                        del level.deficits[owner]
+                        level._granted.discard(owner)
+            else:
+                removed.extend(item for _, item in level if predicate(item))
+                level[:] = [entry for entry in level if not predicate(entry[1])]
+                heapq.heapify(level)
+            if not level:
+                del self._queue.levels[priority]
+        self._queue.size -= len(removed)
+        for _ in removed:
+            # join() が待ち続けないよう、取り除いた分を処理済みにする
+            self.task_done()
+        return removed
+
+    def items(self) -> List[Any]:
+        """待機中の要素（取り出し順。公平分配は残高を考慮しない所有者の巡回順）"""
+        waiting: List[Any] = []
+        for priority in self._queue:
+            level = self._queue.levels[priority]
+            if isinstance(level, _FairShare):
+                rounds = itertools.zip_longest(*level.owners.values())
+                waiting.extend(
+                    item for items in rounds for item in items if item is not None
+                )
+            else:
+                waiting.extend(item for _, item in sorted(level))
+        return waiting
+
+    def get_stats(self) -> Dict[str, Any]:
+        """ポリシーと優先度ごとの待機数・待機中の所有者数"""
+        by_priority: Dict[str, int] = {}
+        owners = set()
+        for priority, level in self._queue.levels.items():
+            try:
+                name = TaskPriority(priority).name.lower()
+            except ValueError:
+                name = str(priority)
+            by_priority[name] = len(level)
+            if isinstance(level, _FairShare):
+                owners.update(level.owners)
+            else:
+                owners.update(
+                    getattr(item, "owner", None) or ANONYMOUS_OWNER for _, item in level
+                )
+        return {
+            "policy": self.policy.value,
+            "by_priority": by_priority,
+            "owners": len(owners),
+        }
+
+
+def parse_policy(value: Optional[str]) -> SchedulingPolicy:
+    """設定値からポリシーを取得（不正な値は fifo）"""
+    try:
+        return SchedulingPolicy(str(value).lower())
+    except ValueError:
+        logger.warning(f"不明なスケジューリングポリシー: {value} (fifoを使用)")
+        return SchedulingPolicy.FIFO
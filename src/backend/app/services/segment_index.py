@@ -0,0 +1,237 @@
+"""
+文字起こしセグメントのタイムスタンプ索引
+
+(文字オフセット, 開始秒, 終了秒) を配列で保持し、文字起こし内の位置から
+実際のメディア時刻を二分探索で求める。索引は小さなバイナリとして
+ストレージに保存する。
+"""
+import os
+import struct
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Iterable, Optional, Tuple
+
+from app.config import settings
+from app.utils.logger import get_logger
+
+if TYPE_CHECKING:
+    from app.models import TranscriptionSegment
+    from app.services.vad import OffsetMap
+
+logger = get_logger(__name__)
+
+# バイナリ形式: マジック + 件数 + char_offsets(uint32) + starts(float32) + ends(float32)
+_MAGIC = b"SIX1"
+_HEADER = struct.Struct("<4sI")
+
+# 文字起こし1秒あたりの推定文字数（索引がない場合のフォールバック）
+FALLBACK_CHARS_PER_SECOND = 10
+
+
+def format_timestamp(seconds: float) -> str:
+    """秒数を HH:MM:SS 形式に変換"""
+    total = max(0, int(seconds))
+    hours = total // 3600
+    minutes = (total % 3600) // 60
+    secs = total % 60
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+
+
+def _little_endian(values: array) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class SegmentIndex:
+    """文字オフセット順に並んだセグメントのタイムスタンプ索引"""
+
+    def __init__(
+        self,
+        char_offsets: Optional[array] = None,
+        starts: Optional[array] = None,
+        ends: Optional[array] = None,
+    ):
+        self.char_offsets = char_offsets if char_offsets is not None else array("I")
+        self.starts = starts if starts is not None else array("f")
+        self.ends = ends if ends is not None else array("f")
+
+    def __len__(self) -> int:
+        return len(self.char_offsets)
+
+    @classmethod
+    def from_segments(
+        cls,
+        transcript: str,
+        segments: Iterable["TranscriptionSegment"],
+        offset_map: Optional["OffsetMap"] = None,
+    ) -> "SegmentIndex":
+        """
+        文字起こし全文とセグメントから索引を作成
+
+        Args:
+            transcript: 文字起こし全文
+            segments: 時刻順のセグメント
+            offset_map: VADのオフセットマップ（元メディア時刻への変換用）
+
+        Returns:
+            SegmentIndex: 作成された索引
+        """
+        index = cls()
+        cursor = 0
+        for segment in segments:
+            text = segment.text.strip()
+            position = transcript.find(text, cursor) if text else -1
+            if position == -1:
+                # 整形等で一致しない場合は直前の位置に続くものとみなす
+                position = cursor
+            start, end = segment.start, segment.end
+            if offset_map is not None:
+                start = offset_map.to_original(start)
+                end = max(offset_map.to_original(end, end=True), start)
+
+            index.char_offsets.append(min(position, len(transcript)))
+            index.starts.append(start)
+            index.ends.append(end)
+            cursor = position + len(text)
+        return index
+
+    def lookup(self, char_position: int) -> Optional[Tuple[float, float]]:
+        """
+        文字位置を含むセグメントの時刻を取得（O(log n)）
+
+        Args:
+            char_position: 文字起こし内の文字インデックス
+
+        Returns:
+            Optional[Tuple[float, float]]: (開始秒, 終了秒)。索引が空の場合はNone
+        """
+        if not self.char_offsets:
+            return None
+        i = max(0, bisect_right(self.char_offsets, char_position) - 1)
+        return float(self.starts[i]), float(self.ends[i])
+
+    def to_bytes(self) -> bytes:
+        """バイナリにシリアライズ"""
+        return b"".join(
+            [
+                _HEADER.pack(_MAGIC, len(self)),
+                _little_endian(self.char_offsets),
+                _little_endian(self.starts),
+                _little_endian(self.ends),
+            ]
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SegmentIndex":
+        """バイナリから復元"""
+        magic, count = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("セグメント索引の形式が不正です")
+
+        index = cls()
+        offset = _HEADER.size
+        for values in (index.char_offsets, index.starts, index.ends):
+            size = count * values.itemsize
+            values.frombytes(data[offset : offset + size])
+            if sys.byteorder != "little":
+                values.byteswap()
+            offset += size
+        if len(index.ends) != count:
+            raise ValueError("セグメント索引のデータが不足しています")
+        return index
+
+
+def estimate_timestamp(
+    position: int, transcription: str, index: Optional[SegmentIndex] = None
+) -> str:
+    """
+    文字起こし内の位置からタイムスタンプを取得
+
+    索引があればセグメントの実時刻を、なければ文字数からの推定値を返す。
+
+    Args:
+        position: 文字起こし内の文字インデックス
+        transcription: 文字起こし全文
+        index: セグメント索引
+
+    Returns:
+        str: HH:MM:SS 形式のタイムスタンプ
+    """
+    if index is not None:
+        times = index.lookup(position)
+        if times is not None:
+            return format_timestamp(times[0])
+    return format_timestamp(position / FALLBACK_CHARS_PER_SECOND)
+
+
+class SegmentIndexStore:
+    """タスクごとのセグメント索引をファイルに保存・キャッシュ"""
+
+    def __init__(self, storage_dir: Optional[str] = None, cache_size: int = 64):
+        self.storage_dir = os.path.join(
+            storage_dir or settings.storage_dir, "segment_index"
+        )
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, SegmentIndex]" = OrderedDict()
+        # 引用照合はスレッドプールで並行して実行されるため、キャッシュはロックで守る
+        self._lock = threading.Lock()
+
+    def _path(self, task_id: str) -> str:
+        return os.path.join(self.storage_dir, f"{os.path.basename(task_id)}.bin")
+
+    def save(self, task_id: str, index: SegmentIndex) -> None:
+        """索引を保存"""
+        os.makedirs(self.storage_dir, exist_ok=True)
+        path = self._path(task_id)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(index.to_bytes())
+        os.replace(temp_path, path)
+        self._remember(task_id, index)
+        logger.info(f"セグメント索引を保存: {task_id} ({len(index)}セグメント)")
+
+    def get(self, task_id: Optional[str]) -> Optional[SegmentIndex]:
+        """索引を取得（存在しない場合はNone）"""
+        if not isinstance(task_id, str) or not task_id:
+            return None
+        with self._lock:
+            index = self._cache.get(task_id)
+            if index is not None:
+                self._cache.move_to_end(task_id)
+                return index
+
+        path = self._path(task_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                index = SegmentIndex.from_bytes(f.read())
+        except (OSError, ValueError, struct.error) as e:
+            logger.warning(f"セグメント索引の読み込みに失敗: {task_id} - {e}")
+            return None
+        self._remember(task_id, index)
+        return index
+
+    def delete(self, task_id: str) -> None:
+        """索引を削除"""
+        with self._lock:
+            self._cache.pop(task_id, None)
+        path = self._path(task_id)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def _remember(self, task_id: str, index: SegmentIndex) -> None:
+        with self._lock:
+            self._cache[task_id] = index
+            self._cache.move_to_end(task_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+# グローバルなセグメント索引ストア
+segment_index_store = SegmentIndexStore()
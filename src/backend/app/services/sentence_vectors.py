@@ -0,0 +1,267 @@
+"""
+文単位のベクトル検索（引用のセマンティック検索用）
+
+文字起こしを文に分割し、文字n-gramをハッシュトリックで固定次元に写像した
+float32行列（行: 文）を作成する。語句側はIDFで重み付けして合計1に正規化するため、
+行列との積は「語句の重みのうち文に含まれる割合」になる。短い語句と長い文の比較では
+コサイン類似度が文の長さに引きずられるため、この非対称なスコアを使う。
+全語句の順位付けは行列積1回で行い、行列はタスクごとにストレージへ保存して再利用する。
+"""
+import hashlib
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.config import settings
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 文の区切り（句点・感嘆符・疑問符・改行まで）
+_SENTENCE_PATTERN = re.compile(r"[^。！？!?\n]+[。！？!?]*")
+# 特徴量から除外する空白・記号
+_IGNORED_CHARS = re.compile(r"[\s、。，．,.！？!?「」『』（）()・:：;；\"'“”]+")
+
+# 使用する文字n-gramの長さ
+NGRAM_SIZES = (2, 3)
+
+
+def split_sentences(text: str) -> List[Tuple[int, int]]:
+    """
+    文の範囲を取得
+
+    Args:
+        text: 対象テキスト
+
+    Returns:
+        List[Tuple[int, int]]: 前後の空白を除いた各文の [start, end)
+    """
+    spans = []
+    for match in _SENTENCE_PATTERN.finditer(text):
+        start, end = match.span()
+        segment = match.group()
+        stripped = segment.strip()
+        if not stripped:
+            continue
+        start += len(segment) - len(segment.lstrip())
+        spans.append((start, start + len(stripped)))
+    return spans
+
+
+def hashed_ngrams(text: str, dim: int) -> np.ndarray:
+    """
+    文字n-gramを特徴量の次元番号に写像
+
+    Args:
+        text: 対象テキスト
+        dim: ベクトルの次元数
+
+    Returns:
+        np.ndarray: n-gramごとの次元番号
+    """
+    normalized = _IGNORED_CHARS.sub("", text.lower())
+    grams = [
+        normalized[i : i + n]
+        for n in NGRAM_SIZES
+        for i in range(len(normalized) - n + 1)
+    ]
+    if not grams and normalized:
+        grams = [normalized]
+    return np.fromiter(
+        (zlib.crc32(gram.encode("utf-8")) % dim for gram in grams),
+        dtype=np.int64,
+        count=len(grams),
+    )
+
+
+def _term_frequencies(texts: Sequence[str], dim: int) -> np.ndarray:
+    """対数スケールのTF行列（行: テキスト）"""
+    matrix = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        counts = np.bincount(hashed_ngrams(text, dim), minlength=dim)
+        nonzero = counts > 0
+        matrix[row, nonzero] = 1.0 + np.log(counts[nonzero])
+    return matrix
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """行ごとに合計1へ正規化"""
+    totals = matrix.sum(axis=1, keepdims=True)
+    totals[totals == 0] = 1.0
+    return matrix / totals
+
+
+class SentenceVectorIndex:
+    """文ごとのn-gram出現行列とIDF"""
+
+    def __init__(self, spans: np.ndarray, matrix: np.ndarray, idf: np.ndarray):
+        self.spans = spans
+        self.matrix = matrix
+        self.idf = idf
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    @property
+    def dim(self) -> int:
+        return int(self.idf.shape[0])
+
+    @classmethod
+    def build(cls, text: str, dim: int = 2048) -> "SentenceVectorIndex":
+        """
+        文字起こしからベクトル行列を作成
+
+        Args:
+            text: 文字起こし全文
+            dim: ベクトルの次元数（ハッシュの衝突とメモリ使用量のトレードオフ）
+
+        Returns:
+            SentenceVectorIndex: 作成したインデックス
+        """
+        spans = split_sentences(text)
+        tf = _term_frequencies([text[start:end] for start, end in spans], dim)
+
+        document_frequency = np.count_nonzero(tf, axis=0)
+        idf = (np.log((1 + len(spans)) / (1 + document_frequency)) + 1.0).astype(
+            np.float32
+        )
+        # 文側は出現の有無のみ（重みは語句側のTF-IDFで付ける）
+        matrix = (tf > 0).astype(np.float32)
+        return cls(np.asarray(spans, dtype=np.int32).reshape(-1, 2), matrix, idf)
+
+    def vectorize(self, phrases: Sequence[str]) -> np.ndarray:
+        """語句をTF-IDFで重み付けし合計1に正規化したベクトルに変換（行: 語句）"""
+        weights = _term_frequencies(phrases, self.dim) * self.idf
+        return _normalize_rows(weights).astype(np.float32)
+
+    def search(
+        self, phrases: Sequence[str], top_k: int = 3, threshold: float = 0.0
+    ) -> List[List[Tuple[int, int, float]]]:
+        """
+        語句ごとに類似する文を検索
+
+        Args:
+            phrases: 検索する語句
+            top_k: 語句ごとの最大件数
+            threshold: 採用する最小スコア（0〜1）
+
+        Returns:
+            List[List[Tuple[int, int, float]]]: 語句ごとの (開始位置, 終了位置, スコア)
+            をスコアの高い順に並べたリスト
+        """
+        if not len(self) or not phrases:
+            return [[] for _ in phrases]
+
+        # (文数 × 次元) @ (次元 × 語句数) の1回の積で全語句のスコアを算出
+        scores = self.matrix @ self.vectorize(phrases).T
+        k = min(max(top_k, 1), len(self))
+
+        results = []
+        for column in scores.T:
+            candidates = np.argpartition(-column, k - 1)[:k]
+            ranked = candidates[np.argsort(-column[candidates], kind="stable")]
+            results.append(
+                [
+                    (int(self.spans[i, 0]), int(self.spans[i, 1]), float(column[i]))
+                    for i in ranked
+                    if column[i] >= threshold
+                ]
+            )
+        return results
+
+
+class SentenceVectorStore:
+    """タスクごとのベクトル行列をファイルに保存・キャッシュ"""
+
+    def __init__(self, storage_dir: Optional[str] = None, cache_size: int = 8):
+        self.storage_dir = os.path.join(
+            storage_dir or settings.storage_dir, "sentence_vectors"
+        )
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, SentenceVectorIndex]" = OrderedDict()
+        # 引用照合はスレッドプールで並行して実行されるため、キャッシュはロックで守る
+        self._lock = threading.Lock()
+
+    def _path(self, task_id: str) -> str:
+        return os.path.join(self.storage_dir, f"{os.path.basename(task_id)}.npz")
+
+    def get(
+        self, text: str, task_id: Optional[str] = None, dim: Optional[int] = None
+    ) -> SentenceVectorIndex:
+        """
+        文字起こしのベクトル行列を取得（未作成の場合は作成して保存）
+
+        Args:
+            text: 文字起こし全文
+            task_id: タスクID（指定時はディスクに保存して再利用）
+            dim: ベクトルの次元数（省略時は設定値）
+
+        Returns:
+            SentenceVectorIndex: ベクトル行列
+        """
+        dim = dim or settings.citation_vector_dim
+        digest = hashlib.sha1(f"{dim}:{text}".encode("utf-8")).hexdigest()
+        with self._lock:
+            index = self._cache.get(digest)
+            if index is not None:
+                self._cache.move_to_end(digest)
+                return index
+
+        has_task = isinstance(task_id, str) and bool(task_id)
+        index = self._load(task_id, digest) if has_task else None
+        if index is None:
+            index = SentenceVectorIndex.build(text, dim)
+            if has_task:
+                self._save(task_id, digest, index)
+
+        with self._lock:
+            self._cache[digest] = index
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return index
+
+    def _load(self, task_id: str, digest: str) -> Optional[SentenceVectorIndex]:
+        path = self._path(task_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                if str(data["digest"]) != digest:
+                    # 文字起こしが変わった場合は作り直す
+                    return None
+                return SentenceVectorIndex(data["spans"], data["matrix"], data["idf"])
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"文ベクトルの読み込みに失敗: {task_id} - {e}")
+            return None
+
+    def _save(self, task_id: str, digest: str, index: SentenceVectorIndex) -> None:
+        try:
+            os.makedirs(self.storage_dir, exist_ok=True)
+            path = self._path(task_id)
+            temp_path = f"{path}.tmp.npz"
+            np.savez(
+                temp_path,
+                digest=np.array(digest),
+                spans=index.spans,
+                matrix=index.matrix,
+                idf=index.idf,
+            )
+            os.replace(temp_path, path)
+            logger.info(f"文ベクトルを保存: {task_id} ({len(index)}文, {index.dim}次元)")
+        except OSError as e:
+            logger.warning(f"文ベクトルの保存に失敗: {task_id} - {e}")
+
+    def delete(self, task_id: str) -> None:
+        """保存済みのベクトル行列を削除"""
+        path = self._path(task_id)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# グローバルな文ベクトルストア
+sentence_vector_store = SentenceVectorStore()
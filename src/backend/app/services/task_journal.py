@@ -0,0 +1,479 @@
+"""
+パイプラインタスクの永続ジャーナル（SQLite WAL）
+
+キュー上のタスクはメモリ上にしかないため、デプロイやクラッシュで失われると
+MinutesTask が queued/processing のまま残ってしまう。処理中のタスクごとに
+「現在のステージ・ステージ間で引き継ぐ値・リース」を SQLite に記録し、
+起動時に未完了のタスクを再投入する。
+
+同じホストで storage を共有する複数のレプリカ（プロセス）は、このジャーナルを
+共有キューとして使う。SQLite WAL は共有メモリでロックを調整するため、
+ホスト間・ネットワークファイルシステム上での共有には対応しない。
+
+- 待機中のタスクは、空きワーカーのあるレプリカが claim() でリース付きで取得する
+  （BEGIN IMMEDIATE による排他で、同じタスクを複数のレプリカが取得することはない）
+- 取得したタスクのリース（期限付きの実行権）は renew_leases() で定期的に延長する
+- 期限切れのリースはレプリカが停止したとみなして待機状態に戻し、他のレプリカが引き継ぐ
+- キャンセルは行を cancelled にして通知し、リースを持つレプリカが中断して行を削除する
+- 最後のステージが終わる（または失敗する）と行を削除する
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.scheduler import QueuePosition
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+CANCELLED = "cancelled"
+
+# 予想処理時間（不明・0の場合は既定値）
+_EXPECTED_SECONDS = (
+    "COALESCE(NULLIF(json_extract(schedule, '$.expected_seconds'), 0), ?)"
+)
+_PRIORITY = "COALESCE(json_extract(schedule, '$.priority'), 0)"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pipeline_jobs (
+    task_id TEXT PRIMARY KEY,
+    stage INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    context TEXT NOT NULL,
+    schedule TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    heartbeat_at REAL,
+    updated_at REAL NOT NULL,
+    enqueued_at REAL
+)
+"""
+
+
+@dataclass
+class JournalEntry:
+    """ジャーナルに記録された未完了のタスク"""
+
+    task_id: str
+    stage: int
+    state: str
+    context: Dict[str, Any] = field(default_factory=dict)
+    schedule: Dict[str, Any] = field(default_factory=dict)
+    attempts: int = 0
+    lease_owner: Optional[str] = None
+    lease_expires: Optional[float] = None
+
+
+class TaskJournal:
+    """パイプラインタスクの永続ジャーナル"""
+
+    def __init__(
+        self, path: str, lease_seconds: float = 60.0, busy_timeout: float = 2.0
+    ):
+        """
+        Args:
+            path: SQLiteファイルのパス
+            lease_seconds: リースの有効期限（秒）
+            busy_timeout: 他のプロセスの書き込みを待つ上限（秒、超えたら例外）
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        # このプロセスのワーカーを識別するリース所有者ID
+        self.owner_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._read_lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(
+            path, timeout=busy_timeout, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+        columns = self._conn.execute("PRAGMA table_info(pipeline_jobs)").fetchall()
+        if "enqueued_at" not in [column[1] for column in columns]:
+            # 以前のバージョンで作成したジャーナル
+            self._conn.execute(
+                "ALTER TABLE pipeline_jobs ADD COLUMN enqueued_at REAL"
+            )
+        # 状況の取得用の接続（WALのため、書き込み・ロック待ちの間も読み取れる）
+        self._reader = sqlite3.connect(
+            path, timeout=busy_timeout, check_same_thread=False, isolation_level=None
+        )
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def _query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        with self._read_lock:
+            return self._reader.execute(sql, params).fetchall()
+
+    def enqueue(
+        self,
+        task_id: str,
+        stage: int,
+        context: Dict[str, Any],
+        schedule: Dict[str, Any],
+    ) -> None:
+        """
+        ステージの待機状態として記録
+
+        既存の記録は上書きする（試行回数・待機順の登録時刻はステージごと）。
+        キャンセル済みの記録は上書きしない（次のステージに進めない）。
+        """
+        now = time.time()
+        self._execute(
+            "INSERT INTO pipeline_jobs (task_id, stage, state, context, schedule, "
+            "attempts, updated_at, enqueued_at) VALUES (?, ?, ?, ?, ?, 0, ?, ?) "
+            "ON CONFLICT(task_id) DO UPDATE SET stage = excluded.stage, "
+            "state = excluded.state, context = excluded.context, "
+            "schedule = excluded.schedule, attempts = CASE WHEN "
+            "pipeline_jobs.stage = excluded.stage THEN pipeline_jobs.attempts "
+            "ELSE 0 END, enqueued_at = CASE WHEN pipeline_jobs.stage = "
+            "excluded.stage THEN COALESCE(pipeline_jobs.enqueued_at, "
+            "pipeline_jobs.updated_at) ELSE excluded.enqueued_at END, "
+            "lease_owner = NULL, lease_expires = NULL, "
+            "heartbeat_at = NULL, updated_at = excluded.updated_at "
+            "WHERE pipeline_jobs.state != ?",
+            (
+                task_id,
+                stage,
+                QUEUED,
+                json.dumps(context, ensure_ascii=False),
+                json.dumps(schedule, ensure_ascii=False),
+                now,
+                now,
+                CANCELLED,
+            ),
+        )
+
+    def acquire(self, task_id: str, stage: int) -> bool:
+        """
+        ステージの実行リースを取得
+
+        Returns:
+            bool: 取得できたか（他のレプリカが有効なリースを持つ場合などはFalse）
+        """
+        now = time.time()
+        cursor = self._execute(
+            "UPDATE pipeline_jobs SET state = ?, attempts = attempts + 1, "
+            "lease_owner = ?, lease_expires = ?, heartbeat_at = ?, updated_at = ? "
+            "WHERE task_id = ? AND stage = ? AND state != ? AND (lease_owner IS NULL "
+            "OR lease_expires < ? OR (state = ? AND lease_owner = ?))",
+            (
+                RUNNING,
+                self.owner_id,
+                now + self.lease_seconds,
+                now,
+                now,
+                task_id,
+                stage,
+                CANCELLED,
+                now,
+                QUEUED,
+                self.owner_id,
+            ),
+        )
+        return cursor.rowcount == 1
+
+    def claim(
+        self,
+        stage: int,
+        limit: int,
+        policy: str = "fifo",
+        default_expected_seconds: float = 600.0,
+    ) -> List[JournalEntry]:
+        """
+        リースを持たない待機中のタスクを最大 limit 件取得
+
+        優先度の高い順に、同じ優先度の中ではポリシーに従って選ぶ。
+
+        - fifo: 登録順
+        - fair: 処理中（リース中）のタスクが少ない所有者を優先
+        - sjf: 予想処理時間の短い順
+
+        Returns:
+            List[JournalEntry]: このレプリカが取得したタスク
+        """
+        if limit <= 0:
+            return []
+        order = ["json_extract(j.schedule, '$.priority') DESC"]
+        params: list = [QUEUED, stage]
+        if policy == "fair":
+            order.append(
+                "(SELECT COUNT(*) FROM pipeline_jobs AS a "
+                "WHERE a.lease_owner IS NOT NULL AND json_extract(a.schedule, "
+                "'$.owner') IS json_extract(j.schedule, '$.owner'))"
+            )
+        elif policy == "sjf":
+            order.append(
+                "COALESCE(json_extract(j.schedule, '$.expected_seconds'), ?)"
+            )
+            params.append(default_expected_seconds)
+        # 期限切れで回収したタスクも元の登録順を保つ
+        order.append("COALESCE(j.enqueued_at, j.updated_at)")
+        params.append(limit)
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT j.task_id, j.stage, j.state, j.context, j.schedule, "
+                    "j.attempts, j.lease_owner, j.lease_expires "
+                    "FROM pipeline_jobs AS j "
+                    "WHERE j.state = ? AND j.stage = ? AND j.lease_owner IS NULL "
+                    f"ORDER BY {', '.join(order)} LIMIT ?",
+                    params,
+                ).fetchall()
+                entries = [self._to_entry(row) for row in rows]
+                self._conn.executemany(
+                    "UPDATE pipeline_jobs SET lease_owner = ?, lease_expires = ? "
+                    "WHERE task_id = ?",
+                    [
+                        (self.owner_id, now + self.lease_seconds, entry.task_id)
+                        for entry in entries
+                    ],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        for entry in entries:
+            entry.lease_owner = self.owner_id
+            entry.lease_expires = now + self.lease_seconds
+        return entries
+
+    def renew_leases(self) -> int:
+        """このレプリカが持つリース（待機中・実行中）の期限を延長"""
+        now = time.time()
+        cursor = self._execute(
+            "UPDATE pipeline_jobs SET lease_expires = ?, heartbeat_at = ? "
+            "WHERE lease_owner = ?",
+            (now + self.lease_seconds, now, self.owner_id),
+        )
+        return cursor.rowcount
+
+    def finish(self, task_id: str) -> bool:
+        """パイプラインの完了・失敗時に記録を削除（削除できたか）"""
+        cursor = self._execute(
+            "DELETE FROM pipeline_jobs WHERE task_id = ?", (task_id,)
+        )
+        return cursor.rowcount == 1
+
+    def request_cancel(self, task_id: str) -> bool:
+        """キャンセルを記録（記録がない場合はFalse）"""
+        cursor = self._execute(
+            "UPDATE pipeline_jobs SET state = ?, updated_at = ? WHERE task_id = ?",
+            (CANCELLED, time.time(), task_id),
+        )
+        return cursor.rowcount == 1
+
+    def cancelled_entries(self) -> List[JournalEntry]:
+        """
+        このレプリカが中断・削除すべきキャンセル済みのタスク
+
+        このレプリカがリースを持つもの、リースがない（期限切れを含む）もの。
+        """
+        with self._lock:
+            return self._select(
+                "state = ? AND (lease_owner IS NULL OR lease_owner = ? "
+                "OR lease_expires < ?)",
+                (CANCELLED, self.owner_id, time.time()),
+            )
+
+    def _select(self, where: str, params: tuple) -> List[JournalEntry]:
+        rows = self._conn.execute(
+            "SELECT task_id, stage, state, context, schedule, attempts, "
+            f"lease_owner, lease_expires FROM pipeline_jobs WHERE {where} "
+            "ORDER BY COALESCE(enqueued_at, updated_at)",
+            params,
+        ).fetchall()
+        return [self._to_entry(row) for row in rows]
+
+    def reclaim_expired(self) -> List[JournalEntry]:
+        """
+        期限切れのリースを解放して待機状態に戻す（他のレプリカが取得できるようにする）
+
+        Returns:
+            List[JournalEntry]: 待機状態に戻したタスク
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                expired = self._select(
+                    "state != ? AND lease_owner IS NOT NULL "
+                    "AND (lease_expires IS NULL OR lease_expires < ?)",
+                    (CANCELLED, now),
+                )
+                self._conn.executemany(
+                    "UPDATE pipeline_jobs SET state = ?, lease_owner = NULL, "
+                    "lease_expires = NULL, updated_at = ? WHERE task_id = ?",
+                    [(QUEUED, now, entry.task_id) for entry in expired],
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        for entry in expired:
+            entry.state = QUEUED
+            logger.warning(
+                f"期限切れのリースを回収: {entry.task_id} "
+                f"(所有者: {entry.lease_owner}, ステージ: {entry.stage})"
+            )
+        return expired
+
+    def release_owned(self) -> int:
+        """
+        このレプリカが持つリースを解放（正常停止時、他のレプリカがすぐに取得できる）
+
+        停止処理で中断した実行中のタスクは異常終了ではないため、試行回数を戻す。
+        """
+        cursor = self._execute(
+            "UPDATE pipeline_jobs SET attempts = CASE WHEN state = ? "
+            "THEN MAX(attempts - 1, 0) ELSE attempts END, "
+            "state = CASE WHEN state = ? THEN state ELSE ? END, "
+            "lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+            "WHERE lease_owner = ?",
+            (RUNNING, CANCELLED, QUEUED, time.time(), self.owner_id),
+        )
+        return cursor.rowcount
+
+    def get_stats(self) -> Dict[str, int]:
+        """待機中（未取得・取得済み）と実行中のタスク数"""
+        (row,) = self._query(
+            "SELECT "
+            "COALESCE(SUM(state = ? AND lease_owner IS NULL), 0), "
+            "COALESCE(SUM(state = ? AND lease_owner IS NOT NULL), 0), "
+            "COALESCE(SUM(state = ?), 0) FROM pipeline_jobs",
+            (QUEUED, QUEUED, RUNNING),
+        )
+        return {"unclaimed": row[0], "claimed": row[1], "running": row[2]}
+
+    def backlog(self, stage: int) -> Tuple[int, float]:
+        """
+        ステージの未取得タスク（どのレプリカも取得していない待機中）の状況
+
+        Returns:
+            Tuple[int, float]: (件数, 最も古いタスクの待ち時間（秒）)
+        """
+        ((count, oldest),) = self._query(
+            "SELECT COUNT(*), MIN(COALESCE(enqueued_at, updated_at)) "
+            "FROM pipeline_jobs WHERE state = ? AND stage = ? AND lease_owner IS NULL",
+            (QUEUED, stage),
+        )
+        return count, max(time.time() - oldest, 0.0) if oldest is not None else 0.0
+
+    def stage_load(
+        self, default_expected_seconds: float = 600.0
+    ) -> Dict[int, Tuple[int, float]]:
+        """
+        ステージごとの待機・実行中のタスク（全レプリカ分）
+
+        Returns:
+            Dict[int, Tuple[int, float]]: ステージ → (件数, 予想処理時間の合計（秒）)
+        """
+        rows = self._query(
+            f"SELECT stage, COUNT(*), SUM({_EXPECTED_SECONDS}) "
+            "FROM pipeline_jobs WHERE state != ? GROUP BY stage",
+            (default_expected_seconds, CANCELLED),
+        )
+        return {stage: (count, float(total or 0.0)) for stage, count, total in rows}
+
+    def locate(
+        self, task_id: str, default_expected_seconds: float = 600.0
+    ) -> Optional[QueuePosition]:
+        """
+        タスクのステージ内での位置（全レプリカ分）
+
+        待機中のタスクの順番は優先度・登録順で数える（公平分配・SJFは考慮しない）。
+
+        Returns:
+            Optional[QueuePosition]: 記録がない・キャンセル済みの場合はNone
+        """
+        now = time.time()
+        with self._read_lock:
+            row = self._reader.execute(
+                f"SELECT stage, state, {_EXPECTED_SECONDS}, {_PRIORITY}, updated_at, "
+                "COALESCE(enqueued_at, updated_at) FROM pipeline_jobs "
+                "WHERE task_id = ?",
+                (default_expected_seconds, task_id),
+            ).fetchone()
+            if row is None or row[1] == CANCELLED:
+                return None
+            stage, state, expected, priority, updated_at, enqueued_at = row
+            running = self._reader.execute(
+                f"SELECT {_EXPECTED_SECONDS}, ? - updated_at FROM pipeline_jobs "
+                "WHERE stage = ? AND state = ? AND task_id != ?",
+                (default_expected_seconds, now, stage, RUNNING, task_id),
+            ).fetchall()
+            ahead, ahead_seconds = 0, 0.0
+            if state == QUEUED:
+                ahead, ahead_seconds = self._reader.execute(
+                    f"SELECT COUNT(*), SUM({_EXPECTED_SECONDS}) FROM pipeline_jobs "
+                    f"WHERE stage = ? AND state = ? AND task_id != ? AND "
+                    f"({_PRIORITY} > ? OR ({_PRIORITY} = ? AND "
+                    "COALESCE(enqueued_at, updated_at) <= ?))",
+                    (
+                        default_expected_seconds,
+                        stage,
+                        QUEUED,
+                        task_id,
+                        priority,
+                        priority,
+                        enqueued_at,
+                    ),
+                ).fetchone()
+        return QueuePosition(
+            stage=stage,
+            expected_seconds=float(expected),
+            elapsed_seconds=max(now - updated_at, 0.0) if state == RUNNING else None,
+            ahead=ahead,
+            ahead_seconds=float(ahead_seconds or 0.0),
+            running=[(float(e), max(float(el), 0.0)) for e, el in running],
+        )
+
+    def get(self, task_id: str) -> Optional[JournalEntry]:
+        """タスクの記録を取得"""
+        rows = self._query(
+            "SELECT task_id, stage, state, context, schedule, attempts, "
+            "lease_owner, lease_expires FROM pipeline_jobs WHERE task_id = ?",
+            (task_id,),
+        )
+        return self._to_entry(rows[0]) if rows else None
+
+    def task_ids(self) -> List[str]:
+        """記録されている全タスクID"""
+        return [row[0] for row in self._query("SELECT task_id FROM pipeline_jobs")]
+
+    @staticmethod
+    def _to_entry(row: tuple) -> JournalEntry:
+        return JournalEntry(
+            task_id=row[0],
+            stage=row[1],
+            state=row[2],
+            context=json.loads(row[3]),
+            schedule=json.loads(row[4]),
+            attempts=row[5],
+            lease_owner=row[6],
+            lease_expires=row[7],
+        )
+
+    def close(self) -> None:
+        """接続を閉じる"""
+        with self._lock:
+            self._conn.close()
+        with self._read_lock:
+            self._reader.close()
@@ -1,9 +1,26 @@
 import asyncio
+import functools
+import itertools
+import math
+import os
+import time
 import uuid
+from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 
+from app.services.autoscaler import WorkerAutoscaler
+from app.services.compute_pool import compute_pool
+from app.services.scheduler import (
+    QueuePosition,
+    SchedulingPolicy,
+    SchedulingQueue,
+    TaskPriority,
+    parse_policy,
+)
+from app.services.task_journal import JournalEntry, TaskJournal
+from app.services.throughput_model import ThroughputModel
 from app.utils.logger import LoggerMixin
 
 
@@ -14,6 +31,25 @@ class TaskQueueStatus(str, Enum):
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+# 実行の中断理由（on_abort に渡す）
+ABORT_CANCELLED = "cancelled"
+ABORT_TIMEOUT = "timeout"
+ABORT_SHUTDOWN = "shutdown"  # ジャーナルなしで停止し、次のステージに進めない
+
+# 中断したタスクの後処理（子プロセスの停止など）を待つ上限（秒）
+ABORT_GRACE_SECONDS = 5.0
+
+# 中断時の後処理: (中断理由) -> None
+AbortFunc = Callable[[str], Awaitable[None]]
+# キューの外で待機しているタスクの (件数, 最長の待ち時間（秒）)
+BacklogProbe = Callable[[], Tuple[int, float]]
+
+
+class QueueDrainingError(RuntimeError):
+    """停止処理中のキューにタスクを追加しようとした"""
 
 
 class QueuedTask:
@@ -31,21 +67,69 @@ class QueuedTask:
         self.completed_at: Optional[datetime] = None
         self.error: Optional[str] = None
         self.result: Any = None
+        # スケジューリング情報（優先度・所有者・予想処理時間（秒））
+        self.priority: int = TaskPriority.NORMAL
+        self.owner: Optional[str] = None
+        self.expected_seconds: Optional[float] = None
+        # 実行時間の上限（秒）と、キャンセル・タイムアウト時の後処理
+        self.timeout: Optional[float] = None
+        self.on_abort: Optional[AbortFunc] = None
+        self.abort_reason: Optional[str] = None
+        self.runner: Optional[asyncio.Future] = None
 
 
 class AsyncTaskQueue(LoggerMixin):
     """非同期タスクキュー"""
 
-    def __init__(self, max_concurrent_tasks: int = 3):
+    def __init__(
+        self,
+        max_concurrent_tasks: int = 3,
+        name: str = "worker",
+        policy: SchedulingPolicy = SchedulingPolicy.FIFO,
+        fair_quantum_seconds: float = 600.0,
+        default_expected_seconds: float = 600.0,
+        task_timeout: Optional[float] = None,
+    ):
         self.max_concurrent_tasks = max_concurrent_tasks
-        self.queue: asyncio.Queue = asyncio.Queue()
+        self.name = name
+        # タスクごとの実行時間の上限（秒、Noneは無制限）
+        self.task_timeout = task_timeout
+        self.queue: SchedulingQueue = SchedulingQueue(
+            policy, fair_quantum_seconds, default_expected_seconds
+        )
         self.running_tasks: Dict[str, QueuedTask] = {}
         self.completed_tasks: Dict[str, QueuedTask] = {}
         self.workers: list = []
         self._shutdown = False
+        # 停止処理中（新しいタスクを取り出さず、実行中のタスクの完了を待つ）
+        self._draining = False
+        self._worker_ids = itertools.count()
+        # ワーカー数の自動調整（enable_autoscaling で有効化）
+        self.autoscaler: Optional[WorkerAutoscaler] = None
+        self.backlog_probe: Optional[BacklogProbe] = None
+        self._autoscale_task: Optional[asyncio.Task] = None
+        self._retiring = 0
+        self._recent_waits: List[float] = []
 
         self.logger.info(f"AsyncTaskQueue初期化: 最大同時実行数={max_concurrent_tasks}")
 
+    def enable_autoscaling(
+        self,
+        autoscaler: WorkerAutoscaler,
+        backlog_probe: Optional[BacklogProbe] = None,
+    ) -> None:
+        """
+        ワーカー数の自動調整を有効化（start_workers の前に呼ぶ）
+
+        Args:
+            autoscaler: ワーカー数を決めるオートスケーラー
+            backlog_probe: キューの外で待機しているタスクの (件数, 最長の待ち時間)
+                を返す関数（共有ジャーナルの未取得タスクなど）
+        """
+        self.autoscaler = autoscaler
+        self.backlog_probe = backlog_probe
+        self.max_concurrent_tasks = autoscaler.clamp(self.max_concurrent_tasks)
+
     async def start_workers(self):
         """ワーカータスクを開始"""
         if self.workers:
@@ -53,16 +137,28 @@ class AsyncTaskQueue(LoggerMixin):
             return
 
         self.logger.info(f"{self.max_concurrent_tasks}個のワーカーを開始")
+        self._draining = False
+        self._retiring = 0
 
-        for i in range(self.max_concurrent_tasks):
-            worker = asyncio.create_task(self._worker(f"worker-{i}"))
-            self.workers.append(worker)
+        for _ in range(self.max_concurrent_tasks):
+            self._spawn_worker()
+        if self.autoscaler is not None:
+            self._autoscale_task = asyncio.create_task(self._autoscale_loop())
+
+    def _spawn_worker(self) -> None:
+        worker_name = f"{self.name}-{next(self._worker_ids)}"
+        self.workers.append(asyncio.create_task(self._worker(worker_name)))
 
     async def stop_workers(self):
         """ワーカータスクを停止"""
         self.logger.info("ワーカー停止開始")
         self._shutdown = True
 
+        if self._autoscale_task is not None:
+            self._autoscale_task.cancel()
+            await asyncio.gather(self._autoscale_task, return_exceptions=True)
+            self._autoscale_task = None
+
         # 実行中のタスクを待機
         for task_id, task in self.running_tasks.items():
             self.logger.info(f"実行中タスクの完了を待機: {task_id}")
@@ -79,14 +175,78 @@ class AsyncTaskQueue(LoggerMixin):
         self.workers.clear()
         self.logger.info("ワーカー停止完了")
 
-    async def add_task(self, task_id: str, func: Callable, *args, **kwargs) -> str:
-        """タスクをキューに追加"""
+    async def drain(self, grace_seconds: float) -> List[QueuedTask]:
+        """
+        新しいタスクの取り出しをやめ、実行中のタスクの完了を待ってからワーカーを停止
+
+        Args:
+            grace_seconds: 実行中のタスクを待つ上限（秒）。超えたタスクはキャンセルする
+
+        Returns:
+            List[QueuedTask]: 期限内に終わらずキャンセルしたタスク
+        """
+        self._draining = True
+        runners = {
+            queued_task.runner: queued_task
+            for queued_task in self.running_tasks.values()
+            if queued_task.runner is not None
+        }
+        if runners:
+            self.logger.info(
+                f"実行中タスクの完了を待機: {len(runners)}件 (最大{grace_seconds}秒)"
+            )
+            _, pending = await asyncio.wait(runners, timeout=grace_seconds)
+        else:
+            pending = set()
+
+        interrupted = [runners[runner] for runner in pending]
+        for queued_task in interrupted:
+            self.logger.warning(f"停止期限を超えたため中断: {queued_task.task_id}")
+        await self.stop_workers()
+        return interrupted
+
+    async def add_task(
+        self,
+        task_id: str,
+        func: Callable,
+        *args,
+        priority: int = TaskPriority.NORMAL,
+        owner: Optional[str] = None,
+        expected_seconds: Optional[float] = None,
+        timeout: Optional[float] = None,
+        on_abort: Optional[AbortFunc] = None,
+        **kwargs,
+    ) -> str:
+        """
+        タスクをキューに追加
+
+        Args:
+            task_id: タスクID
+            func: 実行する関数（残りの位置引数・キーワード引数を渡す）
+            priority: 優先度（大きいほど先に処理）
+            owner: 公平分配の単位（セッションIDまたはAPIキー）
+            expected_seconds: 予想処理時間の目安（メディアの長さ、秒）
+            timeout: 実行時間の上限（秒、省略時はキューの task_timeout）
+            on_abort: キャンセル・タイムアウトで中断したときの後処理
+
+        Returns:
+            str: キューID
+        """
+        if self._draining:
+            raise QueueDrainingError(f"キューは停止処理中です: {self.name}")
+
         queued_task = QueuedTask(task_id, func, *args, **kwargs)
+        queued_task.priority = int(priority)
+        queued_task.owner = owner
+        queued_task.expected_seconds = expected_seconds
+        queued_task.timeout = timeout if timeout is not None else self.task_timeout
+        queued_task.on_abort = on_abort
 
         await self.queue.put(queued_task)
 
         self.logger.info(
-            f"タスクをキューに追加: {task_id} (キューID: {queued_task.id})"
+            f"タスクをキューに追加: {task_id} (キューID: {queued_task.id}, "
+            f"優先度: {queued_task.priority})"
         )
 
         return queued_task.id
@@ -95,7 +255,12 @@ class AsyncTaskQueue(LoggerMixin):
         """ワーカータスク"""
         self.logger.info(f"ワーカー開始: {worker_name}")
 
-        while not self._shutdown:
+        while not self._shutdown and not self._draining:
+            if self._retiring > 0:
+                # オートスケーラーによる縮小（実行中のタスクを終えてから抜ける）
+                self._retiring -= 1
+                self.workers.remove(asyncio.current_task())
+                break
             try:
                 # タスクを取得（タイムアウト付き）
                 try:
@@ -103,6 +268,12 @@ class AsyncTaskQueue(LoggerMixin):
                 except asyncio.TimeoutError:
                     continue
 
+                if self._draining:
+                    # 停止処理の開始と同時に取り出したタスクはキューに戻す
+                    self.queue.put_nowait(queued_task)
+                    self.queue.task_done()
+                    break
+
                 # タスクを実行
                 await self._execute_task(worker_name, queued_task)
 
@@ -130,19 +301,34 @@ class AsyncTaskQueue(LoggerMixin):
             queued_task.status = TaskQueueStatus.RUNNING
             queued_task.started_at = datetime.now()
             self.running_tasks[queue_id] = queued_task
+            if self.autoscaler is not None:
+                self._recent_waits.append(
+                    (queued_task.started_at - queued_task.created_at).total_seconds()
+                )
 
             self.logger.info(f"タスク実行開始: {task_id} (ワーカー: {worker_name})")
 
-            # 関数を実行
-            if asyncio.iscoroutinefunction(queued_task.func):
-                result = await queued_task.func(*queued_task.args, **queued_task.kwargs)
-            else:
-                # 同期関数の場合は別スレッドで実行
-                loop = asyncio.get_event_loop()
-                result = await loop.run_in_executor(
-                    None,
-                    lambda: queued_task.func(*queued_task.args, **queued_task.kwargs),
-                )
+            # 関数を別タスクで実行し、期限切れ・キャンセル時はワーカーを待たせずに中断する
+            runner = asyncio.ensure_future(self._call(queued_task))
+            queued_task.runner = runner
+            try:
+                done, _ = await asyncio.wait({runner}, timeout=queued_task.timeout)
+            except asyncio.CancelledError:
+                # ワーカー停止
+                runner.cancel()
+                await asyncio.wait({runner}, timeout=ABORT_GRACE_SECONDS)
+                raise
+
+            if not done:
+                queued_task.abort_reason = ABORT_TIMEOUT
+                runner.cancel()
+            elif runner.cancelled() and not queued_task.abort_reason:
+                queued_task.abort_reason = ABORT_CANCELLED
+            if queued_task.abort_reason:
+                await self._abort(queued_task)
+                return
+
+            result = runner.result()
 
             # 成功
             queued_task.status = TaskQueueStatus.COMPLETED
@@ -173,15 +359,129 @@ class AsyncTaskQueue(LoggerMixin):
             if queue_id in self.running_tasks:
                 del self.running_tasks[queue_id]
 
-            self.completed_tasks[queue_id] = queued_task
+            self._record_completed(queued_task)
+
+    async def _call(self, queued_task: QueuedTask) -> Any:
+        if asyncio.iscoroutinefunction(queued_task.func):
+            return await queued_task.func(*queued_task.args, **queued_task.kwargs)
+        # 同期関数の場合は計算用プールのスレッドで実行
+        return await compute_pool.run_in_thread(
+            queued_task.func, *queued_task.args, **queued_task.kwargs
+        )
+
+    async def _abort(self, queued_task: QueuedTask) -> None:
+        """キャンセル・タイムアウトしたタスクを中断済みにして後処理を実行"""
+        runner = queued_task.runner
+        if runner is not None and not runner.done():
+            # ffmpegの停止などキャンセル時の後処理を待つ（上限を超えたらスロットを解放）
+            await asyncio.wait({runner}, timeout=ABORT_GRACE_SECONDS)
+
+        queued_task.completed_at = datetime.now()
+        if queued_task.abort_reason == ABORT_TIMEOUT:
+            queued_task.status = TaskQueueStatus.FAILED
+            queued_task.error = f"実行時間の上限（{queued_task.timeout:.0f}秒）を超えました"
+            self.logger.error(f"タスクがタイムアウトしました: {queued_task.task_id}")
+        else:
+            queued_task.status = TaskQueueStatus.CANCELLED
+            queued_task.error = "キャンセルされました"
+            self.logger.info(f"タスクをキャンセルしました: {queued_task.task_id}")
 
-            # 完了したタスクの履歴を制限（最新100件のみ保持）
-            if len(self.completed_tasks) > 100:
-                oldest_tasks = sorted(
-                    self.completed_tasks.values(), key=lambda t: t.completed_at
+        if queued_task.on_abort is not None:
+            try:
+                await queued_task.on_abort(queued_task.abort_reason)
+            except Exception as e:
+                self.logger.error(
+                    f"中断後の処理エラー: {queued_task.task_id} - {e}", exc_info=True
                 )
-                for old_task in oldest_tasks[:-100]:
-                    del self.completed_tasks[old_task.id]
+
+    def _record_completed(self, queued_task: QueuedTask) -> None:
+        self.completed_tasks[queued_task.id] = queued_task
+
+        # 完了したタスクの履歴を制限（最新100件のみ保持）
+        if len(self.completed_tasks) > 100:
+            oldest_tasks = sorted(
+                self.completed_tasks.values(), key=lambda t: t.completed_at
+            )
+            for old_task in oldest_tasks[:-100]:
+                del self.completed_tasks[old_task.id]
+
+    async def cancel_task(self, task_id: str) -> bool:
+        """
+        タスクIDに一致する待機中・実行中のタスクをキャンセル
+
+        待機中のタスクはキューから取り除き、実行中のタスクは中断する
+        （ワーカーのスロットはすぐに解放される）。
+
+        Returns:
+            bool: キャンセルしたタスクがあったか
+        """
+        pending = self.queue.remove(lambda queued: queued.task_id == task_id)
+        for queued_task in pending:
+            queued_task.abort_reason = ABORT_CANCELLED
+            await self._abort(queued_task)
+            self._record_completed(queued_task)
+
+        running = [
+            queued_task
+            for queued_task in self.running_tasks.values()
+            if queued_task.task_id == task_id
+            and queued_task.runner is not None
+            and not queued_task.runner.done()
+        ]
+        for queued_task in running:
+            queued_task.abort_reason = ABORT_CANCELLED
+            queued_task.runner.cancel()
+        return bool(pending or running)
+
+    async def _autoscale_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.autoscaler.interval_seconds)
+            try:
+                self.autoscale()
+            except Exception as e:
+                self.logger.error(f"ワーカー数の自動調整エラー: {e}", exc_info=True)
+
+    def autoscale(self, now: Optional[float] = None) -> int:
+        """
+        キューの状態からワーカー数を見直す
+
+        Returns:
+            int: 見直し後のワーカー数
+        """
+        workers = len(self.workers) - self._retiring
+        if (
+            self.autoscaler is None
+            or not self.workers
+            or self._shutdown
+            or self._draining
+        ):
+            return workers
+        depth = self.queue.qsize()
+        wait_seconds = max(self._recent_waits, default=0.0)
+        self._recent_waits = []
+        if self.backlog_probe is not None:
+            waiting, oldest_wait = self.backlog_probe()
+            depth += waiting
+            wait_seconds = max(wait_seconds, oldest_wait)
+        target = self.autoscaler.evaluate(
+            workers, len(self.running_tasks), depth, wait_seconds, now
+        )
+        if target != workers:
+            self._scale_to(target)
+        return target
+
+    def _scale_to(self, target: int) -> None:
+        """ワーカー数を変更（減らす場合は実行中のタスクを終えたワーカーから抜ける）"""
+        current = len(self.workers) - self._retiring
+        if target > current:
+            # 抜ける予定のワーカーを残してから、足りない分を起動
+            keep = min(self._retiring, target - current)
+            self._retiring -= keep
+            for _ in range(target - current - keep):
+                self._spawn_worker()
+        else:
+            self._retiring += current - target
+        self.max_concurrent_tasks = target
 
     def get_queue_status(self) -> Dict[str, Any]:
         """キューの状態を取得"""
@@ -190,8 +490,11 @@ class AsyncTaskQueue(LoggerMixin):
             "running_tasks": len(self.running_tasks),
             "completed_tasks": len(self.completed_tasks),
             "max_concurrent": self.max_concurrent_tasks,
-            "workers": len(self.workers),
+            "workers": len(self.workers) - self._retiring,
             "shutdown": self._shutdown,
+            "draining": self._draining,
+            "scheduler": self.queue.get_stats(),
+            "autoscaler": self.autoscaler.get_stats() if self.autoscaler else None,
         }
 
     def get_task_status(self, queue_id: str) -> Optional[Dict[str, Any]]:
@@ -233,8 +536,663 @@ class AsyncTaskQueue(LoggerMixin):
         return None
 
 
+# ステージ関数: (タスクID, ステージ間で引き継ぐコンテキスト) -> 次のステージに進むか
+StageFunc = Callable[[str, Dict[str, Any]], Awaitable[bool]]
+
+# パイプライン中断時の後処理: (タスクID, コンテキスト, 中断理由) -> None
+PipelineAbortFunc = Callable[[str, Dict[str, Any], str], Awaitable[None]]
+
+
+@dataclass
+class TaskEstimate:
+    """パイプライン上のタスクの順番と予定（秒は現在からの時間）"""
+
+    stage: str
+    queue_position: int  # 0: 実行中、1以上: ステージの待機列での順番
+    start_in_seconds: Optional[float]  # 待機中のステージの開始まで（実行中はNone）
+    completion_in_seconds: Optional[float]  # 全ステージの完了まで
+
+
+class StagedTaskPipeline(LoggerMixin):
+    """
+    ステージごとにキューと同時実行数を持つパイプライン
+
+    各ステージは独立した AsyncTaskQueue で実行され、ステージ関数が True を返すと
+    タスクは次のステージのキューに移る。長い議事録生成の待ちが音声抽出や文字起こしの
+    ワーカーを占有しないため、スループットは最も遅いステージの処理能力で決まる。
+
+    ジャーナルを接続すると、各タスクの現在のステージとリースを永続化し、
+    再起動後に recover() で未完了のタスクを該当ステージから再投入できる。
+    ジャーナルは同じホストの複数のレプリカで共有でき、各ステージは空きワーカーの数だけ
+    ジャーナルからタスクを取得する。どのレプリカで登録されたタスクも、
+    空きのあるレプリカが処理し、停止したレプリカのタスクはリースの期限切れ後に引き継ぐ。
+
+    task_timeout は全ステージの実行時間の合計の上限で、各ステージには残り時間が
+    期限として渡される。キャンセル・タイムアウトで中断すると on_abort が呼ばれる。
+    """
+
+    def __init__(
+        self,
+        stages: List[Tuple[str, StageFunc, int]],
+        on_abort: Optional[PipelineAbortFunc] = None,
+        task_timeout: Optional[float] = None,
+        throughput: Optional[ThroughputModel] = None,
+        stage_models: Optional[Dict[str, str]] = None,
+        on_progress: Optional[Callable[[], Awaitable[None]]] = None,
+        **queue_options,
+    ):
+        self.on_abort = on_abort
+        self.task_timeout = task_timeout
+        # ステージごとの処理速度（stage_models: ステージ名 → 使用するモデル）
+        self.throughput = throughput or ThroughputModel()
+        self.stage_models = stage_models or {}
+        # ステージの終了時（待機中のタスクの順番・予定が変わる）に呼ばれる
+        self.on_progress = on_progress
+        self.stage_names = [name for name, _, _ in stages]
+        self._funcs = [func for _, func, _ in stages]
+        self.stages: Dict[str, AsyncTaskQueue] = {
+            name: AsyncTaskQueue(
+                max_concurrent_tasks=concurrency, name=name, **queue_options
+            )
+            for name, _, concurrency in stages
+        }
+        self.policy = SchedulingPolicy(
+            queue_options.get("policy", SchedulingPolicy.FIFO)
+        )
+        self.default_expected_seconds = queue_options.get(
+            "default_expected_seconds", 600.0
+        )
+        self._shutdown = False
+        self._draining = False
+        self.journal: Optional[TaskJournal] = None
+        self.max_attempts = 3
+        self.claim_interval = 2.0
+        self._maintainer: Optional[asyncio.Task] = None
+        # 同じステージの取得が重なると、空きワーカー数を超えて取得してしまう
+        self._claim_locks = [asyncio.Lock() for _ in stages]
+        # ジャーナルの集計のスナップショット（受け付け制御・自動調整・/health 用）。
+        # 同期的に参照されるため、リース管理のたびにスレッドで取得し直す
+        self._journal_snapshot: Dict[str, Any] = {
+            "load": {},
+            "backlog": {},
+            "stats": None,
+        }
+
+    def attach_journal(
+        self,
+        journal: TaskJournal,
+        max_attempts: int = 3,
+        claim_interval: float = 2.0,
+    ) -> None:
+        """
+        永続ジャーナル（レプリカ間の共有キュー）を接続
+
+        Args:
+            journal: ジャーナル
+            max_attempts: 同じステージを再投入する上限
+            claim_interval: 他のレプリカで登録されたタスクを確認する間隔（秒）
+        """
+        self.journal = journal
+        self.max_attempts = max_attempts
+        self.claim_interval = claim_interval
+
+    async def _journal_call(self, method: Callable[..., Any], *args) -> Any:
+        """
+        ジャーナルの書き込みをスレッドで実行
+
+        他のレプリカの書き込み中は busy_timeout までロックを待つため、
+        イベントループ上で実行すると API の応答まで止まってしまう。
+        """
+        return await asyncio.to_thread(method, *args)
+
+    async def _refresh_journal_snapshot(self) -> None:
+        """ジャーナルの集計をスレッドで取得してスナップショットを更新"""
+        self._journal_snapshot = await self._journal_call(self._read_journal_snapshot)
+
+    def _read_journal_snapshot(self) -> Dict[str, Any]:
+        return {
+            "load": self.journal.stage_load(self.default_expected_seconds),
+            "backlog": {
+                index: self.journal.backlog(index) for index in range(len(self._funcs))
+            },
+            "stats": self.journal.get_stats(),
+        }
+
+    def enable_autoscaling(
+        self,
+        min_workers: int = 1,
+        max_multiplier: float = 2.0,
+        throttle_signals: Optional[Dict[str, Callable[[], int]]] = None,
+        **autoscaler_options: Any,
+    ) -> None:
+        """
+        各ステージのワーカー数の自動調整を有効化
+
+        上限は各ステージの設定値 × max_multiplier。ジャーナル接続時は
+        ジャーナルの未取得タスクもそのステージの待機数として扱う。
+
+        Args:
+            min_workers: 各ステージのワーカー数の下限
+            max_multiplier: 設定値に対する上限の倍率
+            throttle_signals: ステージ名 → 上流のスロットリング回数（累計）を返す関数
+            **autoscaler_options: WorkerAutoscaler の判定パラメータ
+        """
+        throttle_signals = throttle_signals or {}
+        for index, (name, queue) in enumerate(self.stages.items()):
+            concurrency = queue.max_concurrent_tasks
+            autoscaler = WorkerAutoscaler(
+                min_workers=min(min_workers, concurrency),
+                max_workers=max(concurrency, math.ceil(concurrency * max_multiplier)),
+                throttle_signal=throttle_signals.get(name),
+                **autoscaler_options,
+            )
+            queue.enable_autoscaling(
+                autoscaler, functools.partial(self._journal_backlog, index)
+            )
+
+    def _journal_backlog(self, index: int) -> Tuple[int, float]:
+        if self.journal is None:
+            return 0, 0.0
+        return self._journal_snapshot["backlog"].get(index, (0, 0.0))
+
+    async def start_workers(self):
+        """全ステージのワーカーを開始"""
+        self._shutdown = False
+        self._draining = False
+        for queue in self.stages.values():
+            await queue.start_workers()
+        if self.journal is not None and self._maintainer is None:
+            await self._refresh_journal_snapshot()
+            self._maintainer = asyncio.create_task(self._maintain_leases())
+
+    async def stop_workers(self):
+        """全ステージのワーカーを停止"""
+        self._shutdown = True
+        if self._maintainer is not None:
+            self._maintainer.cancel()
+            await asyncio.gather(self._maintainer, return_exceptions=True)
+            self._maintainer = None
+        for queue in self.stages.values():
+            await queue.stop_workers()
+
+    async def drain(self, grace_seconds: float) -> List[str]:
+        """
+        停止処理: 新しいタスクの取得をやめ、実行中のステージの完了を待ってから停止
+
+        待機中のタスクはジャーナルに残り、他のレプリカか次回起動時に処理される。
+        期限内に終わらなかったステージはキャンセルし、同じステージから再開する
+        （文字起こしは完了済みのチャンクを再利用する）。待機中はリースを延長し続ける。
+        ジャーナルがない場合は再開できないため、中断・待機中のタスクは on_abort で
+        中断として後処理する。
+
+        Args:
+            grace_seconds: 実行中のステージを待つ上限（秒）
+
+        Returns:
+            List[str]: 期限内に終わらず中断したタスクID
+        """
+        self._draining = True
+        results = await asyncio.gather(
+            *(queue.drain(grace_seconds) for queue in self.stages.values())
+        )
+        await self.stop_workers()
+        interrupted = [queued_task for result in results for queued_task in result]
+        if self.journal is None:
+            # 再開に使う記録がないため、中断・待機中のタスクは処理中のまま残さない
+            waiting = [
+                queued_task
+                for queue in self.stages.values()
+                for queued_task in queue.queue.items()
+            ]
+            for queued_task in interrupted + waiting:
+                if queued_task.on_abort is not None:
+                    await queued_task.on_abort(ABORT_SHUTDOWN)
+        return [queued_task.task_id for queued_task in interrupted]
+
+    async def submit(
+        self,
+        task_id: str,
+        context: Optional[Dict[str, Any]] = None,
+        priority: int = TaskPriority.NORMAL,
+        owner: Optional[str] = None,
+        expected_seconds: Optional[float] = None,
+    ) -> Optional[str]:
+        """
+        タスクを最初のステージのキューに追加
+
+        ジャーナル接続時はジャーナルに登録し、このレプリカに空きワーカーがあれば
+        取得してキューに追加する（空きがなければ他のレプリカが取得する）。
+
+        Args:
+            task_id: タスクID
+            context: ステージ間で引き継ぐ値（ファイル種別・音声パスなど）
+            priority: 優先度（全ステージで使用。ステージ関数には context["priority"]
+                で渡す）
+            owner: 公平分配の単位（セッションIDまたはAPIキー）
+            expected_seconds: 予想処理時間の目安（メディアの長さ、秒）
+
+        Returns:
+            Optional[str]: 最初のステージのキューID（他のレプリカに委ねた場合はNone）
+        """
+        schedule = {
+            "priority": int(priority),
+            "owner": owner,
+            "expected_seconds": expected_seconds,
+        }
+        if context is None:
+            context = {}
+        context["priority"] = schedule["priority"]
+        if self.journal is None:
+            return await self._enqueue(0, task_id, context, schedule)
+        # 再実行時は以前の記録（キャンセル済みを含む）を破棄してから登録
+        await self._journal_call(self.journal.finish, task_id)
+        await self._journal_call(self.journal.enqueue, task_id, 0, context, schedule)
+        claimed = await self._claim(0)
+        # 連続したアップロードの受け付け制御が登録済みのタスクを数えられるよう更新
+        await self._refresh_journal_snapshot()
+        return claimed.get(task_id)
+
+    async def _enqueue(
+        self,
+        index: int,
+        task_id: str,
+        context: Dict[str, Any],
+        schedule: Dict[str, Any],
+    ) -> str:
+        stage_name = self.stage_names[index]
+        timeout = None
+        if self.task_timeout:
+            elapsed = schedule.get("elapsed_seconds", 0.0)
+            timeout = max(self.task_timeout - elapsed, 0.0)
+        return await self.stages[stage_name].add_task(
+            task_id,
+            self._run_stage,
+            index,
+            task_id,
+            context,
+            schedule,
+            priority=schedule.get("priority", TaskPriority.NORMAL),
+            owner=schedule.get("owner"),
+            expected_seconds=schedule.get("expected_seconds"),
+            timeout=timeout,
+            on_abort=functools.partial(self._abort, task_id, context),
+        )
+
+    async def _run_stage(
+        self,
+        index: int,
+        task_id: str,
+        context: Dict[str, Any],
+        schedule: Dict[str, Any],
+    ) -> bool:
+        """ステージを実行し、成功したら次のステージのキューに移す"""
+        journal = self.journal
+        if journal is not None and not await self._journal_call(
+            journal.acquire, task_id, index
+        ):
+            self.logger.warning(
+                f"リースを取得できないためスキップ: {task_id} ({self.stage_names[index]})"
+            )
+            return False
+
+        # ワーカー停止でキャンセルされた場合はリースを残し、期限切れ後に他のレプリカが引き継ぐ
+        started = time.monotonic()
+        try:
+            proceed = await self._funcs[index](task_id, context)
+        except Exception:
+            if journal is not None:
+                await self._journal_call(journal.finish, task_id)
+                await self._claim(index, releasing=1)
+            await self._notify_progress()
+            raise
+
+        # 実行時間の上限は全ステージの合計に対して適用する
+        duration = time.monotonic() - started
+        schedule["elapsed_seconds"] = schedule.get("elapsed_seconds", 0.0) + duration
+        if proceed:
+            self._observe_rate(index, duration, schedule.get("expected_seconds"))
+        if proceed and index + 1 < len(self._funcs):
+            if journal is not None:
+                await self._journal_call(
+                    journal.enqueue, task_id, index + 1, context, schedule
+                )
+                await self._claim(index + 1)
+            elif self._shutdown or self._draining:
+                # 再開に使う記録がないため、処理中のまま残さず中断として扱う
+                self.logger.warning(
+                    f"停止処理中のため次のステージに進めません: {task_id} "
+                    f"({self.stage_names[index + 1]})"
+                )
+                await self._abort(task_id, context, ABORT_SHUTDOWN)
+                proceed = False
+            else:
+                await self._enqueue(index + 1, task_id, context, schedule)
+            if proceed:
+                self.logger.info(
+                    f"次のステージへ移動: {task_id} "
+                    f"({self.stage_names[index]} → {self.stage_names[index + 1]})"
+                )
+        elif journal is not None:
+            await self._journal_call(journal.finish, task_id)
+        if journal is not None:
+            # このワーカーが空くので、同じステージの待機タスクを取得しておく
+            await self._claim(index, releasing=1)
+        await self._notify_progress()
+        return bool(proceed)
+
+    async def _notify_progress(self) -> None:
+        if self.on_progress is None:
+            return
+        try:
+            await self.on_progress()
+        except Exception as e:
+            self.logger.warning(f"進捗の通知に失敗: {e}")
+
+    def _expected(self, expected_seconds: Optional[float]) -> float:
+        if expected_seconds and expected_seconds > 0:
+            return expected_seconds
+        return self.default_expected_seconds
+
+    def _observe_rate(
+        self, index: int, duration: float, expected_seconds: Optional[float]
+    ) -> None:
+        """
+        完了したステージの実行時間を処理速度の実績に反映
+
+        メディアの長さが分からないタスクは既定値で割ると実績が歪むため記録しない。
+        """
+        if not expected_seconds or expected_seconds <= 0:
+            return
+        name = self.stage_names[index]
+        self.throughput.observe(
+            name, self.stage_models.get(name), duration, expected_seconds
+        )
+
+    def _rate(self, index: int) -> Optional[float]:
+        name = self.stage_names[index]
+        return self.throughput.rate(name, self.stage_models.get(name))
+
+    def _stage_load(self) -> List[Tuple[int, float]]:
+        """
+        ステージごとの待機・実行中のタスク数と予想処理時間の合計
+
+        ジャーナル接続時は、イベントループ上でSQLiteのロックを待たないよう
+        リース管理・タスクの登録時に更新したスナップショットを使う。
+        """
+        if self.journal is not None:
+            load = self._journal_snapshot["load"]
+            return [load.get(index, (0, 0.0)) for index in range(len(self._funcs))]
+        result = []
+        for queue in self.stages.values():
+            tasks = queue.queue.items() + list(queue.running_tasks.values())
+            result.append(
+                (len(tasks), sum(self._expected(t.expected_seconds) for t in tasks))
+            )
+        return result
+
+    def get_backlog(self) -> Dict[str, Any]:
+        """
+        待機・実行中のタスク数と、新しいタスクが処理されるまでの推定待ち時間
+
+        各ステージは、そのステージ以前にあるタスクをすべて処理するまで新しいタスクに
+        着手できない。ステージごとに「残りの予想処理時間 × 処理速度 / ワーカー数」を
+        求め、最も長いステージ（ボトルネック）の値を待ち時間とする。
+        ジャーナル共有時も、ワーカー数はこのレプリカの値を使う（多めに見積もる）。
+        まだ実行されていないステージは処理速度が分からないため除外し、
+        どのステージも分からなければ推定値は None になる。
+
+        Returns:
+            Dict[str, Any]: tasks, expected_seconds, estimated_wait_seconds
+        """
+        load = self._stage_load()
+        upstream = 0.0
+        wait: Optional[float] = None
+        for index, (name, queue) in enumerate(self.stages.items()):
+            upstream += load[index][1]
+            rate = self._rate(index)
+            if rate is None:
+                continue
+            stage_wait = upstream * rate / max(queue.max_concurrent_tasks, 1)
+            wait = stage_wait if wait is None else max(wait, stage_wait)
+        return {
+            "tasks": sum(count for count, _ in load),
+            "expected_seconds": round(upstream, 1),
+            "estimated_wait_seconds": round(wait, 1) if wait is not None else None,
+        }
+
+    async def _locate(self, task_id: str) -> Optional[QueuePosition]:
+        """タスクが待機・実行中のステージと、その中での位置"""
+        if self.journal is not None:
+            return await self._journal_call(
+                self.journal.locate, task_id, self.default_expected_seconds
+            )
+        now = datetime.now()
+        for index, queue in enumerate(self.stages.values()):
+            running = {
+                queued.task_id: (
+                    self._expected(queued.expected_seconds),
+                    (now - queued.started_at).total_seconds()
+                    if queued.started_at
+                    else 0.0,
+                )
+                for queued in queue.running_tasks.values()
+            }
+            if task_id in running:
+                expected, elapsed = running.pop(task_id)
+                return QueuePosition(
+                    index, expected, elapsed, running=list(running.values())
+                )
+            ahead: List[float] = []
+            for queued in queue.queue.items():
+                if queued.task_id == task_id:
+                    return QueuePosition(
+                        index,
+                        self._expected(queued.expected_seconds),
+                        ahead=len(ahead),
+                        ahead_seconds=sum(ahead),
+                        running=list(running.values()),
+                    )
+                ahead.append(self._expected(queued.expected_seconds))
+        return None
+
+    async def estimate_task(self, task_id: str) -> Optional[TaskEstimate]:
+        """
+        タスクの順番と、現在のステージの開始・全ステージの完了までの予定時間
+
+        待機中のタスクは、同じステージで実行中のタスクの残り時間と、先に取り出される
+        タスクの処理時間をワーカー数で割った時間だけ待つとみなす（公平分配・SJFの
+        順番は概算）。開始後は残りのステージを待たずに進むとみなし、各ステージの
+        処理時間は「メディアの長さ × そのステージ・モデルの処理速度」で見積もる。
+        現在以降のステージに実績のない処理速度があれば予定時間は None になる。
+
+        Returns:
+            Optional[TaskEstimate]: 待機・実行中でなければNone
+        """
+        position = await self._locate(task_id)
+        if position is None:
+            return None
+        index = position.stage
+        stage = self.stage_names[index]
+        waiting = position.elapsed_seconds is None
+        queue_position = position.ahead + 1 if waiting else 0
+        rates = [self._rate(i) for i in range(index, len(self._funcs))]
+        if any(rate is None for rate in rates):
+            return TaskEstimate(stage, queue_position, None, None)
+
+        own = position.expected_seconds
+        rate = rates[0]
+        later = sum(own * r for r in rates[1:])
+        if not waiting:
+            current = max(own * rate - position.elapsed_seconds, 0.0)
+            return TaskEstimate(stage, 0, None, round(current + later, 1))
+
+        workers = max(self.stages[stage].max_concurrent_tasks, 1)
+        start_in = 0.0
+        if len(position.running) + position.ahead >= workers:
+            busy = sum(
+                max(expected * rate - elapsed, 0.0)
+                for expected, elapsed in position.running
+            )
+            start_in = (busy + position.ahead_seconds * rate) / workers
+        return TaskEstimate(
+            stage,
+            queue_position,
+            round(start_in, 1),
+            round(start_in + own * rate + later, 1),
+        )
+
+    async def _abort(self, task_id: str, context: Dict[str, Any], reason: str) -> None:
+        """キャンセル・タイムアウトで中断したタスクの記録を削除して後処理を実行"""
+        if self.journal is not None:
+            await self._journal_call(self.journal.finish, task_id)
+        if self.on_abort is not None:
+            await self.on_abort(task_id, context, reason)
+
+    async def cancel(self, task_id: str) -> bool:
+        """
+        タスクをキャンセル
+
+        このレプリカで待機・実行中であればすぐに中断する。他のレプリカが実行中の
+        場合は共有ジャーナルにキャンセルを記録し、そのレプリカが次のリース更新時に中断する。
+
+        Returns:
+            bool: キャンセル対象のタスクがあったか
+        """
+        cancelled = False
+        for queue in self.stages.values():
+            cancelled = await queue.cancel_task(task_id) or cancelled
+        if self.journal is not None and not cancelled:
+            cancelled = await self._journal_call(self.journal.request_cancel, task_id)
+            await self._apply_cancellations()
+        return cancelled
+
+    async def _apply_cancellations(self) -> None:
+        """共有ジャーナルに記録されたキャンセルをこのレプリカに反映"""
+        for entry in await self._journal_call(self.journal.cancelled_entries):
+            local = False
+            for queue in self.stages.values():
+                local = await queue.cancel_task(entry.task_id) or local
+            # どのレプリカでも実行されていない場合は、記録を削除したレプリカが後処理を行う
+            if not local and await self._journal_call(
+                self.journal.finish, entry.task_id
+            ):
+                if self.on_abort is not None:
+                    await self.on_abort(entry.task_id, entry.context, ABORT_CANCELLED)
+
+    def _free_slots(self, index: int) -> int:
+        queue = self.stages[self.stage_names[index]]
+        return (
+            queue.max_concurrent_tasks
+            - len(queue.running_tasks)
+            - queue.queue.qsize()
+        )
+
+    async def _claim(self, index: int, releasing: int = 0) -> Dict[str, str]:
+        """
+        ステージの空きワーカー分だけジャーナルから待機タスクを取得してキューに追加
+
+        Args:
+            index: ステージ番号
+            releasing: まもなく空くワーカー数（実行中のステージの終了時）
+
+        Returns:
+            Dict[str, str]: タスクID → キューID
+        """
+        async with self._claim_locks[index]:
+            limit = self._free_slots(index) + releasing
+            if self._shutdown or self._draining or limit <= 0:
+                return {}
+            entries = await self._journal_call(
+                self.journal.claim,
+                index,
+                limit,
+                self.policy.value,
+                self.default_expected_seconds,
+            )
+            return await self._resubmit(entries)
+
+    async def recover(self) -> List[str]:
+        """
+        ジャーナルの未完了タスクを記録されたステージから再投入
+
+        Returns:
+            List[str]: 再投入したタスクID
+        """
+        if self.journal is None:
+            return []
+        await self._journal_call(self.journal.reclaim_expired)
+        return await self._claim_all()
+
+    async def _claim_all(self) -> List[str]:
+        claimed: List[str] = []
+        for index in range(len(self._funcs)):
+            claimed.extend(await self._claim(index))
+        return claimed
+
+    async def _maintain_leases(self) -> None:
+        """
+        リースの延長・期限切れリースの回収・待機タスクの取得・集計の更新を定期的に実行
+
+        他のレプリカで登録されたタスクや、停止したレプリカから回収したタスクは
+        ここで空きのあるレプリカが取得する。
+        """
+        interval = min(self.claim_interval, self.journal.lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self._journal_call(self.journal.renew_leases)
+                await self._apply_cancellations()
+                await self._journal_call(self.journal.reclaim_expired)
+                await self._claim_all()
+                await self._refresh_journal_snapshot()
+            except Exception as e:
+                self.logger.error(f"リース管理エラー: {e}", exc_info=True)
+
+    async def _resubmit(self, entries: List[JournalEntry]) -> Dict[str, str]:
+        resubmitted: Dict[str, str] = {}
+        for entry in entries:
+            if entry.attempts >= self.max_attempts or not (
+                0 <= entry.stage < len(self._funcs)
+            ):
+                # 実行のたびにプロセスが停止するタスクは再投入しない
+                self.logger.error(
+                    f"タスクの再投入を中止: {entry.task_id} "
+                    f"(ステージ: {entry.stage}, 試行回数: {entry.attempts})"
+                )
+                await self._journal_call(self.journal.finish, entry.task_id)
+                continue
+            resubmitted[entry.task_id] = await self._enqueue(
+                entry.stage, entry.task_id, entry.context, entry.schedule
+            )
+            self.logger.info(
+                f"ジャーナルからタスクを取得: {entry.task_id} "
+                f"({self.stage_names[entry.stage]})"
+            )
+        return resubmitted
+
+    def get_queue_status(self) -> Dict[str, Any]:
+        """全体とステージごとのキューの状態を取得"""
+        stages = {name: queue.get_queue_status() for name, queue in self.stages.items()}
+        return {
+            "queue_size": sum(stage["queue_size"] for stage in stages.values()),
+            "running_tasks": sum(stage["running_tasks"] for stage in stages.values()),
+            "completed_tasks": sum(
+                stage["completed_tasks"] for stage in stages.values()
+            ),
+            "max_concurrent": sum(stage["max_concurrent"] for stage in stages.values()),
+            "workers": sum(stage["workers"] for stage in stages.values()),
+            "shutdown": self._shutdown,
+            "draining": self._draining,
+            "stages": stages,
+            "backlog": self.get_backlog(),
+            "throughput": self.throughput.get_stats(),
+            "journal": self._journal_snapshot["stats"] if self.journal else None,
+        }
+
+
 # グローバルタスクキューインスタンス
 task_queue: Optional[AsyncTaskQueue] = None
+task_pipeline: Optional[StagedTaskPipeline] = None
 
 
 def get_task_queue() -> AsyncTaskQueue:
@@ -253,9 +1211,116 @@ async def initialize_task_queue():
     await queue.start_workers()
 
 
-async def shutdown_task_queue():
-    """タスクキューを停止"""
+async def shutdown_task_queue(grace_seconds: float = 0.0):
+    """タスクキューを停止（実行中のタスクは grace_seconds まで完了を待つ）"""
     global task_queue
     if task_queue:
-        await task_queue.stop_workers()
+        await task_queue.drain(grace_seconds)
         task_queue = None
+
+
+def _transcription_model(settings) -> str:
+    """文字起こしのバックエンドとモデル（処理速度の記録の単位）"""
+    backend = str(settings.transcription_backend).lower()
+    if backend in ("local", "hybrid"):
+        return f"{backend}:{settings.local_whisper_model}"
+    return f"openai:{settings.whisper_model}"
+
+
+def get_task_pipeline() -> StagedTaskPipeline:
+    """議事録作成パイプライン（音声抽出 → 文字起こし → 議事録生成）を取得"""
+    global task_pipeline
+    if task_pipeline is None:
+        from app.api.endpoints.minutes import (
+            MEDIA_PIPELINE_STAGES,
+            abort_media_task,
+            broadcast_queue_updates,
+        )
+        from app.config import settings
+        from app.services.adaptive_concurrency import (
+            CHAT_ENDPOINT,
+            TRANSCRIPTION_ENDPOINT,
+            get_throttle_count,
+        )
+        from app.services.throughput_model import throughput_model
+
+        concurrency = {
+            "extract": settings.pipeline_extract_concurrency,
+            "transcribe": settings.pipeline_transcribe_concurrency,
+            "minutes": settings.pipeline_minutes_concurrency,
+        }
+        task_pipeline = StagedTaskPipeline(
+            [(name, func, concurrency[name]) for name, func in MEDIA_PIPELINE_STAGES],
+            on_abort=abort_media_task,
+            task_timeout=settings.task_timeout,
+            throughput=throughput_model,
+            stage_models={
+                "transcribe": _transcription_model(settings),
+                "minutes": settings.gpt_model,
+            },
+            on_progress=broadcast_queue_updates,
+            policy=parse_policy(settings.task_scheduling_policy),
+            fair_quantum_seconds=settings.task_fair_quantum_seconds,
+            default_expected_seconds=settings.task_default_expected_seconds,
+        )
+        if settings.task_autoscale_enabled:
+            # 文字起こし・議事録生成はOpenAI APIの429・タイムアウトが増えたら縮小
+            task_pipeline.enable_autoscaling(
+                min_workers=settings.task_autoscale_min_workers,
+                max_multiplier=settings.task_autoscale_max_multiplier,
+                throttle_signals={
+                    "transcribe": functools.partial(
+                        get_throttle_count, TRANSCRIPTION_ENDPOINT
+                    ),
+                    "minutes": functools.partial(get_throttle_count, CHAT_ENDPOINT),
+                },
+                interval_seconds=settings.task_autoscale_interval_seconds,
+                target_wait_seconds=settings.task_autoscale_target_wait_seconds,
+                up_cooldown_seconds=settings.task_autoscale_up_cooldown_seconds,
+                down_cooldown_seconds=settings.task_autoscale_down_cooldown_seconds,
+                scale_down_idle_seconds=settings.task_autoscale_idle_seconds,
+            )
+    return task_pipeline
+
+
+async def initialize_task_pipeline() -> List[str]:
+    """
+    パイプラインの各ステージのワーカーを開始し、ジャーナルの未完了タスクを再投入
+
+    Returns:
+        List[str]: 再投入したタスクID
+    """
+    from app.config import settings
+
+    pipeline = get_task_pipeline()
+    if settings.task_journal_enabled and pipeline.journal is None:
+        pipeline.attach_journal(
+            TaskJournal(
+                os.path.join(settings.storage_dir, "task_journal.sqlite3"),
+                settings.task_lease_seconds,
+            ),
+            settings.task_max_attempts,
+            settings.task_claim_interval_seconds,
+        )
+    await pipeline.start_workers()
+    return await pipeline.recover()
+
+
+async def shutdown_task_pipeline(grace_seconds: float = 0.0):
+    """
+    パイプラインを停止
+
+    実行中のステージは grace_seconds まで完了を待つ。待機中・中断したタスクは
+    ジャーナルに残り、他のレプリカか次回起動時に再投入される。
+    """
+    global task_pipeline
+    if task_pipeline:
+        interrupted = await task_pipeline.drain(grace_seconds)
+        if interrupted:
+            task_pipeline.logger.warning(
+                f"停止期限までに終わらなかったタスク: {len(interrupted)}件"
+            )
+        if task_pipeline.journal is not None:
+            await asyncio.to_thread(task_pipeline.journal.release_owned)
+            task_pipeline.journal.close()
+        task_pipeline = None
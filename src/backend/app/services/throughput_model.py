@@ -0,0 +1,111 @@
+"""
+パイプラインの各ステージの処理速度（ETA の予測用）
+
+処理時間はメディアの長さにほぼ比例するため、「メディア1秒あたりの処理秒数」を
+ステージとモデル（文字起こしのバックエンド・議事録生成のモデル）ごとに
+指数移動平均で記録する。モデルを切り替えた直後は、そのモデルで一度実行されるまで
+そのステージの予測値は出さない。記録は storage に保存し、再起動後も使う。
+"""
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from app.config import settings
+from app.services.compute_pool import compute_pool
+from app.utils.logger import LoggerMixin
+
+
+class ThroughputModel(LoggerMixin):
+    """ステージ・モデルごとの処理速度"""
+
+    def __init__(self, path: Optional[str] = None, smoothing: float = 0.2):
+        """
+        Args:
+            path: 記録の保存先（None なら保存しない）
+            smoothing: 新しい実績の重み（0〜1）
+        """
+        self.path = path
+        self.smoothing = min(max(smoothing, 0.01), 1.0)
+        self._lock = threading.Lock()
+        # "ステージ:モデル" → {"rate": 処理秒数/メディア秒数, "samples": 件数, ...}
+        self._rates: Dict[str, Dict[str, float]] = {}
+        self._writer = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._writer = compute_pool.json_writer("throughput_model")
+            self._load()
+
+    @staticmethod
+    def key(stage: str, model: Optional[str] = None) -> str:
+        return f"{stage}:{model}" if model else stage
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self._rates = {
+                key: value
+                for key, value in data.items()
+                if isinstance(value, dict) and value.get("rate", 0) > 0
+            }
+            self.logger.info(f"処理速度の実績を読み込み: {len(self._rates)}件")
+        except Exception as e:
+            self.logger.warning(f"処理速度の実績を読み込めません: {e}")
+
+    def observe(
+        self,
+        stage: str,
+        model: Optional[str],
+        duration: float,
+        media_seconds: float,
+    ) -> float:
+        """
+        ステージの実行時間を記録
+
+        Args:
+            stage: ステージ名
+            model: ステージで使ったモデル
+            duration: 実行時間（秒）
+            media_seconds: メディアの長さ（秒）
+
+        Returns:
+            float: 更新後の処理速度
+        """
+        sample = duration / max(media_seconds, 1.0)
+        key = self.key(stage, model)
+        with self._lock:
+            entry = self._rates.get(key)
+            if entry is None:
+                entry = self._rates[key] = {"rate": sample, "samples": 0}
+            else:
+                entry["rate"] += (sample - entry["rate"]) * self.smoothing
+            entry["samples"] += 1
+            entry["updated_at"] = time.time()
+            rate = entry["rate"]
+            snapshot = {key: dict(value) for key, value in self._rates.items()}
+        if self._writer is not None:
+            self._writer.save([(self.path, snapshot, {"indent": 2})])
+        return rate
+
+    def rate(self, stage: str, model: Optional[str] = None) -> Optional[float]:
+        """処理速度（メディア1秒あたりの処理秒数、実績がなければNone）"""
+        entry = self._rates.get(self.key(stage, model))
+        return entry["rate"] if entry else None
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            key: {"rate": round(value["rate"], 4), "samples": value["samples"]}
+            for key, value in self._rates.items()
+        }
+
+
+# グローバルな処理速度の記録
+throughput_model = ThroughputModel(
+    os.path.join(settings.storage_dir, "throughput_model.json")
+)
@@ -0,0 +1,167 @@
+"""
+トークン数の計測
+
+tiktoken（BPEトークナイザー）が利用できる場合は実際のトークン数を、
+利用できない場合（未インストール・語彙ファイルを取得できないオフライン環境等）は
+文字種ごとの概算値を返す。文字起こし・議事録のトークン数はチャットセッションに
+キャッシュし、議事録の編集時は議事録分のみ再計測する。
+"""
+import threading
+from typing import TYPE_CHECKING, Any, Optional
+
+from app.config import settings
+from app.utils.logger import get_logger
+
+if TYPE_CHECKING:
+    from app.models.chat import ChatSession, TokenUsage
+
+logger = get_logger(__name__)
+
+# モデル名から判別できない場合のエンコーディング（GPT-4o / GPT-4.1 / o系）
+DEFAULT_ENCODING = "o200k_base"
+
+
+def approximate_tokens(text: str) -> int:
+    """
+    文字種からトークン数を概算
+
+    日本語（非ASCII）は約1.5文字、英語（ASCII）は約4文字で1トークンとみなす。
+    ASCII文字数は encode で一括算出する（1文字ずつのループは行わない）。
+    """
+    ascii_chars = len(text.encode("ascii", "ignore"))
+    non_ascii_chars = len(text) - ascii_chars
+    return int(non_ascii_chars / 1.5) + int(ascii_chars / 4)
+
+
+class TokenCounter:
+    """モデルに対応したBPEトークナイザーでトークン数を計測"""
+
+    def __init__(self, model: str):
+        self.model = model
+        self._encoding: Any = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load_encoding(self) -> Any:
+        """エンコーディングを読み込み（失敗時はNone、結果は一度だけ評価）"""
+        if self._loaded:
+            return self._encoding
+        with self._lock:
+            if self._loaded:
+                return self._encoding
+            try:
+                import tiktoken
+
+                try:
+                    encoding = tiktoken.encoding_for_model(self.model)
+                except KeyError:
+                    encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+                self._encoding = encoding
+                logger.info(f"トークナイザーを読み込み: {encoding.name} ({self.model})")
+            except Exception as e:
+                logger.warning(f"トークナイザーを利用できません。概算値を使用します: {e}")
+                self._encoding = None
+            self._loaded = True
+        return self._encoding
+
+    @property
+    def is_exact(self) -> bool:
+        """BPEトークナイザーによる計測かどうか"""
+        return self._load_encoding() is not None
+
+    def count(self, text: str) -> int:
+        """
+        テキストのトークン数を計測
+
+        Args:
+            text: 対象テキスト
+
+        Returns:
+            int: トークン数（トークナイザーが利用できない場合は概算値）
+        """
+        if not text:
+            return 0
+        encoding = self._load_encoding()
+        if encoding is None:
+            return approximate_tokens(text)
+        # 特殊トークン相当の文字列も通常のテキストとして数える
+        return len(encoding.encode(text, disallowed_special=()))
+
+
+def _cached_count(session: "ChatSession", field: str, text: str) -> int:
+    """セッションにキャッシュされたトークン数を取得（未計測なら計測して保存）"""
+    tokens = getattr(session, field, 0)
+    if text and not tokens:
+        tokens = token_counter.count(text)
+        setattr(session, field, tokens)
+    return tokens
+
+
+def ensure_session_tokens(session: "ChatSession") -> int:
+    """
+    セッションの文字起こし・議事録のトークン数を計測してキャッシュ
+
+    計測済みの場合は再計測しない（旧形式で保存されたセッションは初回のみ計測）。
+
+    Args:
+        session: チャットセッション
+
+    Returns:
+        int: コンテキストトークン数（文字起こし＋議事録）
+    """
+    session.context_tokens = _cached_count(
+        session, "transcription_tokens", session.transcription
+    ) + _cached_count(session, "minutes_tokens", session.minutes)
+    return session.context_tokens
+
+
+def update_session_minutes(session: "ChatSession", minutes: str) -> None:
+    """
+    セッションの議事録を更新し、議事録分のトークン数のみ再計測
+
+    Args:
+        session: チャットセッション
+        minutes: 更新後の議事録
+    """
+    transcription_tokens = _cached_count(
+        session, "transcription_tokens", session.transcription
+    )
+    session.minutes = minutes
+    session.minutes_tokens = token_counter.count(minutes)
+    session.context_tokens = transcription_tokens + session.minutes_tokens
+
+
+def usage_from_response(response: Any) -> Optional["TokenUsage"]:
+    """
+    APIレスポンスの usage を TokenUsage に変換
+
+    Args:
+        response: chat.completions のレスポンス
+
+    Returns:
+        Optional[TokenUsage]: 使用量（レスポンスに含まれない場合はNone）
+    """
+    from app.models.chat import TokenUsage
+
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    # プロンプトキャッシュの一致分（prompt_tokens_details.cached_tokens）
+    details = getattr(usage, "prompt_tokens_details", None)
+    if isinstance(details, dict):
+        cached_tokens = details.get("cached_tokens", 0)
+    else:
+        cached_tokens = getattr(details, "cached_tokens", 0)
+    try:
+        return TokenUsage(
+            prompt_tokens=int(getattr(usage, "prompt_tokens", 0) or 0),
+            completion_tokens=int(getattr(usage, "completion_tokens", 0) or 0),
+            total_tokens=int(getattr(usage, "total_tokens", 0) or 0),
+            cached_tokens=int(cached_tokens or 0),
+        )
+    except (TypeError, ValueError):
+        return None
+
+
+# グローバルなトークンカウンター（チャットモデル用）
+token_counter = TokenCounter(settings.openai_chat_model)
@@ -0,0 +1,221 @@
+"""
+文字起こしの検索（チャットの検索拡張コンテキスト用）
+
+セッション作成時に文字起こしを文単位でまとめたチャンクに分割し、文字バイグラムの
+転置インデックスを作成する。質問ごとにBM25で関連チャンクを選び、トークン予算内で
+元の順序に並べてプロンプトに含める。
+"""
+import hashlib
+import math
+import re
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from app.services.token_counter import token_counter
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# 文の区切り（句点・感嘆符・疑問符・改行を含めて1文とする）
+_SENTENCE_PATTERN = re.compile(r"[^。！？!?\n]+[。！？!?\n]*|[。！？!?\n]+")
+# 検索語から除外する空白・記号
+_IGNORED_CHARS = re.compile(r"[\s、。，．,.！？!?「」『』（）()・:：;；\"'“”]+")
+
+# BM25パラメーター
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+@dataclass
+class TranscriptChunk:
+    """文字起こしのチャンク（元テキスト上の [start, end) 範囲）"""
+
+    index: int
+    start: int
+    end: int
+    text: str
+    tokens: int = 0
+
+
+def char_bigrams(text: str) -> List[str]:
+    """
+    文字バイグラムに分割（分かち書きのない日本語向け）
+
+    Args:
+        text: 対象テキスト
+
+    Returns:
+        List[str]: バイグラムのリスト（1文字のみの場合はその文字）
+    """
+    normalized = _IGNORED_CHARS.sub("", text.lower())
+    if len(normalized) < 2:
+        return [normalized] if normalized else []
+    return [normalized[i : i + 2] for i in range(len(normalized) - 1)]
+
+
+def chunk_transcript(transcript: str, chunk_chars: int = 400) -> List[TranscriptChunk]:
+    """
+    文字起こしを文の境界でチャンクに分割
+
+    Args:
+        transcript: 文字起こし全文
+        chunk_chars: 1チャンクの目安文字数（長すぎる文はこの長さで分割）
+
+    Returns:
+        List[TranscriptChunk]: 出現順のチャンク
+    """
+    chunk_chars = max(chunk_chars, 1)
+    spans: List[Tuple[int, int]] = []
+    chunk_start: Optional[int] = None
+    chunk_end = 0
+
+    for match in _SENTENCE_PATTERN.finditer(transcript):
+        start, end = match.span()
+        if chunk_start is not None and end - chunk_start > chunk_chars:
+            spans.append((chunk_start, chunk_end))
+            chunk_start = None
+        # 1文が長すぎる場合は固定長で分割
+        while end - start > chunk_chars:
+            spans.append((start, start + chunk_chars))
+            start += chunk_chars
+        if chunk_start is None:
+            chunk_start = start
+        chunk_end = end
+    if chunk_start is not None:
+        spans.append((chunk_start, chunk_end))
+
+    chunks = []
+    for start, end in spans:
+        text = transcript[start:end].strip()
+        if text:
+            chunks.append(TranscriptChunk(len(chunks), start, end, text))
+    return chunks
+
+
+class TranscriptRetriever:
+    """チャンク単位のBM25検索"""
+
+    def __init__(self, transcript: str, chunk_chars: int = 400):
+        self.chunks = chunk_transcript(transcript, chunk_chars)
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self._lengths: List[int] = []
+
+        for chunk in self.chunks:
+            chunk.tokens = token_counter.count(chunk.text)
+            terms = char_bigrams(chunk.text)
+            self._lengths.append(len(terms))
+            for term, frequency in Counter(terms).items():
+                self._postings.setdefault(term, []).append((chunk.index, frequency))
+
+        total = sum(self._lengths)
+        self._average_length = total / len(self._lengths) if self._lengths else 0.0
+        self.total_tokens = sum(chunk.tokens for chunk in self.chunks)
+
+    def search(self, query: str, top_k: int = 8) -> List[Tuple[TranscriptChunk, float]]:
+        """
+        質問に関連するチャンクを検索
+
+        Args:
+            query: 質問文
+            top_k: 取得する最大件数
+
+        Returns:
+            List[Tuple[TranscriptChunk, float]]: スコアの高い順のチャンクとスコア
+        """
+        if not self.chunks:
+            return []
+
+        scores: Dict[int, float] = {}
+        chunk_count = len(self.chunks)
+        for term in set(char_bigrams(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            document_frequency = len(postings)
+            idf = math.log(
+                1 + (chunk_count - document_frequency + 0.5) / (document_frequency + 0.5)
+            )
+            for index, frequency in postings:
+                length_ratio = self._lengths[index] / (self._average_length or 1.0)
+                denominator = frequency + BM25_K1 * (1 - BM25_B + BM25_B * length_ratio)
+                scores[index] = scores.get(index, 0.0) + idf * (
+                    frequency * (BM25_K1 + 1) / denominator
+                )
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(self.chunks[index], score) for index, score in ranked[:top_k]]
+
+    def retrieve(
+        self, query: str, token_budget: int, top_k: int = 8
+    ) -> List[TranscriptChunk]:
+        """
+        トークン予算内に収まる関連チャンクを取得
+
+        Args:
+            query: 質問文
+            token_budget: チャンクの合計トークン数の上限
+            top_k: 候補とする最大件数
+
+        Returns:
+            List[TranscriptChunk]: 文字起こし上の出現順に並べたチャンク
+        """
+        selected = []
+        used_tokens = 0
+        for chunk, _ in self.search(query, top_k):
+            if used_tokens + chunk.tokens > token_budget:
+                continue
+            selected.append(chunk)
+            used_tokens += chunk.tokens
+        return sorted(selected, key=lambda chunk: chunk.index)
+
+
+class TranscriptRetrieverCache:
+    """チャットセッションごとの検索インデックスのキャッシュ"""
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[str, TranscriptRetriever]]" = (
+            OrderedDict()
+        )
+
+    def get(
+        self, session_id: str, transcript: str, chunk_chars: int = 400
+    ) -> TranscriptRetriever:
+        """
+        検索インデックスを取得（未作成・文字起こし変更時は作成）
+
+        Args:
+            session_id: チャットセッションID
+            transcript: 文字起こし全文
+            chunk_chars: チャンクの目安文字数
+
+        Returns:
+            TranscriptRetriever: 検索インデックス
+        """
+        digest = hashlib.sha1(
+            f"{chunk_chars}:{transcript}".encode("utf-8")
+        ).hexdigest()
+        entry = self._entries.get(session_id)
+        if entry is not None and entry[0] == digest:
+            self._entries.move_to_end(session_id)
+            return entry[1]
+
+        retriever = TranscriptRetriever(transcript, chunk_chars)
+        self._entries[session_id] = (digest, retriever)
+        self._entries.move_to_end(session_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        logger.info(
+            f"文字起こし検索インデックスを作成: {session_id[:8]}... "
+            f"({len(retriever.chunks)}チャンク, {retriever.total_tokens}トークン)"
+        )
+        return retriever
+
+    def discard(self, session_id: str) -> None:
+        """検索インデックスを破棄"""
+        self._entries.pop(session_id, None)
+
+
+# グローバルな検索インデックスキャッシュ
+transcript_retriever_cache = TranscriptRetrieverCache()
@@ -1,27 +1,57 @@
+import asyncio
 import os
+from typing import List, Optional
 
 import aiofiles
 import openai
 
 from app.config import settings
+from app.services.adaptive_concurrency import (
+    TRANSCRIPTION_ENDPOINT,
+    get_concurrency_limiter,
+)
+from app.models import TranscriptionResult, TranscriptionSegment
+from app.services.retry_policy import call_with_retry
+from app.services.transcription_backends import (
+    create_transcription_backend,
+    estimate_audio_duration,
+)
 from app.utils.logger import LoggerMixin
+from app.utils.openai_client import openai_client_kwargs
 
 
 class TranscriptionService(LoggerMixin):
     """文字起こしサービス"""
 
-    def __init__(self):
-        """OpenAI クライアントを初期化"""
+    def __init__(self, backend_name: Optional[str] = None, priority: str = "normal"):
+        """
+        OpenAI クライアントと文字起こしバックエンドを初期化
+
+        Args:
+            backend_name: "openai", "local", "hybrid"（省略時は設定値）
+            priority: チャンクの優先度（"low" はハイブリッド時にローカルで処理）
+        """
         self.client = openai.AsyncOpenAI(
-            api_key=settings.openai_api_key,
-            timeout=1800.0,  # タイムアウトを30分に設定
+            **openai_client_kwargs(timeout=1800.0)  # タイムアウトを30分に設定
+        )
+        self.backend = create_transcription_backend(lambda: self.client, backend_name)
+        self.priority = priority
+        # 直近の文字起こしのセグメント（チャンクのオフセット適用済み）
+        self.segments: List[TranscriptionSegment] = []
+        self.logger.info(
+            f"TranscriptionService初期化完了 (バックエンド: {self.backend.name}, "
+            "タイムアウト30分)"
         )
-        self.logger.info("TranscriptionService初期化完了 (タイムアウト30分)")
 
     async def transcribe_audio(self, audio_file_path: str) -> str:
-        """音声ファイルを文字起こし（分割ファイル対応）"""
+        """
+        音声ファイルを文字起こし（分割ファイル対応）
+
+        セグメント（チャンクのオフセット適用済みの時刻）は self.segments に保持する。
+        """
 
         self.logger.info(f"文字起こし開始: {audio_file_path}")
+        self.segments = []
 
         # ディレクトリかファイルかを判定
         if os.path.isdir(audio_file_path):
@@ -36,47 +66,38 @@ class TranscriptionService(LoggerMixin):
 
     async def _transcribe_single_file(self, audio_file_path: str) -> str:
         """単一の音声ファイルを文字起こし"""
+        result = await self._transcribe_file(audio_file_path)
+        self.segments = list(result.segments)
+        return result.text
+
+    async def _transcribe_file(self, audio_file_path: str) -> TranscriptionResult:
+        """音声ファイルをバックエンドで文字起こし（テキストとセグメント）"""
 
         file_size = os.path.getsize(audio_file_path)
         self.logger.info(f"音声ファイルサイズ: {file_size} bytes")
 
-        # ファイルサイズチェック
-        if file_size > 25 * 1024 * 1024:
+        # ファイルサイズチェック（Whisper APIは25MBまで）
+        if not self.backend.accepts_file_size(file_size):
             self.logger.error(f"ファイルサイズが制限を超過: {file_size} bytes")
             raise ValueError("音声ファイルが25MBを超えています")
 
         try:
-            # 音声ファイルを開いて文字起こし
-            async with aiofiles.open(audio_file_path, "rb") as audio_file:
-                # ファイル内容を読み込み
-                audio_data = await audio_file.read()
-
-                self.logger.info(
-                    f"Whisper API呼び出し開始 - モデル: {settings.whisper_model}, "
-                    f"言語: {settings.whisper_language}"
-                )
-
-                # ファイル拡張子に基づいてMIMEタイプを決定
-                file_ext = os.path.splitext(audio_file_path)[1].lower()
-                mime_type = "audio/mp3" if file_ext == ".mp3" else "audio/wav"
-                filename = f"audio{file_ext}"
-
-                # OpenAI Whisper APIを呼び出し
-                response = await self.client.audio.transcriptions.create(
-                    model=settings.whisper_model,
-                    file=(filename, audio_data, mime_type),
-                    language=settings.whisper_language,
-                    response_format="text",
-                )
+            result = await self.backend.transcribe(audio_file_path, self.priority)
+            response = result.text
 
-                if not response or not response.strip():
-                    self.logger.warning("文字起こし結果が空でした")
-                    raise ValueError("文字起こし結果が空です")
+            if not response or not response.strip():
+                self.logger.warning("文字起こし結果が空でした")
+                raise ValueError("文字起こし結果が空です")
 
-                result_length = len(response.strip())
-                self.logger.info(f"文字起こし完了: {result_length}文字")
+            result_length = len(response.strip())
+            self.logger.info(
+                f"文字起こし完了: {result_length}文字 (バックエンド: {result.backend})"
+            )
 
-                return response.strip()
+            result.text = response.strip()
+            if result.duration is None:
+                result.duration = estimate_audio_duration(audio_file_path)
+            return result
 
         except Exception as e:
             self.logger.error(
@@ -84,8 +105,43 @@ class TranscriptionService(LoggerMixin):
             )
             raise RuntimeError(f"文字起こし中にエラーが発生しました: {str(e)}")
 
+    @staticmethod
+    def _checkpoint_path(chunk_file: str) -> str:
+        return f"{chunk_file}.json"
+
+    def _load_chunk_checkpoint(self, chunk_file: str) -> Optional[TranscriptionResult]:
+        """中断前に完了したチャンクの文字起こし結果を読み込む（なければ None）"""
+        path = self._checkpoint_path(chunk_file)
+        if not os.path.isfile(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return TranscriptionResult.model_validate_json(f.read())
+        except Exception as e:
+            self.logger.warning(f"チャンクのチェックポイントを読み込めません: {path} - {e}")
+            return None
+
+    def _save_chunk_checkpoint(
+        self, chunk_file: str, result: TranscriptionResult
+    ) -> None:
+        """
+        チャンクの文字起こし結果を保存する
+
+        停止・タイムアウトでステージが中断されても、再開時は完了済みの
+        チャンクを API に送り直さずに済む。書きかけのファイルを読まないよう
+        一時ファイルに書いてから置き換える。
+        """
+        path = self._checkpoint_path(chunk_file)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(result.model_dump_json())
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.warning(f"チャンクのチェックポイントを保存できません: {path} - {e}")
+
     async def _transcribe_chunked_audio(self, chunks_dir: str) -> str:
-        """分割された音声ファイルを順次処理して結合"""
+        """分割された音声ファイルを並行処理して結合"""
 
         self.logger.info(f"分割音声ファイル処理開始: {chunks_dir}")
 
@@ -104,22 +160,59 @@ class TranscriptionService(LoggerMixin):
         self.logger.info(f"チャンクファイル数: {len(chunk_files)}")
 
         try:
-            # 各チャンクを順次処理
-            transcriptions = []
-
-            for i, chunk_file in enumerate(chunk_files):
+            # 各チャンクを並行処理（同時実行数はAIMDリミッターが制御）
+            async def transcribe_chunk(
+                index: int, chunk_file: str
+            ) -> TranscriptionResult:
                 self.logger.info(
-                    f"チャンク {i+1}/{len(chunk_files)} 処理中: {os.path.basename(chunk_file)}"
+                    f"チャンク {index+1}/{len(chunk_files)} 処理中: {os.path.basename(chunk_file)}"
                 )
-
-                chunk_transcript = await self._transcribe_single_file(chunk_file)
-                if chunk_transcript.strip():
-                    transcriptions.append(chunk_transcript.strip())
-
-                self.logger.debug(f"チャンク {i+1} 完了: {len(chunk_transcript)}文字")
+                chunk_result = self._load_chunk_checkpoint(chunk_file)
+                if chunk_result is not None:
+                    self.logger.info(f"チャンク {index+1} はチェックポイントを再利用")
+                    return chunk_result
+                chunk_result = await self._transcribe_file(chunk_file)
+                if chunk_result.duration is None:
+                    chunk_result.duration = estimate_audio_duration(chunk_file)
+                self._save_chunk_checkpoint(chunk_file, chunk_result)
+                self.logger.debug(
+                    f"チャンク {index+1} 完了: {len(chunk_result.text)}文字"
+                )
+                return chunk_result
+
+            chunk_tasks = [
+                asyncio.create_task(transcribe_chunk(i, chunk_file))
+                for i, chunk_file in enumerate(chunk_files)
+            ]
+            try:
+                chunk_results = await asyncio.gather(*chunk_tasks)
+            except BaseException:
+                # 1つでも失敗したら残りのチャンク処理を中断
+                for chunk_task in chunk_tasks:
+                    chunk_task.cancel()
+                await asyncio.gather(*chunk_tasks, return_exceptions=True)
+                raise
+
+            # チャンク順に結合し、セグメント時刻にチャンクの開始位置を加算
+            transcriptions = []
+            segments = []
+            chunk_offset = 0.0
+            for chunk_result in chunk_results:
+                if chunk_result.text.strip():
+                    transcriptions.append(chunk_result.text.strip())
+                    segments.extend(
+                        TranscriptionSegment(
+                            start=segment.start + chunk_offset,
+                            end=segment.end + chunk_offset,
+                            text=segment.text,
+                        )
+                        for segment in chunk_result.segments
+                    )
+                chunk_offset += chunk_result.duration or 0.0
 
             # 結果を結合
             full_transcript = " ".join(transcriptions)
+            self.segments = segments
 
             # 一時ディレクトリを削除
             import shutil
@@ -153,18 +246,22 @@ class TranscriptionService(LoggerMixin):
         """タイムスタンプ付きで文字起こし"""
 
         try:
-            async with aiofiles.open(audio_file_path, "rb") as audio_file:
-                audio_data = await audio_file.read()
-
-                response = await self.client.audio.transcriptions.create(
-                    model=settings.whisper_model,
-                    file=("audio.wav", audio_data, "audio/wav"),
-                    language=settings.whisper_language,
-                    response_format="verbose_json",
-                    timestamp_granularities=["word"],
-                )
-
-                return response
+            limiter = get_concurrency_limiter(TRANSCRIPTION_ENDPOINT)
+
+            async def request():
+                async with limiter.slot():
+                    async with aiofiles.open(audio_file_path, "rb") as audio_file:
+                        audio_data = await audio_file.read()
+
+                    return await self.client.audio.transcriptions.create(
+                        model=settings.whisper_model,
+                        file=("audio.wav", audio_data, "audio/wav"),
+                        language=settings.whisper_language,
+                        response_format="verbose_json",
+                        timestamp_granularities=["word"],
+                    )
+
+            return await call_with_retry(request, TRANSCRIPTION_ENDPOINT)
 
         except Exception as e:
             raise RuntimeError(
@@ -0,0 +1,457 @@
+"""
+文字起こしバックエンド
+
+音声チャンクを「テキスト＋セグメント」に変換するインターフェースと、その実装
+（OpenAI Whisper API / ローカルCPUエンジン / 両者を併用するハイブリッド）。
+"""
+import abc
+import asyncio
+import functools
+import multiprocessing
+import os
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import aiofiles
+
+from app.config import settings
+from app.models import TranscriptionResult, TranscriptionSegment
+from app.services.adaptive_concurrency import (
+    TRANSCRIPTION_ENDPOINT,
+    get_concurrency_limiter,
+)
+from app.services.retry_policy import call_with_retry
+from app.utils.logger import LoggerMixin
+
+# Whisper APIのファイルサイズ上限
+OPENAI_MAX_FILE_SIZE = 25 * 1024 * 1024
+
+# 対応ローカルエンジン
+LOCAL_ENGINES = ("faster_whisper", "stub")
+
+# 優先度
+PRIORITY_LOW = "low"
+PRIORITY_NORMAL = "normal"
+
+
+def estimate_audio_duration(audio_file_path: str) -> float:
+    """
+    音声ファイルの長さ（秒）を推定
+
+    WAVはヘッダーから正確に算出し、それ以外は変換時の最大ビットレートから推定する。
+
+    Args:
+        audio_file_path: 音声ファイルパス
+
+    Returns:
+        float: 推定再生時間（秒）
+    """
+    if audio_file_path.lower().endswith(".wav"):
+        try:
+            with wave.open(audio_file_path, "rb") as wav_file:
+                return wav_file.getnframes() / float(wav_file.getframerate())
+        except (wave.Error, EOFError, OSError):
+            pass
+    bytes_per_second = settings.audio_bitrate_max * 1000 / 8
+    return os.path.getsize(audio_file_path) / bytes_per_second
+
+
+class TranscriptionBackend(LoggerMixin, abc.ABC):
+    """文字起こしバックエンドの基底クラス"""
+
+    name = "base"
+
+    @abc.abstractmethod
+    async def transcribe(
+        self, audio_file_path: str, priority: str = PRIORITY_NORMAL
+    ) -> TranscriptionResult:
+        """
+        音声チャンクを文字起こし
+
+        Args:
+            audio_file_path: 音声ファイルパス
+            priority: 優先度（"normal" または "low"）
+
+        Returns:
+            TranscriptionResult: テキストとセグメント
+        """
+
+    def accepts_file_size(self, file_size: int) -> bool:
+        """処理可能なファイルサイズか"""
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        return {"backend": self.name}
+
+    async def close(self) -> None:
+        """リソースを解放"""
+
+
+class OpenAITranscriptionBackend(TranscriptionBackend):
+    """OpenAI Whisper APIバックエンド"""
+
+    name = "openai"
+
+    def __init__(self, client_provider: Callable[[], Any]):
+        # クライアントの差し替え（テスト・設定変更）に追従するため都度取得する
+        self._client_provider = client_provider
+
+    def accepts_file_size(self, file_size: int) -> bool:
+        return file_size <= OPENAI_MAX_FILE_SIZE
+
+    async def transcribe(
+        self, audio_file_path: str, priority: str = PRIORITY_NORMAL
+    ) -> TranscriptionResult:
+        # 同時実行枠を確保してから音声ファイルを読み込み・送信（AIMD制御）
+        limiter = get_concurrency_limiter(TRANSCRIPTION_ENDPOINT)
+
+        async def request():
+            async with limiter.slot():
+                async with aiofiles.open(audio_file_path, "rb") as audio_file:
+                    audio_data = await audio_file.read()
+
+                self.logger.info(
+                    f"Whisper API呼び出し開始 - モデル: {settings.whisper_model}, "
+                    f"言語: {settings.whisper_language}"
+                )
+
+                # ファイル拡張子に基づいてMIMEタイプを決定
+                file_ext = os.path.splitext(audio_file_path)[1].lower()
+                mime_type = "audio/mp3" if file_ext == ".mp3" else "audio/wav"
+                filename = f"audio{file_ext}"
+
+                # セグメントのタイムスタンプを得るためverbose_jsonで取得
+                return await self._client_provider().audio.transcriptions.create(
+                    model=settings.whisper_model,
+                    file=(filename, audio_data, mime_type),
+                    language=settings.whisper_language,
+                    response_format="verbose_json",
+                )
+
+        # 429/5xx/タイムアウトはバックオフ付きでリトライ（試行ごとに枠を取り直す）
+        response = await call_with_retry(request, TRANSCRIPTION_ENDPOINT)
+        return parse_verbose_transcription(response, self.name)
+
+
+def _field(item: Any, name: str, default: Any = None) -> Any:
+    if isinstance(item, dict):
+        return item.get(name, default)
+    return getattr(item, name, default)
+
+
+def parse_verbose_transcription(response: Any, backend: str) -> TranscriptionResult:
+    """
+    Whisper APIのレスポンスを TranscriptionResult に変換
+
+    verbose_json のセグメントは SDK のバージョンによって dict または
+    オブジェクトで返るため両方に対応する。テキストのみのレスポンスも受け付ける。
+    """
+    if response is None or isinstance(response, str):
+        return TranscriptionResult(text=response or "", backend=backend)
+
+    segments = [
+        TranscriptionSegment(
+            start=float(_field(segment, "start", 0.0)),
+            end=float(_field(segment, "end", 0.0)),
+            text=str(_field(segment, "text", "")).strip(),
+        )
+        for segment in _field(response, "segments", None) or []
+    ]
+    duration = _field(response, "duration", None)
+    return TranscriptionResult(
+        text=_field(response, "text", "") or "",
+        segments=segments,
+        duration=float(duration) if duration is not None else None,
+        backend=backend,
+    )
+
+
+# ワーカープロセス内でロード済みのエンジン（モデルのロードは1プロセス1回）
+_worker_engines: Dict[Tuple[str, str, str], Any] = {}
+
+
+def _load_local_engine(engine: str, model: str, compute_type: str) -> Any:
+    if engine == "faster_whisper":
+        # CTranslate2ベースのWhisper実装（任意依存）
+        from faster_whisper import WhisperModel
+
+        return WhisperModel(model, device="cpu", compute_type=compute_type)
+    raise ValueError(f"未対応のローカルエンジンです: {engine}")
+
+
+def run_local_transcription(
+    engine: str,
+    model: str,
+    compute_type: str,
+    language: str,
+    audio_file_path: str,
+) -> Dict[str, Any]:
+    """
+    ワーカープロセスで音声ファイルを文字起こし
+
+    プロセス間で受け渡すため、結果はプレーンなdictで返す。
+
+    Args:
+        engine: エンジン名（"faster_whisper" または "stub"）
+        model: モデル名またはモデルディレクトリ
+        compute_type: 量子化タイプ（int8等）
+        language: 言語コード
+        audio_file_path: 音声ファイルパス
+
+    Returns:
+        Dict[str, Any]: text, segments, duration
+    """
+    if engine == "stub":
+        # モデル不要の決定的エンジン（テスト・負荷試験用）
+        from app.devtools.openai_stub import build_transcription
+
+        with open(audio_file_path, "rb") as audio_file:
+            audio_data = audio_file.read()
+        duration = estimate_audio_duration(audio_file_path)
+        result = build_transcription(audio_data, duration)
+        return {
+            "text": result["text"],
+            "segments": [
+                {"start": s["start"], "end": s["end"], "text": s["text"]}
+                for s in result["segments"]
+            ],
+            "duration": result["duration"],
+        }
+
+    key = (engine, model, compute_type)
+    instance = _worker_engines.get(key)
+    if instance is None:
+        instance = _load_local_engine(engine, model, compute_type)
+        _worker_engines[key] = instance
+
+    segments_iter, info = instance.transcribe(audio_file_path, language=language)
+    segments = [
+        {"start": float(s.start), "end": float(s.end), "text": s.text.strip()}
+        for s in segments_iter
+    ]
+    # 日本語・中国語は区切りなしで連結
+    separator = "" if language in ("ja", "zh") else " "
+    return {
+        "text": separator.join(s["text"] for s in segments if s["text"]),
+        "segments": segments,
+        "duration": float(info.duration),
+    }
+
+
+class LocalTranscriptionBackend(TranscriptionBackend):
+    """
+    ローカルCPUバックエンド
+
+    Whisper系モデルをプロセスプールで実行し、API課金とネットワーク遅延なしで
+    文字起こしを行う。
+    """
+
+    name = "local"
+
+    def __init__(
+        self,
+        engine: str = "faster_whisper",
+        model: str = "small",
+        workers: int = 2,
+        compute_type: str = "int8",
+        language: str = "ja",
+    ):
+        if engine not in LOCAL_ENGINES:
+            raise ValueError(f"未対応のローカルエンジンです: {engine}")
+        self.engine = engine
+        self.model = model
+        self.workers = max(1, workers)
+        self.compute_type = compute_type
+        self.language = language
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # スレッドを持つイベントループからのforkを避けるためspawnを使用
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            self.logger.info(
+                f"ローカル文字起こしプール起動: engine={self.engine}, "
+                f"model={self.model}, workers={self.workers}"
+            )
+        return self._executor
+
+    @property
+    def has_capacity(self) -> bool:
+        """待ち行列なしで処理を開始できるか"""
+        return self.in_flight < self.workers
+
+    async def transcribe(
+        self, audio_file_path: str, priority: str = PRIORITY_NORMAL
+    ) -> TranscriptionResult:
+        loop = asyncio.get_running_loop()
+        job = functools.partial(
+            run_local_transcription,
+            self.engine,
+            self.model,
+            self.compute_type,
+            self.language,
+            audio_file_path,
+        )
+
+        self.in_flight += 1
+        try:
+            result = await loop.run_in_executor(self._get_executor(), job)
+            self.completed += 1
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+        return TranscriptionResult(
+            text=result["text"],
+            segments=[TranscriptionSegment(**s) for s in result["segments"]],
+            duration=result["duration"],
+            backend=self.name,
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "engine": self.engine,
+            "model": self.model,
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+    async def close(self) -> None:
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(executor.shutdown, wait=True)
+            )
+
+
+class HybridTranscriptionBackend(TranscriptionBackend):
+    """
+    API・ローカル併用バックエンド
+
+    低優先度のチャンクと短いチャンクはローカルで処理し、それ以外（またはローカルが
+    埋まっている場合）はAPIへ送る。ローカルで失敗した通常優先度のチャンクは
+    APIで再試行する。
+    """
+
+    name = "hybrid"
+
+    def __init__(
+        self,
+        api_backend: TranscriptionBackend,
+        local_backend: LocalTranscriptionBackend,
+        local_max_seconds: float = 120.0,
+    ):
+        self.api_backend = api_backend
+        self.local_backend = local_backend
+        self.local_max_seconds = local_max_seconds
+        self.routed = {"local": 0, "api": 0, "fallback": 0}
+
+    def choose_backend(
+        self, audio_file_path: str, priority: str
+    ) -> TranscriptionBackend:
+        """チャンクの処理先を決定"""
+        if priority == PRIORITY_LOW:
+            return self.local_backend
+        if not self.api_backend.accepts_file_size(os.path.getsize(audio_file_path)):
+            return self.local_backend
+        if (
+            self.local_backend.has_capacity
+            and estimate_audio_duration(audio_file_path) <= self.local_max_seconds
+        ):
+            return self.local_backend
+        return self.api_backend
+
+    async def transcribe(
+        self, audio_file_path: str, priority: str = PRIORITY_NORMAL
+    ) -> TranscriptionResult:
+        backend = self.choose_backend(audio_file_path, priority)
+        if backend is self.api_backend:
+            self.routed["api"] += 1
+            return await self.api_backend.transcribe(audio_file_path, priority)
+
+        self.routed["local"] += 1
+        try:
+            return await self.local_backend.transcribe(audio_file_path, priority)
+        except Exception as e:
+            if priority == PRIORITY_LOW or not self.api_backend.accepts_file_size(
+                os.path.getsize(audio_file_path)
+            ):
+                raise
+            self.logger.warning(
+                f"ローカル文字起こし失敗のためAPIで再試行: {audio_file_path} - {e}"
+            )
+            self.routed["fallback"] += 1
+            return await self.api_backend.transcribe(audio_file_path, priority)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.name,
+            "routed": dict(self.routed),
+            "local": self.local_backend.get_stats(),
+        }
+
+
+# プロセスプールはアプリ全体で共有する
+_local_backend: Optional[LocalTranscriptionBackend] = None
+
+
+def get_local_transcription_backend() -> LocalTranscriptionBackend:
+    """共有のローカルバックエンドを取得（未作成の場合は設定値から作成）"""
+    global _local_backend
+    if _local_backend is None:
+        _local_backend = LocalTranscriptionBackend(
+            engine=settings.local_whisper_engine,
+            model=settings.local_whisper_model,
+            workers=settings.local_whisper_workers,
+            compute_type=settings.local_whisper_compute_type,
+            language=settings.whisper_language,
+        )
+    return _local_backend
+
+
+def create_transcription_backend(
+    client_provider: Callable[[], Any], backend_name: Optional[str] = None
+) -> TranscriptionBackend:
+    """
+    設定に応じた文字起こしバックエンドを作成
+
+    Args:
+        client_provider: OpenAIクライアントを返す関数
+        backend_name: "openai", "local", "hybrid"（省略時は設定値）
+
+    Returns:
+        TranscriptionBackend: バックエンド
+    """
+    backend_name = backend_name or settings.transcription_backend
+    if backend_name == "openai":
+        return OpenAITranscriptionBackend(client_provider)
+    if backend_name == "local":
+        return get_local_transcription_backend()
+    if backend_name == "hybrid":
+        return HybridTranscriptionBackend(
+            OpenAITranscriptionBackend(client_provider),
+            get_local_transcription_backend(),
+            local_max_seconds=settings.hybrid_local_max_seconds,
+        )
+    raise ValueError(f"未対応の文字起こしバックエンドです: {backend_name}")
+
+
+async def shutdown_transcription_backends() -> None:
+    """共有リソース（プロセスプール）を停止"""
+    global _local_backend
+    if _local_backend is not None:
+        backend, _local_backend = _local_backend, None
+        await backend.close()
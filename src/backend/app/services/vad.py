@@ -0,0 +1,370 @@
+"""
+エネルギーベースの音声区間検出（VAD）
+
+ffmpegでデコードした16kHzモノラルPCMからフレームごとのエネルギーを算出し、
+長い無音区間を除去する。除去後の時刻を元メディアの時刻へ戻すための
+オフセットマップを併せて返す。
+
+長時間の音声でもPCM全体をメモリに載せないよう、デコード結果は一時ファイルに
+書き出してメモリマップで参照し、残す区間はブロックごとにエンコーダーへ送る。
+"""
+import asyncio
+import os
+import tempfile
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import ffmpeg
+import numpy as np
+
+from app.config import settings
+from app.services.compute_pool import compute_pool
+from app.utils.logger import get_logger
+from app.utils.subprocess_utils import communicate
+
+logger = get_logger(__name__)
+
+VAD_SAMPLE_RATE = 16000
+
+# 1ブロックあたりのフレーム数（長時間音声でのメモリ使用量を抑える）
+_ENERGY_BLOCK_FRAMES = 8192
+
+# エンコーダーへ送る1ブロックのサンプル数（約30秒）
+_STREAM_BLOCK_SAMPLES = VAD_SAMPLE_RATE * 30
+
+
+class OffsetMap:
+    """
+    無音除去後の時刻 → 元メディアの時刻の対応表
+
+    残した区間を (元の開始秒, 元の終了秒) のリストで保持する。
+    """
+
+    def __init__(self, intervals: Sequence[Tuple[float, float]]):
+        self.intervals: List[Tuple[float, float]] = [
+            (float(start), float(end)) for start, end in intervals
+        ]
+        # 除去後の音声における各区間の開始秒
+        self._trimmed_starts: List[float] = []
+        position = 0.0
+        for start, end in self.intervals:
+            self._trimmed_starts.append(position)
+            position += end - start
+        self.trimmed_duration = position
+
+    def to_original(self, trimmed_seconds: float, end: bool = False) -> float:
+        """
+        除去後の時刻を元メディアの時刻に変換
+
+        区間の境目の時刻は、開始時刻なら後の区間の先頭、終了時刻（end=True）なら
+        前の区間の末尾に対応させる（区間の末尾で終わるセグメントの終了時刻を
+        除去した無音の先まで延ばさない）。
+        """
+        if not self.intervals:
+            return trimmed_seconds
+        search = bisect_left if end else bisect_right
+        index = max(0, search(self._trimmed_starts, trimmed_seconds) - 1)
+        start, end = self.intervals[index]
+        original = start + (trimmed_seconds - self._trimmed_starts[index])
+        return min(max(original, start), end)
+
+    def to_list(self) -> List[List[float]]:
+        """永続化用のリストに変換"""
+        return [[round(start, 3), round(end, 3)] for start, end in self.intervals]
+
+    @classmethod
+    def from_list(cls, data: Optional[Sequence[Sequence[float]]]) -> "OffsetMap":
+        """永続化されたリストから復元"""
+        return cls([(item[0], item[1]) for item in data or []])
+
+
+class SpeechAudio:
+    """
+    VAD処理結果（元のPCMと残す区間・オフセットマップ）
+
+    除去後のPCMは連結せず、blocks() で残す区間をブロックごとに取り出す。
+    """
+
+    def __init__(
+        self,
+        source: np.ndarray,
+        intervals: Sequence[Tuple[int, int]],
+        original_duration: float,
+        sample_rate: int = VAD_SAMPLE_RATE,
+        pcm_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            source: 元のPCM（一時ファイルのメモリマップの場合あり）
+            intervals: 残す区間（サンプル位置の [start, end)）
+            original_duration: 元の長さ（秒）
+            sample_rate: サンプリングレート
+            pcm_path: source の一時ファイル（close() で削除）
+        """
+        self.source = source
+        self.intervals = list(intervals)
+        self.offset_map = OffsetMap(
+            [(start / sample_rate, end / sample_rate) for start, end in self.intervals]
+        )
+        self.original_duration = original_duration
+        self.sample_rate = sample_rate
+        self.pcm_path = pcm_path
+
+    @property
+    def samples(self) -> np.ndarray:
+        """除去後のPCM（全体をメモリに載せる。エンコードには blocks() を使う）"""
+        if not self.intervals:
+            return np.empty(0, dtype=np.int16)
+        return np.concatenate([self.source[start:end] for start, end in self.intervals])
+
+    def blocks(
+        self, block_samples: int = _STREAM_BLOCK_SAMPLES
+    ) -> Iterator[np.ndarray]:
+        """残す区間のPCMを block_samples ずつ取り出す"""
+        for start, end in self.intervals:
+            for position in range(start, end, block_samples):
+                yield self.source[position : min(position + block_samples, end)]
+
+    def close(self) -> None:
+        """デコード結果の一時ファイルを削除"""
+        self.source = np.empty(0, dtype=np.int16)
+        if self.pcm_path and os.path.exists(self.pcm_path):
+            os.remove(self.pcm_path)
+        self.pcm_path = None
+
+    @property
+    def kept_duration(self) -> float:
+        kept = sum(end - start for start, end in self.intervals)
+        return kept / self.sample_rate
+
+    @property
+    def removed_percent(self) -> float:
+        """除去した音声の割合（%）"""
+        if self.original_duration <= 0:
+            return 0.0
+        removed = 1.0 - self.kept_duration / self.original_duration
+        return round(max(0.0, removed) * 100, 1)
+
+
+def frame_energy_db(samples: np.ndarray, frame_length: int) -> np.ndarray:
+    """
+    フレームごとのRMSエネルギー（dBFS）を算出
+
+    Args:
+        samples: int16のPCMサンプル
+        frame_length: 1フレームのサンプル数
+
+    Returns:
+        np.ndarray: フレームごとのエネルギー（dBFS）
+    """
+    frame_count = len(samples) // frame_length
+    if frame_count == 0:
+        return np.empty(0, dtype=np.float32)
+
+    frames = samples[: frame_count * frame_length].reshape(frame_count, frame_length)
+    energy = np.empty(frame_count, dtype=np.float64)
+    for start in range(0, frame_count, _ENERGY_BLOCK_FRAMES):
+        block = frames[start : start + _ENERGY_BLOCK_FRAMES].astype(np.float32)
+        energy[start : start + len(block)] = np.einsum("ij,ij->i", block, block)
+
+    mean_square = energy / frame_length / (32768.0**2)
+    return (10.0 * np.log10(mean_square + 1e-12)).astype(np.float32)
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """True が連続する区間 [start, end) のリスト"""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    return list(zip(edges[0::2].tolist(), edges[1::2].tolist()))
+
+
+def detect_speech(
+    samples: np.ndarray,
+    sample_rate: int = VAD_SAMPLE_RATE,
+    threshold_db: float = -40.0,
+    frame_ms: int = 30,
+    min_silence_ms: int = 1000,
+    padding_ms: int = 200,
+) -> List[Tuple[int, int]]:
+    """
+    音声区間を検出
+
+    しきい値以下のフレームが min_silence_ms 以上続く区間のみを無音として扱い、
+    音声区間の前後には padding_ms の余白を残す。
+
+    Args:
+        samples: int16のPCMサンプル
+        sample_rate: サンプリングレート
+        threshold_db: 音声とみなすエネルギーの下限（dBFS）
+        frame_ms: フレーム長（ミリ秒）
+        min_silence_ms: 除去する無音区間の最小長（ミリ秒）
+        padding_ms: 音声区間の前後に残す余白（ミリ秒）
+
+    Returns:
+        List[Tuple[int, int]]: 残す区間（サンプル位置の [start, end)）
+    """
+    frame_length = max(1, sample_rate * frame_ms // 1000)
+    energy_db = frame_energy_db(samples, frame_length)
+    if len(energy_db) == 0:
+        return [(0, len(samples))] if len(samples) else []
+
+    speech = energy_db > threshold_db
+
+    # 音声フレームの前後に余白を付与（膨張処理）
+    pad_frames = padding_ms // frame_ms
+    if pad_frames > 0 and speech.any():
+        kernel = np.ones(2 * pad_frames + 1, dtype=np.int32)
+        speech = np.convolve(speech.astype(np.int32), kernel, mode="same") > 0
+
+    # 短い無音は除去せず音声として残す
+    min_silence_frames = max(1, min_silence_ms // frame_ms)
+    for start, end in _runs(~speech):
+        if end - start < min_silence_frames:
+            speech[start:end] = True
+
+    intervals = [
+        (start * frame_length, end * frame_length) for start, end in _runs(speech)
+    ]
+    # 末尾の端数サンプルは直前の音声区間に含める
+    if intervals and intervals[-1][1] == len(energy_db) * frame_length:
+        intervals[-1] = (intervals[-1][0], len(samples))
+    return intervals
+
+
+def remove_silence(
+    samples: np.ndarray, sample_rate: int = VAD_SAMPLE_RATE, **options
+) -> SpeechAudio:
+    """
+    無音区間を除去
+
+    Args:
+        samples: int16のPCMサンプル
+        sample_rate: サンプリングレート
+        **options: detect_speech のパラメーター
+
+    Returns:
+        SpeechAudio: 元のPCMと残す区間・オフセットマップ
+    """
+    original_duration = len(samples) / sample_rate
+    intervals = detect_speech(samples, sample_rate, **options)
+    if not intervals:
+        # 音声が検出できない場合は除去しない（誤検出で空にしない）
+        intervals = [(0, len(samples))]
+    return SpeechAudio(samples, intervals, original_duration, sample_rate)
+
+
+async def decode_pcm_to_file(
+    input_path: str, pcm_path: str, sample_rate: int = VAD_SAMPLE_RATE
+) -> np.ndarray:
+    """
+    ffmpegでメディアを16bitモノラルPCMのファイルにデコード
+
+    Returns:
+        np.ndarray: PCMファイルの読み取り専用メモリマップ
+    """
+    stream = ffmpeg.input(input_path)
+    stream = ffmpeg.output(
+        stream, pcm_path, format="s16le", acodec="pcm_s16le", ac=1, ar=str(sample_rate)
+    )
+    cmd = ffmpeg.compile(stream, overwrite_output=True)
+
+    process = await asyncio.create_subprocess_exec(
+        *cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+    )
+    _, stderr = await communicate(process)
+
+    if process.returncode != 0:
+        error_msg = stderr.decode("utf-8") if stderr else "不明なエラー"
+        raise RuntimeError(f"PCMデコードエラー: {error_msg}")
+
+    if os.path.getsize(pcm_path) == 0:
+        return np.empty(0, dtype=np.int16)
+    return np.memmap(pcm_path, dtype=np.int16, mode="r")
+
+
+async def encode_pcm_to_mp3(
+    blocks: Iterable[np.ndarray],
+    output_path: str,
+    bitrate: int,
+    sample_rate: int = VAD_SAMPLE_RATE,
+) -> None:
+    """PCMをブロックごとにffmpegへ送ってMP3にエンコード"""
+    stream = ffmpeg.input("pipe:", format="s16le", ac=1, ar=str(sample_rate))
+    stream = ffmpeg.output(
+        stream,
+        output_path,
+        acodec="libmp3lame",
+        ac=1,
+        ar=str(sample_rate),
+        audio_bitrate=f"{bitrate}k",
+        y=None,
+    )
+    cmd = ffmpeg.compile(stream)
+
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    # 標準エラー出力のバッファが詰まって書き込みが止まらないよう並行して読む
+    stderr_reader = asyncio.ensure_future(process.stderr.read())
+    try:
+        try:
+            for block in blocks:
+                process.stdin.write(block.tobytes())
+                await process.stdin.drain()
+            process.stdin.close()
+        except ConnectionError:
+            # ffmpegが先に終了した場合は終了コードとエラー出力で判定する
+            pass
+        stderr = await stderr_reader
+        await process.wait()
+    except asyncio.CancelledError:
+        stderr_reader.cancel()
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+        raise
+
+    if process.returncode != 0:
+        error_msg = stderr.decode("utf-8") if stderr else "不明なエラー"
+        raise RuntimeError(f"MP3エンコードエラー: {error_msg}")
+
+
+async def extract_speech(input_path: str) -> SpeechAudio:
+    """
+    メディアファイルから無音区間を除去した音声を取得
+
+    Args:
+        input_path: 動画・音声ファイルパス
+
+    Returns:
+        SpeechAudio: 元のPCMと残す区間（使用後に close() で一時ファイルを削除）
+    """
+    os.makedirs(settings.temp_dir, exist_ok=True)
+    fd, pcm_path = tempfile.mkstemp(suffix=".pcm", dir=settings.temp_dir)
+    os.close(fd)
+    try:
+        samples = await decode_pcm_to_file(input_path, pcm_path)
+        # numpy の演算はGILを解放するため、PCMを子プロセスへ複製せずスレッドで実行
+        speech = await compute_pool.run_in_thread(
+            remove_silence,
+            samples,
+            threshold_db=settings.vad_threshold_db,
+            frame_ms=settings.vad_frame_ms,
+            min_silence_ms=settings.vad_min_silence_ms,
+            padding_ms=settings.vad_padding_ms,
+        )
+    except BaseException:
+        os.remove(pcm_path)
+        raise
+    speech.pcm_path = pcm_path
+    logger.info(
+        f"VAD完了: {input_path} - 元の長さ={speech.original_duration:.1f}秒, "
+        f"除去後={speech.kept_duration:.1f}秒 (除去率: {speech.removed_percent}%)"
+    )
+    return speech
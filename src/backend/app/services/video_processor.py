@@ -1,17 +1,46 @@
 import asyncio
 import os
+from typing import Optional
 
 import ffmpeg
 from fractions import Fraction
 
 from app.config import settings
+from app.services.vad import OffsetMap, SpeechAudio, encode_pcm_to_mp3, extract_speech
 from app.utils.file_handler import FileHandler
 from app.utils.logger import LoggerMixin
+from app.utils.subprocess_utils import communicate
 
 
 class VideoProcessor(LoggerMixin):
     """動画処理サービス"""
 
+    def __init__(self):
+        # VADで無音を除去した場合のオフセットマップと除去率（%）
+        self.offset_map: Optional[OffsetMap] = None
+        self.vad_removed_percent: Optional[float] = None
+
+    async def _extract_speech(self, input_path: str) -> Optional[SpeechAudio]:
+        """VADで無音区間を除去（失敗時は除去せずに続行）"""
+        try:
+            speech = await extract_speech(input_path)
+        except Exception as e:
+            self.logger.warning(f"VADに失敗したため無音除去をスキップ: {e}")
+            return None
+
+        self.offset_map = speech.offset_map
+        self.vad_removed_percent = speech.removed_percent
+        return speech
+
+    async def _encode_speech(
+        self, speech: SpeechAudio, audio_path: str, bitrate: int
+    ) -> None:
+        """無音除去後の音声をブロックごとにMP3へエンコードし、一時ファイルを削除"""
+        try:
+            await encode_pcm_to_mp3(speech.blocks(), audio_path, bitrate)
+        finally:
+            speech.close()
+
     async def process_audio_file(self, task_id: str) -> str:
         """音声ファイル（動画・M4A）から音声を抽出・処理"""
         
@@ -58,25 +87,37 @@ class VideoProcessor(LoggerMixin):
             # 出力音声ファイルパス（MP3形式）
             audio_path = FileHandler.get_audio_path(task_id).replace(".wav", ".mp3")
             
-            # M4A圧縮が無効の場合、または小さなファイルの場合は通常の変換
-            if (not settings.m4a_compression_enabled or 
+            speech = (
+                await self._extract_speech(m4a_path) if settings.vad_enabled else None
+            )
+            
+            if speech is not None:
+                # 無音除去後の長さでビットレートを決定してエンコード
+                bitrate = settings.m4a_max_bitrate
+                if settings.m4a_compression_enabled:
+                    bitrate = self._calculate_m4a_optimal_bitrate(
+                        speech.kept_duration, settings.m4a_target_file_size_mb
+                    )
+                await self._encode_speech(speech, audio_path, bitrate)
+            elif (not settings.m4a_compression_enabled or 
                 audio_info['size_mb'] <= settings.m4a_target_file_size_mb):
+                # M4A圧縮が無効の場合、または小さなファイルの場合は通常の変換
                 self.logger.info("M4A圧縮をスキップし、通常変換を実行")
                 await self._run_ffmpeg_m4a_to_mp3_simple(m4a_path, audio_path)
                 return audio_path
-            
-            # 最適なビットレートを計算
-            optimal_bitrate = self._calculate_m4a_optimal_bitrate(
-                audio_info['duration'], 
-                settings.m4a_target_file_size_mb
-            )
-            
-            self.logger.info(f"M4A最適ビットレート: {optimal_bitrate}kbps")
-            
-            # M4AからMP3への変換を実行
-            await self._run_ffmpeg_m4a_to_mp3_optimized(
-                m4a_path, audio_path, optimal_bitrate
-            )
+            else:
+                # 最適なビットレートを計算
+                optimal_bitrate = self._calculate_m4a_optimal_bitrate(
+                    audio_info['duration'], 
+                    settings.m4a_target_file_size_mb
+                )
+                
+                self.logger.info(f"M4A最適ビットレート: {optimal_bitrate}kbps")
+                
+                # M4AからMP3への変換を実行
+                await self._run_ffmpeg_m4a_to_mp3_optimized(
+                    m4a_path, audio_path, optimal_bitrate
+                )
             
             if not os.path.exists(audio_path):
                 self.logger.error(f"M4A変換後のファイルが見つかりません: {audio_path}")
@@ -192,7 +233,7 @@ class VideoProcessor(LoggerMixin):
             stderr=asyncio.subprocess.PIPE
         )
         
-        stdout, stderr = await process.communicate()
+        stdout, stderr = await communicate(process)
         
         if process.returncode != 0:
             error_msg = stderr.decode("utf-8") if stderr else "不明なエラー"
@@ -225,7 +266,7 @@ class VideoProcessor(LoggerMixin):
             stderr=asyncio.subprocess.PIPE
         )
         
-        stdout, stderr = await process.communicate()
+        stdout, stderr = await communicate(process)
         
         if process.returncode != 0:
             error_msg = stderr.decode("utf-8") if stderr else "不明なエラー"
@@ -255,6 +296,13 @@ class VideoProcessor(LoggerMixin):
             video_info = self.get_video_info(video_path)
             duration = video_info.get("duration", 0)
 
+            # VAD有効時は無音除去後の長さでビットレートを決定
+            speech = (
+                await self._extract_speech(video_path) if settings.vad_enabled else None
+            )
+            if speech is not None:
+                duration = speech.kept_duration
+
             # ファイルサイズ制限（20MB）に基づいてビットレートを計算
             target_file_size_mb = settings.audio_max_file_size_mb  # 設定から取得
             max_bitrate = self._calculate_max_bitrate(duration, target_file_size_mb)
@@ -265,7 +313,10 @@ class VideoProcessor(LoggerMixin):
             )
 
             # ffmpegでMP3音声抽出を実行
-            await self._run_ffmpeg_extract_mp3(video_path, audio_path, bitrate)
+            if speech is not None:
+                await self._encode_speech(speech, audio_path, bitrate)
+            else:
+                await self._run_ffmpeg_extract_mp3(video_path, audio_path, bitrate)
 
             if not os.path.exists(audio_path):
                 self.logger.error(f"音声ファイルの生成に失敗: {audio_path}")
@@ -318,7 +369,7 @@ class VideoProcessor(LoggerMixin):
             *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
         )
 
-        stdout, stderr = await process.communicate()
+        stdout, stderr = await communicate(process)
 
         if process.returncode != 0:
             error_msg = stderr.decode("utf-8") if stderr else "不明なエラー"
@@ -351,7 +402,7 @@ class VideoProcessor(LoggerMixin):
             *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
         )
 
-        stdout, stderr = await process.communicate()
+        stdout, stderr = await communicate(process)
 
         if process.returncode != 0:
             error_msg = stderr.decode("utf-8") if stderr else "不明なエラー"
@@ -379,7 +430,10 @@ class VideoProcessor(LoggerMixin):
         # 分割チャンク用のディレクトリを作成
         import tempfile
 
-        chunks_dir = tempfile.mkdtemp(prefix=f"audio_chunks_{task_id}_")
+        # 再起動後も文字起こしを再開できるよう、一時ディレクトリ配下に作成する
+        chunks_dir = tempfile.mkdtemp(
+            prefix=f"audio_chunks_{task_id}_", dir=settings.temp_dir
+        )
 
         try:
             # 音声の総時間を取得
@@ -448,13 +502,22 @@ class VideoProcessor(LoggerMixin):
             *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
         )
 
-        stdout, stderr = await process.communicate()
+        stdout, stderr = await communicate(process)
 
         if process.returncode != 0:
             error_msg = stderr.decode("utf-8") if stderr else "不明なエラー"
             self.logger.error(f"音声分割エラー: {error_msg}")
             raise RuntimeError(f"音声分割エラー: {error_msg}")
 
+    async def probe_duration(self, media_path: str) -> Optional[float]:
+        """メディアの長さ（秒）を取得（取得できない場合はNone）"""
+        try:
+            probe = await asyncio.to_thread(ffmpeg.probe, media_path)
+            return float(probe["format"]["duration"])
+        except Exception as e:
+            self.logger.warning(f"メディアの長さを取得できません: {media_path} - {e}")
+            return None
+
     def get_video_info(self, video_path: str) -> dict:
         """動画の情報を取得"""
         try:
@@ -13,6 +13,7 @@ from app.models.chat import (
     MessageType,
     MessageIntent
 )
+from app.services.compute_pool import compute_pool
 from app.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -36,6 +37,8 @@ class ChatPersistentStore:
         self._edit_history_cache: Dict[str, EditHistory] = {}  # edit_id -> edit_history
         self._stats_cache: ChatStats = ChatStats()
         
+        self._writer = compute_pool.json_writer("chat_store")
+
         # 起動時にデータをロード
         self._load_data()
 
@@ -107,9 +110,6 @@ class ChatPersistentStore:
                 except Exception as e:
                     logger.warning(f"セッションの保存に失敗: {session_id} - {e}")
                     
-            with open(self.sessions_file, 'w', encoding='utf-8') as f:
-                json.dump(sessions_data, f, ensure_ascii=False, indent=2, default=str)
-
             # メッセージデータの保存
             messages_data = {}
             for session_id, messages in self._messages_cache.items():
@@ -118,9 +118,6 @@ class ChatPersistentStore:
                 except Exception as e:
                     logger.warning(f"メッセージの保存に失敗: {session_id} - {e}")
                     
-            with open(self.messages_file, 'w', encoding='utf-8') as f:
-                json.dump(messages_data, f, ensure_ascii=False, indent=2, default=str)
-
             # 編集履歴データの保存
             edit_history_data = {}
             for edit_id, edit_history in self._edit_history_cache.items():
@@ -129,12 +126,14 @@ class ChatPersistentStore:
                 except Exception as e:
                     logger.warning(f"編集履歴の保存に失敗: {edit_id} - {e}")
                     
-            with open(self.edit_history_file, 'w', encoding='utf-8') as f:
-                json.dump(edit_history_data, f, ensure_ascii=False, indent=2, default=str)
-
-            # 統計データの保存
-            with open(self.stats_file, 'w', encoding='utf-8') as f:
-                json.dump(self._stats_cache.dict(), f, ensure_ascii=False, indent=2, default=str)
+            # JSONへの変換と書き込みは計算用プールで行う
+            options = {"ensure_ascii": False, "indent": 2, "default": str}
+            self._writer.save([
+                (str(self.sessions_file), sessions_data, options),
+                (str(self.messages_file), messages_data, options),
+                (str(self.edit_history_file), edit_history_data, options),
+                (str(self.stats_file), self._stats_cache.dict(), options),
+            ])
                 
             logger.debug(f"チャットデータを保存: {len(self._sessions_cache)}セッション, {sum(len(msgs) for msgs in self._messages_cache.values())}メッセージ")
             
@@ -1,17 +1,76 @@
-"""永続化タスクストア"""
+"""
+永続化タスクストア
+
+同じホストで storage を共有する複数のプロセス（レプリカ）が同じファイルに
+保存するため、ファイル全体を上書きせず、ファイルロックを取ってタスク単位で
+マージする（ネットワークファイルシステム上の共有には対応しない）。
+"""
+import fcntl
 import json
 import os
+import time
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
 from app.models import MinutesTask, TaskStatus, ProcessingStepName, ProcessingStepStatus, ProcessingStep
+from app.services.compute_pool import compute_pool, write_json_files
 from app.utils.logger import get_logger
 from app.config import settings
 
 logger = get_logger(__name__)
 
 
+def _read_json(path: str) -> dict:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def merge_store_files(snapshot: dict) -> None:
+    """
+    このプロセスのタスクをファイルの内容にマージして書き出す
+
+    他のプロセスが保存したタスクは残し、同じタスクは保存時刻（saved_at）の
+    新しい方を、削除したタスクは削除時刻より古い記録を消す。
+    """
+    tasks_file = snapshot["tasks_file"]
+    sessions_file = snapshot["sessions_file"]
+    with open(f"{tasks_file}.lock", "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            tasks = _read_json(tasks_file)
+            sessions = _read_json(sessions_file)
+            for task_id, data in snapshot["tasks"].items():
+                current = tasks.get(task_id)
+                if current is None or current.get("saved_at", 0) <= data["saved_at"]:
+                    tasks[task_id] = data
+            for task_id, deleted_at in snapshot["deleted"].items():
+                current = tasks.get(task_id)
+                if current is not None and current.get("saved_at", 0) <= deleted_at:
+                    del tasks[task_id]
+            for session_id, task_ids in snapshot["sessions"].items():
+                sessions.setdefault(session_id, {}).update(task_ids)
+            sessions = {
+                session_id: {
+                    task_id: task_id for task_id in task_ids if task_id in tasks
+                }
+                for session_id, task_ids in sessions.items()
+            }
+            write_json_files([
+                (tasks_file, tasks,
+                 {"ensure_ascii": False, "indent": 2, "default": str}),
+                (sessions_file,
+                 {session_id: task_ids for session_id, task_ids in sessions.items()
+                  if task_ids},
+                 {"ensure_ascii": False, "indent": 2}),
+            ])
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
 class PersistentTaskStore:
     """タスクの永続化ストア（JSONファイルベース）"""
 
@@ -24,7 +83,15 @@ class PersistentTaskStore:
         # メモリ内キャッシュ
         self._tasks_cache: Dict[str, MinutesTask] = {}
         self._sessions_cache: Dict[str, Dict[str, str]] = {}  # session_id -> {task_id -> task_id}
-        
+        # task_id -> 保存時刻（他のプロセスの保存とのマージ用）
+        self._versions: Dict[str, float] = {}
+        # task_id -> 削除時刻（他のプロセスが保存した同じタスクを消す）
+        self._deleted: Dict[str, float] = {}
+
+        self._writer = compute_pool.json_writer(
+            "persistent_store", merge_store_files
+        )
+
         # 起動時にデータをロード
         self._load_data()
 
@@ -56,7 +123,7 @@ class PersistentTaskStore:
             logger.error(f"データ読み込みエラー: {e}", exc_info=True)
 
     def _save_data(self) -> None:
-        """データをファイルに保存"""
+        """このプロセスのタスクをファイルにマージして保存"""
         try:
             # タスクデータの保存
             tasks_data = {}
@@ -66,12 +133,19 @@ class PersistentTaskStore:
                 except Exception as e:
                     logger.warning(f"タスクの保存に失敗: {task_id} - {e}")
                     
-            with open(self.tasks_file, 'w', encoding='utf-8') as f:
-                json.dump(tasks_data, f, ensure_ascii=False, indent=2, default=str)
+            sessions_data = {
+                session_id: dict(task_ids)
+                for session_id, task_ids in self._sessions_cache.items()
+            }
 
-            # セッションデータの保存
-            with open(self.sessions_file, 'w', encoding='utf-8') as f:
-                json.dump(self._sessions_cache, f, ensure_ascii=False, indent=2)
+            # マージと書き込みは計算用プールで行う
+            self._writer.save({
+                "tasks_file": str(self.tasks_file),
+                "sessions_file": str(self.sessions_file),
+                "tasks": tasks_data,
+                "sessions": sessions_data,
+                "deleted": dict(self._deleted),
+            })
                 
             logger.debug(f"データを保存: {len(self._tasks_cache)}件のタスク, {len(self._sessions_cache)}個のセッション")
             
@@ -91,7 +165,9 @@ class PersistentTaskStore:
             "transcription": task.transcription,
             "minutes": task.minutes,
             "error_message": task.error_message,
+            "media_duration": task.media_duration,
             "processing_duration": getattr(task, 'processing_duration', None),
+            "saved_at": self._versions.get(task.task_id, 0.0),
             "steps": [
                 {
                     "name": step.name.value,
@@ -118,6 +194,8 @@ class PersistentTaskStore:
         task.transcription = data.get("transcription")
         task.minutes = data.get("minutes")
         task.error_message = data.get("error_message")
+        task.media_duration = data.get("media_duration")
+        self._versions[task.task_id] = data.get("saved_at", 0.0)
         # processing_duration field doesn't exist in MinutesTask model - skip it
         
         # ステップの復元
@@ -133,9 +211,18 @@ class PersistentTaskStore:
             
         return task
 
+    def _touch(self, task_id: str) -> None:
+        self._versions[task_id] = time.time()
+        self._deleted.pop(task_id, None)
+
+    def _forget(self, task_id: str) -> None:
+        self._versions.pop(task_id, None)
+        self._deleted[task_id] = time.time()
+
     def add_task(self, session_id: str, task: MinutesTask) -> None:
         """タスクを追加"""
         self._tasks_cache[task.task_id] = task
+        self._touch(task.task_id)
         
         if session_id not in self._sessions_cache:
             self._sessions_cache[session_id] = {}
@@ -148,6 +235,7 @@ class PersistentTaskStore:
         """タスクを更新"""
         if task.task_id in self._tasks_cache:
             self._tasks_cache[task.task_id] = task
+            self._touch(task.task_id)
             self._save_data()
             logger.debug(f"タスクを永続化ストアで更新: {session_id[:8]}... -> {task.task_id[:8]}...")
 
@@ -181,7 +269,8 @@ class PersistentTaskStore:
             # タスク自体を削除
             if task_id in self._tasks_cache:
                 del self._tasks_cache[task_id]
-                
+            self._forget(task_id)
+
             self._save_data()
             logger.info(f"タスクを永続化ストアから削除: {session_id[:8]}... -> {task_id[:8]}...")
             return True
@@ -194,6 +283,33 @@ class PersistentTaskStore:
                 task_id in self._sessions_cache[session_id] and
                 task_id in self._tasks_cache)
 
+    def load_task_from_disk(self, task_id: str) -> Optional[Tuple[str, MinutesTask]]:
+        """
+        他のプロセス（レプリカ）が保存したタスクをファイルから読み込み、キャッシュに追加
+
+        Returns:
+            (セッションID, タスク)、見つからない場合はNone
+        """
+        try:
+            with open(self.tasks_file, 'r', encoding='utf-8') as f:
+                task_dict = json.load(f).get(task_id)
+            with open(self.sessions_file, 'r', encoding='utf-8') as f:
+                sessions = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"タスクの再読み込みに失敗: {task_id} - {e}")
+            return None
+
+        session_id = next(
+            (sid for sid, tasks in sessions.items() if task_id in tasks), None
+        )
+        if task_dict is None or session_id is None:
+            return None
+
+        task = self._dict_to_task(task_dict)
+        self._tasks_cache[task_id] = task
+        self._sessions_cache.setdefault(session_id, {})[task_id] = task_id
+        return session_id, task
+
     def get_all_tasks(self) -> Dict[str, MinutesTask]:
         """全タスクを取得"""
         return self._tasks_cache.copy()
@@ -220,7 +336,8 @@ class PersistentTaskStore:
                         
             # タスク自体を削除
             del self._tasks_cache[task_id]
-            
+            self._forget(task_id)
+
         if old_task_ids:
             self._save_data()
             logger.info(f"古いタスクをクリーンアップ: {len(old_task_ids)}件")
@@ -1,4 +1,6 @@
+import glob
 import os
+import shutil
 import uuid
 from pathlib import Path
 from typing import Optional
@@ -139,6 +141,11 @@ class FileHandler:
         if os.path.exists(temp_audio_mp3):
             os.remove(temp_audio_mp3)
 
+        # 分割チャンクのディレクトリ（キャンセル・タイムアウトで途中終了した場合）
+        chunk_dirs = os.path.join(settings.temp_dir, f"audio_chunks_{task_id}_*")
+        for chunks_dir in glob.glob(chunk_dirs):
+            shutil.rmtree(chunks_dir, ignore_errors=True)
+
     @staticmethod
     def get_file_path(task_id: str) -> Optional[str]:
         """タスクIDからファイルパスを取得"""
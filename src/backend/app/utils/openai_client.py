@@ -0,0 +1,25 @@
+"""OpenAIクライアント生成の共通設定"""
+from typing import Any, Dict
+
+from app.config import settings
+
+
+def openai_client_kwargs(**overrides: Any) -> Dict[str, Any]:
+    """
+    OpenAIクライアントの初期化引数を生成
+
+    openai_base_url が設定されている場合はその接続先（ローカルのスタブサーバー等）を
+    使用する。SDK の自動リトライは無効にする（リトライは call_with_retry が行い、
+    SDK 内部で再送すると同時実行制御に 429 が届かず、再送回数も掛け算で増える）。
+
+    Args:
+        **overrides: 追加・上書きする初期化引数（timeout等）
+
+    Returns:
+        Dict[str, Any]: AsyncOpenAI に渡す引数
+    """
+    kwargs: Dict[str, Any] = {"api_key": settings.openai_api_key, "max_retries": 0}
+    if settings.openai_base_url:
+        kwargs["base_url"] = settings.openai_base_url
+    kwargs.update(overrides)
+    return kwargs
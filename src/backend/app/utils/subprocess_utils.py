@@ -0,0 +1,31 @@
+"""子プロセス実行の共通処理"""
+import asyncio
+from typing import Optional, Tuple
+
+
+async def communicate(
+    process: asyncio.subprocess.Process, input: Optional[bytes] = None
+) -> Tuple[bytes, bytes]:
+    """
+    process.communicate() を実行し、キャンセル時は子プロセスを強制終了する
+
+    asyncio のキャンセルでは子プロセスが止まらないため、タスクのキャンセルや
+    タイムアウト後も ffmpeg が動き続けてしまう。
+
+    Args:
+        process: asyncio.create_subprocess_exec で起動したプロセス
+        input: 標準入力に渡すデータ
+
+    Returns:
+        Tuple[bytes, bytes]: (標準出力, 標準エラー出力)
+    """
+    try:
+        return await process.communicate(input)
+    except asyncio.CancelledError:
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+        raise
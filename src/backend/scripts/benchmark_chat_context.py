@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+チャットのコンテキスト方式（full / retrieval）のベンチマーク
+
+長時間会議を模した文字起こしに対して同じ質問を両方式で送り、入力トークン数と
+レイテンシを比較する。API呼び出しはプロセス内のOpenAI互換スタブに送るため課金は
+発生しない。スタブのプレフィル時間（入力1,000トークンあたりの秒数）を指定すると、
+入力長に比例するレイテンシを再現できる。
+
+使い方:
+    python scripts/benchmark_chat_context.py --minutes 120 --prefill-per-1k-tokens 0.05
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+# 設定の読み込みにAPIキーが必要なため、未設定時はダミー値を使う（通信先はスタブ）
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import httpx
+import openai
+
+from app.config import settings
+from app.devtools.openai_stub import StubConfig, create_stub_app
+from app.models.chat import ChatSession
+from app.services.openai_service import OpenAIService
+from app.services.token_counter import token_counter
+
+# 議題ごとの発言テンプレート（{n} は通し番号）
+TOPICS = {
+    "予算": "来期の予算案について、広告費を{n}百万円削減し開発費に回す案を検討しました。",
+    "採用": "採用計画では、エンジニアを{n}名増員し、面接は人事部が調整します。",
+    "リリース": "新機能のリリースは第{n}週を目標とし、ステージング環境で最終確認を行います。",
+    "障害": "先週の障害は{n}時間続き、原因はデータベースの接続数上限でした。",
+    "顧客": "顧客アンケートの満足度は{n}ポイント上昇し、サポート対応が評価されました。",
+    "セキュリティ": "セキュリティ監査で指摘された{n}件の脆弱性は今月中に修正します。",
+    "営業": "営業部の受注件数は{n}件で、大型案件の契約が来月に予定されています。",
+    "研修": "新人研修は{n}日間で、ハンズオン形式の演習を追加します。",
+}
+SPEAKERS = ["田中", "佐藤", "鈴木", "高橋", "山田"]
+
+QUESTIONS = [
+    "予算の削減額はいくらですか？",
+    "エンジニアは何名採用しますか？",
+    "障害の原因は何でしたか？",
+    "セキュリティ監査の指摘は何件ありましたか？",
+    "新人研修は何日間ですか？",
+]
+
+# 日本語の会話はおよそ1分あたり300文字
+CHARS_PER_MINUTE = 300
+
+
+def build_transcript(minutes: int) -> str:
+    """議題が順に移り変わる会議の文字起こしを生成"""
+    topics = list(TOPICS.items())
+    sentences = []
+    total_chars = 0
+    n = 0
+    while total_chars < minutes * CHARS_PER_MINUTE:
+        # 数分ごとに議題が切り替わる
+        topic, template = topics[(n // 12) % len(topics)]
+        speaker = SPEAKERS[n % len(SPEAKERS)]
+        sentence = f"{speaker}さん：{template.format(n=n % 9 + 1)}"
+        sentences.append(sentence)
+        total_chars += len(sentence)
+        n += 1
+    return "\n".join(sentences)
+
+
+def build_minutes() -> str:
+    """議題一覧のみの簡易的な議事録"""
+    lines = ["# 定例会議 議事録", "", "## 議題"]
+    lines.extend(f"- {topic}" for topic in TOPICS)
+    return "\n".join(lines)
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_mode(mode, service, session, client, repeat):
+    """1つの方式で全質問を送信し、計測結果を返す"""
+    settings.chat_context_mode = mode
+    prompt_tokens, build_times, latencies = [], [], []
+
+    for _ in range(repeat):
+        for question in QUESTIONS:
+            start = time.perf_counter()
+            transcription, _ = service._build_transcription_context(session, question)
+            system_prompt = service.prompt_manager["get_chat_system_prompt"](
+                transcription=transcription, minutes=session.minutes
+            )
+            user_prompt = service.prompt_manager["build_user_prompt"](question, "")
+            build_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await client.chat.completions.create(
+                model=settings.openai_chat_model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+            )
+            latencies.append(time.perf_counter() - start)
+            prompt_tokens.append(token_counter.count(system_prompt + user_prompt))
+
+    return {
+        "mode": mode,
+        "prompt_tokens": statistics.mean(prompt_tokens),
+        "build_ms": statistics.mean(build_times) * 1000,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+    }
+
+
+async def main_async(args):
+    stub = create_stub_app(
+        StubConfig(
+            latency_distribution="fixed",
+            latency_mean=args.latency_mean,
+            chat_prefill_per_1k_tokens=args.prefill_per_1k_tokens,
+        )
+    )
+    client = openai.AsyncOpenAI(
+        api_key="benchmark",
+        base_url="http://stub/v1",
+        http_client=httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=stub), base_url="http://stub"
+        ),
+        max_retries=0,
+    )
+
+    transcript = build_transcript(args.minutes)
+    session = ChatSession(
+        task_id="benchmark", transcription=transcript, minutes=build_minutes()
+    )
+    service = OpenAIService()
+    settings.chat_retrieval_token_budget = args.token_budget
+    settings.chat_retrieval_top_k = args.top_k
+
+    print(
+        f"文字起こし: {len(transcript):,}文字 "
+        f"({token_counter.count(transcript):,}トークン"
+        f"{'' if token_counter.is_exact else '・概算'}), "
+        f"質問 {len(QUESTIONS) * args.repeat}件"
+    )
+    results = [
+        await run_mode(mode, service, session, client, args.repeat)
+        for mode in ("full", "retrieval")
+    ]
+
+    print(f"{'mode':<10}{'入力トークン':>12}{'構築(ms)':>10}{'p50(s)':>9}{'p95(s)':>9}")
+    for result in results:
+        print(
+            f"{result['mode']:<10}{result['prompt_tokens']:>12,.0f}"
+            f"{result['build_ms']:>10.2f}{result['p50']:>9.3f}{result['p95']:>9.3f}"
+        )
+    full, retrieval = results
+    print(
+        f"入力トークン削減率: "
+        f"{1 - retrieval['prompt_tokens'] / full['prompt_tokens']:.1%}"
+    )
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="チャットコンテキスト方式のベンチマーク")
+    parser.add_argument("--minutes", type=int, default=120, help="会議の長さ（分）")
+    parser.add_argument("--repeat", type=int, default=3, help="質問セットの繰り返し回数")
+    parser.add_argument(
+        "--token-budget", type=int, default=settings.chat_retrieval_token_budget
+    )
+    parser.add_argument("--top-k", type=int, default=settings.chat_retrieval_top_k)
+    parser.add_argument(
+        "--latency-mean", type=float, default=0.05, help="スタブの固定レイテンシ（秒）"
+    )
+    parser.add_argument(
+        "--prefill-per-1k-tokens",
+        type=float,
+        default=0.02,
+        help="入力1,000トークンあたりに加算する処理時間（秒）",
+    )
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
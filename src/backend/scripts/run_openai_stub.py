@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+OpenAI互換スタブサーバー起動スクリプト
+
+バックエンドを OPENAI_BASE_URL=http://<host>:<port>/v1 で起動すると、
+文字起こし・議事録生成・チャットがすべてスタブに向く。
+"""
+import argparse
+import sys
+from pathlib import Path
+
+# プロジェクトルートをパスに追加
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import uvicorn
+
+from app.devtools.openai_stub import LATENCY_DISTRIBUTIONS, StubConfig, create_stub_app
+
+
+def main():
+    """メイン関数"""
+    parser = argparse.ArgumentParser(description="OpenAI互換スタブサーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument(
+        "--latency-distribution", choices=LATENCY_DISTRIBUTIONS, default="lognormal"
+    )
+    parser.add_argument("--latency-mean", type=float, default=0.2, help="平均レイテンシ（秒）")
+    parser.add_argument(
+        "--latency-jitter", type=float, default=0.5, help="uniformは±割合、lognormalはσ"
+    )
+    parser.add_argument(
+        "--realtime-factor",
+        type=float,
+        default=0.0,
+        help="文字起こしで音声1秒あたりに加算する処理時間（秒）",
+    )
+    parser.add_argument(
+        "--prefill-per-1k-tokens",
+        type=float,
+        default=0.0,
+        help="チャットで入力1,000トークンあたりに加算する処理時間（秒）",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500を返す確率")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="429を返す確率")
+    parser.add_argument(
+        "--retry-after", type=float, default=1.0, help="429時のRetry-After（秒）"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency_distribution=args.latency_distribution,
+        latency_mean=args.latency_mean,
+        latency_jitter=args.latency_jitter,
+        transcription_realtime_factor=args.realtime_factor,
+        chat_prefill_per_1k_tokens=args.prefill_per_1k_tokens,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+
+    print(f"🧪 OpenAIスタブサーバー起動: http://{args.host}:{args.port}/v1")
+    print(f"   バックエンド側: export OPENAI_BASE_URL=http://{args.host}:{args.port}/v1")
+    uvicorn.run(create_stub_app(config), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import asyncio
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from app.services.adaptive_concurrency import (
+    AdaptiveConcurrencyLimiter,
+    classify_api_error,
+    get_concurrency_limiter,
+    get_concurrency_stats,
+    get_retry_after,
+    reset_concurrency_limiters,
+)
+
+
+class FakeAPIError(Exception):
+    """ステータスコード付きのAPI例外"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = Mock()
+        self.response.headers = headers or {}
+
+
+class TestErrorClassification:
+    """API例外分類のテスト"""
+
+    def test_classify_throttle(self):
+        assert classify_api_error(FakeAPIError(429)) == "throttle"
+
+    def test_classify_server_error(self):
+        assert classify_api_error(FakeAPIError(503)) == "server_error"
+
+    def test_classify_timeout(self):
+        assert classify_api_error(asyncio.TimeoutError()) == "timeout"
+
+    def test_classify_other(self):
+        assert classify_api_error(ValueError("bad")) == "error"
+
+    def test_retry_after_seconds(self):
+        error = FakeAPIError(429, {"retry-after": "2"})
+        assert get_retry_after(error) == 2.0
+
+    def test_retry_after_milliseconds_preferred(self):
+        error = FakeAPIError(429, {"retry-after-ms": "1500", "retry-after": "2"})
+        assert get_retry_after(error) == 1.5
+
+    def test_retry_after_missing(self):
+        assert get_retry_after(ValueError("no response")) is None
+
+
+class TestAdaptiveConcurrencyLimiter:
+    """AdaptiveConcurrencyLimiterのテスト"""
+
+    def test_additive_increase(self):
+        """正常応答で加算的に増加"""
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=2, max_limit=10)
+
+        # 上限2から始めて約1ラウンド分の成功で+1
+        for _ in range(3):
+            limiter.record_success(0.1)
+
+        assert limiter.current_limit == 3
+
+    def test_increase_capped_at_max(self):
+        """上限を超えて増加しない"""
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=3, max_limit=3)
+
+        for _ in range(20):
+            limiter.record_success(0.1)
+
+        assert limiter.current_limit == 3
+
+    def test_no_increase_when_latency_degrades(self):
+        """レイテンシ悪化時は増加しない"""
+        limiter = AdaptiveConcurrencyLimiter(
+            "test", initial_limit=2, max_limit=10, latency_tolerance=2.0
+        )
+        limiter.record_success(0.1)
+        before = limiter.limit
+
+        limiter.record_success(1.0)
+
+        assert limiter.limit == before
+
+    def test_multiplicative_decrease_on_throttle(self):
+        """429で乗算的に減少し、Retry-Afterを記録"""
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=8, max_limit=16)
+
+        limiter.record_failure(FakeAPIError(429, {"retry-after": "5"}))
+
+        assert limiter.current_limit == 4
+        assert limiter.throttled == 1
+        assert limiter.blocked_until > time.monotonic() + 4
+
+    def test_decreases_once_per_congestion_window(self):
+        """同じ輻輳で失敗した呼び出しごとには減らさないテスト"""
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=16, max_limit=16)
+        started = time.monotonic()
+
+        # 減少前に開始していた呼び出しが続けて429を受ける
+        for _ in range(4):
+            limiter.record_failure(FakeAPIError(429), started)
+
+        assert limiter.current_limit == 8
+        assert limiter.throttled == 4
+
+        # 減少後に開始した呼び出しの失敗は次の輻輳として扱う
+        limiter.record_failure(asyncio.TimeoutError(), time.monotonic())
+
+        assert limiter.current_limit == 4
+
+    def test_decrease_on_timeout_respects_min(self):
+        """タイムアウトで減少するが下限は維持"""
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=2, min_limit=2)
+
+        limiter.record_failure(asyncio.TimeoutError())
+
+        assert limiter.current_limit == 2
+        assert limiter.timeouts == 1
+
+    def test_non_adaptive_keeps_limit(self):
+        """適応制御無効時は上限を変えない"""
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=4, adaptive=False)
+
+        limiter.record_failure(FakeAPIError(429))
+        limiter.record_success(0.1)
+
+        assert limiter.current_limit == 4
+
+    @pytest.mark.asyncio
+    async def test_in_flight_bounded_by_limit(self):
+        """同時実行数が上限を超えない"""
+        limiter = AdaptiveConcurrencyLimiter(
+            "test", initial_limit=2, max_limit=2, adaptive=False
+        )
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            async with limiter.slot():
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*[call() for _ in range(6)])
+
+        assert peak == 2
+        assert limiter.in_flight == 0
+        assert limiter.successes == 6
+
+    @pytest.mark.asyncio
+    async def test_slot_records_failure_and_reraises(self):
+        """スロット内の例外を記録して再送出"""
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=4)
+
+        with pytest.raises(FakeAPIError):
+            async with limiter.slot():
+                raise FakeAPIError(429)
+
+        assert limiter.throttled == 1
+        assert limiter.in_flight == 0
+
+    @pytest.mark.asyncio
+    async def test_retry_after_delays_acquire(self):
+        """Retry-After期間中は新しい呼び出しを開始しない"""
+        limiter = AdaptiveConcurrencyLimiter("test", initial_limit=4)
+        limiter.blocked_until = time.monotonic() + 0.1
+
+        start = time.monotonic()
+        await limiter.acquire()
+        await limiter.release()
+
+        assert time.monotonic() - start >= 0.09
+
+
+class TestLimiterRegistry:
+    """エンドポイント別リミッターのテスト"""
+
+    def test_same_endpoint_returns_same_limiter(self):
+        reset_concurrency_limiters()
+        try:
+            first = get_concurrency_limiter("chat.completions")
+            second = get_concurrency_limiter("chat.completions")
+            other = get_concurrency_limiter("audio.transcriptions")
+
+            assert first is second
+            assert first is not other
+            assert set(get_concurrency_stats()) == {
+                "chat.completions",
+                "audio.transcriptions",
+            }
+        finally:
+            reset_concurrency_limiters()
@@ -0,0 +1,144 @@
+from collections import namedtuple
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.admission import (
+    REJECT_BACKLOG,
+    REJECT_DISK,
+    REJECT_QUEUE_FULL,
+    AdmissionController,
+    AdmissionRejected,
+)
+
+DiskUsage = namedtuple("DiskUsage", "total used free")
+MB = 1024 * 1024
+
+
+def make_controller(tmp_path, backlog=None, **options):
+    defaults = dict(
+        max_queued_tasks=10,
+        max_backlog_seconds=600.0,
+        min_free_bytes=100 * MB,
+        temp_space_factor=1.5,
+        retry_after_seconds=60,
+        backlog_provider=(lambda: backlog) if backlog is not None else None,
+    )
+    defaults.update(options)
+    return AdmissionController(
+        str(tmp_path / "uploads"), str(tmp_path / "temp"), **defaults
+    )
+
+
+class TestAdmissionController:
+    def test_rejects_when_queue_is_full(self, tmp_path):
+        """待機・処理中のタスクが上限に達したら429で断るテスト"""
+        controller = make_controller(
+            tmp_path, {"tasks": 10, "estimated_wait_seconds": 300.0}
+        )
+
+        with pytest.raises(AdmissionRejected) as exc_info:
+            controller.admit(10 * MB)
+
+        error = exc_info.value
+        assert (error.reason, error.status_code) == (REJECT_QUEUE_FULL, 429)
+        assert error.retry_after == 300
+        assert error.estimated_wait_seconds == 300.0
+        assert controller.get_stats()["rejected"] == {REJECT_QUEUE_FULL: 1}
+
+    def test_rejects_long_backlog(self, tmp_path):
+        """推定待ち時間が上限を超えたら超えた分を Retry-After にするテスト"""
+        controller = make_controller(
+            tmp_path, {"tasks": 3, "estimated_wait_seconds": 1000.0}
+        )
+
+        with pytest.raises(AdmissionRejected) as exc_info:
+            controller.admit(10 * MB)
+
+        error = exc_info.value
+        assert (error.reason, error.status_code) == (REJECT_BACKLOG, 429)
+        assert error.retry_after == 400
+        assert "約17分" in error.detail
+
+    def test_admits_when_wait_is_unknown(self, tmp_path):
+        """処理速度が分からない間は待機数だけで判定するテスト"""
+        controller = make_controller(
+            tmp_path, {"tasks": 3, "estimated_wait_seconds": None}
+        )
+
+        controller.admit(10 * MB).release()
+
+        assert controller.get_stats() == {
+            "admitted": 1,
+            "rejected": {},
+            "reserved_bytes": 0,
+        }
+
+    def test_reserves_disk_for_declared_size(self, tmp_path):
+        """受付中のアップロードの申告サイズを空き容量から差し引くテスト"""
+        controller = make_controller(tmp_path)
+        usage = DiskUsage(total=10_000 * MB, used=0, free=600 * MB)
+
+        with patch("app.services.admission.shutil.disk_usage", return_value=usage):
+            # upload 200MB + temp 300MB を引いても 100MB 残る
+            first = controller.admit(200 * MB)
+            assert controller.get_stats()["reserved_bytes"] == 200 * MB
+
+            # 予約分を差し引くと足りない
+            with pytest.raises(AdmissionRejected) as exc_info:
+                controller.admit(200 * MB)
+            assert (exc_info.value.reason, exc_info.value.status_code) == (
+                REJECT_DISK,
+                503,
+            )
+            assert exc_info.value.retry_after == 60
+
+            first.release()
+            first.release()
+            assert controller.get_stats()["reserved_bytes"] == 0
+            controller.admit(200 * MB).release()
+
+    def test_backlog_provider_error_does_not_block(self, tmp_path):
+        def broken():
+            raise RuntimeError("journal unavailable")
+
+        controller = make_controller(tmp_path, backlog_provider=broken)
+
+        controller.admit(None).release()
+        assert controller.admitted == 1
+
+
+class TestUploadAdmissionMiddleware:
+    def test_rejected_upload_returns_retry_after(self):
+        """受け付けられないアップロードは本文を処理せず Retry-After を返すテスト"""
+        rejected = AdmissionRejected(
+            REJECT_BACKLOG, 429, "混雑しています", 400, 1000.0
+        )
+        with patch(
+            "app.services.admission.admission_controller.admit",
+            side_effect=rejected,
+        ) as admit, patch(
+            "app.api.endpoints.minutes.FileHandler.save_uploaded_file"
+        ) as save:
+            response = TestClient(app).post(
+                "/api/v1/minutes/upload",
+                files={"file": ("meeting.mp4", b"0" * 1024, "video/mp4")},
+            )
+
+        assert response.status_code == 429
+        assert response.headers["Retry-After"] == "400"
+        assert response.json() == {
+            "detail": "混雑しています",
+            "estimated_wait_seconds": 1000.0,
+        }
+        assert admit.call_args.args[0] > 1024
+        save.assert_not_called()
+
+    def test_other_requests_are_not_checked(self):
+        with patch("app.services.admission.admission_controller.admit") as admit:
+            response = TestClient(app).get("/health")
+
+        assert response.status_code == 200
+        admit.assert_not_called()
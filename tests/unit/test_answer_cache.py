@@ -0,0 +1,153 @@
+import uuid
+from unittest.mock import AsyncMock, patch
+
+from fastapi.testclient import TestClient
+
+from app.main import create_app
+from app.models.chat import ChatSession, Citation
+from app.services.answer_cache import AnswerCache, answer_cache, normalize_question
+
+
+class TestNormalizeQuestion:
+    def test_near_identical_questions_share_key(self):
+        variants = [
+            "アクションアイテムは？",
+            "アクションアイテムは何ですか？",
+            "アクションアイテムを教えてください。",
+            "アクションアイテム",
+            " アクションアイテムは? ",
+        ]
+
+        assert {normalize_question(question) for question in variants} == {
+            "アクションアイテム"
+        }
+
+    def test_width_and_case_are_normalized(self):
+        assert normalize_question("ＡＰＩの仕様は？") == normalize_question("apiの仕様は")
+
+    def test_different_questions_differ(self):
+        assert normalize_question("決定事項は？") != normalize_question("課題は？")
+        assert normalize_question("は") == "は"
+
+
+class TestAnswerCache:
+    def test_hit_and_miss_with_stats(self):
+        cache = AnswerCache()
+        citation = Citation(text="引用", confidence=0.9)
+
+        assert cache.get("task", "# 議事録", "決定事項は？") is None
+        cache.put("task", "# 議事録", "決定事項は？", "予算が承認されました", [citation])
+        entry = cache.get("task", "# 議事録", "決定事項は何ですか")
+
+        assert entry.response == "予算が承認されました"
+        assert entry.citations == [citation]
+        assert cache.get_stats() == {
+            "entries": 1,
+            "hits": 1,
+            "misses": 1,
+            "hit_rate": 0.5,
+            "invalidations": 0,
+        }
+
+    def test_minutes_change_misses(self):
+        cache = AnswerCache()
+        cache.put("task", "# 議事録 v1", "決定事項は？", "回答", [])
+
+        assert cache.get("task", "# 議事録 v2", "決定事項は？") is None
+        assert cache.get("other", "# 議事録 v1", "決定事項は？") is None
+
+    def test_invalidate_task(self):
+        cache = AnswerCache()
+        cache.put("task", "m", "決定事項は？", "回答", [])
+        cache.put("task", "m", "課題は？", "回答", [])
+        cache.put("other", "m", "決定事項は？", "回答", [])
+
+        assert cache.invalidate("task") == 2
+        assert cache.get("task", "m", "決定事項は？") is None
+        assert cache.get("other", "m", "決定事項は？") is not None
+
+    def test_ttl_and_eviction(self):
+        cache = AnswerCache(max_entries=1, ttl_seconds=10)
+        with patch("app.services.answer_cache.time.time", return_value=100.0):
+            cache.put("task", "m", "決定事項は？", "回答", [])
+            cache.put("task", "m", "課題は？", "回答", [])
+        with patch("app.services.answer_cache.time.time", return_value=105.0):
+            assert cache.get("task", "m", "決定事項は？") is None
+            assert cache.get("task", "m", "課題は？") is not None
+        with patch("app.services.answer_cache.time.time", return_value=120.0):
+            assert cache.get("task", "m", "課題は？") is None
+
+
+class TestSendMessageUsesAnswerCache:
+    def setup_method(self):
+        self.client = TestClient(create_app())
+        self.task_id = str(uuid.uuid4())
+
+    def teardown_method(self):
+        answer_cache.invalidate(self.task_id)
+
+    def send(self, message, minutes="# 議事録", history=()):
+        session = ChatSession(
+            task_id=self.task_id, transcription="文字起こし", minutes=minutes
+        )
+        with patch("app.api.endpoints.chat.chat_store") as chat_store:
+            chat_store.get_session.return_value = session
+            chat_store.get_messages.return_value = list(history)
+            response = self.client.post(
+                f"/api/v1/minutes/{self.task_id}/chat/sessions/"
+                f"{session.session_id}/messages",
+                json={"message": message, "message_type": "user", "intent": "question"},
+            )
+        assert response.status_code == 200
+        return response.json()
+
+    def test_repeated_question_is_served_from_cache(self):
+        process = AsyncMock(
+            return_value={
+                "response": "予算案が承認されました",
+                "citations": [Citation(text="予算案を承認します", confidence=0.9)],
+                "edit_actions": [],
+                "tokens_used": 150,
+                "processing_time": 1.0,
+            }
+        )
+        with patch(
+            "app.services.openai_service.openai_service.process_chat_message", process
+        ), patch(
+            "app.services.citation_service.citation_service."
+            "extract_citations_from_response",
+            return_value=[],
+        ):
+            first = self.send("決定事項は？")
+            second = self.send("決定事項は何ですか")
+            edited = self.send("決定事項は？", minutes="# 議事録（編集後）")
+
+        assert process.await_count == 2
+        assert second["response"] == first["response"]
+        assert second["citations"][0]["text"] == "予算案を承認します"
+        assert second["tokens_used"] == 0
+        assert edited["tokens_used"] == 150
+
+    def test_follow_up_question_is_not_served_from_cache(self):
+        """会話の途中の質問は前の会話に依存するためキャッシュを使わないテスト"""
+        process = AsyncMock(
+            return_value={
+                "response": "予算案が承認されました",
+                "citations": [],
+                "edit_actions": [],
+                "tokens_used": 150,
+                "processing_time": 1.0,
+            }
+        )
+        with patch(
+            "app.services.openai_service.openai_service.process_chat_message", process
+        ), patch(
+            "app.services.citation_service.citation_service."
+            "extract_citations_from_response",
+            return_value=[],
+        ):
+            self.send("決定事項は？")
+            follow_up = self.send("決定事項は？", history=[object()])
+
+        assert process.await_count == 2
+        assert follow_up["tokens_used"] == 150
@@ -179,6 +179,54 @@ class TestMinutesEndpoints:
             assert response.status_code == 500
             assert "処理結果が見つかりません" in response.json()["detail"]
 
+    def test_cancel_task_success(self, client, sample_task):
+        """タスクキャンセル成功テスト"""
+        sample_task.status = TaskStatus.PROCESSING
+        sample_task.update_step_status(
+            ProcessingStepName.TRANSCRIPTION, ProcessingStepStatus.PROCESSING
+        )
+        mock_session_store = Mock()
+        mock_session_store.get_task.return_value = sample_task
+        mock_session_store._sessions = {}
+        pipeline = Mock()
+        pipeline.cancel = AsyncMock(return_value=True)
+
+        with patch(
+            "app.api.endpoints.minutes.session_task_store", mock_session_store
+        ), patch("app.api.endpoints.minutes.tasks_store", {}), patch(
+            "app.api.endpoints.minutes.persistent_store"
+        ), patch(
+            "app.api.endpoints.minutes.FileHandler"
+        ) as mock_file_handler, patch(
+            "app.services.task_queue.get_task_pipeline", return_value=pipeline
+        ):
+            response = client.post(f"/api/v1/minutes/{sample_task.task_id}/cancel")
+
+            assert response.status_code == 200
+            assert response.json()["status"] == "failed"
+            pipeline.cancel.assert_awaited_once_with(sample_task.task_id)
+            # ファイルはステージの中断後に abort_media_task が削除する
+            mock_file_handler.cleanup_files.assert_not_called()
+            assert sample_task.error_message == "処理がキャンセルされました。"
+            step = next(
+                step
+                for step in sample_task.steps
+                if step.name == ProcessingStepName.TRANSCRIPTION
+            )
+            assert step.status == ProcessingStepStatus.FAILED
+
+    def test_cancel_completed_task_rejected(self, client, sample_task):
+        """完了済みタスクのキャンセル拒否テスト"""
+        sample_task.status = TaskStatus.COMPLETED
+        mock_session_store = Mock()
+        mock_session_store.get_task.return_value = sample_task
+
+        with patch("app.api.endpoints.minutes.session_task_store", mock_session_store):
+            response = client.post(f"/api/v1/minutes/{sample_task.task_id}/cancel")
+
+            assert response.status_code == 400
+            assert "キャンセルできます" in response.json()["detail"]
+
 
 class TestProcessVideoTask:
     """process_video_task関数のテスト"""
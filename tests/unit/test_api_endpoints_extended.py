@@ -182,6 +182,55 @@ class TestMinutesEndpointsExtended:
             # エラーが発生してもブロードキャストが継続されることを確認
             await broadcast_progress_update(sample_task.task_id, sample_task)
 
+    @pytest.mark.asyncio
+    async def test_broadcast_progress_update_includes_eta(self, sample_task):
+        """進捗更新に順番と開始・完了の予定時刻を含めるテスト"""
+        from app.api.endpoints.minutes import broadcast_queue_updates
+        from app.services.task_queue import TaskEstimate
+
+        sample_task.status = TaskStatus.QUEUED
+        pipeline = Mock()
+        pipeline.estimate_task = AsyncMock(
+            return_value=TaskEstimate("extract", 3, 120.0, 900.0)
+        )
+        mock_websocket = AsyncMock()
+
+        with patch(
+            "app.api.endpoints.minutes.websocket_connections",
+            {sample_task.task_id: [mock_websocket]},
+        ), patch(
+            "app.api.endpoints.minutes.tasks_store",
+            {sample_task.task_id: sample_task},
+        ), patch(
+            "app.services.task_queue.get_task_pipeline", return_value=pipeline
+        ):
+            await broadcast_queue_updates()
+
+        message = json.loads(mock_websocket.send_text.call_args.args[0])
+        assert message["queue_position"] == 3
+        start = datetime.fromisoformat(message["estimated_start"])
+        completion = datetime.fromisoformat(message["estimated_completion"])
+        assert (completion - start).total_seconds() == pytest.approx(780.0, abs=1)
+        pipeline.estimate_task.assert_awaited_once_with(sample_task.task_id)
+
+    @pytest.mark.asyncio
+    async def test_broadcast_progress_update_without_eta(self, sample_task):
+        """完了済みのタスクには予定時刻を含めないテスト"""
+        from app.api.endpoints.minutes import broadcast_progress_update
+
+        sample_task.status = TaskStatus.COMPLETED
+        mock_websocket = AsyncMock()
+
+        with patch(
+            "app.api.endpoints.minutes.websocket_connections",
+            {sample_task.task_id: [mock_websocket]},
+        ):
+            await broadcast_progress_update(sample_task.task_id, sample_task)
+
+        message = json.loads(mock_websocket.send_text.call_args.args[0])
+        assert message["queue_position"] is None
+        assert message["estimated_completion"] is None
+
     @pytest.mark.asyncio
     async def test_broadcast_task_completed_success(self, sample_task):
         """タスク完了ブロードキャスト成功テスト"""
@@ -290,6 +339,82 @@ class TestMinutesEndpointsExtended:
                                 mock_broadcast_failed.assert_called_once()
                                 assert sample_task.status == TaskStatus.FAILED
 
+    def test_task_priority_parses_names(self):
+        """アップロード時の優先度の指定を検証するテスト"""
+        from fastapi import HTTPException
+
+        from app.api.endpoints.minutes import _task_priority
+        from app.services.scheduler import TaskPriority
+
+        assert _task_priority(None) == TaskPriority.NORMAL
+        assert _task_priority(" Low ") == TaskPriority.LOW
+        assert _task_priority("high") == TaskPriority.HIGH
+        with pytest.raises(HTTPException) as exc_info:
+            _task_priority("urgent")
+        assert exc_info.value.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_retry_keeps_priority_and_owner(self, sample_task):
+        """再実行はアップロード時の優先度と公平分配の単位で登録するテスト"""
+        from app.api.endpoints.minutes import retry_task
+        from app.services.scheduler import TaskPriority
+
+        sample_task.status = TaskStatus.FAILED
+        sample_task.priority = "low"
+        pipeline = Mock()
+        pipeline.submit = AsyncMock(return_value="queue-1")
+        session_store = Mock()
+        session_store.get_task.return_value = sample_task
+
+        with patch(
+            "app.api.endpoints.minutes.SessionManager.get_session_id",
+            return_value="session-1",
+        ), patch(
+            "app.api.endpoints.minutes.session_task_store", session_store
+        ), patch(
+            "app.api.endpoints.minutes.tasks_store", {}
+        ), patch(
+            "app.services.task_queue.get_task_pipeline", return_value=pipeline
+        ):
+            response = await retry_task(Mock(), sample_task.task_id, "api-key-1")
+
+        assert response.status_code == 200
+        kwargs = pipeline.submit.await_args.kwargs
+        assert kwargs["priority"] == TaskPriority.LOW
+        assert kwargs["owner"] == "api-key-1"
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("found", [True, False])
+    async def test_cancel_leaves_cleanup_to_abort(self, sample_task, found):
+        """キューにあったタスクのファイル削除は中断の後処理に任せるテスト"""
+        from app.api.endpoints.minutes import cancel_task
+
+        sample_task.status = TaskStatus.PROCESSING
+        pipeline = Mock()
+        pipeline.cancel = AsyncMock(return_value=found)
+        session_store = Mock()
+        session_store.get_task.return_value = sample_task
+
+        with patch(
+            "app.api.endpoints.minutes.SessionManager.get_session_id",
+            return_value="session-1",
+        ), patch(
+            "app.api.endpoints.minutes.session_task_store", session_store
+        ), patch(
+            "app.api.endpoints.minutes._save_processing_task"
+        ), patch(
+            "app.api.endpoints.minutes.broadcast_task_failed", AsyncMock()
+        ), patch(
+            "app.api.endpoints.minutes.FileHandler.cleanup_files"
+        ) as cleanup, patch(
+            "app.services.task_queue.get_task_pipeline", return_value=pipeline
+        ):
+            response = await cancel_task(Mock(), sample_task.task_id)
+
+        assert response.status_code == 200
+        assert sample_task.status == TaskStatus.FAILED
+        assert cleanup.called is not found
+
     def test_get_queue_status_success(self, client):
         """タスクキューステータス取得成功テスト"""
         with patch("app.api.endpoints.minutes.get_task_queue") as mock_get_queue:
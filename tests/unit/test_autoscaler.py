@@ -0,0 +1,71 @@
+from app.services.autoscaler import WorkerAutoscaler
+
+
+def make_autoscaler(**options):
+    defaults = dict(
+        min_workers=1,
+        max_workers=6,
+        target_wait_seconds=30.0,
+        up_cooldown_seconds=10.0,
+        down_cooldown_seconds=60.0,
+        scale_down_idle_seconds=60.0,
+    )
+    defaults.update(options)
+    return WorkerAutoscaler(**defaults)
+
+
+class TestWorkerAutoscaler:
+    def test_scales_up_to_cover_backlog(self):
+        """待機中のタスクを一度に捌ける数まで増やすテスト"""
+        autoscaler = make_autoscaler()
+
+        assert autoscaler.evaluate(2, running=2, depth=3, wait_seconds=0, now=100) == 5
+        # 上限を超えない
+        autoscaler = make_autoscaler()
+        assert autoscaler.evaluate(2, running=2, depth=20, wait_seconds=0, now=100) == 6
+
+        decision = autoscaler.decisions[-1]
+        assert (decision.previous, decision.target, decision.depth) == (2, 6, 20)
+
+    def test_scales_up_on_long_wait(self):
+        """待機数が少なくても待ち時間が長ければ増やすテスト"""
+        autoscaler = make_autoscaler()
+
+        assert autoscaler.evaluate(4, running=4, depth=1, wait_seconds=5, now=100) == 4
+        assert autoscaler.evaluate(4, running=4, depth=1, wait_seconds=45, now=101) == 5
+
+    def test_up_cooldown(self):
+        """増やした直後はクールダウンが明けるまで増やさないテスト"""
+        autoscaler = make_autoscaler()
+
+        assert autoscaler.evaluate(1, running=1, depth=1, wait_seconds=0, now=100) == 2
+        assert autoscaler.evaluate(2, running=2, depth=3, wait_seconds=0, now=105) == 2
+        assert autoscaler.evaluate(2, running=2, depth=3, wait_seconds=0, now=110) == 5
+
+    def test_scales_down_after_idle(self):
+        """待機タスクのない状態が続いたら実行中の数まで減らすテスト"""
+        autoscaler = make_autoscaler()
+        autoscaler.evaluate(2, running=2, depth=4, wait_seconds=0, now=100)
+
+        assert autoscaler.evaluate(6, running=1, depth=0, wait_seconds=0, now=130) == 6
+        assert autoscaler.evaluate(6, running=1, depth=0, wait_seconds=0, now=160) == 1
+        # 下限は下回らない
+        assert autoscaler.evaluate(1, running=0, depth=0, wait_seconds=0, now=400) == 1
+
+    def test_throttling_blocks_growth_and_shrinks(self):
+        """上流のスロットリングが増えたら増やさずに1つ減らすテスト"""
+        throttled = [0]
+        autoscaler = make_autoscaler(throttle_signal=lambda: throttled[0])
+        assert autoscaler.evaluate(3, running=3, depth=0, wait_seconds=0, now=100) == 3
+
+        throttled[0] = 4
+        assert autoscaler.evaluate(3, running=3, depth=10, wait_seconds=60, now=120) == 2
+        assert "スロットリング" in autoscaler.decisions[-1].reason
+
+        # スロットリングが止まれば再び増やす
+        assert autoscaler.evaluate(2, running=2, depth=10, wait_seconds=60, now=140) == 6
+
+    def test_clamp(self):
+        autoscaler = make_autoscaler(min_workers=2, max_workers=4)
+
+        assert [autoscaler.clamp(n) for n in (0, 3, 9)] == [2, 3, 4]
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from app.services.compute_pool import ComputePool
+
+
+def current_pid(_value):
+    return os.getpid()
+
+
+def fail(message):
+    raise ValueError(message)
+
+
+class TestComputePool:
+    @pytest.mark.asyncio
+    async def test_run_in_process_uses_child_process(self):
+        """モジュールレベルの関数は子プロセスで実行されるテスト"""
+        pool = ComputePool(process_workers=1, thread_workers=1)
+        try:
+            assert await pool.run_in_process(current_pid, 1) != os.getpid()
+            with pytest.raises(ValueError, match="boom"):
+                await pool.run_in_process(fail, "boom")
+        finally:
+            await pool.shutdown()
+
+        stats = pool.get_stats()
+        assert stats["process"] == {"in_flight": 0, "completed": 1, "failed": 1}
+        assert stats["fallbacks"] == 0
+
+    @pytest.mark.asyncio
+    async def test_unpicklable_call_falls_back_to_thread(self):
+        """子プロセスへ送れない関数・引数はスレッドで実行するテスト"""
+        pool = ComputePool(process_workers=1, thread_workers=1)
+        analyzer = Mock()
+        analyzer.analyze.return_value = "ok"
+        try:
+            assert await pool.run_in_process(analyzer.analyze, "text") == "ok"
+            assert await pool.run_in_process(lambda value: value * 2, 21) == 42
+        finally:
+            await pool.shutdown()
+
+        analyzer.analyze.assert_called_once_with("text")
+        stats = pool.get_stats()
+        assert stats["fallbacks"] == 2
+        assert stats["thread"]["completed"] == 2
+        assert stats["process"]["completed"] == 0
+
+    @pytest.mark.asyncio
+    async def test_thread_pool_is_bounded(self):
+        """スレッドプールの同時実行数が上限を超えないテスト"""
+        pool = ComputePool(process_workers=0, thread_workers=2)
+        lock = threading.Lock()
+        active = []
+        peak = []
+
+        def work(_):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+
+        try:
+            # プロセス数0ならプロセス実行もスレッドプールで行う
+            await asyncio.gather(*(pool.run_in_process(work, i) for i in range(6)))
+        finally:
+            await pool.shutdown()
+
+        assert max(peak) == 2
+        assert pool.get_stats()["thread"]["completed"] == 6
+
+
+class TestBackgroundJsonWriter:
+    @staticmethod
+    def read(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def test_writes_inline_without_event_loop(self, tmp_path):
+        """イベントループ外ではその場で書き出すテスト"""
+        pool = ComputePool(process_workers=0, thread_workers=1)
+        writer = pool.json_writer("store")
+        path = str(tmp_path / "data.json")
+
+        writer.save([(path, {"件名": "定例会議"}, {"ensure_ascii": False})])
+
+        assert self.read(path) == {"件名": "定例会議"}
+        assert writer.get_stats()["writes"] == 1
+
+    @pytest.mark.asyncio
+    async def test_coalesces_saves_and_keeps_latest(self, tmp_path):
+        """書き込み中の保存要求は最新の内容だけを書き出すテスト"""
+        pool = ComputePool(process_workers=1, thread_workers=1)
+        writer = pool.json_writer("store")
+        path = str(tmp_path / "data.json")
+        try:
+            for version in range(20):
+                writer.save([(path, {"version": version}, {})])
+            assert await asyncio.get_running_loop().run_in_executor(
+                None, writer.flush, 30
+            )
+        finally:
+            await pool.shutdown()
+
+        assert self.read(path) == {"version": 19}
+        stats = writer.get_stats()
+        assert stats["failures"] == 0
+        assert stats["writes"] + stats["coalesced"] == 20
+        assert stats["coalesced"] > 0
+        assert not os.path.exists(f"{path}.tmp")
+
+    @pytest.mark.asyncio
+    async def test_shutdown_flushes_pending_writes(self, tmp_path):
+        """停止時に保留中の書き込みを終えるテスト"""
+        pool = ComputePool(process_workers=0, thread_workers=1)
+        writer = pool.json_writer("store")
+        path = str(tmp_path / "data.json")
+
+        writer.save([(path, {"version": 1}, {})])
+        writer.save([(path, {"version": 2}, {})])
+        await pool.shutdown()
+
+        assert self.read(path) == {"version": 2}
@@ -184,6 +184,25 @@ class TestFileHandler:
         assert not os.path.exists(video_file)
         assert not os.path.exists(audio_file)
 
+    def test_cleanup_files_removes_chunk_dirs(self, mock_settings):
+        """中断したタスクの分割チャンクディレクトリも削除するテスト"""
+        task_id = "chunk-test-task"
+        os.makedirs(mock_settings.temp_dir, exist_ok=True)
+        chunks_dir = tempfile.mkdtemp(
+            prefix=f"audio_chunks_{task_id}_", dir=mock_settings.temp_dir
+        )
+        other_dir = tempfile.mkdtemp(
+            prefix="audio_chunks_other-task_", dir=mock_settings.temp_dir
+        )
+        with open(os.path.join(chunks_dir, "chunk_000.mp3"), "w") as f:
+            f.write("chunk")
+
+        FileHandler.cleanup_files(task_id)
+
+        assert not os.path.exists(chunks_dir)
+        assert os.path.exists(other_dir)
+        os.rmdir(other_dir)
+
     def test_cleanup_files_no_files(self, mock_settings):
         """存在しないファイルのクリーンアップテスト"""
         # ファイルが存在しない場合でもエラーにならないことを確認
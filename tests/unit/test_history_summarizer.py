@@ -0,0 +1,146 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.models.chat import ChatMessage, ChatSession, MessageIntent
+from app.prompts.chat_prompts import build_chat_history_context
+from app.services.history_summarizer import (
+    HistorySummarizer,
+    extractive_summary,
+    message_tokens,
+    select_recent_messages,
+)
+from app.services.openai_service import OpenAIService
+from app.services.token_counter import token_counter
+
+
+def make_messages(session, count, answer_length=200):
+    return [
+        ChatMessage(
+            session_id=session.session_id,
+            message=f"質問{n}について教えてください",
+            response=f"回答{n}です。" + "詳細な説明が続きます。" * (answer_length // 10),
+        )
+        for n in range(count)
+    ]
+
+
+class TestSelectRecentMessages:
+    def setup_method(self):
+        self.session = ChatSession(task_id="t")
+
+    def test_keeps_suffix_within_budget(self):
+        messages = make_messages(self.session, 10)
+        per_message = message_tokens(messages[-1])
+
+        recent = select_recent_messages(messages, per_message * 3, 5)
+
+        assert recent == messages[-3:]
+
+    def test_respects_max_messages_and_keeps_latest(self):
+        messages = make_messages(self.session, 10)
+
+        assert select_recent_messages(messages, 10**6, 5) == messages[-5:]
+        assert select_recent_messages(messages, 1, 5) == messages[-1:]
+        assert select_recent_messages([], 100, 5) == []
+
+
+class TestExtractiveSummary:
+    def test_keeps_question_and_first_sentence(self):
+        session = ChatSession(task_id="t")
+        messages = make_messages(session, 2)
+
+        summary = extractive_summary("- 以前の要約", messages, 1000)
+
+        lines = summary.splitlines()
+        assert lines[0] == "- 以前の要約"
+        assert lines[1] == "- Q: 質問0について教えてください / A: 回答0です。"
+
+    def test_drops_oldest_lines_over_budget(self):
+        session = ChatSession(task_id="t")
+        messages = make_messages(session, 30)
+
+        summary = extractive_summary("", messages, 100)
+
+        assert token_counter.count(summary) <= 100
+        assert "質問29" in summary
+        assert "質問0について" not in summary
+
+
+class TestHistorySummarizer:
+    @pytest.mark.asyncio
+    async def test_folds_overflow_incrementally(self):
+        session = ChatSession(task_id="t")
+        messages = make_messages(session, 8)
+        per_message = message_tokens(messages[-1])
+        summarize = AsyncMock(side_effect=["要約1", "要約2"])
+
+        with patch.multiple(
+            "app.services.history_summarizer.settings",
+            chat_history_token_budget=per_message * 3,
+            chat_history_max_messages=5,
+        ), patch(
+            "app.services.openai_service.openai_service.summarize_chat_history",
+            summarize,
+        ):
+            summarizer = HistorySummarizer()
+            assert await summarizer.update(session, messages[:3]) is False
+            assert await summarizer.update(session, messages[:6]) is True
+            assert await summarizer.update(session, messages) is True
+
+        assert session.history_summary == "要約2"
+        assert session.summarized_message_count == 5
+        assert summarize.await_args_list[0].args == ("", messages[:3])
+        assert summarize.await_args_list[1].args == ("要約1", messages[3:5])
+
+
+class TestPromptUsesSummary:
+    @pytest.mark.asyncio
+    async def test_history_prompt_is_bounded(self):
+        service = OpenAIService()
+        service.use_mock = True
+        session = ChatSession(task_id="t", transcription="文字起こし", minutes="議事録")
+        messages = make_messages(session, 40, answer_length=400)
+        session.history_summary = extractive_summary("", messages[:35], 400)
+        session.summarized_message_count = 35
+        mock_api = AsyncMock(return_value=("回答", []))
+
+        with patch.object(service, "_call_mock_api", mock_api):
+            await service.process_chat_message(
+                session, "次の質問", MessageIntent.QUESTION, messages
+            )
+
+        user_prompt = mock_api.call_args.args[1]
+        assert "【これまでの会話の要約】" in user_prompt
+        assert "質問34について" in user_prompt
+        assert "Q: 質問39について教えてください" in user_prompt
+        assert "Q: 質問34について教えてください\nA:" not in user_prompt
+        assert token_counter.count(user_prompt) < 1500 + 400 + 100
+
+    @pytest.mark.asyncio
+    async def test_includes_all_selected_recent_messages(self):
+        """上限を5件より大きくしても選んだ直近の会話をすべて含めるテスト"""
+        service = OpenAIService()
+        service.use_mock = True
+        session = ChatSession(task_id="t", transcription="文字起こし", minutes="議事録")
+        messages = make_messages(session, 8)
+        mock_api = AsyncMock(return_value=("回答", []))
+
+        with patch.multiple(
+            "app.services.openai_service.settings",
+            chat_history_token_budget=100000,
+            chat_history_max_messages=8,
+        ), patch.object(service, "_call_mock_api", mock_api):
+            await service.process_chat_message(
+                session, "次の質問", MessageIntent.QUESTION, messages
+            )
+
+        user_prompt = mock_api.call_args.args[1]
+        assert "Q: 質問0について教えてください" in user_prompt
+        assert "Q: 質問7について教えてください" in user_prompt
+
+    def test_build_context_with_summary_only(self):
+        context = build_chat_history_context([], summary="- 予算の話")
+
+        assert context.startswith("【これまでの会話の要約】\n- 予算の話")
+        assert "【これまでの会話履歴】" not in context
@@ -32,15 +32,15 @@ class TestMainExtended:
 
     def test_health_check_endpoint(self, client):
         """ヘルスチェックエンドポイントテスト"""
-        with patch("app.services.task_queue.get_task_queue") as mock_get_queue:
-            # モックキューを作成
-            mock_queue = Mock()
-            mock_queue.get_queue_status.return_value = {
+        with patch("app.services.task_queue.get_task_pipeline") as mock_get_pipeline:
+            # モックパイプラインを作成
+            mock_pipeline = Mock()
+            mock_pipeline.get_queue_status.return_value = {
                 "active": 0,
                 "pending": 0,
                 "completed": 5
             }
-            mock_get_queue.return_value = mock_queue
+            mock_get_pipeline.return_value = mock_pipeline
 
             response = client.get("/health")
             
@@ -48,12 +48,12 @@ class TestMainExtended:
             response_data = response.json()
             assert response_data["status"] == "healthy"
             assert "tasks_count" in response_data
-            assert "queue" in response_data
+            assert response_data["queue"]["completed"] == 5
 
     @pytest.mark.asyncio
     async def test_startup_event(self):
         """アプリケーション起動イベントテスト"""
-        with patch("app.main.initialize_task_queue") as mock_init:
+        with patch("app.main.initialize_task_pipeline") as mock_init:
             mock_init.return_value = AsyncMock()
             
             app = create_app()
@@ -65,7 +65,7 @@ class TestMainExtended:
     @pytest.mark.asyncio
     async def test_shutdown_event(self):
         """アプリケーション停止イベントテスト"""
-        with patch("app.main.shutdown_task_queue") as mock_shutdown:
+        with patch("app.main.shutdown_task_pipeline") as mock_shutdown:
             mock_shutdown.return_value = AsyncMock()
             
             app = create_app()
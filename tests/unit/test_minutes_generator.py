@@ -196,7 +196,10 @@ class TestMinutesGeneratorServiceConfiguration:
             service = MinutesGeneratorService()
 
             # OpenAI クライアントが正しいAPI キーで初期化されることを確認
-            mock_openai.assert_called_once_with(api_key=mock_settings.openai_api_key)
+            # （リトライはアプリ側で行うため SDK の自動リトライは無効）
+            mock_openai.assert_called_once_with(
+                api_key=mock_settings.openai_api_key, max_retries=0
+            )
 
     @pytest.mark.asyncio
     async def test_generate_minutes_uses_correct_settings(self, mock_settings):
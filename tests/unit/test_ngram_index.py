@@ -0,0 +1,89 @@
+from app.services.citation_service import CitationService
+from app.services.ngram_index import NgramIndex, NgramIndexCache
+
+TRANSCRIPT = (
+    "まず、プロジェクトの進捗について報告します。"
+    "開発は順調に進んでいます。"
+    "品質管理が重要だという意見がありました。"
+    "次回のレビューは来週の金曜日です。"
+)
+
+
+class TestNgramIndex:
+    def test_exact_phrase(self):
+        index = NgramIndex(TRANSCRIPT)
+
+        start, end, score = index.find_similar("品質管理が重要")
+
+        assert TRANSCRIPT[start:end] == "品質管理が重要"
+        assert score == 1.0
+
+    def test_fuzzy_japanese_phrase(self):
+        index = NgramIndex(TRANSCRIPT)
+
+        match = index.find_similar("品質の管理が重要")
+
+        assert match is not None
+        start, end, score = match
+        assert "品質管理が重要" in TRANSCRIPT[start:end]
+        assert 0.6 <= score < 1.0
+
+    def test_spaces_in_query_are_ignored(self):
+        index = NgramIndex(TRANSCRIPT)
+
+        start, end, _ = index.find_similar("プロジェクト 進捗 報告")
+
+        assert TRANSCRIPT[start:end].startswith("プロジェクト")
+
+    def test_below_threshold(self):
+        index = NgramIndex(TRANSCRIPT)
+
+        assert index.find_similar("全く関係のない話題") is None
+        assert index.find_similar("") is None
+
+    def test_case_insensitive(self):
+        text = "次はAPI Gatewayの設定です。"
+        index = NgramIndex(text)
+
+        start, end, _ = index.find_similar("api gateway")
+
+        assert text[start:end] == "API Gateway"
+
+    def test_frequent_grams_are_skipped(self):
+        text = "ますます" * 50 + "予算案を承認しました。"
+        index = NgramIndex(text, max_postings=10)
+
+        start, end, _ = index.find_similar("予算案を承認します")
+
+        assert text[start:end].startswith("予算案を承認し")
+
+
+class TestNgramIndexCache:
+    def test_reuses_index_for_same_text(self):
+        cache = NgramIndexCache(max_entries=1)
+
+        first = cache.get(TRANSCRIPT)
+
+        assert cache.get(TRANSCRIPT) is first
+        cache.get("別の文字起こし")
+        assert cache.get(TRANSCRIPT) is not first
+
+
+class TestCitationSimilarText:
+    def test_find_similar_text_japanese(self):
+        service = CitationService()
+
+        position, actual_text = service._find_similar_text(
+            "次回レビューは来週金曜日", TRANSCRIPT
+        )
+
+        assert position == TRANSCRIPT.index("次回")
+        assert actual_text.startswith("次回のレビューは来週の金曜日")
+
+    def test_find_similar_text_not_found(self):
+        service = CitationService()
+
+        position, actual_text = service._find_similar_text("無関係な文章", TRANSCRIPT)
+
+        assert position is None
+        assert actual_text == "無関係な文章"
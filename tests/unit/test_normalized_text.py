@@ -0,0 +1,112 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import Mock
+
+from app.services.citation_service import CitationService
+from app.services.normalized_text import (
+    NormalizedText,
+    NormalizedTextCache,
+    normalize_text,
+)
+
+
+def _regex_normalize(text):
+    """従来の正規表現による正規化"""
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"[、。，．]", "", text)
+    return text.lower().strip()
+
+
+class TestNormalizedText:
+    def test_matches_regex_normalization(self):
+        samples = [
+            "　こんにちは、　世界。　",
+            "\n  Hello,  World.\tテスト。 。 終了  ",
+            "API　Gateway、の 設定．",
+            "",
+            "。、",
+        ]
+        for sample in samples:
+            assert normalize_text(sample) == _regex_normalize(sample)
+
+    def test_offsets_point_to_original_characters(self):
+        original = "  まず、プロジェクト の\n\n進捗。ABC"
+        normalized = NormalizedText(original)
+
+        assert len(normalized.offsets) == len(normalized.text)
+        for position, char in enumerate(normalized.text):
+            source = original[normalized.to_original(position)]
+            assert source.lower() == char or (char == " " and source.isspace())
+
+    def test_find_returns_exact_original_span(self):
+        original = "冒頭の挨拶。\n    まず、プロジェクトの進捗について報告します。"
+        normalized = NormalizedText(original)
+
+        start, end = normalized.find(normalize_text("まずプロジェクトの進捗"))
+
+        assert original[start:end] == "まず、プロジェクトの進捗"
+
+    def test_find_not_found(self):
+        normalized = NormalizedText("会議を始めます。")
+
+        assert normalized.find("終了") is None
+        assert normalized.find("") is None
+
+    def test_span_end_at_text_end(self):
+        original = "予算、承認。"
+        normalized = NormalizedText(original)
+
+        assert normalized.to_original_span(0, len(normalized)) == (0, 5)
+        assert normalized.to_original(len(normalized)) == 5
+
+
+class TestNormalizedTextCache:
+    def test_reuses_normalized_text(self):
+        cache = NormalizedTextCache(max_entries=1)
+
+        first = cache.get("文字起こし。")
+
+        assert cache.get("文字起こし。") is first
+        cache.get("別の文字起こし。")
+        assert cache.get("文字起こし。") is not first
+
+    def test_concurrent_access_from_threads(self):
+        """スレッドプールから並行して取得・追い出しても例外にならないテスト"""
+        cache = NormalizedTextCache(max_entries=2)
+        texts = [f"文字起こし{i % 4}。" for i in range(4000)]
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(cache.get, texts))
+
+        assert [result.text for result in results[:4]] == [
+            NormalizedText(text).text for text in texts[:4]
+        ]
+
+
+class TestCitationHighlight:
+    TRANSCRIPT = (
+        "こんにちは、皆さん。今日の会議を始めます。\n"
+        "        まず、プロジェクトの進捗について報告します。\n"
+        "        現在、開発は順調に進んでいます。"
+    )
+
+    def test_normalized_match_highlights_original_range(self):
+        service = CitationService()
+        match = re.search(r"「([^」]+)」", "「現在開発は順調に進んでいます」")
+
+        citation = service._create_citation_from_match(match, self.TRANSCRIPT, Mock())
+
+        highlighted = self.TRANSCRIPT[citation.highlight_start : citation.highlight_end]
+        assert highlighted == "現在、開発は順調に進んでいます"
+        assert citation.text == highlighted
+
+    def test_map_normalized_position_is_exact(self):
+        service = CitationService()
+        normalized = service._normalize_text(self.TRANSCRIPT)
+        position = normalized.index("まず")
+
+        original = service._map_normalized_position(
+            position, self.TRANSCRIPT, normalized
+        )
+
+        assert self.TRANSCRIPT[original:].startswith("まず")
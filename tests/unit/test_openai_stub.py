@@ -0,0 +1,154 @@
+import httpx
+import openai
+import pytest
+
+from app.devtools.openai_stub import (
+    StubConfig,
+    StubState,
+    build_transcription,
+    create_stub_app,
+)
+
+
+def make_client(app, max_retries=0):
+    """スタブアプリに直接接続するOpenAIクライアント"""
+    http_client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://stub"
+    )
+    return openai.AsyncOpenAI(
+        api_key="test-key",
+        base_url="http://stub/v1",
+        http_client=http_client,
+        max_retries=max_retries,
+    )
+
+
+@pytest.fixture
+def stub_app():
+    return create_stub_app(StubConfig(latency_mean=0.0, stream_chunk_delay=0.0))
+
+
+class TestOpenAIStubServer:
+    """OpenAI互換スタブサーバーのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_chat_completion_is_deterministic(self, stub_app):
+        client = make_client(stub_app)
+        messages = [{"role": "user", "content": "会議の要点は？"}]
+
+        first = await client.chat.completions.create(
+            model="gpt-4.1", messages=messages
+        )
+        second = await client.chat.completions.create(
+            model="gpt-4.1", messages=messages
+        )
+
+        assert first.choices[0].message.content
+        assert first.choices[0].message.content == second.choices[0].message.content
+        assert first.usage.total_tokens > 0
+
+    @pytest.mark.asyncio
+    async def test_chat_completion_streaming(self, stub_app):
+        client = make_client(stub_app)
+        messages = [{"role": "user", "content": "会議の要点は？"}]
+
+        full = await client.chat.completions.create(model="gpt-4.1", messages=messages)
+        stream = await client.chat.completions.create(
+            model="gpt-4.1", messages=messages, stream=True
+        )
+        parts = [chunk.choices[0].delta.content or "" async for chunk in stream]
+
+        assert len(parts) > 2
+        assert "".join(parts) == full.choices[0].message.content
+
+    @pytest.mark.asyncio
+    async def test_transcription_text_and_verbose(self, stub_app):
+        client = make_client(stub_app)
+        audio = b"\x00\x01" * 60000
+
+        text = await client.audio.transcriptions.create(
+            model="whisper-1",
+            file=("audio.mp3", audio, "audio/mpeg"),
+            response_format="text",
+        )
+        verbose = await client.audio.transcriptions.create(
+            model="whisper-1",
+            file=("audio.mp3", audio, "audio/mpeg"),
+            response_format="verbose_json",
+        )
+
+        assert isinstance(text, str)
+        assert text == verbose.text
+        assert verbose.duration == 10.0
+        assert verbose.segments[-1]["end"] == 10.0
+
+    @pytest.mark.asyncio
+    async def test_throttle_injection(self):
+        app = create_stub_app(
+            StubConfig(latency_mean=0.0, throttle_rate=1.0, retry_after=2.5)
+        )
+        client = make_client(app)
+
+        with pytest.raises(openai.RateLimitError) as exc_info:
+            await client.chat.completions.create(
+                model="gpt-4.1", messages=[{"role": "user", "content": "test"}]
+            )
+
+        assert exc_info.value.response.headers["retry-after-ms"] == "2500"
+        assert app.state.stub.stats["chat.completions"]["throttled"] == 1
+
+    @pytest.mark.asyncio
+    async def test_error_injection(self):
+        app = create_stub_app(StubConfig(latency_mean=0.0, error_rate=1.0))
+        client = make_client(app)
+
+        with pytest.raises(openai.InternalServerError):
+            await client.chat.completions.create(
+                model="gpt-4.1", messages=[{"role": "user", "content": "test"}]
+            )
+
+    @pytest.mark.asyncio
+    async def test_runtime_config_update(self, stub_app):
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=stub_app), base_url="http://stub"
+        ) as client:
+            response = await client.put("/stub/config", json={"error_rate": 0.5})
+            invalid = await client.put(
+                "/stub/config", json={"latency_distribution": "unknown"}
+            )
+
+        assert response.json()["error_rate"] == 0.5
+        assert invalid.status_code == 400
+
+
+class TestStubHelpers:
+    """スタブの補助関数のテスト"""
+
+    def test_invalid_config_update_changes_nothing(self):
+        """不正な値を含む更新は一部だけ反映されないテスト"""
+        config = StubConfig()
+
+        with pytest.raises(ValueError):
+            config.update({"error_rate": 0.5, "latency_distribution": "unknown"})
+        with pytest.raises(ValueError):
+            config.update({"throttle_rate": 0.5, "latency_mean": "slow"})
+
+        assert config == StubConfig()
+        config.update({"latency_mean": 1, "seed": None, "unknown_field": 1})
+        assert (config.latency_mean, config.seed) == (1, None)
+
+    def test_latency_distributions_are_seeded(self):
+        for distribution in ("fixed", "uniform", "exponential", "lognormal"):
+            config = StubConfig(latency_distribution=distribution, latency_mean=0.3)
+            first = [StubState(config).sample_latency() for _ in range(3)]
+            second = [StubState(config).sample_latency() for _ in range(3)]
+
+            assert first == second
+            assert all(latency >= 0 for latency in first)
+
+    def test_build_transcription_words_cover_duration(self):
+        result = build_transcription(b"audio", 30.0)
+
+        assert result["words"][0]["start"] == 0.0
+        assert result["words"][-1]["end"] == pytest.approx(30.0, abs=0.01)
+        assert result["text"] == "".join(s["text"] for s in result["segments"])
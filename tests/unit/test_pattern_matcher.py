@@ -0,0 +1,84 @@
+import re
+
+from app.services.edit_executor import EditExecutor
+from app.services.edit_intent_analyzer import EditIntentAnalyzer
+from app.services.pattern_matcher import (
+    KeywordPatternMatcher,
+    compile_any,
+    required_keywords,
+)
+
+INSTRUCTIONS = [
+    "田中さんを山田さんに変更",
+    "「プロジェクト進捗報告」を「開発進捗レポート」に変更",
+    "佐藤さんにデータベース設計のタスクを追加",
+    "レビュー実施の期限を来週金曜日に変更",
+    "参加者から鈴木さんを削除",
+    "TODOを追加：CIのテストを安定化する",
+    "結論と議論の順番を入れ替え",
+    "議事録の要約をもう少し短くしてください",
+]
+
+
+class TestRequiredKeywords:
+    def test_literal_alternation_groups(self):
+        keywords = required_keywords(r"(.+?)の?(タスク|TODO)を?追加")
+
+        assert keywords == [frozenset({"タスク", "todo"})]
+
+    def test_optional_or_nested_groups_are_ignored(self):
+        assert required_keywords(r"(.+?)(変更|修正)?") == []
+        assert required_keywords(r"(?:(変更|修正))?") == []
+        assert required_keywords(r"(変更|修正)|削除") == []
+
+
+class TestKeywordPatternMatcher:
+    def test_same_results_as_sequential_search(self):
+        analyzer = EditIntentAnalyzer()
+
+        for instruction in INSTRUCTIONS:
+            expected = [
+                (action_type, match.span(), match.groups())
+                for action_type, patterns in analyzer.edit_patterns.items()
+                for pattern in patterns
+                for match in [re.search(pattern, instruction, re.IGNORECASE)]
+                if match
+            ]
+            actual = [
+                (action_type, match.span(), match.groups())
+                for action_type, match in analyzer.edit_matcher.iter_matches(
+                    instruction
+                )
+            ]
+            assert actual == expected, instruction
+
+    def test_overlapping_keywords_are_detected(self):
+        matcher = KeywordPatternMatcher(
+            {"a": [r"(.+)(アクションアイテム)"], "b": [r"(.+)(アイテム)"]}
+        )
+
+        kinds = [kind for kind, _ in matcher.iter_matches("新規アクションアイテム")]
+
+        assert kinds == ["a", "b"]
+
+    def test_skips_patterns_without_keywords(self):
+        matcher = KeywordPatternMatcher({"replace": [r"(.+?)を(.+?)に(変更|修正)"]})
+
+        assert matcher.keywords_in("議事録を要約") == set()
+        assert list(matcher.iter_matches("議事録を要約")) == []
+
+
+class TestSectionMatcher:
+    def test_compile_any(self):
+        pattern = compile_any([r"#+\s*action", r"#+\s*今後の予定"], re.IGNORECASE)
+
+        assert pattern.search("## Action Items")
+        assert pattern.search("### 今後の予定")
+        assert not pattern.search("## 議題")
+
+    def test_find_action_items_section(self):
+        executor = EditExecutor()
+        minutes = "# 議事録\n\n## 議題\n- 予算\n\n## TODO\n- 資料作成"
+
+        assert executor._find_action_items_section(minutes) == 5
+        assert executor._find_action_items_section("# 議事録\n## 議題") is None
@@ -0,0 +1,141 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from app.models.chat import ChatMessage, ChatSession, MessageIntent, TokenUsage
+from app.prompts.chat_prompts import RETRIEVED_TRANSCRIPTION_NOTE
+from app.services.openai_service import OpenAIService, PromptContext
+from app.services.prompt_cache import SessionPromptCache, session_prompt_cache
+from app.services.token_counter import usage_from_response
+
+TRANSCRIPT = "\n".join(
+    f"田中さん：第{n}四半期の売上は前年比で増加し、広告費の見直しを進めます。"
+    for n in range(200)
+)
+
+
+def build(transcription, minutes):
+    return f"指示\n{transcription}\n{minutes}"
+
+
+class TestSessionPromptCache:
+    def test_reuses_prompt_until_content_changes(self):
+        cache = SessionPromptCache()
+
+        first, hit = cache.get("s1", "文字起こし", "議事録", build)
+        assert not hit
+        second, hit = cache.get("s1", "文字起こし", "議事録", build)
+        assert hit
+        assert second is first
+
+        edited, hit = cache.get("s1", "文字起こし", "編集後の議事録", build)
+        assert not hit
+        assert edited.endswith("編集後の議事録")
+
+    def test_without_session_id_is_not_cached(self):
+        cache = SessionPromptCache()
+        builder = Mock(side_effect=build)
+
+        cache.get(None, "a", "b", builder)
+        cache.get(None, "a", "b", builder)
+
+        assert builder.call_count == 2
+
+    def test_discard_and_eviction(self):
+        cache = SessionPromptCache(max_entries=1)
+        cache.get("s1", "a", "b", build)
+        cache.get("s2", "a", "b", build)
+
+        assert cache.get("s1", "a", "b", build)[1] is False
+        cache.discard("s1")
+        assert "s1" not in cache._entries
+
+
+class TestPrefixStablePrompt:
+    def setup_method(self):
+        self.service = OpenAIService()
+        self.service.use_mock = True
+        self.session = ChatSession(
+            task_id="t", transcription=TRANSCRIPT, minutes="# 議事録\n- 売上増加"
+        )
+
+    def teardown_method(self):
+        session_prompt_cache.discard(self.session.session_id)
+
+    async def ask(self, message, history):
+        mock_api = AsyncMock(return_value=("回答", []))
+        with patch.object(self.service, "_call_mock_api", mock_api):
+            result = await self.service.process_chat_message(
+                self.session, message, MessageIntent.QUESTION, history
+            )
+        return result, mock_api.call_args
+
+    @pytest.mark.asyncio
+    async def test_system_prompt_is_identical_across_turns(self):
+        first, first_call = await self.ask("売上は？", [])
+        history = [
+            ChatMessage(
+                session_id=self.session.session_id, message="売上は？", response="増加"
+            )
+        ]
+        second, second_call = await self.ask("広告費は？", history)
+
+        system_prompt = first_call.args[0]
+        assert second_call.args[0] is system_prompt
+        # 指示 → 文字起こし → 議事録の順で、履歴と質問はユーザーメッセージ側
+        assert system_prompt.index("【回答時の注意点】") < system_prompt.index(TRANSCRIPT)
+        assert system_prompt.index(TRANSCRIPT) < system_prompt.index("売上増加")
+        assert "広告費は？" in second_call.args[1]
+        assert "Q: 売上は？" in second_call.args[1]
+
+        assert first["usage"].cached_tokens == 0
+        assert second["usage"].cached_tokens > 0
+        assert 0 < second["usage"].cached_ratio <= 1
+
+    @pytest.mark.asyncio
+    async def test_mock_receives_structured_session_data(self):
+        _, call = await self.ask("売上は？", [])
+
+        context = call.kwargs["context"]
+        assert context == PromptContext(TRANSCRIPT, self.session.minutes, "売上は？")
+
+    @pytest.mark.asyncio
+    async def test_retrieval_mode_keeps_excerpt_out_of_system_prompt(self):
+        with patch.multiple(
+            "app.services.openai_service.settings",
+            chat_context_mode="retrieval",
+            chat_retrieval_chunk_chars=200,
+            chat_retrieval_top_k=2,
+            chat_retrieval_token_budget=1000,
+        ):
+            _, first_call = await self.ask("第10四半期の売上は？", [])
+            _, second_call = await self.ask("第150四半期は？", [])
+
+        system_prompt = first_call.args[0]
+        assert second_call.args[0] is system_prompt
+        assert RETRIEVED_TRANSCRIPTION_NOTE in system_prompt
+        assert TRANSCRIPT not in system_prompt
+        assert "【関連する文字起こし】" in second_call.args[1]
+        assert "第150四半期" in second_call.args[1]
+
+
+class TestCachedTokenUsage:
+    def test_usage_from_response_reads_cached_tokens(self):
+        response = SimpleNamespace(
+            usage=SimpleNamespace(
+                prompt_tokens=2000,
+                completion_tokens=100,
+                total_tokens=2100,
+                prompt_tokens_details={"cached_tokens": 1536},
+            )
+        )
+
+        usage = usage_from_response(response)
+
+        assert usage.cached_tokens == 1536
+        assert usage.cached_ratio == 0.768
+
+    def test_cached_ratio_without_prompt_tokens(self):
+        assert TokenUsage().cached_ratio == 0.0
+        assert TokenUsage(prompt_tokens=100).model_dump()["cached_ratio"] == 0.0
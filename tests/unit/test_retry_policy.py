@@ -0,0 +1,227 @@
+import asyncio
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.services.retry_policy import (
+    LatencyTracker,
+    RetryPolicy,
+    call_with_retry,
+    hedged_call,
+    is_retryable_error,
+)
+
+
+class FakeAPIError(Exception):
+    """ステータスコード付きのAPI例外"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = Mock()
+        self.response.headers = headers or {}
+
+
+class APIConnectionError(Exception):
+    """接続エラー（クラス名で分類される）"""
+
+
+NO_WAIT_POLICY = RetryPolicy(max_attempts=3, base_delay=0.0, max_delay=0.0)
+
+
+class TestLatencyTracker:
+    """LatencyTrackerのテスト"""
+
+    def test_percentiles(self):
+        tracker = LatencyTracker()
+        for i in range(1, 101):
+            tracker.record("chat", i / 100)
+
+        assert tracker.percentile("chat", 50) == 0.5
+        assert tracker.percentile("chat", 95) == 0.95
+        assert tracker.percentile("chat", 99) == 0.99
+
+    def test_window_keeps_recent_samples(self):
+        tracker = LatencyTracker(window_size=3)
+        for latency in (10.0, 1.0, 2.0, 3.0):
+            tracker.record("chat", latency)
+
+        assert tracker.sample_count("chat") == 3
+        assert tracker.percentile("chat", 100) == 3.0
+
+    def test_stats_without_samples(self):
+        tracker = LatencyTracker()
+
+        assert tracker.percentile("chat", 95) is None
+        assert tracker.get_stats() == {}
+
+
+class TestRetryPolicy:
+    """RetryPolicyのテスト"""
+
+    def test_retryable_classification(self):
+        assert is_retryable_error(FakeAPIError(429))
+        assert is_retryable_error(FakeAPIError(502))
+        assert is_retryable_error(asyncio.TimeoutError())
+        assert is_retryable_error(APIConnectionError())
+        assert not is_retryable_error(FakeAPIError(400))
+        assert not is_retryable_error(ValueError("bad"))
+
+    def test_delay_within_exponential_ceiling(self):
+        policy = RetryPolicy(base_delay=1.0, max_delay=3.0)
+
+        for _ in range(50):
+            assert 0.0 <= policy.get_delay(1) <= 1.0
+            assert 0.0 <= policy.get_delay(2) <= 2.0
+            assert 0.0 <= policy.get_delay(5) <= 3.0
+
+    def test_delay_honors_retry_after(self):
+        policy = RetryPolicy(base_delay=0.1, max_delay=10.0)
+        error = FakeAPIError(429, {"retry-after": "4"})
+
+        assert policy.get_delay(1, error) >= 4.0
+
+
+class TestCallWithRetry:
+    """call_with_retryのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_errors(self):
+        tracker = LatencyTracker()
+        calls = []
+
+        async def func():
+            calls.append(1)
+            if len(calls) < 3:
+                raise FakeAPIError(429 if len(calls) == 1 else 503)
+            return "ok"
+
+        result = await call_with_retry(func, "chat", NO_WAIT_POLICY, tracker=tracker)
+
+        assert result == "ok"
+        assert len(calls) == 3
+        assert tracker.sample_count("chat") == 1
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_attempts(self):
+        calls = []
+
+        async def func():
+            calls.append(1)
+            raise asyncio.TimeoutError()
+
+        with pytest.raises(asyncio.TimeoutError):
+            await call_with_retry(func, "chat", NO_WAIT_POLICY, tracker=LatencyTracker())
+
+        assert len(calls) == 3
+
+    @pytest.mark.asyncio
+    async def test_does_not_retry_client_errors(self):
+        calls = []
+
+        async def func():
+            calls.append(1)
+            raise FakeAPIError(400)
+
+        with pytest.raises(FakeAPIError):
+            await call_with_retry(func, "chat", NO_WAIT_POLICY, tracker=LatencyTracker())
+
+        assert len(calls) == 1
+
+
+class TestHedgedCall:
+    """hedged_callのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_no_hedge_without_samples(self):
+        tracker = LatencyTracker()
+        calls = []
+
+        async def func():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "primary"
+
+        assert await hedged_call(func, "chat", tracker) == "primary"
+        assert len(calls) == 1
+
+    @pytest.mark.asyncio
+    async def test_hedge_wins_when_primary_is_slow(self):
+        tracker = LatencyTracker()
+        for _ in range(5):
+            tracker.record("chat", 0.02)
+        delays = [1.0, 0.01]
+        started = []
+
+        async def func():
+            delay = delays[len(started)]
+            started.append(delay)
+            await asyncio.sleep(delay)
+            return f"done in {delay}"
+
+        with patch("app.services.retry_policy.settings") as mock_settings:
+            mock_settings.openai_hedge_min_samples = 5
+            result = await asyncio.wait_for(hedged_call(func, "chat", tracker), 0.5)
+
+        assert result == "done in 0.01"
+        assert len(started) == 2
+
+    @pytest.mark.asyncio
+    async def test_records_primary_latency_when_hedge_wins(self):
+        """ヘッジが勝ったら1本目を打ち切り、打ち切りまでの経過時間を記録するテスト"""
+        tracker = LatencyTracker()
+        for _ in range(5):
+            tracker.record("chat", 0.02)
+        delays = [0.2, 0.05]
+        started = []
+        cancelled = []
+
+        async def func():
+            delay = delays[len(started)]
+            started.append(delay)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(delay)
+                raise
+            return f"done in {delay}"
+
+        with patch("app.services.retry_policy.settings") as mock_settings:
+            mock_settings.openai_hedge_min_samples = 5
+            result = await call_with_retry(
+                func, "chat", NO_WAIT_POLICY, hedge=True, tracker=tracker
+            )
+            await asyncio.sleep(0)
+
+        assert result == "done in 0.05"
+        assert cancelled == [0.2]
+        assert tracker.sample_count("chat") == 6
+        # ヘッジの所要時間(0.05秒)ではなく1本目の経過時間(約0.07秒)
+        assert 0.06 <= tracker.percentile("chat", 100) < 0.2
+
+    @pytest.mark.asyncio
+    async def test_caller_cancel_cancels_primary(self):
+        """ヘッジ待ちの間に呼び出し元がキャンセルされたら1本目も打ち切るテスト"""
+        tracker = LatencyTracker()
+        for _ in range(5):
+            tracker.record("chat", 1.0)
+        cancelled = []
+
+        async def func():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        with patch("app.services.retry_policy.settings") as mock_settings:
+            mock_settings.openai_hedge_min_samples = 5
+            call = asyncio.ensure_future(hedged_call(func, "chat", tracker))
+            await asyncio.sleep(0.05)
+            call.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await call
+            await asyncio.sleep(0)
+
+        assert cancelled == [True]
+        assert tracker.sample_count("chat") == 5
@@ -0,0 +1,145 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.scheduler import (
+    SchedulingPolicy,
+    SchedulingQueue,
+    TaskPriority,
+    parse_policy,
+)
+from app.services.task_queue import AsyncTaskQueue
+
+
+def job(name, owner=None, seconds=None, priority=TaskPriority.NORMAL):
+    return SimpleNamespace(
+        name=name, owner=owner, expected_seconds=seconds, priority=priority
+    )
+
+
+def drain(queue):
+    names = []
+    while not queue.empty():
+        names.append(queue.get_nowait().name)
+    return names
+
+
+class TestSchedulingQueue:
+    def test_fifo_with_priorities(self):
+        queue = SchedulingQueue(SchedulingPolicy.FIFO)
+        queue.put_nowait(job("a"))
+        queue.put_nowait(job("low", priority=TaskPriority.LOW))
+        queue.put_nowait(job("b"))
+        queue.put_nowait(job("urgent", priority=TaskPriority.HIGH))
+
+        assert queue.qsize() == 4
+        assert drain(queue) == ["urgent", "a", "b", "low"]
+        assert queue.qsize() == 0
+
+    def test_fair_share_interleaves_owners(self):
+        queue = SchedulingQueue(SchedulingPolicy.FAIR, fair_quantum_seconds=600)
+        # 一人目が3時間の録音を大量に登録した後に、二人目が5分のクリップを登録
+        for n in range(20):
+            queue.put_nowait(job(f"long-{n}", owner="batch", seconds=3 * 3600))
+        queue.put_nowait(job("clip-1", owner="user", seconds=300))
+        queue.put_nowait(job("clip-2", owner="user", seconds=300))
+
+        order = drain(queue)
+
+        assert order.index("clip-1") <= 1
+        assert order.index("clip-2") <= 2
+        assert len(order) == 22
+
+    def test_fair_share_splits_by_media_seconds(self):
+        queue = SchedulingQueue(SchedulingPolicy.FAIR, fair_quantum_seconds=600)
+        for n in range(4):
+            queue.put_nowait(job(f"a{n}", owner="a", seconds=1200))
+            queue.put_nowait(job(f"b{n}", owner="b", seconds=300))
+
+        order = drain(queue)
+
+        # 同じ時間で「a」の長いタスク1件に対し「b」の短いタスクが4件処理される
+        assert order[:5] == ["b0", "b1", "a0", "b2", "b3"]
+
+    def test_fair_share_respects_priority(self):
+        queue = SchedulingQueue(SchedulingPolicy.FAIR)
+        queue.put_nowait(job("normal", owner="a"))
+        queue.put_nowait(job("high", owner="b", priority=TaskPriority.HIGH))
+
+        assert drain(queue) == ["high", "normal"]
+
+    def test_shortest_expected_job_first(self):
+        queue = SchedulingQueue(SchedulingPolicy.SJF, default_expected_seconds=600)
+        queue.put_nowait(job("3h", seconds=10800))
+        queue.put_nowait(job("unknown"))
+        queue.put_nowait(job("5m", seconds=300))
+        queue.put_nowait(job("5m-later", seconds=300))
+
+        assert drain(queue) == ["5m", "5m-later", "unknown", "3h"]
+
+    @pytest.mark.parametrize("policy", list(SchedulingPolicy))
+    def test_remove(self, policy):
+        queue = SchedulingQueue(policy)
+        queue.put_nowait(job("a", owner="x"))
+        queue.put_nowait(job("b", owner="x"))
+        queue.put_nowait(job("c", owner="y", priority=TaskPriority.HIGH))
+        queue.put_nowait(job("d", owner="y"))
+
+        removed = queue.remove(lambda item: item.name in ("b", "c"))
+
+        assert sorted(item.name for item in removed) == ["b", "c"]
+        assert queue.qsize() == 2
+        assert drain(queue) == ["a", "d"]
+
+    def test_items_in_dequeue_order(self):
+        """待機中の要素を取り出し順に列挙するテスト"""
+        sjf = SchedulingQueue(SchedulingPolicy.SJF)
+        sjf.put_nowait(job("long", seconds=3600))
+        sjf.put_nowait(job("short", seconds=60))
+        sjf.put_nowait(job("urgent", seconds=7200, priority=TaskPriority.HIGH))
+        assert [item.name for item in sjf.items()] == ["urgent", "short", "long"]
+        assert drain(sjf) == ["urgent", "short", "long"]
+
+        fair = SchedulingQueue(SchedulingPolicy.FAIR)
+        for name in ("a1", "a2", "a3"):
+            fair.put_nowait(job(name, owner="a"))
+        fair.put_nowait(job("b1", owner="b"))
+        assert [item.name for item in fair.items()] == ["a1", "b1", "a2", "a3"]
+
+    def test_stats(self):
+        queue = SchedulingQueue(SchedulingPolicy.FAIR)
+        queue.put_nowait(job("a", owner="x"))
+        queue.put_nowait(job("b", owner="y", priority=TaskPriority.HIGH))
+        queue.put_nowait(job("c"))
+
+        assert queue.get_stats() == {
+            "policy": "fair",
+            "by_priority": {"normal": 2, "high": 1},
+            "owners": 3,
+        }
+
+    def test_parse_policy(self):
+        assert parse_policy("SJF") == SchedulingPolicy.SJF
+        assert parse_policy("unknown") == SchedulingPolicy.FIFO
+
+
+class TestAsyncTaskQueueScheduling:
+    @pytest.mark.asyncio
+    async def test_add_task_scheduling_options(self):
+        task_queue = AsyncTaskQueue(max_concurrent_tasks=1, policy="fair")
+
+        async def work(value, scale=1):
+            return value * scale
+
+        await task_queue.add_task(
+            "t1", work, 1, scale=2, owner="a", expected_seconds=60
+        )
+        await task_queue.add_task("t2", work, 2, priority=TaskPriority.HIGH)
+
+        first = task_queue.queue.get_nowait()
+        second = task_queue.queue.get_nowait()
+
+        assert first.task_id == "t2"
+        assert (second.owner, second.expected_seconds) == ("a", 60)
+        assert second.kwargs == {"scale": 2}
+        assert task_queue.get_queue_status()["scheduler"]["policy"] == "fair"
@@ -0,0 +1,130 @@
+import pytest
+
+from app.models import TranscriptionSegment
+from app.services.segment_index import (
+    SegmentIndex,
+    SegmentIndexStore,
+    estimate_timestamp,
+    format_timestamp,
+)
+from app.services.vad import OffsetMap
+
+TRANSCRIPT = "おはようございます。予算の件です。次回は来週です。"
+SEGMENTS = [
+    TranscriptionSegment(start=0.0, end=2.0, text="おはようございます。"),
+    TranscriptionSegment(start=65.0, end=68.5, text=" 予算の件です。"),
+    TranscriptionSegment(start=3700.0, end=3703.0, text="次回は来週です。"),
+]
+
+
+class TestSegmentIndex:
+    def test_from_segments_char_offsets(self):
+        index = SegmentIndex.from_segments(TRANSCRIPT, SEGMENTS)
+
+        assert len(index) == 3
+        assert list(index.char_offsets) == [
+            0,
+            TRANSCRIPT.index("予算"),
+            TRANSCRIPT.index("次回"),
+        ]
+
+    def test_lookup_returns_containing_segment(self):
+        index = SegmentIndex.from_segments(TRANSCRIPT, SEGMENTS)
+
+        assert index.lookup(0) == (0.0, 2.0)
+        assert index.lookup(TRANSCRIPT.index("件")) == (65.0, 68.5)
+        assert index.lookup(len(TRANSCRIPT) - 1)[0] == 3700.0
+
+    def test_lookup_empty_index(self):
+        assert SegmentIndex().lookup(10) is None
+
+    def test_unmatched_segment_follows_previous(self):
+        segments = [
+            TranscriptionSegment(start=0.0, end=1.0, text="おはようございます。"),
+            TranscriptionSegment(start=1.0, end=2.0, text="一致しない文"),
+        ]
+        index = SegmentIndex.from_segments(TRANSCRIPT, segments)
+
+        assert list(index.char_offsets) == [0, len("おはようございます。")]
+
+    def test_offset_map_restores_original_times(self):
+        # 除去後0-10秒 → 元30-40秒、除去後10-20秒 → 元100-110秒
+        offset_map = OffsetMap([(30.0, 40.0), (100.0, 110.0)])
+        segments = [
+            TranscriptionSegment(start=1.0, end=2.0, text="おはようございます。"),
+            TranscriptionSegment(start=12.0, end=14.0, text="予算の件です。"),
+        ]
+        index = SegmentIndex.from_segments(TRANSCRIPT, segments, offset_map)
+
+        assert list(index.starts) == [31.0, 102.0]
+        assert list(index.ends) == [32.0, 104.0]
+
+    def test_segment_end_at_boundary_is_not_moved_past_silence(self):
+        offset_map = OffsetMap([(30.0, 40.0), (100.0, 110.0)])
+        segments = [
+            TranscriptionSegment(start=8.0, end=10.0, text="おはようございます。"),
+        ]
+        index = SegmentIndex.from_segments(TRANSCRIPT, segments, offset_map)
+
+        assert list(index.starts) == [38.0]
+        assert list(index.ends) == [40.0]
+
+    def test_bytes_round_trip(self):
+        index = SegmentIndex.from_segments(TRANSCRIPT, SEGMENTS)
+
+        restored = SegmentIndex.from_bytes(index.to_bytes())
+
+        assert list(restored.char_offsets) == list(index.char_offsets)
+        assert list(restored.starts) == list(index.starts)
+        assert list(restored.ends) == list(index.ends)
+
+    def test_from_bytes_rejects_invalid_data(self):
+        with pytest.raises(ValueError):
+            SegmentIndex.from_bytes(b"XXXX\x00\x00\x00\x00")
+
+
+class TestEstimateTimestamp:
+    def test_format_timestamp(self):
+        assert format_timestamp(3725.9) == "01:02:05"
+        assert format_timestamp(-1) == "00:00:00"
+
+    def test_uses_index(self):
+        index = SegmentIndex.from_segments(TRANSCRIPT, SEGMENTS)
+        position = TRANSCRIPT.index("次回")
+
+        assert estimate_timestamp(position, TRANSCRIPT, index) == "01:01:40"
+
+    def test_fallback_without_index(self):
+        assert estimate_timestamp(650, "あ" * 1000) == "00:01:05"
+
+
+class TestSegmentIndexStore:
+    def test_save_get_delete(self, temp_dir):
+        store = SegmentIndexStore(storage_dir=temp_dir)
+        index = SegmentIndex.from_segments(TRANSCRIPT, SEGMENTS)
+
+        store.save("task-1", index)
+
+        # キャッシュを使わずファイルから復元できること
+        reloaded = SegmentIndexStore(storage_dir=temp_dir).get("task-1")
+        assert list(reloaded.starts) == list(index.starts)
+
+        store.delete("task-1")
+        assert store.get("task-1") is None
+        assert SegmentIndexStore(storage_dir=temp_dir).get("task-1") is None
+
+    def test_get_missing_or_invalid_task_id(self, temp_dir):
+        store = SegmentIndexStore(storage_dir=temp_dir)
+
+        assert store.get("missing") is None
+        assert store.get(None) is None
+
+    def test_cache_is_bounded(self, temp_dir):
+        store = SegmentIndexStore(storage_dir=temp_dir, cache_size=2)
+        index = SegmentIndex.from_segments(TRANSCRIPT, SEGMENTS)
+
+        for task_id in ("a", "b", "c"):
+            store.save(task_id, index)
+
+        assert list(store._cache) == ["b", "c"]
+        assert store.get("a") is not None
@@ -0,0 +1,125 @@
+import os
+from unittest.mock import Mock
+
+import numpy as np
+
+from app.models.chat import ChatSession
+from app.services.citation_service import CitationService
+from app.services.sentence_vectors import (
+    SentenceVectorIndex,
+    SentenceVectorStore,
+    split_sentences,
+)
+
+TRANSCRIPT = (
+    "今日の会議を始めます。\n"
+    "まず、プロジェクトの進捗について報告します。現在、開発は順調に進んでいます。\n"
+    "特に品質管理の問題を重点的に検討します。\n"
+    "テストの自動化が遅れているという指摘がありました。\n"
+    "営業部からは新しい顧客の紹介がありました。"
+)
+
+
+class TestSplitSentences:
+    def test_spans_are_stripped_sentences(self):
+        spans = split_sentences(TRANSCRIPT)
+
+        sentences = [TRANSCRIPT[start:end] for start, end in spans]
+        assert sentences[0] == "今日の会議を始めます。"
+        assert "現在、開発は順調に進んでいます。" in sentences
+        assert all(sentence == sentence.strip() for sentence in sentences)
+
+    def test_empty_text(self):
+        assert split_sentences("") == []
+        assert split_sentences(" \n ") == []
+
+
+class TestSentenceVectorIndex:
+    def test_build_creates_float32_matrix(self):
+        index = SentenceVectorIndex.build(TRANSCRIPT, dim=256)
+
+        assert index.matrix.shape == (len(index), 256)
+        assert index.matrix.dtype == np.float32
+        assert index.spans.shape == (len(index), 2)
+        assert index.idf.shape == (256,)
+
+    def test_search_ranks_matching_sentence_first(self):
+        index = SentenceVectorIndex.build(TRANSCRIPT)
+
+        results = index.search(["品質管理の問題", "テスト自動化の遅れ"], top_k=2)
+
+        start, end, score = results[0][0]
+        assert TRANSCRIPT[start:end] == "特に品質管理の問題を重点的に検討します。"
+        assert score > results[0][1][2]
+        start, end, _ = results[1][0]
+        assert TRANSCRIPT[start:end].startswith("テストの自動化")
+
+    def test_threshold_filters_unrelated_phrases(self):
+        index = SentenceVectorIndex.build(TRANSCRIPT)
+
+        results = index.search(["全然関係のない天気の話題"], top_k=3, threshold=0.3)
+
+        assert results == [[]]
+
+    def test_empty_inputs(self):
+        index = SentenceVectorIndex.build("")
+
+        assert len(index) == 0
+        assert index.search(["品質管理"]) == [[]]
+        assert SentenceVectorIndex.build(TRANSCRIPT).search([]) == []
+
+
+class TestSentenceVectorStore:
+    def test_saves_and_loads_per_task(self, temp_dir):
+        store = SentenceVectorStore(storage_dir=temp_dir)
+
+        built = store.get(TRANSCRIPT, task_id="task-1", dim=256)
+        path = os.path.join(temp_dir, "sentence_vectors", "task-1.npz")
+        assert os.path.exists(path)
+
+        loaded = SentenceVectorStore(storage_dir=temp_dir).get(
+            TRANSCRIPT, task_id="task-1", dim=256
+        )
+        assert loaded is not built
+        np.testing.assert_array_equal(loaded.matrix, built.matrix)
+        np.testing.assert_array_equal(loaded.spans, built.spans)
+
+        store.delete("task-1")
+        assert not os.path.exists(path)
+
+    def test_rebuilds_when_transcript_changes(self, temp_dir):
+        SentenceVectorStore(storage_dir=temp_dir).get(TRANSCRIPT, "task-1", dim=256)
+
+        changed = TRANSCRIPT + "\n次回は来週です。"
+        index = SentenceVectorStore(storage_dir=temp_dir).get(changed, "task-1", dim=256)
+
+        assert len(index) == len(split_sentences(changed))
+
+    def test_without_task_id_uses_memory_only(self, temp_dir):
+        store = SentenceVectorStore(storage_dir=temp_dir)
+
+        first = store.get(TRANSCRIPT, dim=256)
+
+        assert store.get(TRANSCRIPT, dim=256) is first
+        assert not os.path.exists(os.path.join(temp_dir, "sentence_vectors"))
+
+
+class TestSemanticCitations:
+    def test_citation_points_to_similar_sentence(self):
+        service = CitationService()
+        session = Mock(spec=ChatSession)
+        session.transcription = TRANSCRIPT
+
+        citations = service._find_semantic_citations(
+            "「品質管理の課題」を優先して検討することになりました。",
+            TRANSCRIPT,
+            session,
+        )
+
+        texts = [citation.text for citation in citations]
+        assert "特に品質管理の問題を重点的に検討します。" in texts
+        for citation in citations:
+            assert TRANSCRIPT[citation.highlight_start : citation.highlight_end] == (
+                citation.text
+            )
+            assert 0.0 < citation.confidence <= 1.0
@@ -3,7 +3,8 @@ import pytest
 from datetime import datetime
 
 from app.store import tasks_store
-from app.models import MinutesTask
+from app.store.persistent_store import PersistentTaskStore
+from app.models import MinutesTask, TaskStatus
 
 
 class TestTasksStore:
@@ -327,4 +328,45 @@ class TestTasksStore:
         # 結果確認
         assert len(results) == 5
         assert len(tasks_store) == 5
-        assert all(f"concurrent-{i}" in tasks_store for i in range(5))
\ No newline at end of file
+        assert all(f"concurrent-{i}" in tasks_store for i in range(5))
+
+def make_task(task_id):
+    return MinutesTask(
+        task_id=task_id,
+        video_filename=f"{task_id}.mp4",
+        video_size=1024,
+        upload_timestamp=datetime.now(),
+    )
+
+
+class TestPersistentTaskStore:
+    """同じファイルに保存する複数のプロセスのテスト"""
+
+    def test_replicas_do_not_overwrite_each_others_tasks(self, tmp_path):
+        first = PersistentTaskStore(storage_dir=str(tmp_path))
+        second = PersistentTaskStore(storage_dir=str(tmp_path))
+
+        first.add_task("session-a", make_task("task-1"))
+        second.add_task("session-b", make_task("task-2"))
+        second.delete_task("session-b", "task-2")
+        second.add_task("session-b", make_task("task-3"))
+
+        reloaded = PersistentTaskStore(storage_dir=str(tmp_path))
+        assert reloaded.has_task("session-a", "task-1")
+        assert not reloaded.has_task("session-b", "task-2")
+        assert reloaded.has_task("session-b", "task-3")
+
+    def test_stale_copy_does_not_overwrite_newer_update(self, tmp_path):
+        owner = PersistentTaskStore(storage_dir=str(tmp_path))
+        owner.add_task("session-a", make_task("task-1"))
+        other = PersistentTaskStore(storage_dir=str(tmp_path))
+        assert other.load_task_from_disk("task-1") is not None
+
+        task = owner.get_task("session-a", "task-1")
+        task.status = TaskStatus.COMPLETED
+        owner.update_task("session-a", task)
+        other.add_task("session-b", make_task("task-2"))
+
+        reloaded = PersistentTaskStore(storage_dir=str(tmp_path))
+        assert reloaded.get_task("session-a", "task-1").status == TaskStatus.COMPLETED
+        assert reloaded.has_task("session-b", "task-2")
@@ -0,0 +1,578 @@
+import asyncio
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.services.task_journal import CANCELLED, QUEUED, RUNNING, TaskJournal
+from app.services.task_queue import StagedTaskPipeline
+
+# 2段目の途中で強制終了されるワーカープロセス
+CRASHING_WORKER = textwrap.dedent(
+    """
+    import asyncio, sys, pathlib
+    from app.services.task_journal import TaskJournal
+    from app.services.task_queue import StagedTaskPipeline
+
+    journal_path, marker = sys.argv[1], pathlib.Path(sys.argv[2])
+
+    async def extract(task_id, context):
+        context["audio_path"] = f"/tmp/{task_id}.mp3"
+        return True
+
+    async def transcribe(task_id, context):
+        marker.write_text("started")
+        await asyncio.sleep(3600)
+        return True
+
+    async def minutes(task_id, context):
+        return True
+
+    async def main():
+        pipeline = StagedTaskPipeline(
+            [("extract", extract, 1), ("transcribe", transcribe, 1),
+             ("minutes", minutes, 1)]
+        )
+        pipeline.attach_journal(TaskJournal(journal_path, lease_seconds=0.6))
+        await pipeline.start_workers()
+        await pipeline.submit("task-1", {"media_type": "video"}, owner="alice")
+        await asyncio.sleep(3600)
+
+    asyncio.run(main())
+    """
+)
+
+
+async def wait_until(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        await asyncio.sleep(0.02)
+
+
+class TestTaskJournal:
+    def test_uses_wal_mode(self, tmp_path):
+        journal = TaskJournal(str(tmp_path / "journal.sqlite3"))
+
+        mode = journal._conn.execute("PRAGMA journal_mode").fetchone()[0]
+
+        assert mode == "wal"
+        journal.close()
+
+    def test_lease_lifecycle(self, tmp_path):
+        path = str(tmp_path / "journal.sqlite3")
+        worker = TaskJournal(path, lease_seconds=60)
+        other = TaskJournal(path, lease_seconds=60)
+        worker.enqueue("t", 0, {"media_type": "audio"}, {"owner": "a"})
+
+        assert [e.task_id for e in worker.claim(0, 5)] == ["t"]
+        assert other.claim(0, 5) == []
+        assert not other.acquire("t", 0)
+        assert worker.acquire("t", 0)
+        assert worker.renew_leases() == 1
+        assert other.renew_leases() == 0
+        assert other.reclaim_expired() == []
+
+        worker.enqueue("t", 1, {"media_type": "audio", "audio_path": "x"}, {})
+        entry = other.get("t")
+        assert (entry.stage, entry.state, entry.attempts) == (1, QUEUED, 0)
+        assert entry.context["audio_path"] == "x"
+
+        worker.finish("t")
+        assert other.get("t") is None
+        worker.close()
+        other.close()
+
+    def test_backlog_counts_unclaimed_tasks_per_stage(self, tmp_path):
+        journal = TaskJournal(str(tmp_path / "journal.sqlite3"))
+        assert journal.backlog(0) == (0, 0.0)
+
+        for task_id in ("a", "b", "c"):
+            journal.enqueue(task_id, 0, {}, {})
+        journal.enqueue("d", 1, {}, {})
+        journal.claim(0, 1)
+        time.sleep(0.05)
+
+        count, oldest_wait = journal.backlog(0)
+        assert count == 2
+        assert oldest_wait >= 0.05
+        assert journal.backlog(1)[0] == 1
+        journal.close()
+
+    def test_stage_load_sums_expected_seconds(self, tmp_path):
+        journal = TaskJournal(str(tmp_path / "journal.sqlite3"))
+        journal.enqueue("a", 0, {}, {"expected_seconds": 120})
+        journal.enqueue("b", 0, {}, {"expected_seconds": None})
+        journal.enqueue("c", 1, {}, {"expected_seconds": 30})
+        journal.enqueue("d", 1, {}, {"expected_seconds": 60})
+        journal.request_cancel("d")
+
+        # 長さ不明のタスクは既定値、キャンセル済みは数えない
+        assert journal.stage_load(600) == {0: (2, 720.0), 1: (1, 30.0)}
+        journal.close()
+
+    def test_locate_counts_tasks_ahead(self, tmp_path):
+        journal = TaskJournal(str(tmp_path / "journal.sqlite3"))
+        journal.enqueue("running", 1, {}, {"priority": 1, "expected_seconds": 600})
+        assert journal.acquire("running", 1)
+        journal.enqueue("first", 1, {}, {"priority": 1, "expected_seconds": 300})
+        journal.enqueue("second", 1, {}, {"priority": 1, "expected_seconds": None})
+        journal.enqueue("urgent", 1, {}, {"priority": 2, "expected_seconds": 60})
+        journal.enqueue("other", 0, {}, {"priority": 1})
+
+        position = journal.locate("second", 100)
+        assert (position.stage, position.elapsed_seconds) == (1, None)
+        assert position.expected_seconds == 100.0
+        # 優先度の高いタスクと先に登録されたタスクが先
+        assert (position.ahead, position.ahead_seconds) == (2, 360.0)
+        assert [expected for expected, _ in position.running] == [600.0]
+
+        running = journal.locate("running", 100)
+        assert running.elapsed_seconds is not None
+        assert (running.ahead, running.running) == (0, [])
+
+        journal.request_cancel("other")
+        assert journal.locate("other") is None
+        assert journal.locate("missing") is None
+        journal.close()
+
+    def test_expired_lease_is_reclaimed(self, tmp_path):
+        path = str(tmp_path / "journal.sqlite3")
+        crashed = TaskJournal(path, lease_seconds=0.05)
+        crashed.enqueue("t", 2, {}, {"priority": 1})
+        assert crashed.acquire("t", 2)
+        assert crashed.get("t").state == RUNNING
+        time.sleep(0.1)
+
+        restarted = TaskJournal(path)
+        assert restarted.claim(2, 1) == []
+        reclaimed = restarted.reclaim_expired()
+
+        assert [(e.task_id, e.stage, e.state) for e in reclaimed] == [
+            ("t", 2, QUEUED)
+        ]
+        assert [e.task_id for e in restarted.claim(2, 1)] == ["t"]
+        assert restarted.acquire("t", 2)
+        assert restarted.get("t").attempts == 2
+        crashed.close()
+        restarted.close()
+
+    def test_reclaimed_task_keeps_enqueue_order(self, tmp_path):
+        """期限切れで回収したタスクが待機列の末尾に回らないテスト"""
+        path = str(tmp_path / "journal.sqlite3")
+        crashed = TaskJournal(path, lease_seconds=0.05)
+        crashed.enqueue("first", 0, {}, {"priority": 1})
+        time.sleep(0.01)
+        crashed.enqueue("second", 0, {}, {"priority": 1})
+        assert [e.task_id for e in crashed.claim(0, 1)] == ["first"]
+        assert crashed.acquire("first", 0)
+        time.sleep(0.1)
+
+        restarted = TaskJournal(path)
+        assert [e.task_id for e in restarted.reclaim_expired()] == ["first"]
+
+        assert restarted.locate("second").ahead == 1
+        assert [e.task_id for e in restarted.claim(0, 2)] == ["first", "second"]
+        crashed.close()
+        restarted.close()
+
+    def test_migrates_journal_without_enqueue_time(self, tmp_path):
+        path = str(tmp_path / "journal.sqlite3")
+        conn = sqlite3.connect(path)
+        conn.execute(
+            "CREATE TABLE pipeline_jobs (task_id TEXT PRIMARY KEY, "
+            "stage INTEGER NOT NULL, state TEXT NOT NULL, context TEXT NOT NULL, "
+            "schedule TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "lease_owner TEXT, lease_expires REAL, heartbeat_at REAL, "
+            "updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "INSERT INTO pipeline_jobs (task_id, stage, state, context, schedule, "
+            "updated_at) VALUES ('old', 0, 'queued', '{}', '{}', 1)"
+        )
+        conn.commit()
+        conn.close()
+
+        journal = TaskJournal(path)
+        journal.enqueue("new", 0, {}, {})
+
+        assert [e.task_id for e in journal.claim(0, 2)] == ["old", "new"]
+        journal.close()
+
+    def test_cancelled_entry_is_not_requeued(self, tmp_path):
+        path = str(tmp_path / "journal.sqlite3")
+        worker = TaskJournal(path, lease_seconds=0.05)
+        other = TaskJournal(path)
+        worker.enqueue("t", 0, {}, {})
+        assert worker.acquire("t", 0)
+
+        assert other.request_cancel("t")
+        worker.enqueue("t", 1, {}, {})
+        time.sleep(0.1)
+
+        assert other.reclaim_expired() == []
+        assert other.get("t").state == CANCELLED
+        assert not other.acquire("t", 0)
+        assert [e.task_id for e in other.cancelled_entries()] == ["t"]
+        assert other.finish("t")
+        assert not other.request_cancel("t")
+        worker.close()
+        other.close()
+
+    def test_claim_order_follows_policy(self, tmp_path):
+        journal = TaskJournal(str(tmp_path / "journal.sqlite3"))
+        journal.enqueue("busy-1", 0, {}, {"priority": 1, "owner": "busy"})
+        journal.enqueue("busy-2", 0, {}, {"priority": 1, "owner": "busy"})
+        journal.enqueue("idle-1", 0, {}, {"priority": 1, "owner": "idle"})
+        journal.enqueue("urgent", 0, {}, {"priority": 2, "owner": "busy"})
+        journal.enqueue("running", 1, {}, {"priority": 1, "owner": "busy"})
+        journal.claim(1, 1)
+
+        fair = [e.task_id for e in journal.claim(0, 2, "fair")]
+
+        assert fair == ["urgent", "idle-1"]
+        journal.close()
+
+    def test_claim_shortest_first(self, tmp_path):
+        journal = TaskJournal(str(tmp_path / "journal.sqlite3"))
+        journal.enqueue("3h", 0, {}, {"priority": 1, "expected_seconds": 10800})
+        journal.enqueue("unknown", 0, {}, {"priority": 1})
+        journal.enqueue("5m", 0, {}, {"priority": 1, "expected_seconds": 300})
+
+        order = [e.task_id for e in journal.claim(0, 3, "sjf", 600)]
+
+        assert order == ["5m", "unknown", "3h"]
+        journal.close()
+
+
+class TestDurablePipeline:
+    @pytest.mark.asyncio
+    async def test_recovers_task_after_worker_is_killed(self, tmp_path):
+        journal_path = str(tmp_path / "journal.sqlite3")
+        marker = tmp_path / "started"
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        worker = subprocess.Popen(
+            [sys.executable, "-c", CRASHING_WORKER, journal_path, str(marker)],
+            env=env,
+        )
+        try:
+            await wait_until(marker.exists, timeout=30)
+        finally:
+            # 文字起こしの途中でワーカーを強制終了
+            worker.send_signal(signal.SIGKILL)
+            worker.wait()
+
+        journal = TaskJournal(journal_path, lease_seconds=0.6)
+        crashed = journal.get("task-1")
+        assert (crashed.stage, crashed.state) == (1, RUNNING)
+
+        calls = []
+
+        async def extract(task_id, context):
+            calls.append(("extract", task_id))
+            return True
+
+        async def transcribe(task_id, context):
+            calls.append(("transcribe", context["audio_path"]))
+            return True
+
+        async def minutes(task_id, context):
+            calls.append(("minutes", task_id))
+            return True
+
+        pipeline = StagedTaskPipeline(
+            [
+                ("extract", extract, 1),
+                ("transcribe", transcribe, 1),
+                ("minutes", minutes, 1),
+            ]
+        )
+        pipeline.attach_journal(journal)
+        await pipeline.start_workers()
+        try:
+            # リースの期限が切れると回収され、中断したステージから再開する
+            await pipeline.recover()
+            await wait_until(lambda: len(calls) == 2)
+            await wait_until(lambda: journal.get("task-1") is None)
+        finally:
+            await pipeline.stop_workers()
+            journal.close()
+
+        assert calls == [("transcribe", "/tmp/task-1.mp3"), ("minutes", "task-1")]
+
+    @pytest.mark.asyncio
+    async def test_stopped_worker_releases_lease_for_restart(self, tmp_path):
+        journal_path = str(tmp_path / "journal.sqlite3")
+        started = asyncio.Event()
+
+        async def blocking(task_id, context):
+            started.set()
+            await asyncio.sleep(3600)
+            return True
+
+        first = StagedTaskPipeline([("extract", blocking, 1)])
+        first.attach_journal(TaskJournal(journal_path, lease_seconds=60))
+        await first.start_workers()
+        await first.submit("task-1", {"media_type": "audio"})
+        await asyncio.wait_for(started.wait(), 5)
+        await first.stop_workers()
+        first.journal.release_owned()
+        first.journal.close()
+
+        done = []
+
+        async def finish(task_id, context):
+            done.append(context["media_type"])
+            return True
+
+        second = StagedTaskPipeline([("extract", finish, 1)])
+        second.attach_journal(TaskJournal(journal_path, lease_seconds=60))
+        await second.start_workers()
+        try:
+            assert await second.recover() == ["task-1"]
+            await wait_until(lambda: done == ["audio"])
+        finally:
+            await second.stop_workers()
+            second.journal.close()
+
+    @pytest.mark.asyncio
+    async def test_gives_up_after_max_attempts(self, tmp_path):
+        journal = TaskJournal(str(tmp_path / "journal.sqlite3"), lease_seconds=0.01)
+        journal.enqueue("poison", 0, {}, {})
+        for _ in range(3):
+            journal.reclaim_expired()
+            assert journal.acquire("poison", 0)
+            time.sleep(0.02)
+
+        async def stage(task_id, context):
+            return True
+
+        pipeline = StagedTaskPipeline([("extract", stage, 1)])
+        pipeline.attach_journal(journal, max_attempts=3)
+
+        assert await pipeline.recover() == []
+        assert journal.get("poison") is None
+        journal.close()
+
+
+class TestGracefulDrain:
+    @pytest.mark.asyncio
+    async def test_drain_hands_remaining_work_to_journal(self, tmp_path):
+        """停止時に完了したステージの次と中断したステージがジャーナルに残るテスト"""
+        path = str(tmp_path / "journal.sqlite3")
+        started = {"fast": asyncio.Event(), "slow": asyncio.Event()}
+
+        async def extract(task_id, context):
+            started[task_id].set()
+            await asyncio.sleep(0.1 if task_id == "fast" else 3600)
+            return True
+
+        async def transcribe(task_id, context):
+            return True
+
+        pipeline = StagedTaskPipeline(
+            [("extract", extract, 2), ("transcribe", transcribe, 1)]
+        )
+        journal = TaskJournal(path)
+        pipeline.attach_journal(journal)
+        await pipeline.start_workers()
+        await pipeline.submit("fast")
+        await pipeline.submit("slow")
+        await asyncio.wait_for(started["slow"].wait(), 3)
+        await asyncio.wait_for(started["fast"].wait(), 3)
+
+        interrupted = await pipeline.drain(grace_seconds=0.5)
+        assert interrupted == ["slow"]
+        assert journal.release_owned() == 1
+        journal.close()
+
+        other = TaskJournal(path)
+        fast, slow = other.get("fast"), other.get("slow")
+        # 完了したステージの次は取得されずに待機
+        assert (fast.stage, fast.state, fast.lease_owner) == (1, QUEUED, None)
+        # 停止で中断したステージは試行回数を消費せずに待機へ戻る
+        assert (slow.stage, slow.state, slow.attempts) == (0, QUEUED, 0)
+        other.close()
+
+
+class TestSharedJournal:
+    @staticmethod
+    def replica(path, stage, lease_seconds=0.3):
+        pipeline = StagedTaskPipeline([("extract", stage, 1)])
+        pipeline.attach_journal(
+            TaskJournal(path, lease_seconds=lease_seconds), claim_interval=0.05
+        )
+        return pipeline
+
+    @pytest.mark.asyncio
+    async def test_backlog_is_served_from_snapshot(self, tmp_path):
+        """受け付け制御・/health はイベントループ上でSQLiteを読まないテスト"""
+        release = asyncio.Event()
+
+        async def hang(task_id, context):
+            await release.wait()
+            return True
+
+        pipeline = self.replica(str(tmp_path / "journal.sqlite3"), hang)
+        await pipeline.start_workers()
+        try:
+            await pipeline.submit("running", {}, expected_seconds=60)
+            await pipeline.submit("waiting", {}, expected_seconds=30)
+
+            with patch.object(
+                pipeline.journal, "stage_load", side_effect=AssertionError
+            ), patch.object(pipeline.journal, "get_stats", side_effect=AssertionError):
+                backlog = pipeline.get_backlog()
+                status = pipeline.get_queue_status()
+
+            assert (backlog["tasks"], backlog["expected_seconds"]) == (2, 90.0)
+            assert status["journal"] == {"unclaimed": 1, "claimed": 0, "running": 1}
+            assert pipeline._journal_backlog(0)[0] == 1
+        finally:
+            release.set()
+            await pipeline.stop_workers()
+            pipeline.journal.close()
+
+    @pytest.mark.asyncio
+    async def test_estimate_task_locates_in_thread(self, tmp_path):
+        """順番の問い合わせはジャーナルをイベントループ外で読むテスト"""
+        release = asyncio.Event()
+
+        async def hang(task_id, context):
+            await release.wait()
+            return True
+
+        pipeline = self.replica(str(tmp_path / "journal.sqlite3"), hang)
+        locate = pipeline.journal.locate
+        threads = []
+
+        def recording_locate(*args):
+            threads.append(threading.current_thread())
+            return locate(*args)
+
+        await pipeline.start_workers()
+        try:
+            await pipeline.submit("running", {})
+            await pipeline.submit("waiting", {})
+            with patch.object(pipeline.journal, "locate", recording_locate):
+                estimate = await pipeline.estimate_task("waiting")
+        finally:
+            release.set()
+            await pipeline.stop_workers()
+            pipeline.journal.close()
+
+        assert (estimate.stage, estimate.queue_position) == ("extract", 1)
+        assert threads and threading.main_thread() not in threads
+
+    @pytest.mark.asyncio
+    async def test_idle_replica_picks_up_other_replicas_tasks(self, tmp_path):
+        path = str(tmp_path / "journal.sqlite3")
+        release = asyncio.Event()
+        ran = []
+
+        def stage_for(name):
+            async def stage(task_id, context):
+                ran.append((name, task_id))
+                await release.wait()
+                return True
+
+            return stage
+
+        first = self.replica(path, stage_for("first"))
+        second = self.replica(path, stage_for("second"))
+        await first.start_workers()
+        await second.start_workers()
+        try:
+            assert await first.submit("a") is not None
+            # 1つ目のレプリカは空きがないため、2件目は共有ジャーナルに残る
+            assert await first.submit("b") is None
+            await wait_until(lambda: len(ran) == 2)
+            assert sorted(ran) == [("first", "a"), ("second", "b")]
+
+            # 実行時間がリースより長くても、延長されるため横取りされない
+            await asyncio.sleep(1.0)
+            assert len(ran) == 2
+
+            release.set()
+            await wait_until(lambda: first.journal.task_ids() == [])
+        finally:
+            await first.stop_workers()
+            await second.stop_workers()
+            first.journal.close()
+            second.journal.close()
+
+    @pytest.mark.asyncio
+    async def test_takes_over_tasks_of_stopped_replica(self, tmp_path):
+        path = str(tmp_path / "journal.sqlite3")
+        started = asyncio.Event()
+        done = []
+
+        async def hang(task_id, context):
+            started.set()
+            await asyncio.sleep(3600)
+            return True
+
+        async def finish(task_id, context):
+            done.append(task_id)
+            return True
+
+        dying = self.replica(path, hang)
+        await dying.start_workers()
+        await dying.submit("task-1", {"media_type": "audio"})
+        await asyncio.wait_for(started.wait(), 5)
+
+        survivor = self.replica(path, finish)
+        await survivor.start_workers()
+        try:
+            # リースを解放せずに停止（レプリカの異常終了）
+            await dying.stop_workers()
+            await asyncio.sleep(0.1)
+            assert done == []
+            await wait_until(lambda: done == ["task-1"])
+            await wait_until(lambda: survivor.journal.task_ids() == [])
+        finally:
+            await survivor.stop_workers()
+            dying.journal.close()
+            survivor.journal.close()
+
+    @pytest.mark.asyncio
+    async def test_cancel_reaches_replica_running_the_task(self, tmp_path):
+        path = str(tmp_path / "journal.sqlite3")
+        started = asyncio.Event()
+        aborted = []
+
+        async def hang(task_id, context):
+            started.set()
+            await asyncio.sleep(3600)
+            return True
+
+        async def on_abort(task_id, context, reason):
+            aborted.append((task_id, context["media_type"], reason))
+
+        running = self.replica(path, hang)
+        running.on_abort = on_abort
+        other = self.replica(path, hang)
+        await running.start_workers()
+        await other.start_workers()
+        try:
+            await running.submit("task-1", {"media_type": "video"})
+            await asyncio.wait_for(started.wait(), 5)
+
+            # 実行していないレプリカでキャンセルを受け付ける
+            assert await other.cancel("task-1") is True
+            await wait_until(lambda: aborted == [("task-1", "video", "cancelled")])
+            await wait_until(lambda: running.journal.task_ids() == [])
+            stage = running.get_queue_status()["stages"]["extract"]
+            assert stage["running_tasks"] == 0
+        finally:
+            await running.stop_workers()
+            await other.stop_workers()
+            running.journal.close()
+            other.journal.close()
@@ -1,17 +1,26 @@
 import asyncio
+import sys
 from datetime import datetime
 from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
 
 from app.services.task_queue import (
+    ABORT_CANCELLED,
+    ABORT_SHUTDOWN,
+    ABORT_TIMEOUT,
     AsyncTaskQueue,
+    QueueDrainingError,
     QueuedTask,
+    StagedTaskPipeline,
     TaskQueueStatus,
     get_task_queue,
     initialize_task_queue,
     shutdown_task_queue,
 )
+from app.services.autoscaler import WorkerAutoscaler
+from app.services.scheduler import TaskPriority
+from app.utils.subprocess_utils import communicate
 
 
 class TestQueuedTask:
@@ -500,3 +509,540 @@ class TestTaskQueueLogging:
                 # エラーログが出力されることを確認
                 mock_error.assert_called_once()
                 assert mock_info.call_count >= 1  # 開始ログ
+
+
+class TestStagedTaskPipeline:
+    """StagedTaskPipelineクラスのテスト"""
+
+    @staticmethod
+    async def wait_until(condition, timeout=3.0):
+        deadline = asyncio.get_event_loop().time() + timeout
+        while not condition():
+            assert asyncio.get_event_loop().time() < deadline
+            await asyncio.sleep(0.01)
+
+    @pytest.mark.asyncio
+    async def test_task_moves_through_stages_with_context(self):
+        """タスクがコンテキストを引き継いで各ステージを順に進むテスト"""
+        calls = []
+
+        async def extract(task_id, context):
+            calls.append(("extract", task_id))
+            context["audio_path"] = f"/tmp/{task_id}.mp3"
+            return task_id != "broken"
+
+        async def transcribe(task_id, context):
+            calls.append(("transcribe", context["audio_path"]))
+            return True
+
+        pipeline = StagedTaskPipeline(
+            [("extract", extract, 1), ("transcribe", transcribe, 1)]
+        )
+        await pipeline.start_workers()
+        try:
+            await pipeline.submit("ok")
+            await pipeline.submit("broken")
+            await self.wait_until(
+                lambda: pipeline.get_queue_status()["completed_tasks"] == 3
+            )
+        finally:
+            await pipeline.stop_workers()
+
+        # 失敗したタスクは次のステージに進まない
+        assert sorted(calls) == [
+            ("extract", "broken"),
+            ("extract", "ok"),
+            ("transcribe", "/tmp/ok.mp3"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_stages_receive_task_priority(self):
+        """ステージ関数がタスクの優先度をコンテキストで受け取るテスト"""
+        seen = []
+
+        async def transcribe(task_id, context):
+            seen.append(context["priority"])
+            return True
+
+        pipeline = StagedTaskPipeline([("transcribe", transcribe, 1)])
+        await pipeline.start_workers()
+        try:
+            await pipeline.submit("backfill", priority=TaskPriority.LOW)
+            await self.wait_until(lambda: seen)
+        finally:
+            await pipeline.stop_workers()
+
+        assert seen == [TaskPriority.LOW]
+
+    @pytest.mark.asyncio
+    async def test_slow_stage_does_not_block_earlier_stage(self):
+        """遅いステージの待ちが前段のワーカーを占有しないことのテスト"""
+        release = asyncio.Event()
+        extracted = []
+
+        async def extract(task_id, context):
+            extracted.append(task_id)
+            return True
+
+        async def minutes(task_id, context):
+            await release.wait()
+            return True
+
+        pipeline = StagedTaskPipeline(
+            [("extract", extract, 1), ("minutes", minutes, 1)]
+        )
+
+        def stages():
+            return pipeline.get_queue_status()["stages"]
+        await pipeline.start_workers()
+        try:
+            for n in range(3):
+                await pipeline.submit(f"task-{n}")
+            await self.wait_until(lambda: len(extracted) == 3)
+            await self.wait_until(lambda: stages()["minutes"]["running_tasks"] == 1)
+
+            status = pipeline.get_queue_status()
+            assert status["stages"]["extract"]["queue_size"] == 0
+            assert status["stages"]["minutes"]["queue_size"] == 2
+            assert status["queue_size"] == 2
+            assert status["max_concurrent"] == 2
+
+            release.set()
+            await self.wait_until(lambda: stages()["minutes"]["completed_tasks"] == 3)
+        finally:
+            await pipeline.stop_workers()
+
+    @pytest.mark.asyncio
+    async def test_task_timeout_covers_all_stages(self):
+        """実行時間の上限が全ステージの合計に適用されるテスト"""
+        aborted = []
+
+        async def slow(task_id, context):
+            await asyncio.sleep(0.2)
+            return True
+
+        async def on_abort(task_id, context, reason):
+            aborted.append((task_id, reason))
+
+        pipeline = StagedTaskPipeline(
+            [("extract", slow, 1), ("transcribe", slow, 1)],
+            on_abort=on_abort,
+            task_timeout=0.3,
+        )
+        await pipeline.start_workers()
+        try:
+            await pipeline.submit("long")
+            await self.wait_until(lambda: aborted)
+        finally:
+            await pipeline.stop_workers()
+
+        assert aborted == [("long", ABORT_TIMEOUT)]
+        transcribe = pipeline.get_queue_status()["stages"]["transcribe"]
+        assert transcribe["running_tasks"] == 0
+
+
+    @pytest.mark.asyncio
+    async def test_backlog_estimates_wait_from_bottleneck(self):
+        """処理速度の最も遅いステージから待ち時間を推定するテスト"""
+        release = asyncio.Event()
+
+        async def extract(task_id, context):
+            return True
+
+        async def minutes(task_id, context):
+            await release.wait()
+            return True
+
+        pipeline = StagedTaskPipeline(
+            [("extract", extract, 1), ("minutes", minutes, 2)],
+            default_expected_seconds=100.0,
+        )
+        # 実行前は処理速度が分からない
+        assert pipeline.get_backlog() == {
+            "tasks": 0,
+            "expected_seconds": 0.0,
+            "estimated_wait_seconds": None,
+        }
+        # メディア1秒あたりの処理秒数
+        pipeline.throughput.observe("extract", None, 1.0, 100.0)
+        pipeline.throughput.observe("minutes", None, 50.0, 100.0)
+
+        def stages():
+            return pipeline.get_queue_status()["stages"]
+
+        await pipeline.start_workers()
+        try:
+            await pipeline.submit("a", expected_seconds=600)
+            await pipeline.submit("b", expected_seconds=300)
+            await pipeline.submit("c")
+            await self.wait_until(lambda: stages()["minutes"]["running_tasks"] == 2)
+            await self.wait_until(lambda: stages()["minutes"]["queue_size"] == 1)
+
+            backlog = pipeline.get_backlog()
+            assert backlog["tasks"] == 3
+            assert backlog["expected_seconds"] == 1000.0
+            # minutes: 1000秒分 × 0.5 / 2ワーカー
+            assert backlog["estimated_wait_seconds"] == 250.0
+
+            release.set()
+            await self.wait_until(lambda: stages()["minutes"]["completed_tasks"] == 3)
+        finally:
+            await pipeline.stop_workers()
+
+        assert pipeline.get_backlog()["tasks"] == 0
+        # 実行時間から処理速度の平均を更新する
+        assert pipeline.throughput.rate("minutes") < 0.5
+
+
+    @pytest.mark.asyncio
+    async def test_rate_ignores_failed_stage_and_unknown_length(self):
+        """失敗したステージと長さ不明のタスクは処理速度に反映しないテスト"""
+        async def extract(task_id, context):
+            return task_id != "failed"
+
+        pipeline = StagedTaskPipeline([("extract", extract, 1)])
+        await pipeline.start_workers()
+        try:
+            await pipeline.submit("failed", expected_seconds=600)
+            await pipeline.submit("unknown")
+            await self.wait_until(
+                lambda: pipeline.get_queue_status()["completed_tasks"] == 2
+            )
+            assert pipeline.throughput.rate("extract") is None
+
+            await pipeline.submit("ok", expected_seconds=600)
+            await self.wait_until(
+                lambda: pipeline.get_queue_status()["completed_tasks"] == 3
+            )
+        finally:
+            await pipeline.stop_workers()
+
+        assert pipeline.throughput.get_stats()["extract"]["samples"] == 1
+
+    @pytest.mark.asyncio
+    async def test_estimate_task_position_and_eta(self):
+        """ステージの順番と処理速度から開始・完了の予定を見積もるテスト"""
+        release = asyncio.Event()
+        progress = []
+
+        async def transcribe(task_id, context):
+            await release.wait()
+            return True
+
+        async def minutes(task_id, context):
+            return True
+
+        async def on_progress():
+            progress.append(pipeline.get_queue_status()["queue_size"])
+
+        pipeline = StagedTaskPipeline(
+            [("transcribe", transcribe, 1), ("minutes", minutes, 1)],
+            stage_models={"transcribe": "openai:whisper-1"},
+            on_progress=on_progress,
+        )
+
+        def stages():
+            return pipeline.get_queue_status()["stages"]
+
+        await pipeline.start_workers()
+        try:
+            await pipeline.submit("a", expected_seconds=600)
+            await pipeline.submit("b", expected_seconds=300)
+            await pipeline.submit("c", expected_seconds=100)
+            await self.wait_until(lambda: stages()["transcribe"]["running_tasks"] == 1)
+
+            # 実績がなければ順番だけ分かる
+            estimate = await pipeline.estimate_task("c")
+            assert (estimate.stage, estimate.queue_position) == ("transcribe", 2)
+            assert estimate.completion_in_seconds is None
+
+            # 他のモデルの実績は使わない
+            pipeline.throughput.observe("transcribe", "local:small", 60.0, 60.0)
+            assert (await pipeline.estimate_task("c")).completion_in_seconds is None
+
+            pipeline.throughput.observe("transcribe", "openai:whisper-1", 6.0, 60.0)
+            pipeline.throughput.observe("minutes", None, 3.0, 60.0)
+
+            running = await pipeline.estimate_task("a")
+            assert (running.queue_position, running.start_in_seconds) == (0, None)
+            # 残り 600 × 0.1 + 議事録 600 × 0.05
+            assert 89.0 <= running.completion_in_seconds <= 90.0
+
+            # 実行中の残り60秒 + 先に待つ b の30秒
+            estimate = await pipeline.estimate_task("c")
+            assert estimate.queue_position == 2
+            assert 89.0 <= estimate.start_in_seconds <= 90.0
+            assert estimate.completion_in_seconds == pytest.approx(
+                estimate.start_in_seconds + 15.0, abs=0.11
+            )
+            assert await pipeline.estimate_task("unknown") is None
+
+            release.set()
+            await self.wait_until(lambda: stages()["minutes"]["completed_tasks"] == 3)
+        finally:
+            await pipeline.stop_workers()
+
+        assert await pipeline.estimate_task("c") is None
+        # ステージが終わるたびに通知する
+        assert len(progress) == 6
+
+
+class TestTaskCancellation:
+    """タスクのキャンセルと実行時間の上限のテスト"""
+
+    @staticmethod
+    async def wait_until(condition, timeout=3.0):
+        deadline = asyncio.get_event_loop().time() + timeout
+        while not condition():
+            assert asyncio.get_event_loop().time() < deadline
+            await asyncio.sleep(0.01)
+
+    @pytest.mark.asyncio
+    async def test_timeout_kills_child_process_and_frees_slot(self):
+        """期限切れで子プロセスを停止し、ワーカーを解放するテスト"""
+        task_queue = AsyncTaskQueue(max_concurrent_tasks=1, task_timeout=0.2)
+        processes = []
+        aborted = []
+        done = []
+
+        async def run_ffmpeg():
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, "-c", "import time; time.sleep(30)"
+            )
+            processes.append(process)
+            await communicate(process)
+
+        async def on_abort(reason):
+            aborted.append(reason)
+
+        async def quick():
+            done.append("quick")
+
+        await task_queue.start_workers()
+        try:
+            queue_id = await task_queue.add_task("hung", run_ffmpeg, on_abort=on_abort)
+            await task_queue.add_task("next", quick)
+            await self.wait_until(lambda: done == ["quick"])
+        finally:
+            await task_queue.stop_workers()
+
+        assert aborted == [ABORT_TIMEOUT]
+        assert processes[0].returncode is not None
+        status = task_queue.get_task_status(queue_id)
+        assert status["status"] == TaskQueueStatus.FAILED
+        assert "上限" in status["error"]
+
+    @pytest.mark.asyncio
+    async def test_cancel_running_and_pending_tasks(self):
+        """実行中・待機中のタスクをキャンセルできるテスト"""
+        task_queue = AsyncTaskQueue(max_concurrent_tasks=1)
+        started = asyncio.Event()
+        aborted = []
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(3600)
+
+        def on_abort(name):
+            async def record(reason):
+                aborted.append((name, reason))
+
+            return record
+
+        await task_queue.start_workers()
+        try:
+            running_id = await task_queue.add_task(
+                "t1", hang, on_abort=on_abort("running")
+            )
+            pending_id = await task_queue.add_task(
+                "t1", hang, on_abort=on_abort("pending")
+            )
+            await task_queue.add_task("t2", hang)
+            await asyncio.wait_for(started.wait(), 3)
+
+            assert await task_queue.cancel_task("t1") is True
+            assert task_queue.queue.qsize() == 1
+            await self.wait_until(lambda: len(aborted) == 2)
+            await self.wait_until(lambda: len(task_queue.running_tasks) == 1)
+            assert await task_queue.cancel_task("missing") is False
+        finally:
+            await task_queue.stop_workers()
+
+        assert sorted(aborted) == [
+            ("pending", ABORT_CANCELLED),
+            ("running", ABORT_CANCELLED),
+        ]
+        for queue_id in (running_id, pending_id):
+            status = task_queue.get_task_status(queue_id)
+            assert status["status"] == TaskQueueStatus.CANCELLED
+
+
+class TestTaskQueueDrain:
+    """停止処理（ドレイン）のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_drain_waits_for_running_task(self):
+        """実行中のタスクは猶予時間内なら完了まで待つテスト"""
+        task_queue = AsyncTaskQueue(max_concurrent_tasks=1)
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(0.1)
+            return "done"
+
+        await task_queue.start_workers()
+        running_id = await task_queue.add_task("t1", slow)
+        pending_id = await task_queue.add_task("t2", slow)
+        await asyncio.wait_for(started.wait(), 3)
+
+        interrupted = await task_queue.drain(grace_seconds=3)
+
+        assert interrupted == []
+        assert task_queue.workers == []
+        assert task_queue.get_task_status(running_id)["status"] == (
+            TaskQueueStatus.COMPLETED
+        )
+        # 待機中のタスクは取り出されずに残る
+        assert task_queue.get_task_status(pending_id) is None
+        assert task_queue.queue.qsize() == 1
+        with pytest.raises(QueueDrainingError):
+            await task_queue.add_task("t3", slow)
+
+    @pytest.mark.asyncio
+    async def test_drain_cancels_task_past_grace(self):
+        """猶予時間を過ぎたタスクは中断し、on_abort を呼ばないテスト"""
+        task_queue = AsyncTaskQueue(max_concurrent_tasks=1)
+        started = asyncio.Event()
+        aborted = []
+
+        async def hang():
+            started.set()
+            await asyncio.sleep(3600)
+
+        async def on_abort(reason):
+            aborted.append(reason)
+
+        await task_queue.start_workers()
+        await task_queue.add_task("t1", hang, on_abort=on_abort)
+        await asyncio.wait_for(started.wait(), 3)
+
+        interrupted = await task_queue.drain(grace_seconds=0.05)
+
+        assert [queued_task.task_id for queued_task in interrupted] == ["t1"]
+        assert task_queue.running_tasks == {}
+        assert aborted == []
+
+    @pytest.mark.asyncio
+    async def test_pipeline_drain_without_journal_aborts_tasks(self):
+        """ジャーナルなしの停止では、次のステージに進めないタスクを中断にするテスト"""
+        started = asyncio.Event()
+        release = asyncio.Event()
+        aborted = []
+        transcribed = []
+
+        async def extract(task_id, context):
+            started.set()
+            await release.wait()
+            return True
+
+        async def transcribe(task_id, context):
+            transcribed.append(task_id)
+            return True
+
+        async def on_abort(task_id, context, reason):
+            aborted.append((task_id, reason))
+
+        pipeline = StagedTaskPipeline(
+            [("extract", extract, 1), ("transcribe", transcribe, 1)],
+            on_abort=on_abort,
+        )
+        await pipeline.start_workers()
+        await pipeline.submit("running")
+        await pipeline.submit("waiting")
+        await asyncio.wait_for(started.wait(), 3)
+
+        drain = asyncio.create_task(pipeline.drain(grace_seconds=3))
+        await asyncio.sleep(0.05)
+        release.set()
+        assert await drain == []
+
+        assert transcribed == []
+        assert sorted(aborted) == [
+            ("running", ABORT_SHUTDOWN),
+            ("waiting", ABORT_SHUTDOWN),
+        ]
+
+
+class TestTaskQueueAutoscaling:
+    """ワーカー数の自動調整のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_grows_under_burst_and_shrinks_when_idle(self):
+        """待機が溜まるとワーカーを増やし、アイドルになると減らすテスト"""
+        task_queue = AsyncTaskQueue(max_concurrent_tasks=1, name="burst")
+        task_queue.enable_autoscaling(
+            WorkerAutoscaler(
+                min_workers=1,
+                max_workers=4,
+                interval_seconds=3600,
+                up_cooldown_seconds=0,
+                down_cooldown_seconds=0,
+                scale_down_idle_seconds=0,
+            )
+        )
+        release = asyncio.Event()
+        started = []
+
+        async def upload(name):
+            started.append(name)
+            await release.wait()
+
+        await task_queue.start_workers()
+        try:
+            for i in range(4):
+                await task_queue.add_task(f"t{i}", upload, f"t{i}")
+            await TestTaskCancellation.wait_until(lambda: len(started) == 1)
+
+            assert task_queue.autoscale() == 4
+            await TestTaskCancellation.wait_until(lambda: len(started) == 4)
+            assert task_queue.get_queue_status()["workers"] == 4
+
+            release.set()
+            await TestTaskCancellation.wait_until(
+                lambda: not task_queue.running_tasks
+            )
+            assert task_queue.autoscale() == 1
+            # 縮小したワーカーは取得待ちのタイムアウト後に抜ける
+            await TestTaskCancellation.wait_until(
+                lambda: len(task_queue.workers) == 1
+            )
+        finally:
+            await task_queue.stop_workers()
+
+        status = task_queue.get_queue_status()
+        assert [
+            (decision["previous"], decision["target"])
+            for decision in status["autoscaler"]["decisions"]
+        ] == [(1, 4), (4, 1)]
+
+    @pytest.mark.asyncio
+    async def test_counts_backlog_outside_queue(self):
+        """キューの外（共有ジャーナル）の待機タスクも増加の判断に使うテスト"""
+        task_queue = AsyncTaskQueue(max_concurrent_tasks=2)
+        task_queue.enable_autoscaling(
+            WorkerAutoscaler(min_workers=1, max_workers=8, up_cooldown_seconds=0),
+            backlog_probe=lambda: (5, 120.0),
+        )
+
+        # ワーカー開始前は見直さない
+        assert task_queue.autoscale() == 0
+
+        await task_queue.start_workers()
+        try:
+            assert task_queue.autoscale() == 5
+            assert len(task_queue.workers) == 5
+            # パイプラインはこの値を空きワーカー数の計算に使う
+            assert task_queue.max_concurrent_tasks == 5
+        finally:
+            await task_queue.stop_workers()
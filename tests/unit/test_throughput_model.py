@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from app.services.throughput_model import ThroughputModel
+
+
+class TestThroughputModel:
+    def test_observe_tracks_rate_per_stage_and_model(self):
+        """ステージ・モデルごとにメディア1秒あたりの処理秒数を記録するテスト"""
+        model = ThroughputModel(smoothing=0.5)
+
+        assert model.rate("transcribe", "openai:whisper-1") is None
+        assert model.observe("transcribe", "openai:whisper-1", 60.0, 600.0) == 0.1
+        assert model.observe(
+            "transcribe", "openai:whisper-1", 180.0, 600.0
+        ) == pytest.approx(0.2)
+        model.observe("transcribe", "local:small", 600.0, 600.0)
+
+        assert model.rate("transcribe", "openai:whisper-1") == pytest.approx(0.2)
+        assert model.rate("transcribe", "local:small") == 1.0
+        # モデルの異なる実績は使わない
+        assert model.rate("transcribe") is None
+        assert model.get_stats()["transcribe:openai:whisper-1"] == {
+            "rate": 0.2,
+            "samples": 2,
+        }
+
+    def test_history_survives_restart(self, tmp_path):
+        """記録を保存し、再起動後も過去の実績から予測できるテスト"""
+        path = str(tmp_path / "throughput_model.json")
+        ThroughputModel(path).observe("minutes", "o3", 30.0, 600.0)
+
+        restarted = ThroughputModel(path)
+
+        assert restarted.rate("minutes", "o3") == 0.05
+        with open(path, encoding="utf-8") as f:
+            assert json.load(f)["minutes:o3"]["samples"] == 1
+
+    def test_broken_history_is_ignored(self, tmp_path):
+        path = tmp_path / "throughput_model.json"
+        path.write_text("{broken", encoding="utf-8")
+
+        assert ThroughputModel(str(path)).get_stats() == {}
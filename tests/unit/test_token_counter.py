@@ -0,0 +1,163 @@
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.models.chat import ChatSession, MessageIntent, TokenUsage
+from app.services import token_counter as token_counter_module
+from app.services.openai_service import OpenAIService
+from app.services.token_counter import (
+    TokenCounter,
+    approximate_tokens,
+    ensure_session_tokens,
+    update_session_minutes,
+    usage_from_response,
+)
+
+
+class FakeEncoding:
+    """1文字1トークンとして数えるエンコーディング"""
+
+    name = "fake"
+
+    def encode(self, text, disallowed_special=()):
+        return list(text)
+
+
+def loaded_counter(encoding):
+    counter = TokenCounter("gpt-4.1")
+    counter._encoding = encoding
+    counter._loaded = True
+    return counter
+
+
+@pytest.fixture
+def counting_counter():
+    """呼び出し回数を記録するトークンカウンター"""
+    counter = loaded_counter(FakeEncoding())
+    calls = []
+    original = counter.count
+
+    def count(text):
+        calls.append(text)
+        return original(text)
+
+    counter.count = count
+    counter.calls = calls
+    with patch.object(token_counter_module, "token_counter", counter), patch(
+        "app.services.openai_service.token_counter", counter
+    ):
+        yield counter
+
+
+class TestTokenCounter:
+    def test_count_with_encoding(self):
+        counter = loaded_counter(FakeEncoding())
+
+        assert counter.is_exact
+        assert counter.count("会議abc") == 5
+        assert counter.count("") == 0
+
+    def test_fallback_when_tokenizer_unavailable(self):
+        counter = loaded_counter(None)
+
+        assert not counter.is_exact
+        assert counter.count("あいう" + "abcdefgh") == approximate_tokens(
+            "あいう" + "abcdefgh"
+        )
+
+    def test_load_failure_is_cached(self):
+        counter = TokenCounter("gpt-4.1")
+        with patch.dict("sys.modules", {"tiktoken": None}):
+            assert counter.count("テスト") == approximate_tokens("テスト")
+        # 読み込み失敗後は再試行しない
+        assert counter._loaded
+        assert counter._encoding is None
+
+    def test_approximate_tokens(self):
+        assert approximate_tokens("あいうえおか") == 4
+        assert approximate_tokens("abcdefgh") == 2
+        assert approximate_tokens("") == 0
+
+
+class TestSessionTokens:
+    def test_counts_cached_once(self, counting_counter):
+        session = ChatSession(task_id="t", transcription="文字起こし", minutes="議事録")
+
+        assert ensure_session_tokens(session) == 8
+        assert ensure_session_tokens(session) == 8
+        assert counting_counter.calls == ["文字起こし", "議事録"]
+        assert session.transcription_tokens == 5
+        assert session.minutes_tokens == 3
+
+    def test_update_minutes_recounts_minutes_only(self, counting_counter):
+        session = ChatSession(task_id="t", transcription="文字起こし", minutes="議事録")
+        ensure_session_tokens(session)
+        counting_counter.calls.clear()
+
+        update_session_minutes(session, "新しい議事録")
+
+        assert counting_counter.calls == ["新しい議事録"]
+        assert session.minutes == "新しい議事録"
+        assert session.context_tokens == 5 + 6
+
+
+class TestUsage:
+    def test_usage_from_response(self):
+        response = SimpleNamespace(
+            usage=SimpleNamespace(
+                prompt_tokens=120, completion_tokens=30, total_tokens=150
+            )
+        )
+
+        usage = usage_from_response(response)
+
+        assert usage == TokenUsage(
+            prompt_tokens=120, completion_tokens=30, total_tokens=150
+        )
+
+    def test_usage_missing(self):
+        assert usage_from_response(SimpleNamespace()) is None
+
+    @pytest.mark.asyncio
+    async def test_question_records_api_usage(self, counting_counter):
+        service = OpenAIService()
+        service.use_mock = False
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="回答"))],
+            usage=SimpleNamespace(
+                prompt_tokens=900, completion_tokens=100, total_tokens=1000
+            ),
+        )
+        session = ChatSession(task_id="t", transcription="文字起こし", minutes="議事録")
+
+        with patch.object(
+            service, "_make_openai_request", AsyncMock(return_value=response)
+        ):
+            result = await service.process_chat_message(
+                session, "質問", MessageIntent.QUESTION, []
+            )
+
+        assert result["tokens_used"] == 1000
+        assert result["usage"].prompt_tokens == 900
+        assert result["usage"].completion_tokens == 100
+
+    @pytest.mark.asyncio
+    async def test_question_estimates_usage_in_mock_mode(self, counting_counter):
+        service = OpenAIService()
+        service.use_mock = True
+        session = ChatSession(task_id="t", transcription="文字起こし", minutes="議事録")
+
+        with patch.object(
+            service, "_call_mock_api", AsyncMock(return_value=("回答", []))
+        ):
+            result = await service.process_chat_message(
+                session, "質問", MessageIntent.QUESTION, []
+            )
+
+        usage = result["usage"]
+        assert usage.completion_tokens == 2
+        # 文字起こし・議事録はキャッシュ済みの件数を使用
+        assert usage.prompt_tokens > session.context_tokens
+        assert counting_counter.calls.count("文字起こし") == 1
+        assert result["tokens_used"] == usage.total_tokens
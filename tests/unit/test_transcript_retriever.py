@@ -0,0 +1,128 @@
+from unittest.mock import patch
+
+from app.models.chat import ChatSession
+from app.services.openai_service import OpenAIService
+from app.services.transcript_retriever import (
+    TranscriptRetriever,
+    TranscriptRetrieverCache,
+    char_bigrams,
+    chunk_transcript,
+)
+
+TRANSCRIPT = "\n".join(
+    [
+        "田中さん：来期の予算案について広告費を三百万円削減します。",
+        "佐藤さん：削減分は開発費に回す予定です。",
+        "鈴木さん：採用計画ではエンジニアを五名増員します。",
+        "高橋さん：面接は人事部が調整します。",
+        "山田さん：先週の障害はデータベースの接続数上限が原因でした。",
+        "田中さん：再発防止策を来週までにまとめます。",
+    ]
+)
+
+
+class TestChunkTranscript:
+    def test_chunks_follow_sentence_boundaries(self):
+        chunks = chunk_transcript(TRANSCRIPT, chunk_chars=60)
+
+        assert len(chunks) > 1
+        for chunk in chunks:
+            assert TRANSCRIPT[chunk.start : chunk.end].strip() == chunk.text
+            assert chunk.text.endswith("。")
+        assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+
+    def test_long_sentence_is_split(self):
+        transcript = "あ" * 250 + "。"
+
+        chunks = chunk_transcript(transcript, chunk_chars=100)
+
+        assert [len(chunk.text) for chunk in chunks] == [100, 100, 51]
+        assert "".join(chunk.text for chunk in chunks) == transcript
+
+    def test_empty_transcript(self):
+        assert chunk_transcript("") == []
+
+    def test_char_bigrams_ignore_punctuation(self):
+        assert char_bigrams("予算、案。") == ["予算", "算案"]
+        assert char_bigrams("a") == ["a"]
+        assert char_bigrams("。") == []
+
+
+class TestTranscriptRetriever:
+    def test_search_ranks_relevant_chunk_first(self):
+        retriever = TranscriptRetriever(TRANSCRIPT, chunk_chars=40)
+
+        results = retriever.search("エンジニアは何名採用しますか？", top_k=3)
+
+        assert "エンジニア" in results[0][0].text
+        assert results[0][1] >= results[-1][1]
+
+    def test_search_without_match(self):
+        retriever = TranscriptRetriever(TRANSCRIPT, chunk_chars=40)
+
+        assert retriever.search("xyz") == []
+
+    def test_retrieve_respects_budget_and_order(self):
+        retriever = TranscriptRetriever(TRANSCRIPT, chunk_chars=40)
+        budget = max(chunk.tokens for chunk in retriever.chunks)
+
+        one = retriever.retrieve("予算と障害", token_budget=budget, top_k=5)
+        many = retriever.retrieve("予算と障害", token_budget=10_000, top_k=5)
+
+        assert sum(chunk.tokens for chunk in one) <= budget
+        assert len(many) > len(one)
+        assert [chunk.index for chunk in many] == sorted(
+            chunk.index for chunk in many
+        )
+
+
+class TestTranscriptRetrieverCache:
+    def test_reuses_index_until_transcript_changes(self):
+        cache = TranscriptRetrieverCache()
+
+        first = cache.get("session-1", TRANSCRIPT, 40)
+        assert cache.get("session-1", TRANSCRIPT, 40) is first
+        assert cache.get("session-1", TRANSCRIPT + "追加。", 40) is not first
+
+    def test_discard_and_eviction(self):
+        cache = TranscriptRetrieverCache(max_entries=1)
+        first = cache.get("a", TRANSCRIPT)
+        cache.get("b", TRANSCRIPT)
+
+        assert cache.get("a", TRANSCRIPT) is not first
+
+        cache.discard("a")
+        assert "a" not in cache._entries
+
+
+class TestRetrievalContext:
+    def test_full_mode_uses_whole_transcript(self):
+        service = OpenAIService()
+        session = ChatSession(task_id="t", transcription=TRANSCRIPT, minutes="# 議事録")
+
+        with patch("app.services.openai_service.settings.chat_context_mode", "full"):
+            transcription, tokens = service._build_transcription_context(
+                session, "予算は？"
+            )
+
+        assert transcription == TRANSCRIPT
+        assert tokens == session.context_tokens
+
+    def test_retrieval_mode_sends_relevant_passages_only(self):
+        service = OpenAIService()
+        session = ChatSession(task_id="t", transcription=TRANSCRIPT, minutes="# 議事録")
+
+        with patch.multiple(
+            "app.services.openai_service.settings",
+            chat_context_mode="retrieval",
+            chat_retrieval_chunk_chars=40,
+            chat_retrieval_top_k=1,
+            chat_retrieval_token_budget=1000,
+        ):
+            transcription, tokens = service._build_transcription_context(
+                session, "障害の原因は？"
+            )
+
+        assert "データベース" in transcription
+        assert "広告費" not in transcription
+        assert tokens < session.context_tokens
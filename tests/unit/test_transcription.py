@@ -76,7 +76,7 @@ class TestTranscriptionService:
                             model=settings.whisper_model,
                             file=("audio.wav", mock_audio_data, "audio/wav"),
                             language=settings.whisper_language,
-                            response_format="text",
+                            response_format="verbose_json",
                         )
 
     @pytest.mark.asyncio
@@ -384,4 +384,4 @@ class TestTranscriptionServiceConfiguration:
                 call_args = mock_client.audio.transcriptions.create.call_args
                 assert call_args[1]["model"] == settings.whisper_model
                 assert call_args[1]["language"] == settings.whisper_language
-                assert call_args[1]["response_format"] == "text"
+                assert call_args[1]["response_format"] == "verbose_json"
@@ -0,0 +1,235 @@
+import os
+import tempfile
+import wave
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from openai.types.audio import Transcription
+
+from app.models import TranscriptionResult
+from app.services.retry_policy import RetryPolicy
+from app.services.transcription_backends import (
+    HybridTranscriptionBackend,
+    LocalTranscriptionBackend,
+    OpenAITranscriptionBackend,
+    TranscriptionBackend,
+    create_transcription_backend,
+    estimate_audio_duration,
+    parse_verbose_transcription,
+    run_local_transcription,
+)
+
+
+@pytest.fixture
+def wav_file():
+    """10秒の無音WAVファイル（16kHz/16bit/モノラル）"""
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
+        path = f.name
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(16000)
+        wav.writeframes(b"\x00\x00" * 16000 * 10)
+    yield path
+    os.unlink(path)
+
+
+class FakeBackend(TranscriptionBackend):
+    """呼び出しを記録するバックエンド"""
+
+    def __init__(self, name, max_size=None, error=None):
+        self.name = name
+        self.max_size = max_size
+        self.error = error
+        self.calls = []
+        self.workers = 1
+        self.in_flight = 0
+
+    @property
+    def has_capacity(self):
+        return self.in_flight < self.workers
+
+    def accepts_file_size(self, file_size):
+        return self.max_size is None or file_size <= self.max_size
+
+    async def transcribe(self, audio_file_path, priority="normal"):
+        self.calls.append((audio_file_path, priority))
+        if self.error:
+            raise self.error
+        return TranscriptionResult(text=f"{self.name}の結果", backend=self.name)
+
+
+class TestHelpers:
+    """補助関数のテスト"""
+
+    def test_estimate_wav_duration(self, wav_file):
+        assert estimate_audio_duration(wav_file) == pytest.approx(10.0)
+
+    def test_stub_engine_is_deterministic(self, wav_file):
+        first = run_local_transcription("stub", "tiny", "int8", "ja", wav_file)
+        second = run_local_transcription("stub", "tiny", "int8", "ja", wav_file)
+
+        assert first == second
+        assert first["text"]
+        assert first["segments"][-1]["end"] == pytest.approx(10.0, abs=0.01)
+
+    def test_backend_must_implement_transcribe(self):
+        class Incomplete(TranscriptionBackend):
+            name = "incomplete"
+
+        with pytest.raises(TypeError):
+            Incomplete()
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            create_transcription_backend(Mock(), "unknown")
+
+    def test_unknown_local_engine(self):
+        with pytest.raises(ValueError):
+            LocalTranscriptionBackend(engine="unknown")
+
+
+class TestOpenAITranscriptionBackend:
+    """OpenAIバックエンドのテスト"""
+
+    @pytest.mark.asyncio
+    async def test_uses_current_client(self, wav_file):
+        response = Transcription(
+            text="こんにちは。本日は",
+            duration=10.0,
+            segments=[
+                {"start": 0.0, "end": 1.5, "text": " こんにちは。"},
+                {"start": 1.5, "end": 3.0, "text": "本日は"},
+            ],
+        )
+        client = Mock()
+        client.audio.transcriptions.create = AsyncMock(return_value=response)
+        backend = OpenAITranscriptionBackend(lambda: client)
+
+        result = await backend.transcribe(wav_file)
+
+        assert result.text == "こんにちは。本日は"
+        assert result.backend == "openai"
+        assert result.duration == 10.0
+        assert [s.text for s in result.segments] == ["こんにちは。", "本日は"]
+        assert client.audio.transcriptions.create.call_args[1]["response_format"] == (
+            "verbose_json"
+        )
+
+    @pytest.mark.asyncio
+    async def test_retries_transient_errors(self, wav_file):
+        """SDKの自動リトライを無効にしたため、一時的なエラーはアプリ側で再送するテスト"""
+
+        class ServerError(Exception):
+            status_code = 503
+
+        client = Mock()
+        client.audio.transcriptions.create = AsyncMock(
+            side_effect=[ServerError("unavailable"), "再送で成功"]
+        )
+        backend = OpenAITranscriptionBackend(lambda: client)
+
+        with patch(
+            "app.services.retry_policy.RetryPolicy.from_settings",
+            return_value=RetryPolicy(max_attempts=3, base_delay=0.0, max_delay=0.0),
+        ):
+            result = await backend.transcribe(wav_file)
+
+        assert result.text == "再送で成功"
+        assert client.audio.transcriptions.create.await_count == 2
+
+    def test_parse_text_only_response(self):
+        result = parse_verbose_transcription("テキストのみ", "openai")
+
+        assert result.text == "テキストのみ"
+        assert result.segments == []
+
+    def test_file_size_limit(self):
+        backend = OpenAITranscriptionBackend(Mock())
+
+        assert backend.accepts_file_size(25 * 1024 * 1024)
+        assert not backend.accepts_file_size(25 * 1024 * 1024 + 1)
+
+
+class TestLocalTranscriptionBackend:
+    """ローカルバックエンド（スタブエンジン）のテスト"""
+
+    @pytest.mark.asyncio
+    async def test_transcribe_in_process_pool(self, wav_file):
+        backend = LocalTranscriptionBackend(engine="stub", workers=1)
+        try:
+            result = await backend.transcribe(wav_file)
+        finally:
+            await backend.close()
+
+        expected = run_local_transcription("stub", "small", "int8", "ja", wav_file)
+        assert result.backend == "local"
+        assert result.text == expected["text"]
+        assert len(result.segments) == len(expected["segments"])
+        assert backend.get_stats()["completed"] == 1
+
+
+class TestHybridTranscriptionBackend:
+    """ハイブリッドバックエンドのルーティングテスト"""
+
+    @pytest.mark.asyncio
+    async def test_short_chunk_goes_local(self, wav_file):
+        api, local = FakeBackend("api"), FakeBackend("local")
+        hybrid = HybridTranscriptionBackend(api, local, local_max_seconds=30)
+
+        result = await hybrid.transcribe(wav_file)
+
+        assert result.backend == "local"
+        assert not api.calls
+
+    @pytest.mark.asyncio
+    async def test_long_chunk_goes_to_api(self, wav_file):
+        api, local = FakeBackend("api"), FakeBackend("local")
+        hybrid = HybridTranscriptionBackend(api, local, local_max_seconds=5)
+
+        result = await hybrid.transcribe(wav_file)
+
+        assert result.backend == "api"
+
+    @pytest.mark.asyncio
+    async def test_busy_local_overflows_to_api(self, wav_file):
+        api, local = FakeBackend("api"), FakeBackend("local")
+        local.in_flight = 1
+        hybrid = HybridTranscriptionBackend(api, local, local_max_seconds=30)
+
+        result = await hybrid.transcribe(wav_file)
+
+        assert result.backend == "api"
+
+    @pytest.mark.asyncio
+    async def test_low_priority_always_local(self, wav_file):
+        api, local = FakeBackend("api"), FakeBackend("local")
+        local.in_flight = 1
+        hybrid = HybridTranscriptionBackend(api, local, local_max_seconds=5)
+
+        result = await hybrid.transcribe(wav_file, priority="low")
+
+        assert result.backend == "local"
+        assert local.calls == [(wav_file, "low")]
+
+    @pytest.mark.asyncio
+    async def test_local_failure_falls_back_to_api(self, wav_file):
+        api = FakeBackend("api")
+        local = FakeBackend("local", error=RuntimeError("engine crashed"))
+        hybrid = HybridTranscriptionBackend(api, local, local_max_seconds=30)
+
+        result = await hybrid.transcribe(wav_file)
+
+        assert result.backend == "api"
+        assert hybrid.get_stats()["routed"]["fallback"] == 1
+
+    @pytest.mark.asyncio
+    async def test_low_priority_failure_is_not_sent_to_api(self, wav_file):
+        api = FakeBackend("api")
+        local = FakeBackend("local", error=RuntimeError("engine crashed"))
+        hybrid = HybridTranscriptionBackend(api, local)
+
+        with pytest.raises(RuntimeError):
+            await hybrid.transcribe(wav_file, priority="low")
+
+        assert not api.calls
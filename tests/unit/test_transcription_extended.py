@@ -1,8 +1,11 @@
+import asyncio
 import os
+import shutil
 import tempfile
 from unittest.mock import AsyncMock, Mock, patch
 import pytest
 import aiofiles
+from app.models import TranscriptionResult, TranscriptionSegment
 from app.services.transcription import TranscriptionService
 
 
@@ -170,13 +173,13 @@ class TestTranscriptionServiceExtended:
     @pytest.mark.asyncio
     async def test_transcribe_chunked_audio_success(self, transcription_service, temp_chunks_dir):
         """分割音声ファイル処理成功テスト"""
-        with patch.object(transcription_service, '_transcribe_single_file') as mock_transcribe:
+        with patch.object(transcription_service, '_transcribe_file') as mock_transcribe:
             with patch('shutil.rmtree') as mock_rmtree:
                 # 各チャンクの文字起こし結果をモック
                 mock_transcribe.side_effect = [
-                    "最初のチャンクです。",
-                    "二番目のチャンクです。",
-                    "最後のチャンクです。"
+                    TranscriptionResult(text="最初のチャンクです。", duration=10.0),
+                    TranscriptionResult(text="二番目のチャンクです。", duration=10.0),
+                    TranscriptionResult(text="最後のチャンクです。", duration=10.0)
                 ]
 
                 result = await transcription_service._transcribe_chunked_audio(temp_chunks_dir)
@@ -190,6 +193,25 @@ class TestTranscriptionServiceExtended:
                 # 一時ディレクトリが削除されることを確認
                 mock_rmtree.assert_called_once_with(temp_chunks_dir)
 
+    @pytest.mark.asyncio
+    async def test_transcribe_chunked_audio_offsets_segments(self, transcription_service, temp_chunks_dir):
+        """チャンクのセグメント時刻に開始位置が加算されるテスト"""
+        with patch.object(transcription_service, '_transcribe_file') as mock_transcribe:
+            with patch('shutil.rmtree'):
+                mock_transcribe.side_effect = [
+                    TranscriptionResult(
+                        text=f"チャンク{i}です。",
+                        duration=600.0,
+                        segments=[TranscriptionSegment(start=5.0, end=8.0, text=f"チャンク{i}です。")],
+                    )
+                    for i in range(3)
+                ]
+
+                await transcription_service._transcribe_chunked_audio(temp_chunks_dir)
+
+                starts = [segment.start for segment in transcription_service.segments]
+                assert starts == [5.0, 605.0, 1205.0]
+
     @pytest.mark.asyncio
     async def test_transcribe_chunked_audio_no_chunks(self, transcription_service):
         """チャンクファイルがない場合のテスト"""
@@ -205,13 +227,13 @@ class TestTranscriptionServiceExtended:
     @pytest.mark.asyncio
     async def test_transcribe_chunked_audio_with_empty_chunks(self, transcription_service, temp_chunks_dir):
         """空の文字起こし結果を含むチャンクのテスト"""
-        with patch.object(transcription_service, '_transcribe_single_file') as mock_transcribe:
+        with patch.object(transcription_service, '_transcribe_file') as mock_transcribe:
             with patch('shutil.rmtree') as mock_rmtree:
                 # 一部が空の文字起こし結果をモック
                 mock_transcribe.side_effect = [
-                    "最初のチャンクです。",
-                    "",  # 空の結果
-                    "最後のチャンクです。"
+                    TranscriptionResult(text="最初のチャンクです。", duration=10.0),
+                    TranscriptionResult(text="", duration=10.0),  # 空の結果
+                    TranscriptionResult(text="最後のチャンクです。", duration=10.0)
                 ]
 
                 result = await transcription_service._transcribe_chunked_audio(temp_chunks_dir)
@@ -222,7 +244,7 @@ class TestTranscriptionServiceExtended:
     @pytest.mark.asyncio
     async def test_transcribe_chunked_audio_error_cleanup(self, transcription_service, temp_chunks_dir):
         """チャンク処理エラー時のクリーンアップテスト"""
-        with patch.object(transcription_service, '_transcribe_single_file') as mock_transcribe:
+        with patch.object(transcription_service, '_transcribe_file') as mock_transcribe:
             with patch('shutil.rmtree') as mock_rmtree:
                 with patch('os.path.exists') as mock_exists:
                     # エラーを発生させる
@@ -238,7 +260,7 @@ class TestTranscriptionServiceExtended:
     @pytest.mark.asyncio
     async def test_transcribe_chunked_audio_error_no_cleanup_needed(self, transcription_service, temp_chunks_dir):
         """ディレクトリが存在しない場合のエラーテスト"""
-        with patch.object(transcription_service, '_transcribe_single_file') as mock_transcribe:
+        with patch.object(transcription_service, '_transcribe_file') as mock_transcribe:
             with patch('shutil.rmtree') as mock_rmtree:
                 with patch('os.path.exists') as mock_exists:
                     # エラーを発生させる
@@ -251,6 +273,38 @@ class TestTranscriptionServiceExtended:
                     # 存在しないディレクトリは削除されない
                     mock_rmtree.assert_called_once()  # 最初の削除（成功時）のみ
 
+    @pytest.mark.asyncio
+    async def test_transcribe_chunked_audio_resumes_from_checkpoints(
+        self, transcription_service, temp_chunks_dir
+    ):
+        """中断後の再実行で完了済みチャンクを再利用するテスト"""
+        with patch.object(transcription_service, '_transcribe_file') as mock_transcribe:
+            with patch('shutil.rmtree') as mock_rmtree:
+                # 2番目のチャンクの処理中に停止処理でキャンセルされる
+                mock_transcribe.side_effect = [
+                    TranscriptionResult(text="最初のチャンクです。", duration=10.0),
+                    asyncio.CancelledError(),
+                    TranscriptionResult(text="最後のチャンクです。", duration=10.0),
+                ]
+                with pytest.raises(asyncio.CancelledError):
+                    await transcription_service._transcribe_chunked_audio(temp_chunks_dir)
+                mock_rmtree.assert_not_called()
+                assert sorted(
+                    name for name in os.listdir(temp_chunks_dir) if name.endswith(".json")
+                ) == ["chunk_000.mp3.json", "chunk_002.mp3.json"]
+
+                mock_transcribe.reset_mock()
+                mock_transcribe.side_effect = [
+                    TranscriptionResult(text="二番目のチャンクです。", duration=10.0),
+                ]
+                result = await transcription_service._transcribe_chunked_audio(temp_chunks_dir)
+
+        mock_transcribe.assert_called_once_with(
+            os.path.join(temp_chunks_dir, "chunk_001.mp3")
+        )
+        assert result == "最初のチャンクです。 二番目のチャンクです。 最後のチャンクです。"
+        shutil.rmtree(temp_chunks_dir)
+
     def test_different_chunk_file_extensions(self, transcription_service):
         """異なる拡張子のチャンクファイルテスト"""
         # 様々な拡張子のファイルを含むディレクトリを作成
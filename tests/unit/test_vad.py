@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+
+from app.services.vad import (
+    OffsetMap,
+    detect_speech,
+    frame_energy_db,
+    remove_silence,
+)
+
+SAMPLE_RATE = 16000
+
+
+def tone(seconds, amplitude=8000):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.int16)
+
+
+class TestFrameEnergy:
+    """フレームエネルギー計算のテスト"""
+
+    def test_silence_and_tone_levels(self):
+        energy = frame_energy_db(np.concatenate([silence(0.3), tone(0.3)]), 480)
+
+        assert energy[:10].max() < -100
+        assert energy[-10:].min() > -20
+
+    def test_short_input(self):
+        assert len(frame_energy_db(tone(0.01), 480)) == 0
+
+
+class TestDetectSpeech:
+    """音声区間検出のテスト"""
+
+    def test_long_silence_removed(self):
+        samples = np.concatenate([tone(2), silence(3), tone(2)])
+
+        intervals = detect_speech(samples, SAMPLE_RATE, padding_ms=0)
+
+        assert len(intervals) == 2
+        assert intervals[0][1] / SAMPLE_RATE == pytest.approx(2.0, abs=0.03)
+        assert intervals[1][0] / SAMPLE_RATE == pytest.approx(5.0, abs=0.03)
+
+    def test_short_pause_kept(self):
+        samples = np.concatenate([tone(1), silence(0.5), tone(1)])
+
+        intervals = detect_speech(samples, SAMPLE_RATE, min_silence_ms=1000)
+
+        assert intervals == [(0, len(samples))]
+
+    def test_padding_keeps_context(self):
+        samples = np.concatenate([tone(1), silence(3), tone(1)])
+
+        unpadded = detect_speech(samples, SAMPLE_RATE, padding_ms=0)
+        padded = detect_speech(samples, SAMPLE_RATE, padding_ms=300)
+
+        extra = padded[0][1] - unpadded[0][1]
+        assert extra == pytest.approx(0.3 * SAMPLE_RATE, abs=480)
+
+
+class TestRemoveSilence:
+    """無音除去とオフセットマップのテスト"""
+
+    def test_removed_percent_and_offsets(self):
+        samples = np.concatenate([silence(2), tone(2), silence(4), tone(2)])
+
+        speech = remove_silence(samples, SAMPLE_RATE, padding_ms=0)
+
+        # フレーム境界の分だけ誤差を許容
+        assert speech.kept_duration == pytest.approx(4.0, abs=0.1)
+        assert speech.removed_percent == pytest.approx(60.0, abs=1.0)
+        # 除去後1秒 → 元の3秒、除去後3秒 → 元の9秒
+        assert speech.offset_map.to_original(1.0) == pytest.approx(3.0, abs=0.1)
+        assert speech.offset_map.to_original(3.0) == pytest.approx(9.0, abs=0.1)
+
+    def test_all_silence_is_not_emptied(self):
+        samples = silence(3)
+
+        speech = remove_silence(samples, SAMPLE_RATE)
+
+        assert len(speech.samples) == len(samples)
+        assert speech.removed_percent == 0.0
+
+    def test_blocks_match_kept_samples(self):
+        """残す区間をブロックごとに取り出しても連結結果と一致するテスト"""
+        samples = np.concatenate([silence(2), tone(2), silence(4), tone(2)])
+        speech = remove_silence(samples, SAMPLE_RATE, padding_ms=0)
+
+        blocks = list(speech.blocks(block_samples=SAMPLE_RATE // 2))
+
+        assert max(len(block) for block in blocks) <= SAMPLE_RATE // 2
+        np.testing.assert_array_equal(np.concatenate(blocks), speech.samples)
+        assert speech.kept_duration == len(speech.samples) / SAMPLE_RATE
+
+
+class TestOffsetMap:
+    """OffsetMapのテスト"""
+
+    def test_round_trip(self):
+        offset_map = OffsetMap([(0.0, 10.0), (25.0, 40.0)])
+        restored = OffsetMap.from_list(offset_map.to_list())
+
+        assert restored.trimmed_duration == 25.0
+        assert restored.to_original(5.0) == 5.0
+        assert restored.to_original(12.0) == 27.0
+        assert restored.to_original(100.0) == 40.0
+
+    def test_end_at_boundary_stays_in_previous_interval(self):
+        """区間の境目で終わる時刻は除去した無音の先へ飛ばさないテスト"""
+        offset_map = OffsetMap([(0.0, 10.0), (25.0, 40.0)])
+
+        assert offset_map.to_original(10.0) == 25.0
+        assert offset_map.to_original(10.0, end=True) == 10.0
+        assert offset_map.to_original(12.0, end=True) == 27.0
+        assert offset_map.to_original(0.0, end=True) == 0.0
+
+    def test_empty_map_is_identity(self):
+        assert OffsetMap.from_list(None).to_original(12.5) == 12.5